@@ -0,0 +1,112 @@
+"""
+Collector HTTP finto usato dai benchmark.
+
+Accetta sia ``/api/events/`` sia ``/api/events/batch/`` e conta gli eventi
+ricevuti, senza database: misura il costo del lato SDK e del trasporto.
+Con ``fail_with`` simula un collector in difficoltà (es. 503 + Retry-After),
+con ``delay`` uno lento, con ``reject`` un evento che fa fallire ogni batch
+che lo contiene.
+"""
+import gzip
+import json
+import threading
+import time
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        stats = self.server.stats
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        encoding = self.headers.get("Content-Encoding")
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "zstd":
+            import zstandard
+
+            body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        failure = self.server.failure
+        if self.server.poison is not None and self.server.poison in body:
+            failure = (500, None)
+        if failure is not None:
+            status, retry_after = failure
+            with stats["lock"]:
+                stats["rejected"] += 1
+            self.send_response(status)
+            if retry_after is not None:
+                self.send_header("Retry-After", str(retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = json.loads(body)
+        count = len(payload["events"]) if "events" in payload else 1
+        with stats["lock"]:
+            stats["requests"] += 1
+            stats["events"] += count
+            stats["bytes"] += length
+        response = b'{"status": "success"}'
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    # Backlog di listen() come un server reale: con molti sender paralleli
+    # quello di default (5) provoca connessioni rifiutate
+    request_queue_size = 128
+
+
+class Collector:
+    def __init__(self) -> None:
+        self.server = _Server(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.stats = {"lock": threading.Lock(), "requests": 0, "events": 0, "bytes": 0, "rejected": 0}
+        self.server.failure = None
+        self.server.delay = 0.0
+        self.server.poison = None
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/api/events/"
+
+    @property
+    def stats(self):
+        return self.server.stats
+
+    def reset(self) -> None:
+        with self.stats["lock"]:
+            self.stats.update(requests=0, events=0, bytes=0, rejected=0)
+
+    def delay(self, seconds: float) -> None:
+        """Attende ``seconds`` prima di rispondere a ogni richiesta."""
+        self.server.delay = seconds
+
+    def fail_with(self, status: Optional[int], retry_after: Optional[int] = None) -> None:
+        """Risponde a ogni richiesta con ``status`` (``None`` per tornare a 201)."""
+        self.server.failure = None if status is None else (status, retry_after)
+
+    def reject(self, marker: Optional[bytes]) -> None:
+        """Risponde 500 alle richieste che contengono ``marker`` (``None`` per smettere)."""
+        self.server.poison = marker
+
+    def __enter__(self) -> "Collector":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
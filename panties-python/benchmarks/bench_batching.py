@@ -0,0 +1,60 @@
+"""
+Benchmark: eventi/secondo in modalità singola (un POST per evento) contro
+modalità batch (buste con più eventi) verso un collector locale.
+
+    python benchmarks/bench_batching.py [n_events]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.transport import HttpTransport  # noqa: E402
+from _collector import Collector  # noqa: E402
+
+
+def _event(i: int):
+    return {
+        "event_id": f"bench-{i}",
+        "timestamp": int(time.time()),
+        "type": "message",
+        "message": {"text": f"benchmark event {i}", "level": "info"},
+        "tags": {"bench": "batching"},
+        "extra": {},
+    }
+
+
+def run(collector: Collector, n_events: int, batch_size: int):
+    collector.reset()
+    transport = HttpTransport(
+        endpoint=collector.endpoint,
+        api_token="bench",
+        max_queue_size=n_events,
+        batch_size=batch_size,
+    )
+    start = time.perf_counter()
+    for i in range(n_events):
+        transport.send(_event(i))
+    transport.flush(timeout=60)
+    elapsed = time.perf_counter() - start
+    assert collector.stats["events"] == n_events, collector.stats
+    return elapsed, transport.stats()
+
+
+def main() -> None:
+    n_events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with Collector() as collector:
+        for label, batch_size in (("single", 1), ("batched", 100)):
+            elapsed, stats = run(collector, n_events, batch_size)
+            print(
+                f"{label:>8}: {n_events / elapsed:10.0f} events/s "
+                f"({collector.stats['requests']} requests, "
+                f"{stats['connections_opened']} connections, {elapsed:.3f}s, "
+                f"send latency p50 {stats['send_latency']['p50_ms']:.0f} ms "
+                f"p99 {stats['send_latency']['p99_ms']:.0f} ms)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Costo per chiamata di log del ``BreadcrumbHandler`` (record -> ring buffer
+del thread / task corrente), nel thread principale e dentro un task
+asyncio, confrontato con un handler ingenuo che formatta il messaggio e lo
+salva in una ``deque`` sotto il lock dell'handler.
+
+Mostra anche il costo di ``logger.info`` completo (creazione del record
+compresa) con e senza handler di breadcrumb.
+
+Esce con codice 1 se l'handler supera ``BUDGET_NS`` per chiamata.
+
+    python benchmarks/bench_breadcrumbs.py
+"""
+import asyncio
+import collections
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.breadcrumbs import _buffer, clear_breadcrumbs, get_breadcrumbs  # noqa: E402
+from panties.logging import BreadcrumbHandler  # noqa: E402
+
+CALLS = 100_000
+REPEATS = 7
+# Budget per chiamata dell'handler, in nanosecondi
+BUDGET_NS = 1000
+
+
+class NaiveHandler(logging.Handler):
+    """Breadcrumb come dict con messaggio formattato, in una deque."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records = collections.deque(maxlen=100)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append({
+            "timestamp": record.created,
+            "category": record.name,
+            "level": record.levelname.lower(),
+            "message": record.getMessage(),
+        })
+
+
+def _per_call_ns(func, *args) -> float:
+    """Minimo su REPEATS serie di CALLS chiamate, in ns per chiamata."""
+    samples = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            func(*args)
+        samples.append((time.perf_counter() - start) / CALLS * 1e9)
+    # Il minimo è la misura meno disturbata dal resto della macchina
+    return min(samples)
+
+
+def _baseline_ns() -> float:
+    """Costo del ciclo di misura con una funzione vuota, da sottrarre."""
+    return _per_call_ns(lambda record: None, None)
+
+
+def main() -> int:
+    record = logging.LogRecord("app.orders", logging.INFO, __file__, 1, "order %s shipped", (42,), None)
+    handler = BreadcrumbHandler()
+    naive = NaiveHandler()
+    loop_ns = _baseline_ns()
+
+    results = {}
+    clear_breadcrumbs()
+    results["BreadcrumbHandler (thread)"] = _per_call_ns(handler.handle, record) - loop_ns
+    # Nel buffer il messaggio resta da formattare; lo formatta la copia
+    assert _buffer.get().records()[-1][3] == "order %s shipped"
+    assert get_breadcrumbs()[-1][3] == "order 42 shipped"
+
+    async def in_task() -> float:
+        return _per_call_ns(handler.handle, record) - loop_ns
+
+    results["BreadcrumbHandler (asyncio task)"] = asyncio.run(in_task())
+    results["naive deque handler"] = _per_call_ns(naive.handle, record) - loop_ns
+
+    print(f"per-call handler cost (best of {REPEATS} x {CALLS} calls, loop overhead removed):")
+    for name, ns in results.items():
+        print(f"  {name:34s} {ns:7.0f} ns")
+
+    logger = logging.getLogger("bench.breadcrumbs")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    plain = _per_call_ns(logger.info, "order %s shipped", 42)
+    logger.addHandler(handler)
+    with_crumbs = _per_call_ns(logger.info, "order %s shipped", 42)
+    logger.removeHandler(handler)
+    print(f"logger.info: {plain:.0f} ns without handlers, {with_crumbs:.0f} ns with BreadcrumbHandler")
+
+    worst = max(results["BreadcrumbHandler (thread)"], results["BreadcrumbHandler (asyncio task)"])
+    if worst > BUDGET_NS:
+        print(f"FAIL: BreadcrumbHandler over budget ({worst:.0f} ns > {BUDGET_NS} ns)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
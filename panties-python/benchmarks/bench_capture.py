@@ -0,0 +1,91 @@
+"""
+Latenza di ``capture_exception`` sul thread dell'applicazione (p50/p99),
+con un traceback profondo 20 frame:
+
+- prima: evento costruito e serializzato dal chiamante (transport che non
+  accetta snapshot)
+- dopo: solo lo ``EventSnapshot`` sul chiamante, il resto nel worker
+
+    python benchmarks/bench_capture.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from _collector import Collector  # noqa: E402
+from panties.client import PantiesClient  # noqa: E402
+from panties.transport import HttpTransport  # noqa: E402
+
+ITERATIONS = 2000
+DEPTH = 20
+
+
+class _EagerTransport:
+    """``HttpTransport`` senza snapshot: il client gli passa eventi già costruiti."""
+
+    def __init__(self, transport: HttpTransport) -> None:
+        self._transport = transport
+
+    def send(self, event) -> None:
+        self._transport.send(event)
+
+    def stats(self):
+        return self._transport.stats()
+
+    def flush(self, timeout=None) -> int:
+        return self._transport.flush(timeout)
+
+    def close(self, timeout=None) -> int:
+        return self._transport.close(timeout)
+
+
+def _recurse(depth: int) -> None:
+    if depth == 0:
+        raise ValueError("invalid literal for int() with base 10: 'abc'")
+    _recurse(depth - 1)
+
+
+def _measure(client: PantiesClient):
+    samples = []
+    for _ in range(ITERATIONS):
+        try:
+            _recurse(DEPTH)
+        except ValueError:
+            start = time.perf_counter()
+            client.capture_exception(extra={"user_id": 42}, tags={"region": "eu"})
+            samples.append(time.perf_counter() - start)
+    samples.sort()
+    p50 = samples[len(samples) // 2] * 1e6
+    p99 = samples[int(len(samples) * 0.99)] * 1e6
+    return p50, p99
+
+
+def _run(collector: Collector, eager: bool):
+    transport = HttpTransport(
+        endpoint=collector.endpoint,
+        api_token="bench",
+        max_queue_size=ITERATIONS,
+    )
+    client = PantiesClient(
+        api_token="bench",
+        endpoint=collector.endpoint,
+        transport=_EagerTransport(transport) if eager else transport,
+        dedupe_window=0,
+    )
+    p50, p99 = _measure(client)
+    client.close(timeout=10)
+    return p50, p99, transport.stats()["sent"]
+
+
+def main() -> None:
+    with Collector() as collector:
+        for label, eager in (("before (eager)", True), ("after (snapshot)", False)):
+            p50, p99, sent = _run(collector, eager)
+            print(f"{label:17s}: p50 {p50:7.1f} us   p99 {p99:7.1f} us   sent {sent}/{ITERATIONS}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: byte sul filo e costo CPU della compressione dei body
+(nessuna, gzip, zstd se disponibile) su buste di eventi realistiche.
+
+    python benchmarks/bench_compression.py [events_per_batch]
+"""
+import json
+import os
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.compression import available_encodings, compress_body  # noqa: E402
+
+
+def _recurse(depth: int):
+    if depth == 0:
+        raise ValueError("invalid literal for int() with base 10: 'abc'")
+    return _recurse(depth - 1)
+
+
+def _exception_event(i: int):
+    try:
+        _recurse(20)
+    except ValueError as e:
+        frames = traceback.format_tb(e.__traceback__)
+        message = str(e)
+    return {
+        "event_id": f"bench-{i}",
+        "timestamp": int(time.time()),
+        "environment": "production",
+        "service_name": "bench-service",
+        "sdk": {"name": "panties-python", "version": "0.1.0"},
+        "type": "exception",
+        "exception": {"type": "ValueError", "message": message, "stacktrace": frames},
+        "tags": {"bench": "compression", "host": "web-01"},
+        "extra": {"user_id": i, "path": "/api/orders/", "query": {"page": 1, "size": 50}},
+    }
+
+
+def main() -> None:
+    n_events = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    events = [json.dumps(_exception_event(i)).encode("utf-8") for i in range(n_events)]
+    envelope = b'{"events":[' + b",".join(events) + b"]}"
+    rounds = 50
+
+    print(f"envelope: {n_events} events, {len(envelope)} bytes raw")
+    for encoding in (None,) + available_encodings():
+        start = time.process_time()
+        for _ in range(rounds):
+            body, used = compress_body(envelope, encoding, threshold=1024)
+        cpu_ms = (time.process_time() - start) * 1000 / rounds
+        ratio = len(envelope) / len(body)
+        print(
+            f"{encoding or 'none':>6}: {len(body):9d} bytes  "
+            f"ratio {ratio:6.1f}x  cpu {cpu_ms:7.3f} ms/batch"
+        )
+
+
+if __name__ == "__main__":
+    main()
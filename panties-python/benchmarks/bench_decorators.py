@@ -0,0 +1,159 @@
+"""
+Costo aggiunto da ``capture_exceptions`` e ``capture_exceptions_ctx`` sul
+percorso senza eccezioni, rispetto alla stessa funzione non decorata:
+
+- funzione normale, ``async def``, generatore e generatore asincrono
+- blocco ``with`` / ``async with``, confrontato con il vecchio
+  context manager basato su ``@contextmanager``
+
+    python benchmarks/bench_decorators.py
+"""
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import panties  # noqa: E402
+
+CALLS = 100_000
+REPEATS = 7
+
+
+def _per_call_ns(run) -> float:
+    """Minimo su REPEATS esecuzioni di ``run(CALLS)``, in ns per chiamata."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run(CALLS)
+        best = min(best, time.perf_counter() - start)
+    return best / CALLS * 1e9
+
+
+def _async_per_call_ns(run) -> float:
+    """Come ``_per_call_ns`` per una coroutine ``run(CALLS)``, in un solo loop."""
+
+    async def main() -> float:
+        best = float("inf")
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            await run(CALLS)
+            best = min(best, time.perf_counter() - start)
+        return best / CALLS * 1e9
+
+    return asyncio.run(main())
+
+
+def plain(x):
+    return x
+
+
+async def coro(x):
+    return x
+
+
+def gen(x):
+    yield x
+
+
+async def agen(x):
+    yield x
+
+
+@contextlib.contextmanager
+def old_ctx():
+    # Il context manager prima di questa versione
+    try:
+        yield
+    except Exception:
+        raise
+
+
+def _call(func):
+    def run(n):
+        for i in range(n):
+            func(i)
+    return run
+
+
+def _await(func):
+    async def run(n):
+        for i in range(n):
+            await func(i)
+    return run
+
+
+def _iterate(func):
+    def run(n):
+        for i in range(n):
+            for _ in func(i):
+                pass
+    return run
+
+
+def _async_iterate(func):
+    async def run(n):
+        for i in range(n):
+            async for _ in func(i):
+                pass
+    return run
+
+
+def _with(factory):
+    def run(n):
+        for i in range(n):
+            with factory():
+                plain(i)
+    return run
+
+
+def _no_with(n):
+    for i in range(n):
+        plain(i)
+
+
+def _async_with(factory):
+    async def run(n):
+        for i in range(n):
+            async with factory():
+                plain(i)
+    return run
+
+
+async def _no_async_with(n):
+    for i in range(n):
+        plain(i)
+
+
+def _row(name: str, base: float, wrapped: float) -> None:
+    print(f"  {name:26s} {base:7.0f} ns  {wrapped:7.0f} ns  +{wrapped - base:6.0f} ns  x{wrapped / base:4.2f}")
+
+
+def main() -> None:
+    wrap = panties.capture_exceptions
+    print(f"success path, best of {REPEATS} x {CALLS} calls:")
+    print(f"  {'':26s} {'undecorated':>10s} {'decorated':>10s}")
+    _row("function", _per_call_ns(_call(plain)), _per_call_ns(_call(wrap(plain))))
+    _row("async def (await)", _async_per_call_ns(_await(coro)), _async_per_call_ns(_await(wrap(coro))))
+    _row("generator (1 item)", _per_call_ns(_iterate(gen)), _per_call_ns(_iterate(wrap(gen))))
+    _row(
+        "async generator (1 item)",
+        _async_per_call_ns(_async_iterate(agen)),
+        _async_per_call_ns(_async_iterate(wrap(agen))),
+    )
+
+    print(f"  {'':26s} {'no block':>10s} {'block':>10s}")
+    no_with = _per_call_ns(_no_with)
+    _row("with capture_exceptions_ctx", no_with, _per_call_ns(_with(panties.capture_exceptions_ctx)))
+    _row("with @contextmanager (old)", no_with, _per_call_ns(_with(old_ctx)))
+    _row(
+        "async with",
+        _async_per_call_ns(_no_async_with),
+        _async_per_call_ns(_async_with(panties.capture_exceptions_ctx)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Verifica sotto carico della fork-safety di ``HttpTransport``: il padre invia
+eventi da un thread mentre fa ``fork()`` di più figli (sia con ``os.fork`` sia
+con un pool ``multiprocessing``), ognuno dei quali invia i propri eventi.
+Al termine il collector deve aver ricevuto tutti gli eventi, senza perdite
+né duplicati.
+
+    python benchmarks/bench_fork.py [children] [events_per_child]
+"""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.transport import HttpTransport  # noqa: E402
+from _collector import Collector  # noqa: E402
+
+transport: HttpTransport
+
+
+def _event(origin: str, i: int):
+    return {"event_id": f"{origin}-{i}", "type": "message", "message": {"text": "fork", "level": "info"}}
+
+
+def _child_work(args) -> int:
+    origin, n_events = args
+    for i in range(n_events):
+        transport.send(_event(origin, i))
+    transport.flush()
+    return n_events
+
+
+def main() -> None:
+    global transport
+    if not hasattr(os, "fork"):
+        print("os.fork non disponibile su questa piattaforma")
+        return
+
+    children = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_child = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    parent_events = 2000
+
+    with Collector() as collector:
+        transport = HttpTransport(
+            endpoint=collector.endpoint,
+            api_token="bench",
+            max_queue_size=parent_events + 1,
+        )
+        stop = threading.Event()
+
+        def parent_load() -> None:
+            for i in range(parent_events):
+                transport.send(_event("parent", i))
+                if i % 100 == 0:
+                    time.sleep(0.001)
+            stop.set()
+
+        start = time.perf_counter()
+        loader = threading.Thread(target=parent_load)
+        loader.start()
+
+        pids = []
+        for c in range(children):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    _child_work((f"fork{c}", per_child))
+                finally:
+                    os._exit(0)
+            pids.append(pid)
+
+        ctx = multiprocessing.get_context("fork")
+        with ctx.Pool(children) as pool:
+            pool_sent = sum(pool.map(_child_work, [(f"pool{c}", per_child) for c in range(children)]))
+
+        for pid in pids:
+            os.waitpid(pid, 0)
+        loader.join()
+        transport.flush()
+        elapsed = time.perf_counter() - start
+
+        expected = parent_events + children * per_child + pool_sent
+        received = collector.stats["events"]
+        print(f"expected {expected} events, received {received} in {elapsed:.2f}s")
+        if received != expected:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
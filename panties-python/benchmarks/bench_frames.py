@@ -0,0 +1,53 @@
+"""
+Benchmark: costo di cattura dello stacktrace per traceback profondi
+(``traceback.format_tb`` contro ``extract_frames`` a cache fredda e calda).
+
+    python benchmarks/bench_frames.py [depth]
+"""
+import os
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.frames import clear_cache, extract_frames  # noqa: E402
+
+
+def _recurse(depth: int):
+    if depth == 0:
+        raise RuntimeError("deep")
+    return _recurse(depth - 1)
+
+
+def _traceback(depth: int):
+    try:
+        _recurse(depth)
+    except RuntimeError as e:
+        return e.__traceback__
+
+
+def _measure(label: str, func, tb, rounds: int, before=None) -> None:
+    total = 0.0
+    for _ in range(rounds):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        func(tb)
+        total += time.perf_counter() - start
+    print(f"{label:>22}: {total / rounds * 1e6:10.1f} µs/capture")
+
+
+def main() -> None:
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 150
+    rounds = 200
+    tb = _traceback(depth)
+    print(f"traceback depth: {depth} frames")
+    _measure("traceback.format_tb", traceback.format_tb, tb, rounds)
+    _measure("extract_frames (cold)", extract_frames, tb, rounds, before=clear_cache)
+    extract_frames(tb)
+    _measure("extract_frames (warm)", extract_frames, tb, rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Costo di ``import panties`` più ``panties.init()`` in un interprete nuovo,
+misurato con ``-X importtime`` e con il tempo totale, contro un budget.
+
+Il budget vale per il costo aggiunto da panties rispetto a un interprete
+che ha già importato ``typing`` (usato da praticamente ogni applicazione,
+e da solo più costoso di tutto l'SDK).
+
+Esce con codice 1 se il budget viene superato o se l'avvio importa moduli
+pesanti che devono restare differiti al primo evento (asyncio, logging,
+http.client, json, ...), così può essere usato come test di regressione.
+
+    python benchmarks/bench_import.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+RUNS = 15
+# Budget (mediana, in millisecondi) per import + init() oltre a ``import typing``
+BUDGET_MS = 15.0
+
+# Moduli che non devono essere importati da import + init()
+DEFERRED = (
+    "asyncio",
+    "ssl",
+    "logging",
+    "traceback",
+    "http.client",
+    "urllib.parse",
+    "urllib.request",
+    "email.utils",
+    "json",
+    "uuid",
+    "gzip",
+    "sqlite3",
+    "sysconfig",
+    "hashlib",
+    "random",
+)
+
+_INIT = """
+import panties
+panties.init(api_token="bench", endpoint="http://127.0.0.1:9/api/events/")
+"""
+
+_SCRIPT = """
+import sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+modules = sorted(set(sys.modules) - before)
+import json, threading
+print(json.dumps({"ms": elapsed * 1000, "threads": threading.active_count(), "modules": modules}))
+"""
+
+
+def _run(code: str = _INIT, importtime: bool = False):
+    args = [sys.executable, "-E"]
+    if importtime:
+        args += ["-X", "importtime"]
+    result = subprocess.run(
+        args + ["-c", _SCRIPT % code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout), result.stderr
+
+
+def _self_times(stderr: str):
+    """Tempo proprio (us) dei moduli importati, dal più costoso."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return sorted(rows, reverse=True)
+
+
+def main() -> int:
+    baseline = statistics.median(_run("import typing")[0]["ms"] for _ in range(RUNS))
+    runs = [_run()[0] for _ in range(RUNS)]
+    total = statistics.median(run["ms"] for run in runs)
+    median = total - baseline
+    loaded = set(runs[0]["modules"])
+    leaked = [name for name in DEFERRED if name in loaded]
+
+    _, stderr = _run(importtime=True)
+    print(f"import panties + init(): median {total:.2f} ms over {RUNS} runs")
+    print(f"  of which import typing: {baseline:.2f} ms, panties: {median:.2f} ms (budget {BUDGET_MS:.0f} ms)")
+    print(f"threads after init(): {runs[0]['threads']}, modules imported: {len(loaded)}")
+    print("slowest imports (self us | cumulative us | module):")
+    for self_us, cumulative_us, name in _self_times(stderr)[:8]:
+        print(f"  {self_us:6d} | {cumulative_us:6d} | {name}")
+
+    ok = True
+    if median > BUDGET_MS:
+        print(f"FAIL: over budget by {median - BUDGET_MS:.2f} ms")
+        ok = False
+    if leaked:
+        print(f"FAIL: deferred modules imported at startup: {', '.join(leaked)}")
+        ok = False
+    if runs[0]["threads"] != 1:
+        print("FAIL: init() started background threads")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Costo della cattura delle variabili locali con ``SafeRepr`` rispetto a un
+``repr()`` ingenuo, su locals tipici e patologici (liste enormi, stringhe
+da 10 MB, sottoclassi di contenitori come ``defaultdict``, ``__repr__``
+lenti, QuerySet che eseguirebbero una query).
+
+    python benchmarks/bench_locals.py
+"""
+import os
+import sys
+import time
+from collections import OrderedDict, defaultdict, deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.safe_repr import SafeRepr  # noqa: E402
+
+EVENTS = 50
+
+
+class SlowRepr:
+    def __repr__(self) -> str:
+        time.sleep(0.005)
+        return "SlowRepr()"
+
+
+class QuerySet:
+    """Simula un QuerySet di Django: repr() esegue una query."""
+
+    def __repr__(self) -> str:
+        time.sleep(0.02)
+        return "<QuerySet [...]>"
+
+
+QuerySet.__module__ = "django.db.models.query"
+
+
+class Order:
+    def __init__(self, i: int) -> None:
+        self.id = i
+        self.items = [1, 2, 3]
+
+    def __repr__(self) -> str:
+        return f"Order(id={self.id})"
+
+
+def _scenarios():
+    return {
+        "typical": {
+            "order": Order(1),
+            "user_id": 42,
+            "path": "/api/orders",
+            "payload": {"a": 1, "b": [1, 2, 3]},
+        },
+        "huge containers": {
+            "rows": list(range(1_000_000)),
+            "index": {i: str(i) for i in range(100_000)},
+            "blob": "x" * 10_000_000,
+            "number": 10 ** 4000,
+        },
+        "subclasses": {
+            "groups": defaultdict(list, {i: [i] for i in range(100_000)}),
+            "recent": deque(range(1_000_000)),
+            "ordered": OrderedDict((i, str(i)) for i in range(100_000)),
+        },
+        "slow __repr__": {"objects": [SlowRepr() for _ in range(20)]},
+        "queryset": {"qs": QuerySet(), "orders": [Order(i) for i in range(1000)]},
+    }
+
+
+def _naive(variables):
+    result = {}
+    for name, value in variables.items():
+        try:
+            text = repr(value)
+        except ValueError:
+            text = "<error>"
+        result[name] = text[:200]
+    return result
+
+
+def _time(func, variables, events: int):
+    samples = []
+    for _ in range(events):
+        start = time.perf_counter()
+        func(variables)
+        samples.append(time.perf_counter() - start)
+    return samples[0] * 1e3, sorted(samples)[len(samples) // 2] * 1e3, max(samples) * 1e3
+
+
+def main() -> None:
+    print(f"{'':16s}  {'naive repr (first/p50/max ms)':>32s}  {'SafeRepr (first/p50/max ms)':>30s}")
+    for name, variables in _scenarios().items():
+        # Il repr ingenuo dei casi lenti viene misurato su meno eventi
+        naive = _time(_naive, variables, 5)
+        engine = SafeRepr()
+        safe = _time(lambda v: engine.repr_locals(v), variables, EVENTS)
+        print(
+            f"{name:16s}  {naive[0]:9.3f} {naive[1]:9.3f} {naive[2]:9.3f}"
+            f"       {safe[0]:9.3f} {safe[1]:9.3f} {safe[2]:9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
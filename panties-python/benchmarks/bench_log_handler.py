@@ -0,0 +1,118 @@
+"""
+``PantiesHandler`` contro la configurazione non bloccante della libreria
+standard (``QueueHandler`` + ``QueueListener`` con un handler che chiama il
+client), con più thread che loggano errori contemporaneamente verso un
+collector locale:
+
+- latenza della chiamata di log sul thread dell'applicazione (p50/p99)
+- record al secondo e tempo per consegnare tutto al collector
+- eventi e richieste arrivati al collector ed eventi scartati a coda piena
+  (le raffiche di record identici vengono aggregate da ``PantiesHandler``)
+
+    python benchmarks/bench_log_handler.py [threads] [records_per_thread]
+"""
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from _collector import Collector  # noqa: E402
+from panties.client import PantiesClient  # noqa: E402
+from panties.logging import PantiesHandler  # noqa: E402
+
+# Un record su EXCEPTION_EVERY viene loggato con logger.exception
+EXCEPTION_EVERY = 10
+
+
+class ClientHandler(logging.Handler):
+    """Handler ingenuo per il QueueListener: un evento per record."""
+
+    def __init__(self, client: PantiesClient) -> None:
+        super().__init__()
+        self.client = client
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.exc_info:
+            self.client.capture_exception(*record.exc_info, extra={"log_message": record.getMessage()})
+        else:
+            self.client.capture_message(record.getMessage(), level="error")
+
+
+def _load(logger: logging.Logger, threads: int, records: int):
+    latencies = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def work(n: int) -> None:
+        samples = latencies[n]
+        barrier.wait()
+        for i in range(records):
+            start = time.perf_counter()
+            if i % EXCEPTION_EVERY:
+                logger.error("payment %s failed for order %s", n, i)
+            else:
+                try:
+                    raise ValueError(f"order {i}")
+                except ValueError:
+                    logger.exception("order %s rejected", i)
+            samples.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=work, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    merged = sorted(s for samples in latencies for s in samples)
+    return elapsed, merged[len(merged) // 2], merged[int(len(merged) * 0.99)]
+
+
+def _run(name: str, threads: int, records: int, queued: bool) -> None:
+    with Collector() as collector:
+        client = PantiesClient(api_token="bench", endpoint=collector.endpoint, dedupe_window=60.0)
+        logger = logging.getLogger(f"bench.{name}")
+        logger.propagate = False
+        listener = None
+        if queued:
+            log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+            listener = logging.handlers.QueueListener(log_queue, ClientHandler(client))
+            listener.start()
+            handler: logging.Handler = logging.handlers.QueueHandler(log_queue)
+        else:
+            handler = PantiesHandler(client=client)
+        logger.addHandler(handler)
+
+        elapsed, p50, p99 = _load(logger, threads, records)
+        start = time.perf_counter()
+        if listener is not None:
+            listener.stop()
+        client.close(timeout=30.0)
+        drain = time.perf_counter() - start
+        dropped = client.stats()["dropped"]
+        logger.removeHandler(handler)
+
+        total = threads * records
+        stats = collector.stats
+        print(
+            f"{name:15s} log call p50 {p50 * 1e6:6.1f} us  p99 {p99 * 1e6:7.1f} us  "
+            f"{total / elapsed:9.0f} records/s  drain {drain:5.2f}s  "
+            f"-> {stats['events']:6d} events in {stats['requests']:4d} requests, {dropped} dropped"
+        )
+
+
+def main() -> None:
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    records = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    print(f"{threads} threads x {records} ERROR records (1 in {EXCEPTION_EVERY} with a traceback)")
+    _run("QueueHandler", threads, records, queued=True)
+    _run("PantiesHandler", threads, records, queued=False)
+
+
+if __name__ == "__main__":
+    main()
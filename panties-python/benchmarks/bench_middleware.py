@@ -0,0 +1,205 @@
+"""
+Costo per richiesta dei middleware di panties sul percorso senza errori,
+confrontato con la stessa app senza middleware:
+
+- WSGI con risposta in lista e con risposta generatore (iterata e chiusa
+  come fa il server)
+- ASGI (scope ``http``, dentro un event loop)
+- Django, sincrono e asincrono (il middleware attorno a una view, con una
+  ``HttpRequest`` di ``RequestFactory``)
+
+Il client è inizializzato con il tracing spento (default): il contesto
+della richiesta viene costruito solo per gli eventi inviati, quindi qui non
+compare.
+
+Esce con codice 1 se un middleware aggiunge più di ``BUDGET_US`` per richiesta.
+
+    python benchmarks/bench_middleware.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from _collector import Collector  # noqa: E402
+from panties.asgi import PantiesASGIMiddleware  # noqa: E402
+from panties.client import PantiesClient  # noqa: E402
+from panties.state import set_client  # noqa: E402
+from panties.wsgi import PantiesWSGIMiddleware  # noqa: E402
+
+CALLS = 50_000
+REPEATS = 7
+# Costo aggiunto per richiesta, in microsecondi
+BUDGET_US = 5.0
+
+ENVIRON = {
+    "REQUEST_METHOD": "GET",
+    "PATH_INFO": "/orders/42",
+    "QUERY_STRING": "page=2",
+    "SERVER_NAME": "localhost",
+    "SERVER_PORT": "8000",
+    "wsgi.url_scheme": "http",
+    "HTTP_HOST": "localhost:8000",
+    "HTTP_AUTHORIZATION": "Bearer secret",
+    "HTTP_USER_AGENT": "bench",
+}
+
+SCOPE = {
+    "type": "http",
+    "method": "GET",
+    "path": "/orders/42",
+    "query_string": b"page=2",
+    "headers": [(b"host", b"localhost:8000"), (b"authorization", b"Bearer secret")],
+}
+
+
+def _best_us(run) -> float:
+    """Minimo su REPEATS serie di CALLS richieste, in us per richiesta."""
+    best = float("inf")
+    for _ in range(REPEATS):
+        best = min(best, run())
+    return best
+
+
+def _start_response(status, headers, exc_info=None) -> None:
+    pass
+
+
+def _wsgi_list(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+
+def _wsgi_generator(environ, start_response):
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    yield b"ok"
+
+
+def _serve_wsgi(app) -> float:
+    # Come un server WSGI: chiama l'app, itera la risposta e la chiude
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        result = app(ENVIRON, _start_response)
+        for _chunk in result:
+            pass
+        close = getattr(result, "close", None)
+        if close is not None:
+            close()
+    return (time.perf_counter() - start) / CALLS * 1e6
+
+
+async def _asgi_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _send(message) -> None:
+    pass
+
+
+def _serve_asgi(app) -> float:
+    async def run() -> float:
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            await app(SCOPE, None, _send)
+        return (time.perf_counter() - start) / CALLS * 1e6
+
+    return asyncio.run(run())
+
+
+def _django_results():
+    """Coppie (nome, bare, con middleware) per Django, se installato."""
+    try:
+        import django
+        from django.conf import settings
+    except ImportError:
+        print("django not installed: skipped")
+        return []
+    settings.configure(ALLOWED_HOSTS=["*"], ROOT_URLCONF=__name__, LOGGING_CONFIG=None)
+    django.setup()
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    from panties.django import PantiesMiddleware
+
+    request = RequestFactory().get("/orders/42", {"page": 2}, HTTP_AUTHORIZATION="Bearer secret")
+    response = HttpResponse("ok")
+
+    def view(request):
+        return response
+
+    async def async_view(request):
+        return response
+
+    def serve(handler) -> float:
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            handler(request)
+        return (time.perf_counter() - start) / CALLS * 1e6
+
+    def serve_async(handler) -> float:
+        async def run() -> float:
+            start = time.perf_counter()
+            for _ in range(CALLS):
+                await handler(request)
+            return (time.perf_counter() - start) / CALLS * 1e6
+
+        return asyncio.run(run())
+
+    return [
+        ("django (sync)", _best_us(lambda: serve(view)), _best_us(lambda: serve(PantiesMiddleware(view)))),
+        (
+            "django (async)",
+            _best_us(lambda: serve_async(async_view)),
+            _best_us(lambda: serve_async(PantiesMiddleware(async_view))),
+        ),
+    ]
+
+
+urlpatterns: list = []
+
+
+def main() -> int:
+    with Collector() as collector:
+        client = PantiesClient(api_token="bench", endpoint=collector.endpoint)
+        set_client(client)
+
+        results = [
+            (
+                "wsgi (list response)",
+                _best_us(lambda: _serve_wsgi(_wsgi_list)),
+                _best_us(lambda: _serve_wsgi(PantiesWSGIMiddleware(_wsgi_list))),
+            ),
+            (
+                "wsgi (generator response)",
+                _best_us(lambda: _serve_wsgi(_wsgi_generator)),
+                _best_us(lambda: _serve_wsgi(PantiesWSGIMiddleware(_wsgi_generator))),
+            ),
+            (
+                "asgi",
+                _best_us(lambda: _serve_asgi(_asgi_app)),
+                _best_us(lambda: _serve_asgi(PantiesASGIMiddleware(_asgi_app))),
+            ),
+        ]
+        results.extend(_django_results())
+        client.close()
+
+    print(f"per-request cost (best of {REPEATS} x {CALLS} requests, us):")
+    print(f"  {'':28s} {'bare':>7s} {'panties':>8s} {'added':>7s}")
+    worst = 0.0
+    for name, bare, wrapped in results:
+        added = wrapped - bare
+        worst = max(worst, added)
+        print(f"  {name:28s} {bare:7.2f} {wrapped:8.2f} {added:7.2f}")
+
+    if worst > BUDGET_US:
+        print(f"FAIL: middleware over budget ({worst:.2f} us > {BUDGET_US:.0f} us)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
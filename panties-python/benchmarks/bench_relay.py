@@ -0,0 +1,151 @@
+"""
+``RelayTransport`` + ``panties.relay`` contro un ``HttpTransport`` per
+processo:
+
+- costo di ``send()`` sul thread dell'applicazione (dict) e di
+  ``capture_exception`` (snapshot) con i due transport
+- più processi che inviano eventi (con un'eccezione ripetuta in tutti):
+  connessioni e richieste verso il collector, eventi consegnati e
+  duplicati aggregati dal relay
+
+    python benchmarks/bench_relay.py [processes] [events_per_process]
+"""
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from _collector import Collector  # noqa: E402
+from panties.client import PantiesClient  # noqa: E402
+from panties.relay import Relay  # noqa: E402
+from panties.relay_transport import RelayTransport  # noqa: E402
+from panties.transport import HttpTransport  # noqa: E402
+
+CALLS = 2000
+REPEATS = 5
+# Eccezioni identiche per processo (aggregate tra processi dal relay)
+DUPLICATES = 20
+
+
+def _event(origin: str, i: int):
+    return {"event_id": f"{origin}-{i}", "type": "message", "message": {"text": "relay", "level": "info"}}
+
+
+def _per_call_us(func) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for i in range(CALLS):
+            func(i)
+        best = min(best, (time.perf_counter() - start) / CALLS)
+    return best * 1e6
+
+
+def _capture(client: PantiesClient, i: int) -> None:
+    try:
+        raise ValueError(i)
+    except ValueError:
+        client.capture_exception()
+
+
+def _process_work(args):
+    """Un processo dell'host: eventi distinti più la stessa eccezione ripetuta."""
+    mode, target, origin, events = args
+    if mode == "relay":
+        transport = RelayTransport(target)
+    else:
+        transport = HttpTransport(endpoint=target, api_token="bench", max_queue_size=events + DUPLICATES + 10)
+    client = PantiesClient(api_token="bench", endpoint="-", transport=transport, dedupe_window=60)
+    for i in range(events):
+        transport.send(_event(origin, i))
+    for i in range(DUPLICATES):
+        try:
+            raise KeyError("same")
+        except KeyError:
+            client.capture_exception()
+    client.close(timeout=30.0)
+    stats = transport.stats()
+    return stats.get("connections_opened", 0), stats["dropped"]
+
+
+def _serve_relay(address: str, endpoint: str, ready, results) -> None:
+    """Il relay, in un processo suo come in produzione (niente GIL condiviso)."""
+    relay = Relay(address, endpoint, "bench", dedupe_window=60.0)
+    relay.bind()
+    signal.signal(signal.SIGTERM, lambda *_: relay.shutdown())
+    ready.set()
+    relay.serve_forever()
+    relay.close(timeout=30.0)
+    results.put(relay.stats())
+
+
+class _RelayProcess:
+    def __init__(self, address: str, endpoint: str) -> None:
+        ctx = multiprocessing.get_context("fork")
+        ready = ctx.Event()
+        self._results = ctx.Queue()
+        self._process = ctx.Process(target=_serve_relay, args=(address, endpoint, ready, self._results))
+        self._process.start()
+        ready.wait(10)
+
+    def stop(self):
+        self._process.terminate()
+        stats = self._results.get(timeout=60)
+        self._process.join()
+        return stats
+
+
+def _run(mode: str, target: str, processes: int, events: int):
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(processes) as pool:
+        results = pool.map(_process_work, [(mode, target, f"p{i}", events) for i in range(processes)])
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
+def main() -> None:
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    address = f"unix:{tempfile.mkdtemp()}/relay.sock"
+
+    with Collector() as collector:
+        relay = _RelayProcess(address, collector.endpoint)
+        http = HttpTransport(endpoint=collector.endpoint, api_token="bench", max_queue_size=REPEATS * CALLS + 1)
+        local = RelayTransport(address)
+        print("app thread cost per event (us):")
+        print(f"  HttpTransport.send(dict)   {_per_call_us(lambda i: http.send(_event('http', i))):6.2f}")
+        print(f"  RelayTransport.send(dict)  {_per_call_us(lambda i: local.send(_event('relay', i))):6.2f}")
+        for name, transport in (("HttpTransport", http), ("RelayTransport", local)):
+            client = PantiesClient(api_token="bench", endpoint=collector.endpoint, transport=transport, dedupe_window=0)
+            print(f"  capture_exception ({name}) {_per_call_us(lambda i: _capture(client, i)):6.2f}")
+            transport.flush(timeout=30.0)
+        http.close(timeout=30.0)
+        local.close(timeout=30.0)
+        relay.stop()
+
+    total = processes * (events + DUPLICATES)
+    print(f"{processes} processes x ({events} events + {DUPLICATES} identical exceptions) = {total} captures:")
+    with Collector() as collector:
+        connections, dropped = _run("http", collector.endpoint, processes, events)
+        print(
+            f"  HttpTransport per process: {connections} connections, {collector.stats['requests']} requests, "
+            f"{collector.stats['events']} events, {dropped} dropped"
+        )
+
+    with Collector() as collector:
+        relay = _RelayProcess(address, collector.endpoint)
+        _, dropped = _run("relay", address, processes, events)
+        stats = relay.stop()
+        print(
+            f"  RelayTransport + relay:    {stats['connections_opened']} connections, {collector.stats['requests']} requests, "
+            f"{collector.stats['events']} events, {dropped} dropped in processes, "
+            f"{stats['received']} datagrams, {stats['deduplicated']} duplicates aggregated"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Comportamento del transport con un collector in difficoltà:
+
+1. collector che risponde 503 + ``Retry-After``: quante richieste arrivano
+   durante il blackout e se gli eventi vengono consegnati alla ripresa
+2. endpoint irraggiungibile (porta chiusa): tentativi di connessione e CPU
+   consumata dal worker, con e senza circuit breaker
+
+    python benchmarks/bench_retry.py
+"""
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.transport import HttpTransport  # noqa: E402
+from _collector import Collector  # noqa: E402
+
+EVENTS = 500
+OUTAGE = 3.0
+
+
+def _event(i: int):
+    return {"event_id": f"evt-{i}", "type": "message", "message": {"text": "retry", "level": "info"}}
+
+
+def _send_over(transport: HttpTransport, seconds: float) -> None:
+    interval = seconds / EVENTS
+    for i in range(EVENTS):
+        transport.send(_event(i))
+        time.sleep(interval)
+
+
+def retry_after_outage() -> None:
+    with Collector() as collector:
+        transport = HttpTransport(collector.endpoint, "bench", batch_linger=0.01)
+        collector.fail_with(503, retry_after=1)
+        _send_over(transport, OUTAGE)
+        rejected = collector.stats["rejected"]
+        collector.fail_with(None)
+
+        deadline = time.monotonic() + 10
+        while collector.stats["events"] < EVENTS and time.monotonic() < deadline:
+            time.sleep(0.05)
+        delivered = collector.stats["events"]
+        print(f"503 + Retry-After: {rejected} rejected requests in {OUTAGE:.0f}s, "
+              f"{delivered}/{EVENTS} events delivered after recovery, "
+              f"circuit opened {transport.stats()['circuit_opened']} times")
+        if delivered != EVENTS:
+            sys.exit(1)
+
+
+def dead_endpoint(label: str, **options) -> None:
+    # Porta libera ma senza nessuno in ascolto: connection refused
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    transport = HttpTransport(f"http://127.0.0.1:{port}/api/events/", "bench", batch_linger=0.01, **options)
+    cpu = time.process_time()
+    _send_over(transport, OUTAGE)
+    cpu = time.process_time() - cpu
+    stats = transport.stats()
+    print(f"{label:>18}: {stats.get('connections_opened', 0)} connection attempts, "
+          f"{cpu * 1000:.0f} ms CPU, {stats['held']} events held")
+
+
+def main() -> None:
+    retry_after_outage()
+    dead_endpoint("no breaker", breaker_threshold=10 ** 9, max_retries=0)
+    dead_endpoint("breaker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Costo di ``push_scope`` (entrata + uscita) al crescere dei tag nello scope
+padre, contro uno scope che copia i propri dizionari a ogni ``push``, e
+costo di ``set_tag`` e della costruzione dell'evento base.
+
+    python benchmarks/bench_scope.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import panties  # noqa: E402
+import panties.client  # noqa: E402
+from panties.client import PantiesClient  # noqa: E402
+
+CALLS = 20_000
+REPEATS = 5
+
+
+class _CopyingScope:
+    """Scope "ingenuo": ogni push copia tag ed extra del padre."""
+
+    stack = [({}, {})]
+
+    def __enter__(self):
+        tags, extra = self.stack[-1]
+        self.stack.append((dict(tags), dict(extra)))
+
+    def __exit__(self, *exc_info):
+        self.stack.pop()
+
+
+def _per_call_us(func) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            func()
+        best = min(best, (time.perf_counter() - start) / CALLS)
+    return best * 1e6
+
+
+def _push_pop() -> None:
+    with panties.push_scope():
+        pass
+
+
+def _push_pop_copying() -> None:
+    with _CopyingScope():
+        pass
+
+
+def _old_base_event(client: PantiesClient):
+    # Evento base ricostruito a ogni evento, come prima di _event_template
+    return {
+        **{
+            "event_id": "id",
+            "timestamp": int(time.time()),
+            "environment": client.environment,
+            "service_name": client.service_name,
+            "sdk": {"name": "panties-python", "version": "0.1.0"},
+        },
+        "type": "message",
+        "tags": {},
+        "extra": {},
+    }
+
+
+def main() -> None:
+    print("push_scope enter + exit (us), by number of tags in the parent scope:")
+    for n in (0, 10, 100, 1000):
+        with panties.push_scope():
+            panties.set_tags({f"tag{i}": i for i in range(n)})
+            _CopyingScope.stack.append(({f"tag{i}": i for i in range(n)}, {}))
+            ours = _per_call_us(_push_pop)
+            copying = _per_call_us(_push_pop_copying)
+            _CopyingScope.stack.pop()
+        print(f"  {n:5d} tags   push_scope {ours:6.2f}   copy on push {copying:7.2f}")
+
+    with panties.push_scope():
+        print(f"set_tag: {_per_call_us(lambda: panties.set_tag('order_id', 42)):.2f} us")
+
+    client = PantiesClient(api_token="bench", endpoint="http://127.0.0.1:9/api/events/")
+    # uuid4 costa più di tutto il resto e non cambia tra i due casi
+    panties.client._event_id = lambda: "id"
+
+    def new_base_event():
+        event = client._base_event()
+        event["type"] = "message"
+        event["tags"] = {}
+        event["extra"] = {}
+        return event
+
+    print(
+        f"base event (without uuid4): rebuilt {_per_call_us(lambda: _old_base_event(client)):.2f} us, "
+        f"from template {_per_call_us(new_base_event):.2f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Costo della serializzazione con limiti (``EventSerializer``) rispetto a
+``json.dumps``, e dimensione dei payload enormi dopo il troncamento.
+
+    python benchmarks/bench_serializer.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.serializer import EventSerializer  # noqa: E402
+
+ITERATIONS = 5000
+
+
+def _typical_event():
+    frames = [
+        {
+            "filename": f"/srv/app/module_{i}.py",
+            "function": f"handler_{i}",
+            "module": f"app.module_{i}",
+            "lineno": 10 + i,
+            "in_app": True,
+            "context_line": "    result = process(request, payload)",
+            "pre_context": ["def handler(request):", "    payload = load()", "    # process"],
+            "post_context": ["    return result", "", "def other():"],
+        }
+        for i in range(20)
+    ]
+    return {
+        "event_id": "0f8fad5b-d9cb-469f-a165-70867728950e",
+        "timestamp": 1700000000,
+        "environment": "production",
+        "service_name": "api",
+        "sdk": {"name": "panties-python", "version": "0.1.0"},
+        "type": "exception",
+        "exception": {"type": "ValueError", "message": "invalid literal for int()", "frames": frames},
+        "tags": {"region": "eu-west-1"},
+        "extra": {"user_id": 42, "path": "/api/orders", "items": [1, 2, 3]},
+    }
+
+
+def _time(func, event) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func(event)
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def main() -> None:
+    serializer = EventSerializer()
+    event = _typical_event()
+    dumps = _time(lambda e: json.dumps(e).encode("utf-8"), event)
+    limited = _time(serializer.encode, event)
+    print(f"typical event : json.dumps {dumps:6.1f} us   EventSerializer {limited:6.1f} us")
+
+    huge = _typical_event()
+    huge["exception"]["message"] = "x" * 5_000_000
+    huge["exception"]["frames"] = huge["exception"]["frames"] * 50
+    huge["extra"] = {f"key_{i}": ["value" * 200] * 50 for i in range(2000)}
+    huge["extra"]["self"] = huge["extra"]
+    start = time.perf_counter()
+    body = serializer.encode(huge)
+    elapsed = (time.perf_counter() - start) * 1000
+    try:
+        json.dumps(huge)
+        plain = "ok"
+    except ValueError as e:
+        plain = f"ValueError: {e}"
+    print(f"huge event    : {len(body) / 1024:.0f} KiB after truncation in {elapsed:.1f} ms "
+          f"(json.dumps: {plain})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Sessioni aggregate lato client:
+
+- costo di ``start_session()`` + ``end_session()`` e di una richiesta WSGI
+  con ``auto_session_tracking`` acceso e spento
+- volume inviato per ``sessions`` sessioni chiuse in un minuto: eventi e
+  byte serializzati con i contatori aggregati, contro un evento per
+  sessione
+
+Esce con codice 1 se la sessione automatica aggiunge più di ``BUDGET_US``
+per richiesta.
+
+    python benchmarks/bench_sessions.py [sessions]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.client import PantiesClient  # noqa: E402
+from panties.serializer import EventSerializer  # noqa: E402
+from panties.sessions import Session, end_session, start_session  # noqa: E402
+from panties.state import set_client  # noqa: E402
+from panties.wsgi import PantiesWSGIMiddleware  # noqa: E402
+
+CALLS = 50_000
+REPEATS = 7
+# Costo aggiunto per richiesta dalla sessione automatica, in microsecondi
+BUDGET_US = 5.0
+
+ENVIRON = {"REQUEST_METHOD": "GET", "PATH_INFO": "/orders/42", "SERVER_NAME": "localhost", "SERVER_PORT": "80"}
+
+
+class _CountingTransport:
+    """Transport che serializza gli eventi e ne conta numero e byte."""
+
+    def __init__(self) -> None:
+        self.serializer = EventSerializer()
+        self.events = 0
+        self.bytes = 0
+
+    def send(self, event) -> None:
+        self.events += 1
+        self.bytes += len(self.serializer.encode(event))
+
+    def flush(self, timeout: float = 2.0) -> int:
+        return 0
+
+
+def _start_response(status, headers, exc_info=None) -> None:
+    pass
+
+
+def _app(environ, start_response):
+    start_response("200 OK", [])
+    return [b"ok"]
+
+
+def _best_us(run) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        best = min(best, (time.perf_counter() - start) / CALLS * 1e6)
+    return best
+
+
+def _sessions() -> None:
+    for _ in range(CALLS):
+        start_session()
+        end_session()
+
+
+def _requests(app) -> None:
+    for _ in range(CALLS):
+        app(ENVIRON, _start_response)
+
+
+def main() -> int:
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    app = PantiesWSGIMiddleware(_app)
+
+    client = PantiesClient(api_token="bench", endpoint="-", transport=_CountingTransport(), release="bench@1.0")
+    set_client(client)
+    off = _best_us(lambda: _requests(app))
+    client.auto_session_tracking = True
+    session = _best_us(_sessions)
+    on = _best_us(lambda: _requests(app))
+    client.close()
+
+    print(f"per-session cost (best of {REPEATS} x {CALLS}, us):")
+    print(f"  start_session + end_session       {session:6.2f}")
+    print(f"  wsgi request, sessions off        {off:6.2f}")
+    print(f"  wsgi request, sessions on         {on:6.2f}  (+{on - off:.2f})")
+
+    # Le stesse sessioni: contatori aggregati contro un evento ciascuna
+    transport = _CountingTransport()
+    client = PantiesClient(api_token="bench", endpoint="-", transport=transport, release="bench@1.0")
+    set_client(client)
+    for i in range(sessions):
+        Session().end("crashed" if i % 1000 == 0 else None)
+    client.close()
+    per_session = _CountingTransport()
+    for i in range(sessions):
+        per_session.send({
+            **client._base_event(),
+            "type": "session",
+            "release": client.release,
+            "status": "crashed" if i % 1000 == 0 else "exited",
+        })
+    print(f"{sessions} sessions:")
+    print(f"  aggregated:         {transport.events:8d} events {transport.bytes:12d} bytes")
+    print(f"  one per session:    {per_session.events:8d} events {per_session.bytes:12d} bytes")
+
+    if on - off > BUDGET_US:
+        print(f"FAIL: session tracking over budget ({on - off:.2f} us > {BUDGET_US:.0f} us)")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
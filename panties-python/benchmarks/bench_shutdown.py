@@ -0,0 +1,64 @@
+"""
+Uscita di un job CLI di breve durata: il processo figlio inizializza panties,
+invia degli eventi ed esce senza chiamare ``flush()``; ci pensa ``atexit``.
+
+- collector veloce: tutti gli eventi devono arrivare e l'uscita è rapida
+- collector bloccato: l'uscita deve avvenire entro ``shutdown_timeout``
+
+    python benchmarks/bench_shutdown.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from _collector import Collector  # noqa: E402
+
+EVENTS = 1000
+SHUTDOWN_TIMEOUT = 1.0
+
+_CHILD = """
+import sys
+sys.path.insert(0, {root!r})
+import panties
+
+panties.init(api_token="bench", endpoint={endpoint!r}, install_sys_hook=False,
+             shutdown_timeout={timeout})
+for i in range({events}):
+    panties.capture_message(f"cli job event {{i}}")
+"""
+
+
+def _run_child(endpoint: str) -> float:
+    code = _CHILD.format(
+        root=os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."),
+        endpoint=endpoint,
+        timeout=SHUTDOWN_TIMEOUT,
+        events=EVENTS,
+    )
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    with Collector() as collector:
+        elapsed = _run_child(collector.endpoint)
+        received = collector.stats["events"]
+        print(f"fast collector : exit after {elapsed:.2f}s, {received}/{EVENTS} events delivered")
+        ok = received == EVENTS
+
+    with Collector() as collector:
+        collector.delay(30)
+        elapsed = _run_child(collector.endpoint)
+        print(f"stuck collector: exit after {elapsed:.2f}s (shutdown_timeout={SHUTDOWN_TIMEOUT}s)")
+        ok = ok and elapsed < SHUTDOWN_TIMEOUT + 1.5
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
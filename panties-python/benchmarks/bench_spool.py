@@ -0,0 +1,63 @@
+"""
+Benchmark: throughput dello spool su disco (SQLite WAL) rispetto alla coda
+in memoria, in scrittura e in lettura/rimozione (replay).
+
+    python benchmarks/bench_spool.py [n_events]
+"""
+import json
+import os
+import queue
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from panties.spool import SqliteSpool  # noqa: E402
+
+
+def _body(i: int) -> bytes:
+    return json.dumps({
+        "event_id": f"bench-{i}",
+        "type": "message",
+        "message": {"text": f"benchmark event {i}", "level": "error"},
+        "extra": {"payload": "x" * 200},
+    }).encode("utf-8")
+
+
+def main() -> None:
+    n_events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    batch_size = 100
+    bodies = [_body(i) for i in range(n_events)]
+
+    q: "queue.Queue[bytes]" = queue.Queue()
+    start = time.perf_counter()
+    for body in bodies:
+        q.put_nowait(body)
+    put_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    while not q.empty():
+        q.get_nowait()
+    get_elapsed = time.perf_counter() - start
+    print(f"memory queue : put {n_events / put_elapsed:12.0f} ev/s   get {n_events / get_elapsed:12.0f} ev/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = SqliteSpool(os.path.join(tmp, "spool.db"))
+        start = time.perf_counter()
+        for i in range(0, n_events, batch_size):
+            spool.append(bodies[i:i + batch_size])
+        append_elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        while len(spool):
+            rows = spool.peek(batch_size)
+            spool.remove([row_id for row_id, _ in rows])
+        replay_elapsed = time.perf_counter() - start
+        spool.close()
+    print(
+        f"sqlite spool : put {n_events / append_elapsed:12.0f} ev/s   "
+        f"get {n_events / replay_elapsed:12.0f} ev/s  (batches of {batch_size})"
+    )
+
+
+if __name__ == "__main__":
+    main()
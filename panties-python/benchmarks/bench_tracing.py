@@ -0,0 +1,96 @@
+"""
+Costo del tracing sul thread dell'applicazione e consegna delle
+transazioni a un collector locale:
+
+- ``panties.span()`` (entrata + uscita) fuori da una transazione, in una
+  transazione non campionata e in una campionata
+- transazione completa con 10 span, campionata e non
+- transazioni inviate al collector: eventi e richieste (le transazioni
+  finite viaggiano nelle stesse buste batch degli altri eventi)
+
+    python benchmarks/bench_tracing.py [transactions]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import panties  # noqa: E402
+from _collector import Collector  # noqa: E402
+from panties.client import PantiesClient  # noqa: E402
+from panties.state import set_client  # noqa: E402
+
+CALLS = 20_000
+REPEATS = 5
+SPANS_PER_TRANSACTION = 10
+
+
+def _per_call_us(func, calls: int = CALLS) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best * 1e6
+
+
+def _span() -> None:
+    with panties.span("db.query", "SELECT 1"):
+        pass
+
+
+def _transaction() -> None:
+    with panties.start_transaction("GET /orders", op="http.server"):
+        for _ in range(SPANS_PER_TRANSACTION):
+            with panties.span("db.query", "SELECT 1"):
+                pass
+
+
+def main() -> None:
+    transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with Collector() as collector:
+        client = PantiesClient(api_token="bench", endpoint=collector.endpoint, traces_sample_rate=0.0)
+        set_client(client)
+
+        print("span enter + exit (us):")
+        print(f"  no transaction        {_per_call_us(_span):6.2f}")
+        with panties.start_transaction("unsampled", sampled=False):
+            print(f"  unsampled transaction {_per_call_us(_span):6.2f}")
+        with panties.start_transaction("sampled", sampled=True) as txn:
+            # Solo il costo sul thread: gli span non vengono tenuti
+            txn.spans = _Discard()
+            print(f"  sampled transaction   {_per_call_us(_span):6.2f}")
+
+        print(f"transaction with {SPANS_PER_TRANSACTION} spans (us):")
+        print(f"  traces_sample_rate=0  {_per_call_us(_transaction, 2000):6.2f}")
+        client.traces_sample_rate = 1.0
+        start = time.perf_counter()
+        for _ in range(transactions):
+            _transaction()
+        sampled = (time.perf_counter() - start) / transactions * 1e6
+        print(f"  traces_sample_rate=1  {sampled:6.2f}  (build and send in the worker)")
+
+        start = time.perf_counter()
+        client.close(timeout=30.0)
+        drain = time.perf_counter() - start
+        stats = collector.stats
+        print(
+            f"{transactions} transactions -> {stats['events']} events in {stats['requests']} requests, "
+            f"{stats['bytes'] / max(1, stats['events']):.0f} bytes/transaction (compressed), "
+            f"{client.stats()['dropped']} dropped at full queue, drain {drain:.2f}s"
+        )
+
+
+class _Discard(list):
+    def __len__(self) -> int:
+        return 0
+
+    def append(self, item) -> None:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,54 @@
 # panties/__init__.py
-from typing import Optional, Dict, Any
+from __future__ import annotations
 
+from typing import TYPE_CHECKING, Optional, Dict, Any
+
+from .breadcrumbs import add_breadcrumb, clear_breadcrumbs
 from .client import PantiesClient
 from .state import set_client, get_client
-from .hooks import install_global_excepthook, install_threading_excepthook
+from .scope import push_scope, set_context, set_extra, set_tag, set_tags
+from .hooks import (
+    install_asyncio_exception_handler,
+    install_global_excepthook,
+    install_logging_breadcrumbs,
+    install_logging_handler,
+    install_threading_excepthook,
+)
 from .decorators import capture_exceptions, capture_exceptions_ctx
+from .sessions import end_session, start_session
+from .tracing import span, start_transaction
+
+if TYPE_CHECKING:
+    from .async_transport import AsyncHttpTransport
+    from .relay_transport import RelayTransport
+
+# I log dell'SDK (logger "panties") sono spenti di default: vedi panties.log
 
 __all__ = [
     "init",
     "capture_exception",
     "capture_message",
+    "add_breadcrumb",
+    "clear_breadcrumbs",
+    "push_scope",
+    "set_tag",
+    "set_tags",
+    "set_extra",
+    "set_context",
+    "start_transaction",
+    "span",
+    "start_session",
+    "end_session",
+    "flush",
+    "close",
     "get_client",
     "capture_exceptions",
     "capture_exceptions_ctx",
+    "install_asyncio_exception_handler",
+    "install_logging_breadcrumbs",
+    "install_logging_handler",
+    "AsyncHttpTransport",
+    "RelayTransport",
 ]
 
 
@@ -24,11 +60,41 @@ def init(
     timeout: float = 2.0,
     install_sys_hook: bool = True,
     install_thread_hook: bool = True,
+    install_logging_hook: bool = False,
+    dedupe_window: float = 60.0,
+    transport=None,
+    sample_rate: float = 1.0,
+    **client_options: Any,
 ) -> PantiesClient:
     """
     Inizializza il client globale di panties e registra gli hook sulle eccezioni.
 
     Va chiamato il prima possibile nel processo (es. all'avvio dell'app).
+
+    ``dedupe_window`` (secondi) raggruppa le eccezioni identiche in un unico
+    evento con il numero di occorrenze; 0 disattiva l'aggregazione.
+
+    ``transport`` permette di usare un transport diverso da ``HttpTransport``,
+    ad esempio ``AsyncHttpTransport`` nei servizi asyncio (in quel caso
+    chiamare anche ``install_asyncio_exception_handler()`` dal loop), o
+    ``RelayTransport`` per passare dal relay locale ``panties.relay``.
+
+    ``install_logging_hook`` registra i log (INFO o superiore) come
+    breadcrumb allegati agli eventi e invia quelli ERROR o superiori come
+    eventi; importa ``logging``, quindi è disattivato di default.
+
+    ``sample_rate`` è la frazione di eventi inviati; le altre opzioni di
+    ``PantiesClient`` (es. ``level_sample_rates``, ``exception_sample_rates``,
+    ``rate_limit``, ``capture_locals``, ``max_breadcrumbs``, ``traces_sample_rate``,
+    ``redact_headers``) possono essere passate come keyword.
+
+    Per i tassi di sessioni senza crash per release passare ``release`` e
+    ``auto_session_tracking=True`` (ogni richiesta dei middleware è una
+    sessione), oppure delimitare job e processi con ``start_session()`` /
+    ``end_session()``: gli esiti vengono inviati come contatori aggregati.
+
+    All'uscita del processo gli eventi in coda vengono inviati entro
+    ``shutdown_timeout`` secondi (opzione di ``PantiesClient``, default 2).
     """
     client = PantiesClient(
         api_token=api_token,
@@ -36,6 +102,10 @@ def init(
         environment=environment,
         service_name=service_name,
         timeout=timeout,
+        dedupe_window=dedupe_window,
+        transport=transport,
+        sample_rate=sample_rate,
+        **client_options,
     )
     set_client(client)
 
@@ -43,6 +113,9 @@ def init(
         install_global_excepthook()
     if install_thread_hook:
         install_threading_excepthook()
+    if install_logging_hook:
+        install_logging_breadcrumbs()
+        install_logging_handler()
 
     return client
 
@@ -78,3 +151,38 @@ def capture_message(
     if client is None:
         return
     client.capture_message(message, level=level, extra=extra, tags=tags)
+
+
+def flush(timeout: float = 2.0) -> int:
+    """
+    Attende l'invio degli eventi in coda, al massimo ``timeout`` secondi.
+    Ritorna il numero di eventi non ancora inviati.
+    """
+    client = get_client()
+    if client is None:
+        return 0
+    return client.flush(timeout=timeout)
+
+
+def close(timeout: float = 2.0) -> int:
+    """
+    Invia gli eventi in coda entro ``timeout`` secondi e chiude il client.
+    Ritorna il numero di eventi rimasti non inviati.
+    """
+    client = get_client()
+    if client is None:
+        return 0
+    return client.close(timeout=timeout)
+
+
+def __getattr__(name: str) -> Any:
+    # Transport alternativi caricati solo se usati (AsyncHttpTransport importa asyncio e ssl)
+    if name == "AsyncHttpTransport":
+        from .async_transport import AsyncHttpTransport
+
+        return AsyncHttpTransport
+    if name == "RelayTransport":
+        from .relay_transport import RelayTransport
+
+        return RelayTransport
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
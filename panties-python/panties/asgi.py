@@ -0,0 +1,90 @@
+# panties/asgi.py
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .request import (
+    ASGIRequest,
+    _request,
+    capture_request_exception,
+    end_request_session,
+    set_request_result,
+    start_request_session,
+    start_request_transaction,
+)
+from .scope import push_scope
+from .tracing import Transaction
+
+__all__ = ["PantiesASGIMiddleware"]
+
+_Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class PantiesASGIMiddleware:
+    """
+    Middleware ASGI 3 (Starlette, FastAPI, Django ASGI, ...):
+
+        app = PantiesASGIMiddleware(app)
+
+    Per le connessioni ``http`` e ``websocket`` le eccezioni non gestite
+    vengono inviate con il contesto della richiesta e poi rilanciate; gli
+    altri scope (es. ``lifespan``) passano senza modifiche. Tag, extra e
+    contesti impostati dall'app valgono solo per la connessione.
+
+    Con ``traces_sample_rate`` > 0 ogni richiesta campionata è una
+    transazione ``http.server`` (che segue l'header ``traceparent``); con
+    ``auto_session_tracking`` ogni connessione è una sessione.
+    """
+
+    __slots__ = ("app",)
+
+    def __init__(self, app: Callable[..., Awaitable[None]]) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: _Send) -> None:
+        kind = scope["type"]
+        if kind != "http" and kind != "websocket":
+            await self.app(scope, receive, send)
+            return
+        info = ASGIRequest(scope)
+        start_request_session(info)
+        token = _request.set(info)
+        with push_scope():
+            try:
+                txn = start_request_transaction(info)
+                if txn is None:
+                    await self.app(scope, receive, send)
+                else:
+                    await self._traced(txn, info, scope, receive, send)
+            except Exception:
+                capture_request_exception(info)
+                raise
+            finally:
+                _request.reset(token)
+                end_request_session(info)
+
+    async def _traced(
+        self,
+        txn: Transaction,
+        info: ASGIRequest,
+        scope: Dict[str, Any],
+        receive: Any,
+        send: _Send,
+    ) -> None:
+        status: Optional[int] = None
+
+        async def send_recording(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message.get("type") == "http.response.start":
+                status = message.get("status")
+            await send(message)
+
+        with txn:
+            try:
+                await self.app(scope, receive, send_recording)
+            except Exception:
+                txn.set_status("internal_error")
+                raise
+            finally:
+                set_request_result(txn, info, status)
+
@@ -0,0 +1,541 @@
+# panties/async_transport.py
+from __future__ import annotations
+
+import asyncio
+import collections
+import concurrent.futures
+import ssl
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit
+
+from .compression import compress_body
+from .log import get_logger
+from .metrics import TransportMetrics
+from .retry import Backoff, CircuitBreaker, is_server_error, parse_retry_after, split_rejected
+from .serializer import EventSerializer
+from .snapshot import EventSnapshot
+from .transport import _default_batch_endpoint, _split_url
+
+__all__ = ["AsyncHttpTransport"]
+
+logger = get_logger(__name__)
+
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncHttpTransport:
+    """
+    Transport HTTP nativo per asyncio, senza thread aggiuntivi:
+    - ``asyncio.Queue`` limitata sul loop in esecuzione
+    - un task invia gli eventi con socket non bloccanti
+    - batch come ``HttpTransport`` e fino a ``max_in_flight`` richieste
+      concorrenti, ognuna sulla propria connessione keep-alive
+    - retry con backoff e jitter, ``Retry-After`` e circuit breaker come
+      ``HttpTransport``: a circuito aperto il task smette di prelevare dalla
+      coda, così gli eventi restano in attesa invece di essere persi
+    - batch non consegnati dopo i tentativi tenuti in memoria (entro
+      ``max_queue_size`` eventi e ``max_queue_bytes`` byte, scartando i più
+      vecchi) e reinviati quando il collector torna raggiungibile, come fa
+      ``HttpTransport`` senza spool; anche i batch rifiutati con un 5xx
+      ``max_server_errors`` volte di fila vengono divisi come lì
+
+    Il task viene avviato al primo evento inviato dall'interno del loop;
+    ``send`` può essere chiamato anche da altri thread. I dict vengono
+    serializzati da ``send``; gli ``EventSnapshot`` del client vengono
+    costruiti e serializzati nell'executor di default del loop, un batch
+    per volta, così il loop non si ferma per frame e codifica JSON.
+    """
+
+    # Il client può passare snapshot invece di eventi già costruiti
+    accepts_snapshots = True
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_token: str,
+        timeout: float = 2.0,
+        max_queue_size: int = 1000,
+        batch_size: int = 100,
+        batch_max_bytes: int = 512 * 1024,
+        batch_linger: float = 0.05,
+        batch_endpoint: Optional[str] = None,
+        max_in_flight: int = 4,
+        compression: Optional[str] = "gzip",
+        compress_threshold: int = 1024,
+        max_retries: int = 2,
+        retry_backoff: float = 0.1,
+        retry_backoff_max: float = 2.0,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 5.0,
+        breaker_max_reset_timeout: float = 300.0,
+        serializer: Optional[EventSerializer] = None,
+        max_queue_bytes: int = 8 * 1024 * 1024,
+        max_server_errors: int = 3,
+    ) -> None:
+        self.endpoint = endpoint
+        self.api_token = api_token
+        self.timeout = timeout
+        self.max_queue_size = max_queue_size
+        self.max_queue_bytes = max_queue_bytes
+        self.retry_backoff_max = retry_backoff_max
+        self.batch_size = max(1, batch_size)
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_linger = batch_linger
+        self.batch_endpoint = batch_endpoint or _default_batch_endpoint(endpoint)
+        self.max_in_flight = max(1, max_in_flight)
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.max_retries = max(0, max_retries)
+        self.max_server_errors = max(1, max_server_errors)
+        self.serializer = serializer or EventSerializer()
+        self._backoff = Backoff(retry_backoff, retry_backoff_max)
+        self._breaker = CircuitBreaker(breaker_threshold, breaker_reset_timeout, breaker_max_reset_timeout)
+
+        parts = urlsplit(endpoint)
+        self._host = parts.hostname or "localhost"
+        self._https = parts.scheme == "https"
+        self._port = parts.port or (443 if self._https else 80)
+        self._host_header = parts.netloc
+        _, self._endpoint_path = _split_url(self.endpoint)
+        _, self._batch_path = _split_url(self.batch_endpoint)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: "Optional[asyncio.Queue[Union[bytes, EventSnapshot]]]" = None
+        self._task: "Optional[asyncio.Task[None]]" = None
+        self._in_flight: Set["asyncio.Task[None]"] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle: List[_Connection] = []
+        self._start_lock = threading.Lock()
+        # Batch non consegnati con i 5xx consecutivi ricevuti, reinviati dal
+        # più vecchio (solo dal loop)
+        self._held: "collections.deque[Tuple[List[bytes], int]]" = collections.deque()
+        self._held_events = 0
+        self._held_bytes = 0
+        self._retrying = False
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+        # Eventi accettati e non ancora completati (in coda o in volo)
+        self._pending = 0
+        self._closed = False
+        self._stats: Dict[str, int] = {
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "requests": 0,
+        }
+        self._metrics = TransportMetrics()
+
+    # ------- Avvio sul loop -------
+
+    def _ensure_started(self, loop: asyncio.AbstractEventLoop) -> None:
+        with self._start_lock:
+            if self._loop is loop and self._task is not None and not self._task.done():
+                return
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._idle = []
+            self._task = loop.create_task(self._sender_loop())
+
+    def send(self, event: Union[Dict[str, Any], EventSnapshot]) -> None:
+        """
+        Inserisce l'evento in coda. Non blocca mai: se la coda è piena o non
+        c'è un loop attivo l'evento viene scartato.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if self._closed:
+            self._metrics.add("dropped")
+            return
+        item = event if type(event) is EventSnapshot else self._encode(event)
+        if item is None:
+            pass
+        elif running is not None:
+            self._ensure_started(running)
+            self._put(item)
+        elif self._loop is not None and not self._loop.is_closed():
+            # Chiamato da un altro thread: passa l'evento al thread del loop
+            self._loop.call_soon_threadsafe(self._put, item)
+        else:
+            self._metrics.add("dropped")
+
+    def _put(self, event: Union[bytes, EventSnapshot]) -> None:
+        assert self._queue is not None
+        try:
+            self._queue.put_nowait(event)
+            self._pending += 1
+            self._metrics.add("enqueued")
+        except asyncio.QueueFull:
+            self._metrics.add("dropped")
+
+    # ------- Invio -------
+
+    async def _sender_loop(self) -> None:
+        assert self._queue is not None and self._semaphore is not None
+        while True:
+            delay = self._breaker.remaining()
+            if delay:
+                # Circuito aperto: gli eventi restano in coda
+                await asyncio.sleep(delay)
+            first = await self._queue.get()
+            batch, taken = await self._collect_batch(first)
+            await self._semaphore.acquire()
+            task = asyncio.ensure_future(self._send_batch(batch, taken))
+            self._in_flight.add(task)
+            task.add_done_callback(self._in_flight.discard)
+
+    async def _collect_batch(self, first: Union[bytes, EventSnapshot]) -> Tuple[List[bytes], int]:
+        """
+        Raccoglie gli eventi in coda fino ai limiti del batch; per gli
+        snapshot ancora da costruire conta la loro stima dei byte. Gli
+        snapshot vengono poi costruiti e serializzati nell'executor.
+        """
+        assert self._queue is not None and self._loop is not None
+        items = [first]
+        size = self._size(first)
+        deadline = time.monotonic() + self.batch_linger
+
+        while len(items) < self.batch_size and size < self.batch_max_bytes:
+            if self._queue.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                event = self._queue.get_nowait()
+            items.append(event)
+            size += self._size(event)
+
+        if all(type(item) is bytes for item in items):
+            return items, len(items)  # type: ignore[return-value]
+        batch = await self._loop.run_in_executor(None, self._encode_batch, items)
+        return batch, len(items)
+
+    @staticmethod
+    def _size(item: Union[bytes, EventSnapshot]) -> int:
+        return len(item) if type(item) is bytes else item.estimated_size()
+
+    def _encode_batch(self, items: List[Union[bytes, EventSnapshot]]) -> List[bytes]:
+        """Costruisce e serializza gli snapshot di un batch (nell'executor)."""
+        batch = []
+        for item in items:
+            body = item if type(item) is bytes else self._encode(item)
+            if body is not None:
+                batch.append(body)
+        return batch
+
+    def _encode(self, event: Union[Dict[str, Any], EventSnapshot]) -> Optional[bytes]:
+        try:
+            if type(event) is EventSnapshot:
+                event = event.to_event()
+            return self.serializer.encode(event)
+        except Exception:
+            # Costruzione dell'evento fallita (es. bug in un __str__)
+            logger.warning("Failed to build event", exc_info=True)
+            self._metrics.add("dropped")
+            return None
+
+    async def _send_batch(self, batch: List[bytes], taken: int) -> None:
+        assert self._queue is not None and self._semaphore is not None
+        try:
+            if not batch:
+                pass
+            else:
+                delivered, server_errors = await self._deliver(batch)
+                if not delivered:
+                    self._hold(self._rejected(batch, server_errors))
+                elif self._held:
+                    await self._retry_held()
+        finally:
+            self._semaphore.release()
+            self._pending -= taken
+            for _ in range(taken):
+                self._queue.task_done()
+
+    async def _deliver(self, batch: List[bytes]) -> Tuple[bool, int]:
+        if len(batch) == 1:
+            result = await self._post_with_retry(self._endpoint_path, batch[0], 1)
+        else:
+            envelope = b'{"events":[' + b",".join(batch) + b"]}"
+            result = await self._post_with_retry(self._batch_path, envelope, len(batch))
+        if not result[0]:
+            self._metrics.add("failed", len(batch))
+        return result
+
+    def _rejected(self, batch: List[bytes], failures: int) -> List[Tuple[List[bytes], int]]:
+        """``split_rejected`` con ``max_server_errors``, contando gli eventi scartati."""
+        parts = split_rejected(batch, failures, self.max_server_errors)
+        if not parts:
+            logger.warning("Dropping event rejected %d times in a row by the collector", failures)
+            self._metrics.add("dropped")
+        return parts
+
+    def _hold(self, parts: List[Tuple[List[bytes], int]], front: bool = False) -> None:
+        """Conserva in memoria batch non consegnati, come ``HttpTransport._hold``."""
+        for part in reversed(parts) if front else parts:
+            batch = part[0]
+            if front:
+                self._held.appendleft(part)
+            else:
+                self._held.append(part)
+            self._held_events += len(batch)
+            self._held_bytes += sum(len(body) for body in batch)
+        # Oltre il limite si scartano i batch più vecchi
+        while len(self._held) > 1 and (
+            self._held_events > self.max_queue_size
+            or self._held_bytes > self.max_queue_bytes
+        ):
+            dropped, _ = self._held.popleft()
+            self._held_events -= len(dropped)
+            self._held_bytes -= sum(len(body) for body in dropped)
+            self._metrics.add("dropped", len(dropped))
+        self._schedule_retry()
+
+    def _schedule_retry(self) -> None:
+        """Programma un nuovo tentativo sui batch in memoria, anche a coda vuota."""
+        if self._retry_handle is not None or self._closed or self._loop is None:
+            return
+        delay = max(self._breaker.remaining(), self.retry_backoff_max)
+        self._retry_handle = self._loop.call_later(delay, self._start_retry)
+
+    def _start_retry(self) -> None:
+        self._retry_handle = None
+        task = asyncio.ensure_future(self._retry_held())
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _retry_held(self) -> None:
+        """
+        Reinvia i batch in memoria, dal più vecchio, finché il collector
+        risponde; un batch rifiutato troppe volte viene diviso come in
+        ``HttpTransport._retry_held``.
+        """
+        if self._retrying:
+            return
+        self._retrying = True
+        try:
+            while self._held:
+                batch, failures = self._held.popleft()
+                self._held_events -= len(batch)
+                self._held_bytes -= sum(len(body) for body in batch)
+                delivered, server_errors = await self._deliver(batch)
+                if delivered:
+                    continue
+                parts = self._rejected(batch, failures + server_errors)
+                self._hold(parts, front=True)
+                if len(parts) == 1:
+                    return
+        finally:
+            self._retrying = False
+
+    async def _post_with_retry(self, path: str, body: bytes, events: int) -> Tuple[bool, int]:
+        """
+        Invia con backoff e circuit breaker. Ritorna ``(delivered,
+        server_errors)`` come ``HttpTransport._send_sync``.
+        """
+        server_errors = 0
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff.delay(attempt - 1))
+            while not self._breaker.allow():
+                # Circuito aperto: attende senza consumare tentativi
+                await asyncio.sleep(min(max(self._breaker.remaining(), 0.05), 1.0))
+            retry_after = None
+            try:
+                status, retry_after = await self._post(path, body)
+                retry = status >= 500 or status in (408, 429)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                # Errori di rete, timeout o risposta non valida
+                logger.warning("Connection error sending %d event(s): %s", events, e)
+                status, retry = 0, True
+            if not retry:
+                # Anche un 4xx definitivo conta come collector raggiungibile
+                self._breaker.record_success()
+                if status >= 400:
+                    logger.warning("Collector rejected %d event(s) with HTTP %d", events, status)
+                    self._metrics.add("dropped", events)
+                else:
+                    self._metrics.add("sent", events)
+                return True, 0
+            if status:
+                logger.warning("Collector returned HTTP %d for %d event(s)", status, events)
+            server_errors = server_errors + 1 if is_server_error(status) else 0
+            self._breaker.record_failure(retry_after)
+        return False, server_errors
+
+    async def _post(self, path: str, body: bytes) -> Tuple[int, Optional[float]]:
+        headers = {
+            "Host": self._host_header,
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_token}",
+        }
+        body, content_encoding = compress_body(body, self.compression, self.compress_threshold)
+        if content_encoding is not None:
+            headers["Content-Encoding"] = content_encoding
+        headers["Content-Length"] = str(len(body))
+        head = f"POST {path} HTTP/1.1\r\n" + "".join(
+            f"{key}: {value}\r\n" for key, value in headers.items()
+        ) + "\r\n"
+        request = head.encode("latin-1") + body
+
+        start = time.perf_counter()
+        status, retry_after = await self._send_request(request)
+        self._metrics.latency.observe(time.perf_counter() - start)
+        if status < 400:
+            self._metrics.add("bytes_sent", len(body))
+        return status, retry_after
+
+    async def _send_request(self, request: bytes) -> Tuple[int, Optional[float]]:
+        if self._idle:
+            conn = self._idle.pop()
+            self._stats["connections_reused"] += 1
+            try:
+                return await asyncio.wait_for(self._roundtrip(conn, request), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Connessione keep-alive chiusa dal server: riprova con una nuova
+                conn[1].close()
+        conn = await asyncio.wait_for(self._open(), self.timeout)
+        return await asyncio.wait_for(self._roundtrip(conn, request), self.timeout)
+
+    async def _open(self) -> _Connection:
+        ssl_context = ssl.create_default_context() if self._https else None
+        conn = await asyncio.open_connection(self._host, self._port, ssl=ssl_context)
+        self._stats["connections_opened"] += 1
+        return conn
+
+    async def _roundtrip(self, conn: _Connection, request: bytes) -> Tuple[int, Optional[float]]:
+        reader, writer = conn
+        try:
+            writer.write(request)
+            await writer.drain()
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError("connection closed by server")
+            status = int(status_line.split()[1])
+
+            length: Optional[int] = None
+            chunked = False
+            keep_alive = True
+            retry_after: Optional[float] = None
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                name = name.strip().lower()
+                value = value.strip().lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "transfer-encoding" and "chunked" in value:
+                    chunked = True
+                elif name == "connection" and value == "close":
+                    keep_alive = False
+                elif name == "retry-after" and status in (429, 503):
+                    retry_after = parse_retry_after(value)
+
+            if chunked:
+                while True:
+                    size = int((await reader.readline()).split(b";")[0], 16)
+                    await reader.readexactly(size + 2)
+                    if size == 0:
+                        break
+            elif length is not None:
+                await reader.readexactly(length)
+            else:
+                await reader.read()
+                keep_alive = False
+        except BaseException:
+            writer.close()
+            raise
+
+        self._stats["requests"] += 1
+        if keep_alive and len(self._idle) < self.max_in_flight:
+            self._idle.append(conn)
+        else:
+            writer.close()
+        return status, retry_after
+
+    # ------- Flush / stats -------
+
+    async def aflush(self, timeout: float = 2.0) -> int:
+        """
+        Attende (al massimo ``timeout`` secondi) l'invio degli eventi in coda.
+        Ritorna il numero di eventi non ancora inviati, compresi quelli dei
+        batch tenuti in memoria.
+        """
+        if self._queue is None:
+            return 0
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._pending + self._held_events
+
+    async def aclose(self, timeout: float = 2.0) -> int:
+        """
+        Invia gli eventi in coda entro ``timeout`` secondi, poi ferma il task
+        e chiude le connessioni. Ritorna il numero di eventi non inviati.
+        """
+        unsent = await self.aflush(timeout)
+        self._closed = True
+        if self._retry_handle is not None:
+            self._retry_handle.cancel()
+            self._retry_handle = None
+        if self._task is not None:
+            self._task.cancel()
+        for task in list(self._in_flight):
+            task.cancel()
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+        return unsent
+
+    def _run_on_loop(self, coro_func, timeout: float) -> int:
+        """Esegue ``coro_func(timeout)`` sul loop da un altro thread, con scadenza."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not loop.is_running():
+            return self._pending + self._held_events
+        try:
+            if asyncio.get_running_loop() is loop:
+                return self._pending + self._held_events
+        except RuntimeError:
+            pass
+        future = asyncio.run_coroutine_threadsafe(coro_func(timeout), loop)
+        try:
+            return future.result(timeout)
+        except (concurrent.futures.TimeoutError, OSError, asyncio.CancelledError):
+            return self._pending + self._held_events
+
+    def flush(self, timeout: float = 2.0) -> int:
+        """
+        Versione sincrona di ``aflush`` per gli hook (es. ``sys.excepthook``).
+
+        Dal thread del loop non si può attendere senza bloccarlo: in quel caso
+        usare ``await transport.aflush()``.
+        """
+        return self._run_on_loop(self.aflush, timeout)
+
+    def close(self, timeout: float = 2.0) -> int:
+        """Versione sincrona di ``aclose`` (dal loop usare ``await transport.aclose()``)."""
+        unsent = self._run_on_loop(self.aclose, timeout)
+        self._closed = True
+        return unsent
+
+    def stats(self) -> Dict[str, Any]:
+        """Metriche come ``HttpTransport.stats()``."""
+        stats: Dict[str, Any] = self._metrics.snapshot()
+        stats.update(self._stats)
+        stats["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        stats["in_flight"] = len(self._in_flight)
+        stats["pending"] = self._pending
+        stats["held"] = self._held_events
+        stats["truncated"] = self.serializer.truncated
+        stats["circuit_open"] = int(self._breaker.state != CircuitBreaker.CLOSED)
+        stats["circuit_opened"] = self._breaker.opened
+        return stats
@@ -0,0 +1,218 @@
+# panties/breadcrumbs.py
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = [
+    "MAX_BREADCRUMBS",
+    "add_breadcrumb",
+    "clear_breadcrumbs",
+    "get_breadcrumbs",
+    "breadcrumb_dicts",
+]
+
+# Capacità del buffer di ogni thread / task
+MAX_BREADCRUMBS = 100
+
+# Record compatto: (timestamp, categoria, livello, messaggio, args, data).
+# Il messaggio viene formattato con gli args solo quando un evento copia i
+# breadcrumb (get_breadcrumbs, sul thread che lo cattura).
+Breadcrumb = Tuple[float, str, str, Any, Any, Optional[Dict[str, Any]]]
+
+_get_ident = threading.get_ident
+# Funzioni di asyncio, risolte quando asyncio viene importato dall'applicazione
+_get_running_loop: Any = None
+_current_task: Any = None
+
+
+class BreadcrumbBuffer:
+    """
+    Ring buffer preallocato di ``MAX_BREADCRUMBS`` record: aggiungere un
+    breadcrumb è un'assegnazione in una lista, senza allocare nodi né
+    spostare elementi.
+
+    Ogni buffer appartiene a un thread o a un task asyncio (``owner``) e
+    viene scritto solo da lui, quindi non serve un lock.
+    """
+
+    __slots__ = ("owner", "_records", "_next")
+
+    def __init__(self, owner: Any, records: Optional[List[Breadcrumb]] = None) -> None:
+        self.owner = owner
+        self._records: List[Optional[Breadcrumb]] = [None] * MAX_BREADCRUMBS
+        self._next = 0
+        if records:
+            for record in records[-MAX_BREADCRUMBS:]:
+                self.append(record)
+
+    def append(self, record: Breadcrumb) -> None:
+        i = self._next
+        self._records[i % MAX_BREADCRUMBS] = record
+        self._next = i + 1
+
+    def records(self) -> List[Breadcrumb]:
+        """Record presenti, dal più vecchio al più recente."""
+        n = self._next
+        if n <= MAX_BREADCRUMBS:
+            return self._records[:n]  # type: ignore[return-value]
+        start = n % MAX_BREADCRUMBS
+        return self._records[start:] + self._records[:start]  # type: ignore[operator]
+
+    def formatted(self, in_place: bool) -> List[Breadcrumb]:
+        """
+        Come ``records()``, con i messaggi formattati e senza args. Con
+        ``in_place`` (solo dal proprietario del buffer) i record formattati
+        sostituiscono gli originali: ogni messaggio viene formattato una
+        volta e gli args non restano referenziati.
+        """
+        records = self._records
+        n = self._next
+        result: List[Breadcrumb] = []
+        for i in range(max(0, n - MAX_BREADCRUMBS), n):
+            slot = i % MAX_BREADCRUMBS
+            record = records[slot]
+            timestamp, category, level, message, args, data = record  # type: ignore[misc]
+            if args is not None or type(message) is not str:
+                record = (timestamp, category, level, _format_message(message, args), None, data)
+                if in_place:
+                    records[slot] = record
+            result.append(record)  # type: ignore[arg-type]
+        return result
+
+
+# Buffer del contesto corrente (None finché non viene aggiunto un breadcrumb)
+_buffer: ContextVar[Optional[BreadcrumbBuffer]] = ContextVar("panties_breadcrumbs", default=None)
+
+
+def _running_loop() -> Any:
+    """Loop asyncio in esecuzione nel thread corrente, o None."""
+    global _get_running_loop, _current_task
+    if _get_running_loop is None:
+        asyncio = sys.modules.get("asyncio")
+        if asyncio is None:
+            # Senza asyncio importato non ci sono loop in esecuzione
+            return None
+        _get_running_loop = asyncio._get_running_loop
+        _current_task = asyncio.current_task
+    return _get_running_loop()
+
+
+def _owner() -> Any:
+    """Task asyncio in esecuzione nel thread corrente, altrimenti il thread."""
+    loop = _running_loop()
+    if loop is None:
+        return _get_ident()
+    return _current_task(loop) or _get_ident()
+
+
+def _own_buffer(owner: Any, buffer: Optional[BreadcrumbBuffer]) -> BreadcrumbBuffer:
+    """
+    Nuovo buffer per ``owner``. Un task (o un thread avviato con una copia
+    del contesto) eredita il buffer di chi lo ha creato: alla prima
+    scrittura ne riceve una copia, così i breadcrumb precedenti restano
+    visibili ma quelli nuovi non si mescolano con gli altri.
+    """
+    buffer = BreadcrumbBuffer(owner, buffer.records() if buffer is not None else None)
+    _buffer.set(buffer)
+    return buffer
+
+
+def _current_buffer() -> BreadcrumbBuffer:
+    """Buffer del thread / task corrente."""
+    owner = _owner()
+    buffer = _buffer.get()
+    if buffer is None or buffer.owner != owner:
+        buffer = _own_buffer(owner, buffer)
+    return buffer
+
+
+def record(
+    timestamp: float,
+    category: str,
+    level: str,
+    message: Any,
+    args: Any = None,
+    data: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Percorso veloce per le integrazioni (es. l'handler di logging): come
+    ``_current_buffer().append(...)``, senza chiamate intermedie.
+    """
+    loop = _get_running_loop() if _get_running_loop is not None else _running_loop()
+    owner = _get_ident() if loop is None else _current_task(loop) or _get_ident()
+    buffer = _buffer.get()
+    if buffer is None or buffer.owner != owner:
+        buffer = _own_buffer(owner, buffer)
+    i = buffer._next
+    buffer._records[i % MAX_BREADCRUMBS] = (timestamp, category, level, message, args, data)
+    buffer._next = i + 1
+
+
+def add_breadcrumb(
+    message: str,
+    category: str = "default",
+    level: str = "info",
+    data: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Aggiunge un breadcrumb al buffer del thread / task corrente. Gli ultimi
+    ``MAX_BREADCRUMBS`` vengono allegati agli eventi inviati da qui.
+    """
+    _current_buffer().append((time.time(), category, level, message, None, dict(data) if data else None))
+
+
+def get_breadcrumbs() -> List[Breadcrumb]:
+    """
+    Record del contesto corrente, dal più vecchio al più recente, con i
+    messaggi già formattati. Chiamato alla cattura di un evento, sul thread
+    dell'applicazione: ``__str__`` / ``__repr__`` degli args girano qui e
+    non nel worker, e lo snapshot non tiene riferimenti agli oggetti
+    dell'applicazione.
+    """
+    buffer = _buffer.get()
+    if buffer is None:
+        return []
+    return buffer.formatted(buffer.owner == _owner())
+
+
+def clear_breadcrumbs() -> None:
+    """Svuota i breadcrumb del thread / task corrente."""
+    _buffer.set(BreadcrumbBuffer(_owner()))
+
+
+def _format_message(message: Any, args: Any) -> str:
+    try:
+        if not args:
+            return str(message)
+        try:
+            return str(message) % args
+        except (TypeError, ValueError):
+            # Argomenti che non corrispondono al formato: si tiene il
+            # messaggio grezzo
+            return str(message)
+    except Exception:
+        return "<unformattable message>"
+
+
+def breadcrumb_dicts(records: List[Breadcrumb], limit: int) -> List[Dict[str, Any]]:
+    """
+    Converte gli ultimi ``limit`` record nei breadcrumb dell'evento
+    (chiamato nel worker del transport, quando l'evento viene costruito, su
+    record già formattati da ``get_breadcrumbs``).
+    """
+    result = []
+    for timestamp, category, level, message, args, data in records[-limit:] if limit > 0 else ():
+        crumb: Dict[str, Any] = {
+            "timestamp": round(timestamp, 3),
+            "category": category,
+            "level": level.lower(),
+            "message": _format_message(message, args),
+        }
+        if data:
+            crumb["data"] = data
+        result.append(crumb)
+    return result
@@ -0,0 +1,103 @@
+# panties/chain.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from .frames import _frame_entries
+
+__all__ = ["exception_message", "extract_exception_chain"]
+
+# Eccezioni al massimo nell'albero (catena + figli degli ExceptionGroup)
+MAX_EXCEPTIONS = 100
+
+# Relazione di un'eccezione con il nodo padre
+CAUSE = "cause"  # raise ... from ...
+CONTEXT = "context"  # sollevata mentre se ne gestiva un'altra
+GROUP = "group"  # figlia di un ExceptionGroup
+
+try:
+    _BaseExceptionGroup: Any = BaseExceptionGroup  # type: ignore[name-defined]
+except NameError:  # Python < 3.11
+    _BaseExceptionGroup = None
+
+
+def exception_message(exc_value: Any) -> str:
+    """``str()`` dell'eccezione, senza fallire se il suo ``__str__`` solleva."""
+    try:
+        return str(exc_value)
+    except Exception:
+        return f"<unprintable {type(exc_value).__name__} object>"
+
+
+def _children(exc: BaseException) -> List[Tuple[BaseException, str]]:
+    children = []
+    if exc.__cause__ is not None:
+        children.append((exc.__cause__, CAUSE))
+    elif exc.__context__ is not None and not exc.__suppress_context__:
+        children.append((exc.__context__, CONTEXT))
+    if _BaseExceptionGroup is not None and isinstance(exc, _BaseExceptionGroup):
+        children.extend((child, GROUP) for child in exc.exceptions)
+    return children
+
+
+def extract_exception_chain(
+    exc_value: BaseException,
+    tb=None,
+    max_exceptions: int = MAX_EXCEPTIONS,
+) -> Optional[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """
+    Albero delle eccezioni collegate a ``exc_value``: ``__cause__``,
+    ``__context__`` (se non soppresso) e figli degli ``ExceptionGroup``.
+
+    Ritorna ``(frames, exceptions)``, oppure ``None`` se l'eccezione è sola:
+
+    - ``frames``: tabella dei frame, ognuno una volta sola anche se compare
+      in più traceback (stessa coppia code object/riga)
+    - ``exceptions``: nodi in pre-ordine, il primo è ``exc_value``; ogni
+      nodo ha ``type``, ``message``, ``frames`` (indici nella tabella, dal
+      più esterno al più interno), ``parent`` (indice del nodo padre) e
+      ``relation`` (``cause``, ``context`` o ``group``)
+    """
+    if not isinstance(exc_value, BaseException) or not _children(exc_value):
+        return None
+
+    frames: List[Dict[str, Any]] = []
+    index: Dict[Tuple[Any, int], int] = {}
+    exceptions: List[Dict[str, Any]] = []
+    seen = set()
+    stack: List[Tuple[BaseException, Any, Optional[int], Optional[str]]] = [
+        (exc_value, tb if tb is not None else exc_value.__traceback__, None, None)
+    ]
+
+    while stack and len(exceptions) < max_exceptions:
+        exc, exc_tb, parent, relation = stack.pop()
+        if id(exc) in seen:
+            # Riferimenti circolari tra __context__
+            continue
+        seen.add(id(exc))
+
+        refs = []
+        for key, data in _frame_entries(exc_tb):
+            position = index.get(key)
+            if position is None:
+                position = index[key] = len(frames)
+                frames.append(dict(data))
+            refs.append(position)
+
+        node: Dict[str, Any] = {
+            "type": type(exc).__name__,
+            "message": exception_message(exc),
+            "frames": refs,
+            "parent": parent,
+            "relation": relation,
+        }
+        if _BaseExceptionGroup is not None and isinstance(exc, _BaseExceptionGroup):
+            node["is_group"] = True
+        position = len(exceptions)
+        exceptions.append(node)
+
+        # In ordine inverso sullo stack: i figli escono nell'ordine originale
+        for child, child_relation in reversed(_children(exc)):
+            stack.append((child, child.__traceback__, position, child_relation))
+
+    return frames, exceptions
@@ -1,17 +1,82 @@
 # panties/client.py
+from __future__ import annotations
+
+import atexit
 import sys
+import threading
 import time
-import uuid
-import traceback
-from typing import Optional, Dict, Any
+import weakref
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
 
+from .breadcrumbs import MAX_BREADCRUMBS, breadcrumb_dicts, get_breadcrumbs
+from .chain import exception_message, extract_exception_chain
+from .fingerprint import DuplicateAggregator, FingerprintKey, exception_key, fingerprint_hex
+from .frames import extract_frames, frame_locals
+from .request import get_request, normalize_headers
+from .safe_repr import SafeRepr
+from .sampling import DiscardCounter, Sampler, TokenBucketLimiter
+from .scope import get_scope, merged
+from .serializer import EventSerializer
+from .sessions import SessionAggregator, get_session
+from .snapshot import EventSnapshot
 from .transport import HttpTransport
 
 
+def _event_id() -> str:
+    # uuid importato qui: gli eventi vengono costruiti nel worker
+    import uuid
+
+    return str(uuid.uuid4())
+
+
+_SDK = {
+    "name": "panties-python",
+    "version": "0.1.0",
+}
+
+
+def _close_at_exit(ref: "weakref.ReferenceType[PantiesClient]") -> None:
+    client = ref()
+    if client is not None:
+        client.close(timeout=client.shutdown_timeout)
+
+
 class PantiesClient:
     """
     Client principale di panties.
     Si occupa di costruire gli eventi e delegare l'invio al transport.
+
+    Sul thread dell'applicazione viene catturato solo uno ``EventSnapshot``;
+    con i transport che lo supportano (``accepts_snapshots``) l'evento viene
+    costruito e serializzato nel worker del transport.
+
+    Con ``capture_locals=True`` lo snapshot copia anche le variabili locali
+    dei frame; il worker le rappresenta (solo per i frame in-app) con
+    ``SafeRepr``, entro ``locals_time_budget`` secondi per evento.
+
+    Tag, extra e contesti dello scope corrente (vedi ``panties.scope``)
+    vengono uniti a quelli passati alle singole catture.
+
+    Agli eventi inviati vengono allegati gli ultimi ``max_breadcrumbs``
+    breadcrumb del thread / task che li ha catturati (vedi
+    ``panties.breadcrumbs``); 0 li disattiva.
+
+    ``traces_sample_rate`` è la frazione di transazioni registrate e
+    inviate (vedi ``panties.tracing``); con 0, il default, il tracing è
+    spento e ``span()`` non registra nulla.
+
+    Dentro i middleware di ``panties.wsgi``, ``panties.asgi`` e
+    ``panties.django`` gli eventi hanno il contesto ``request`` (metodo,
+    URL, header, route) e, se noto, ``user``. Gli header in
+    ``redact_headers`` (default ``DEFAULT_REDACTED_HEADERS`` di
+    ``panties.request``) vengono inviati come ``"[Filtered]"``.
+
+    Le sessioni (vedi ``panties.sessions``; con ``auto_session_tracking``
+    ogni richiesta dei middleware è una sessione) vengono contate in
+    memoria per minuto di inizio ed esito (``exited``, ``errored``,
+    ``crashed``) e inviate come un solo evento ``sessions`` al massimo ogni
+    ``session_flush_interval`` secondi, con la ``release`` del client; un
+    timer le invia anche se non finiscono altre sessioni.
     """
 
     def __init__(
@@ -21,30 +86,252 @@ class PantiesClient:
         environment: str = "production",
         service_name: str = "default-service",
         timeout: float = 2.0,
+        dedupe_window: float = 60.0,
+        dedupe_max_fingerprints: int = 1000,
+        transport=None,
+        sample_rate: float = 1.0,
+        level_sample_rates: Optional[Dict[str, float]] = None,
+        exception_sample_rates: Optional[Dict[str, float]] = None,
+        rate_limit: float = 0.0,
+        rate_limit_burst: int = 10,
+        client_report_interval: float = 60.0,
+        max_queue_bytes: int = 8 * 1024 * 1024,
+        max_message_length: int = 8192,
+        max_frames: int = 100,
+        max_extra_depth: int = 5,
+        max_extra_bytes: int = 64 * 1024,
+        shutdown_timeout: float = 2.0,
+        stats_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        stats_interval: float = 60.0,
+        capture_locals: bool = False,
+        locals_time_budget: float = 0.01,
+        max_breadcrumbs: int = MAX_BREADCRUMBS,
+        traces_sample_rate: float = 0.0,
+        redact_headers: Optional[Iterable[str]] = None,
+        release: Optional[str] = None,
+        auto_session_tracking: bool = False,
+        session_flush_interval: float = 60.0,
     ) -> None:
         self.api_token = api_token
         self.endpoint = endpoint
         self.environment = environment
         self.service_name = service_name
-        self.transport = HttpTransport(
+        self.shutdown_timeout = shutdown_timeout
+        # Riceve stats() ogni stats_interval secondi (solo col transport di default)
+        self.stats_callback = stats_callback
+        # Transport personalizzato (es. AsyncHttpTransport) o HTTP di default,
+        # con coda limitata in byte e limiti di dimensione per campo
+        self.transport = transport or HttpTransport(
             endpoint=endpoint,
             api_token=api_token,
             timeout=timeout,
+            max_queue_bytes=max_queue_bytes,
+            serializer=EventSerializer(
+                max_message_length=max_message_length,
+                max_frames=max_frames,
+                max_extra_depth=max_extra_depth,
+                max_extra_bytes=max_extra_bytes,
+            ),
+            shutdown_timeout=shutdown_timeout,
+            stats_callback=self._emit_stats if stats_callback is not None else None,
+            stats_interval=stats_interval,
         )
+        # Aggregazione dei duplicati (disattivata con dedupe_window=0)
+        self._aggregator: Optional[DuplicateAggregator] = None
+        if dedupe_window > 0:
+            self._aggregator = DuplicateAggregator(
+                window=dedupe_window,
+                max_fingerprints=dedupe_max_fingerprints,
+            )
+        # Campionamento e rate limit per fingerprint, applicati prima di
+        # costruire l'evento; gli scarti vengono riportati al server
+        self._sampler = Sampler(
+            sample_rate=sample_rate,
+            level_rates=level_sample_rates,
+            exception_rates=exception_sample_rates,
+        )
+        self._limiter: Optional[TokenBucketLimiter] = None
+        if rate_limit > 0:
+            self._limiter = TokenBucketLimiter(rate=rate_limit, burst=rate_limit_burst)
+        self._discarded = DiscardCounter()
+        self.client_report_interval = client_report_interval
+        self._last_report = time.monotonic()
+        self._closed = False
+        # Timer che chiude le finestre dei duplicati scadute senza nuove occorrenze
+        self._sweep_timer: Optional[threading.Timer] = None
+        # Variabili locali dei frame in-app, rappresentate con costo limitato
+        # (locals_time_budget secondi al massimo per evento)
+        self._safe_repr: Optional[SafeRepr] = None
+        if capture_locals:
+            self._safe_repr = SafeRepr(time_budget=locals_time_budget)
+        self.max_breadcrumbs = min(max(0, max_breadcrumbs), MAX_BREADCRUMBS)
+        self.traces_sample_rate = min(max(0.0, traces_sample_rate), 1.0)
+        self.redact_headers = normalize_headers(redact_headers)
+        self.release = release
+        # Esiti delle sessioni, inviati come contatori aggregati
+        self.auto_session_tracking = auto_session_tracking
+        self.session_flush_interval = session_flush_interval
+        self._sessions = SessionAggregator()
+        self._last_sessions = time.monotonic()
+        # Timer che invia i contatori rimasti senza nuove sessioni finite
+        self._sessions_timer: Optional[threading.Timer] = None
+        # Campi comuni a tutti gli eventi, calcolati una volta: ogni evento
+        # ne è una copia superficiale (sdk è condiviso, non viene modificato)
+        self._event_template: Dict[str, Any] = {
+            "event_id": None,
+            "timestamp": 0,
+            "environment": environment,
+            "service_name": service_name,
+            "sdk": _SDK,
+        }
+        if release is not None:
+            self._event_template["release"] = release
+        # Costruzione dell'evento rimandata al worker del transport?
+        self._deferred = bool(getattr(self.transport, "accepts_snapshots", False))
+        # All'uscita del processo: riassunti e coda inviati entro shutdown_timeout
+        atexit.register(_close_at_exit, weakref.ref(self))
+
+    # ------- Metriche -------
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Metriche dell'SDK: quelle del transport (profondità della coda,
+        eventi accodati/inviati/falliti/scartati, byte inviati, istogramma
+        delle latenze, ...) più gli eventi scartati lato client per motivo
+        (``discarded``, es. ``sample_rate`` e ``rate_limit``).
+        """
+        transport_stats = getattr(self.transport, "stats", None)
+        stats: Dict[str, Any] = dict(transport_stats()) if transport_stats is not None else {}
+        stats["discarded"] = self._discarded.totals()
+        return stats
+
+    def _emit_stats(self, transport_stats: Dict[str, Any]) -> None:
+        if self.stats_callback is not None:
+            self.stats_callback({**transport_stats, "discarded": self._discarded.totals()})
+
+    # ------- Load shedding -------
+
+    def _discard(self, reason: str, category: str) -> None:
+        self._discarded.add(reason, category)
+        self._maybe_send_client_report()
+
+    def _maybe_send_client_report(self, force: bool = False) -> None:
+        """Invia il conteggio degli scarti al massimo ogni ``client_report_interval``."""
+        if not self._discarded:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_report < self.client_report_interval:
+            return
+        self._last_report = now
+        discarded = self._discarded.drain()
+        if discarded:
+            event = self._base_event()
+            event["type"] = "client_report"
+            event["discarded"] = discarded
+            self.transport.send(event)
+
+    # ------- Sessioni -------
+
+    def record_session(self, session: Any) -> None:
+        """Conta una sessione finita (chiamato da ``Session.end``)."""
+        self._sessions.add(session.started, session.status)
+        self._maybe_send_sessions()
+        if self._sessions:
+            self._schedule_sessions_flush()
+
+    def _schedule_sessions_flush(self) -> None:
+        """
+        Programma l'invio dei contatori ancora in memoria allo scadere di
+        ``session_flush_interval``: senza altre sessioni finite verrebbero
+        inviati solo a flush / close, e persi se il processo viene
+        terminato. Come il timer dei duplicati, esiste solo finché ci sono
+        contatori da inviare.
+        """
+        timer = self._sessions_timer
+        if self._closed or (timer is not None and timer.is_alive()):
+            return
+        delay = self._last_sessions + self.session_flush_interval - time.monotonic()
+        timer = threading.Timer(max(0.0, delay), self._flush_sessions)
+        timer.daemon = True
+        self._sessions_timer = timer
+        timer.start()
+
+    def _flush_sessions(self) -> None:
+        self._sessions_timer = None
+        if self._closed:
+            return
+        self._maybe_send_sessions()
+        if self._sessions:
+            self._schedule_sessions_flush()
+
+    def _maybe_send_sessions(self, force: bool = False) -> None:
+        """Invia i contatori delle sessioni al massimo ogni ``session_flush_interval``."""
+        now = time.monotonic()
+        if not force and now - self._last_sessions < self.session_flush_interval:
+            return
+        if not self._sessions:
+            return
+        self._last_sessions = now
+        aggregates = self._sessions.drain()
+        if aggregates:
+            event = self._base_event()
+            event["type"] = "sessions"
+            event["release"] = self.release
+            event["aggregates"] = aggregates
+            self.transport.send(event)
 
     # ------- Event building -------
 
     def _base_event(self) -> Dict[str, Any]:
-        return {
-            "event_id": str(uuid.uuid4()),
-            "timestamp": int(time.time()),
-            "environment": self.environment,
-            "service_name": self.service_name,
-            "sdk": {
-                "name": "panties-python",
-                "version": "0.1.0",
-            },
-        }
+        event = self._event_template.copy()
+        event["event_id"] = _event_id()
+        event["timestamp"] = int(time.time())
+        return event
+
+    def _build_event(self, snapshot: EventSnapshot) -> Dict[str, Any]:
+        """Costruisce l'evento completo di uno snapshot (nel worker del transport)."""
+        if snapshot.kind == "aggregate":
+            return self._build_aggregate_event(snapshot)
+        if snapshot.kind == "transaction":
+            return self._build_transaction_event(snapshot)
+        scope = snapshot.scope
+        tags, extra = snapshot.tags, snapshot.extra
+        if scope:
+            tags = merged(scope.tags, tags)
+            extra = merged(scope.extra, extra)
+        if snapshot.kind == "exception":
+            event = self._build_exception_event(
+                exc_type=snapshot.exc_type,
+                exc_value=snapshot.exc_value,
+                tb=snapshot.tb,
+                extra=extra,
+                tags=tags,
+            )
+            if snapshot.locals is not None:
+                self._attach_locals(event["exception"], snapshot.locals)
+            event["fingerprint"] = fingerprint_hex(snapshot.key)
+        else:
+            event = self._build_message_event(
+                message=snapshot.message or "",
+                level=snapshot.level or "info",
+                extra=extra,
+                tags=tags,
+            )
+            if snapshot.key is not None:
+                event["fingerprint"] = fingerprint_hex(snapshot.key)
+        if snapshot.request is not None:
+            contexts = snapshot.request.contexts(self.redact_headers)
+            if scope and scope.contexts:
+                contexts.update(scope.contexts)
+            event["contexts"] = contexts
+        elif scope and scope.contexts:
+            event["contexts"] = dict(scope.contexts)
+        if snapshot.breadcrumbs:
+            event["breadcrumbs"] = breadcrumb_dicts(snapshot.breadcrumbs, self.max_breadcrumbs)
+        event["timestamp"] = int(snapshot.timestamp)
+        if snapshot.sample_rate < 1.0:
+            event["sample_rate"] = snapshot.sample_rate
+        return event
 
     def _build_exception_event(
         self,
@@ -54,20 +341,163 @@ class PantiesClient:
         extra: Optional[Dict[str, Any]] = None,
         tags: Optional[Dict[str, str]] = None,
     ) -> Dict[str, Any]:
-        # Stacktrace serializzato in forma semplice
-        frames = traceback.format_tb(tb) if tb else []
+        exception: Dict[str, Any] = {
+            "type": exc_type.__name__ if exc_type else None,
+            "message": exception_message(exc_value),
+        }
+        chain = extract_exception_chain(exc_value, tb)
+        if chain is None:
+            # Frame strutturati (dal più esterno al più interno)
+            exception["frames"] = extract_frames(tb) if tb else []
+        else:
+            # Catena o ExceptionGroup: tabella dei frame condivisa e albero
+            # delle eccezioni che la referenzia per indice
+            exception["frames"], exception["exceptions"] = chain
+        event = self._base_event()
+        event["type"] = "exception"
+        event["exception"] = exception
+        event["tags"] = tags or {}
+        event["extra"] = extra or {}
+        return event
+
+    def _attach_locals(self, exception: Dict[str, Any], variables) -> None:
+        """
+        Aggiunge ``vars`` ai frame in-app dell'eccezione principale.
+
+        In una catena i frame sono nella tabella condivisa, dove ogni coppia
+        code object/riga compare una volta sola: una voce già usata da
+        un'altra occorrenza (ricorsione, o un'altra eccezione della catena)
+        viene copiata in fondo alla tabella, così ogni occorrenza ha le sue
+        variabili.
+        """
+        assert self._safe_repr is not None
+        budget = self._safe_repr.budget()
+        frames = exception["frames"]
+        if "exceptions" not in exception:
+            for frame, frame_vars in zip(frames, variables):
+                if frame.get("in_app") and frame_vars:
+                    frame["vars"] = self._safe_repr.repr_locals(frame_vars, budget)
+            return
+        nodes = exception["exceptions"]
+        indices = list(nodes[0]["frames"])
+        used = {index for node in nodes[1:] for index in node["frames"]}
+        for position, frame_vars in enumerate(variables[:len(indices)]):
+            index = indices[position]
+            frame = frames[index]
+            if not frame.get("in_app") or not frame_vars:
+                continue
+            if index in used:
+                frame = dict(frame)
+                indices[position] = len(frames)
+                frames.append(frame)
+            else:
+                used.add(index)
+            frame["vars"] = self._safe_repr.repr_locals(frame_vars, budget)
+        nodes[0]["frames"] = indices
+
+    def _build_aggregate_event(self, snapshot: EventSnapshot) -> Dict[str, Any]:
+        """
+        Evento riassuntivo delle occorrenze duplicate di una finestra:
+        copia dell'evento originale con conteggio e primo/ultimo timestamp.
+        """
+        assert snapshot.source is not None and snapshot.aggregation is not None
         return {
-            **self._base_event(),
-            "type": "exception",
-            "exception": {
-                "type": exc_type.__name__ if exc_type else None,
-                "message": str(exc_value),
-                "stacktrace": frames,
-            },
-            "tags": tags or {},
-            "extra": extra or {},
+            **snapshot.source.to_event(),
+            "event_id": _event_id(),
+            "timestamp": int(snapshot.timestamp),
+            "aggregation": snapshot.aggregation,
         }
 
+    def _build_transaction_event(self, snapshot: EventSnapshot) -> Dict[str, Any]:
+        """
+        Evento di una transazione finita: durate e offset degli span in
+        millisecondi rispetto all'inizio della transazione.
+        """
+        txn = snapshot.transaction
+        origin = txn.start
+        spans = [
+            {
+                "span_id": span.span_id,
+                "parent_span_id": span.parent_id,
+                "op": span.op,
+                "description": span.description,
+                "status": span.status or "ok",
+                "start": (span.start - origin) * 1000.0,
+                "duration": (span.end - span.start) * 1000.0,
+                "data": span.data or {},
+            }
+            for span in txn.spans
+        ]
+        event = self._base_event()
+        event["type"] = "transaction"
+        event["transaction"] = {
+            "name": txn.name,
+            "op": txn.op,
+            "trace_id": txn.trace_id,
+            "span_id": txn.span_id,
+            "parent_span_id": txn.parent_id,
+            "status": txn.status or "ok",
+            "start_timestamp": txn.timestamp,
+            "duration": (txn.end - origin) * 1000.0,
+            "spans": spans,
+            "dropped_spans": txn.dropped_spans,
+        }
+        scope = snapshot.scope
+        event["tags"] = merged(scope.tags, txn.tags) if scope else (txn.tags or {})
+        event["timestamp"] = int(snapshot.timestamp)
+        if snapshot.sample_rate < 1.0:
+            event["sample_rate"] = snapshot.sample_rate
+        return event
+
+    def _send_aggregates(self, windows) -> None:
+        for window in windows:
+            if window.event is None:
+                continue
+            snapshot = EventSnapshot(self._build_event, "aggregate", window.last_seen)
+            snapshot.source = window.event
+            snapshot.aggregation = {
+                "count": window.count,
+                "first_seen": window.first_seen,
+                "last_seen": window.last_seen,
+            }
+            self._dispatch(snapshot)
+
+    def _schedule_sweep(self, delay: Optional[float] = None) -> None:
+        """
+        Programma la chiusura delle finestre dei duplicati scadute: senza
+        nuove occorrenze il riassunto verrebbe inviato solo a flush / close,
+        e perso se il processo viene terminato. Il timer (un thread daemon)
+        esiste solo finché ci sono finestre aperte; dopo un fork il figlio
+        ne avvia uno suo alla prima finestra.
+        """
+        timer = self._sweep_timer
+        if self._closed or (timer is not None and timer.is_alive()):
+            return
+        if delay is None:
+            delay = self._aggregator.window
+        timer = threading.Timer(delay, self._sweep)
+        timer.daemon = True
+        self._sweep_timer = timer
+        timer.start()
+
+    def _sweep(self) -> None:
+        aggregator = self._aggregator
+        self._sweep_timer = None
+        if self._closed or aggregator is None:
+            return
+        now = time.time()
+        self._send_aggregates(aggregator.expired(now))
+        expiry = aggregator.next_expiry()
+        if expiry is not None:
+            self._schedule_sweep(max(0.0, expiry - now))
+
+    def _dispatch(self, snapshot: EventSnapshot) -> None:
+        """Passa lo snapshot al transport, o l'evento costruito se non li supporta."""
+        if self._deferred:
+            self.transport.send(snapshot)
+        else:
+            self.transport.send(snapshot.to_event())
+
     def _build_message_event(
         self,
         message: str,
@@ -75,16 +505,15 @@ class PantiesClient:
         extra: Optional[Dict[str, Any]] = None,
         tags: Optional[Dict[str, str]] = None,
     ) -> Dict[str, Any]:
-        return {
-            **self._base_event(),
-            "type": "message",
-            "message": {
-                "text": message,
-                "level": level,
-            },
-            "tags": tags or {},
-            "extra": extra or {},
+        event = self._base_event()
+        event["type"] = "message"
+        event["message"] = {
+            "text": message,
+            "level": level,
         }
+        event["tags"] = tags or {}
+        event["extra"] = extra or {}
+        return event
 
     # ------- Public capture methods -------
 
@@ -108,14 +537,51 @@ class PantiesClient:
             # Nessuna eccezione corrente
             return
 
-        event = self._build_exception_event(
-            exc_type=exc_type,
-            exc_value=exc_value,
-            tb=tb,
-            extra=extra,
-            tags=tags,
-        )
-        self.transport.send(event)
+        # La sessione conta l'errore anche se l'evento viene poi scartato
+        request = get_request()
+        session = get_session()
+        if session is None and request is not None:
+            session = request.session
+        if session is not None:
+            session.mark_errored()
+
+        sample_rate = 1.0
+        if self._sampler.enabled:
+            sample_rate = self._sampler.exception_rate(exc_type)
+            if not self._sampler.keep(sample_rate):
+                self._discard("sample_rate", "exception")
+                return
+
+        key = exception_key(exc_type, tb)
+        if self._limiter is not None and not self._limiter.allow(key, time.monotonic()):
+            self._discard("rate_limit", "exception")
+            return
+
+        if self._aggregator is not None:
+            is_new, closed = self._aggregator.record(key, time.time())
+            self._send_aggregates(closed)
+            if not is_new:
+                # Duplicato nella finestra: viene solo contato
+                return
+            self._schedule_sweep()
+
+        # Solo riferimenti e copie superficiali: il resto lo fa il worker
+        snapshot = EventSnapshot(self._build_event, "exception", time.time(), tags, extra, sample_rate)
+        snapshot.exc_type = exc_type
+        snapshot.exc_value = exc_value
+        snapshot.tb = tb
+        snapshot.key = key
+        if self._safe_repr is not None:
+            snapshot.locals = frame_locals(tb)
+        snapshot.scope = get_scope()
+        if request is not None:
+            snapshot.request = request.freeze()
+        if self.max_breadcrumbs:
+            snapshot.breadcrumbs = get_breadcrumbs()
+        if self._aggregator is not None:
+            self._aggregator.remember(key, snapshot)
+        self._dispatch(snapshot)
+        self._maybe_send_client_report()
 
     def capture_message(
         self,
@@ -123,14 +589,111 @@ class PantiesClient:
         level: str = "info",
         extra: Optional[Dict[str, Any]] = None,
         tags: Optional[Dict[str, str]] = None,
+        dedupe_key: Optional[FingerprintKey] = None,
     ) -> None:
         """
         Invia un evento di tipo "message".
+
+        I messaggi con la stessa ``dedupe_key`` (stessa forma delle chiavi
+        di ``exception_key``) vengono aggregati come le eccezioni duplicate
+        e ne determinano il fingerprint.
+        """
+        sample_rate = 1.0
+        if self._sampler.enabled:
+            sample_rate = self._sampler.level_rate(level)
+            if not self._sampler.keep(sample_rate):
+                self._discard("sample_rate", "message")
+                return
+
+        if self._limiter is not None and not self._limiter.allow(
+            ("message", level, message), time.monotonic()
+        ):
+            self._discard("rate_limit", "message")
+            return
+
+        aggregate = dedupe_key is not None and self._aggregator is not None
+        if aggregate:
+            is_new, closed = self._aggregator.record(dedupe_key, time.time())
+            self._send_aggregates(closed)
+            if not is_new:
+                return
+            self._schedule_sweep()
+
+        snapshot = EventSnapshot(self._build_event, "message", time.time(), tags, extra, sample_rate)
+        snapshot.message = message
+        snapshot.level = level
+        snapshot.key = dedupe_key
+        snapshot.scope = get_scope()
+        request = get_request()
+        if request is not None:
+            snapshot.request = request.freeze()
+        if aggregate:
+            self._aggregator.remember(dedupe_key, snapshot)
+        if self.max_breadcrumbs:
+            snapshot.breadcrumbs = get_breadcrumbs()
+        self._dispatch(snapshot)
+        self._maybe_send_client_report()
+
+    def sample_transaction(self) -> Tuple[bool, float]:
+        """
+        Decisione di campionamento (head-based) per una nuova transazione:
+        ritorna ``(sampled, sample_rate)``.
+        """
+        rate = self.traces_sample_rate
+        if rate <= 0.0:
+            return False, rate
+        if Sampler.keep(rate):
+            return True, rate
+        self._discard("sample_rate", "transaction")
+        return False, rate
+
+    def capture_transaction(self, transaction: Any) -> None:
+        """
+        Accoda una transazione finita (chiamato da ``Transaction.finish``);
+        l'evento viene costruito nel worker del transport.
         """
-        event = self._build_message_event(
-            message=message,
-            level=level,
-            extra=extra,
-            tags=tags,
+        snapshot = EventSnapshot(
+            self._build_event, "transaction", transaction.timestamp,
+            sample_rate=transaction.sample_rate,
         )
-        self.transport.send(event)
+        snapshot.transaction = transaction
+        snapshot.scope = get_scope()
+        self._dispatch(snapshot)
+
+    def _send_pending(self) -> None:
+        """Invia i riassunti dei duplicati ancora aperti, il client report e le sessioni."""
+        if self._aggregator is not None:
+            self._send_aggregates(self._aggregator.drain())
+        self._maybe_send_client_report(force=True)
+        self._maybe_send_sessions(force=True)
+
+    def flush(self, timeout: float = 2.0) -> int:
+        """
+        Invia i riassunti dei duplicati ancora aperti (e i contatori delle
+        sessioni) e attende l'invio
+        degli eventi in coda, al massimo ``timeout`` secondi.
+
+        Ritorna il numero di eventi non ancora inviati alla scadenza.
+        """
+        self._send_pending()
+        return self.transport.flush(timeout=timeout) or 0
+
+    def close(self, timeout: float = 2.0) -> int:
+        """
+        Come ``flush``, poi chiude il transport. Chiamato automaticamente
+        all'uscita del processo.
+
+        Ritorna il numero di eventi rimasti non inviati.
+        """
+        if self._closed:
+            return 0
+        self._closed = True
+        for timer in (self._sweep_timer, self._sessions_timer):
+            if timer is not None:
+                timer.cancel()
+        self._send_pending()
+        close = getattr(self.transport, "close", None)
+        if close is None:
+            # Transport personalizzato senza close()
+            return self.transport.flush(timeout=timeout) or 0
+        return close(timeout=timeout) or 0
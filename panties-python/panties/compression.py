@@ -0,0 +1,60 @@
+# panties/compression.py
+from __future__ import annotations
+
+from typing import Callable, Dict, Optional, Tuple
+
+__all__ = ["available_encodings", "compress_body"]
+
+# Caricati al primo utilizzo, per non importare gzip/zstd all'import di panties
+_COMPRESSORS: Optional[Dict[str, Callable[[bytes], bytes]]] = None
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    global _COMPRESSORS
+    if _COMPRESSORS is not None:
+        return _COMPRESSORS
+    import gzip
+
+    compressors: Dict[str, Callable[[bytes], bytes]] = {
+        "gzip": lambda data: gzip.compress(data, compresslevel=6, mtime=0),
+    }
+    # zstd è opzionale: stdlib da Python 3.14, altrimenti il pacchetto ``zstandard``
+    try:
+        from compression import zstd as _zstd  # type: ignore[import-not-found]
+
+        compressors["zstd"] = lambda data: _zstd.compress(data, level=3)
+    except ImportError:
+        try:
+            import zstandard as _zstandard  # type: ignore[import-not-found]
+
+            compressors["zstd"] = _zstandard.ZstdCompressor(level=3).compress
+        except ImportError:
+            pass
+    _COMPRESSORS = compressors
+    return compressors
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Content-Encoding supportati in questo interprete."""
+    return tuple(_compressors())
+
+
+def compress_body(
+    body: bytes,
+    encoding: Optional[str],
+    threshold: int,
+) -> Tuple[bytes, Optional[str]]:
+    """
+    Comprime ``body`` se supera ``threshold`` byte.
+
+    Ritorna ``(body, content_encoding)``; ``content_encoding`` è ``None`` se
+    il body viene inviato così com'è (sotto soglia, encoding non disponibile,
+    o compressione che non fa risparmiare byte).
+    """
+    compressor = _compressors().get(encoding) if encoding else None
+    if compressor is None or len(body) < threshold:
+        return body, None
+    compressed = compressor(body)
+    if len(compressed) >= len(body):
+        return body, None
+    return compressed, encoding
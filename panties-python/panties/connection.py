@@ -0,0 +1,130 @@
+# panties/connection.py
+from __future__ import annotations
+
+import http.client
+import threading
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+__all__ = ["ConnectionPool"]
+
+# Errori che indicano una connessione keep-alive chiusa dal server
+# mentre era inattiva nel pool: in quel caso si riprova una volta.
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class ConnectionPool:
+    """
+    Pool di connessioni persistenti (keep-alive) verso un singolo host.
+
+    - riusa le connessioni ``http.client`` tra una richiesta e l'altra
+    - riapre la connessione se il server l'ha chiusa
+    - mantiene al massimo ``maxsize`` connessioni inattive, così più
+      sender paralleli possono avere ognuno la propria
+    """
+
+    # Eccezioni di request() per problemi di rete o di protocollo
+    errors = (OSError, http.client.HTTPException)
+
+    def __init__(self, url: str, timeout: float = 2.0, maxsize: int = 1) -> None:
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.timeout = timeout
+        self.maxsize = max(1, maxsize)
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            "connections_opened": 0,
+            "connections_reused": 0,
+            "requests": 0,
+        }
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            conn: http.client.HTTPConnection = http.client.HTTPSConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        with self._lock:
+            self._stats["connections_opened"] += 1
+        return conn
+
+    def _get(self) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                self._stats["connections_reused"] += 1
+                return self._idle.pop(), True
+        return self._new_connection(), False
+
+    def _put(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.maxsize:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, bytes, http.client.HTTPMessage]:
+        """
+        Esegue una richiesta e ritorna ``(status, body, headers)``.
+
+        Gli errori di rete vengono propagati (``OSError`` /
+        ``http.client.HTTPException``) dopo aver scartato la connessione.
+        """
+        conn, reused = self._get()
+        try:
+            try:
+                return self._do_request(conn, method, path, body, headers)
+            except _STALE_ERRORS:
+                if not reused:
+                    raise
+                # Connessione inattiva chiusa dal server: riprova con una nuova
+                conn.close()
+                conn = self._new_connection()
+                return self._do_request(conn, method, path, body, headers)
+        except BaseException:
+            conn.close()
+            raise
+
+    def _do_request(
+        self,
+        conn: http.client.HTTPConnection,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Optional[Dict[str, str]],
+    ) -> Tuple[int, bytes, http.client.HTTPMessage]:
+        conn.request(method, path, body=body, headers=headers or {})
+        resp = conn.getresponse()
+        # Il body va letto per intero prima di poter riusare la connessione
+        data = resp.read()
+        with self._lock:
+            self._stats["requests"] += 1
+        if resp.will_close:
+            conn.close()
+        else:
+            self._put(conn)
+        return resp.status, data, resp.headers
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
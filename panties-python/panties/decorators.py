@@ -1,38 +1,144 @@
 # panties/decorators.py
-from contextlib import contextmanager
-from typing import Callable, TypeVar, Any
+from __future__ import annotations
+
+import functools
+from types import TracebackType
+from typing import Any, Callable, Optional, Type, TypeVar
 
 from .state import get_client
 
 F = TypeVar("F", bound=Callable[..., Any])
 
+# Flag dei code object (gli stessi usati da inspect, che qui non si importa)
+_CO_GENERATOR = 0x20
+_CO_COROUTINE = 0x80
+_CO_ASYNC_GENERATOR = 0x200
+
+
+def _capture(
+    exc_type: Optional[Type[BaseException]] = None,
+    exc_value: Optional[BaseException] = None,
+    tb: Optional[TracebackType] = None,
+) -> None:
+    client = get_client()
+    if client is not None:
+        client.capture_exception(exc_type, exc_value, tb)
+
+
+def _code_flags(func: Any) -> int:
+    """Flag del code object di ``func`` (anche dietro partial e metodi)."""
+    while isinstance(func, functools.partial):
+        func = func.func
+    func = getattr(func, "__func__", func)
+    if getattr(func, "_is_coroutine_marker", None) is not None:
+        # inspect.markcoroutinefunction (Python 3.12+)
+        return _CO_COROUTINE
+    code = getattr(func, "__code__", None)
+    return code.co_flags if code is not None else 0
+
 
 def capture_exceptions(func: F) -> F:
     """
     Decorator che cattura tutte le eccezioni della funzione, le invia a panties
     e poi le rilancia.
+
+    Funziona con funzioni normali, ``async def``, generatori e generatori
+    asincroni (le eccezioni sollevate durante l'iterazione vengono catturate)
+    e conserva nome, docstring e firma della funzione (``functools.wraps``).
+    Il tipo di funzione viene riconosciuto una volta sola, alla decorazione:
+    se non ci sono eccezioni il costo è quello di una chiamata in più.
     """
-    def wrapper(*args, **kwargs):
+    flags = _code_flags(func)
+
+    if flags & _CO_COROUTINE:
+        @functools.wraps(func)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                _capture()
+                raise
+
+        return async_wrapper  # type: ignore[return-value]
+
+    if flags & _CO_ASYNC_GENERATOR:
+        @functools.wraps(func)
+        async def async_gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+            agen = func(*args, **kwargs)
+            try:
+                item = await agen.__anext__()
+                while True:
+                    # Inoltra al generatore originale valori, eccezioni e chiusura
+                    try:
+                        sent = yield item
+                    except GeneratorExit:
+                        await agen.aclose()
+                        raise
+                    except BaseException as exc:
+                        item = await agen.athrow(exc)
+                    else:
+                        item = await (agen.__anext__() if sent is None else agen.asend(sent))
+            except StopAsyncIteration:
+                return
+            except Exception:
+                _capture()
+                raise
+
+        return async_gen_wrapper  # type: ignore[return-value]
+
+    if flags & _CO_GENERATOR:
+        @functools.wraps(func)
+        def gen_wrapper(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return (yield from func(*args, **kwargs))
+            except Exception:
+                _capture()
+                raise
+
+        return gen_wrapper  # type: ignore[return-value]
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
         try:
             return func(*args, **kwargs)
         except Exception:
-            client = get_client()
-            if client is not None:
-                client.capture_exception()
+            _capture()
             raise
 
     return wrapper  # type: ignore[return-value]
 
 
-@contextmanager
-def capture_exceptions_ctx():
+class capture_exceptions_ctx:
     """
-    Context manager che cattura le eccezioni nello scope del blocco.
+    Context manager che cattura le eccezioni nello scope del blocco, sia con
+    ``with`` sia con ``async with``, e le rilancia.
+
+    A differenza di un ``@contextmanager`` non crea un generatore a ogni
+    uso: entrare e uscire senza eccezioni costa due chiamate a metodo.
     """
-    try:
-        yield
-    except Exception:
-        client = get_client()
-        if client is not None:
-            client.capture_exception()
-        raise
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> bool:
+        if exc_type is not None and issubclass(exc_type, Exception):
+            _capture(exc_type, exc_value, tb)
+        return False
+
+    async def __aenter__(self) -> None:
+        return None
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> bool:
+        return self.__exit__(exc_type, exc_value, tb)
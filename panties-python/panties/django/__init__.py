@@ -0,0 +1,163 @@
+# panties/django/__init__.py
+from __future__ import annotations
+
+import sys
+from typing import Any, Callable, Dict, FrozenSet, Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import BadRequest, PermissionDenied, SuspiciousOperation
+from django.http import Http404
+
+from ..request import (
+    RequestInfo,
+    WSGIRequest,
+    _request,
+    already_captured,
+    capture_request_exception,
+    copy_environ,
+    end_request_session,
+    environ_request,
+    get_request,
+    set_request_result,
+    start_request_session,
+    start_request_transaction,
+)
+from ..scope import push_scope
+
+__all__ = ["DjangoRequest", "PantiesMiddleware"]
+
+# Eccezioni che Django trasforma in risposte 4xx: non sono errori dell'app
+_CLIENT_ERRORS = (Http404, PermissionDenied, BadRequest, SuspiciousOperation)
+
+
+class DjangoRequest(RequestInfo):
+    """
+    Richiesta Django. La route è il pattern risolto dall'URLconf
+    (``/projects/<int:pk>/``); l'utente viene letto solo se
+    ``AuthenticationMiddleware`` lo ha già caricato, senza query in più.
+    """
+
+    __slots__ = ("http_request",)
+
+    def __init__(self, http_request: Any) -> None:
+        self.http_request = http_request
+        self.route = None
+        self.session = None
+        self._user = None
+
+    def resolve(self) -> None:
+        request = self.http_request
+        if self.route is None:
+            match = getattr(request, "resolver_match", None)
+            if match is not None and match.route is not None:
+                self.route = "/" + match.route
+        if self._user is None:
+            # Impostato da django.contrib.auth al primo accesso a request.user
+            user = getattr(request, "_cached_user", None)
+            if user is not None and user.is_authenticated:
+                self._user = {"id": str(user.pk), "username": user.get_username()}
+
+    def freeze(self) -> RequestInfo:
+        # Il contesto viene dal META, come per una richiesta WSGI
+        return self._frozen(WSGIRequest(copy_environ(self.http_request.META)))
+
+    def method(self) -> str:
+        return self.http_request.method or ""
+
+    def path(self) -> str:
+        return self.http_request.path
+
+    def request(self, redacted: FrozenSet[str]) -> Dict[str, Any]:
+        return environ_request(self.http_request.META, redacted)
+
+    def traceparent(self) -> Optional[str]:
+        return self.http_request.META.get("HTTP_TRACEPARENT")
+
+
+class PantiesMiddleware:
+    """
+    Middleware Django, sincrono e asincrono; va messo per primo in
+    ``MIDDLEWARE``:
+
+        MIDDLEWARE = ["panties.django.PantiesMiddleware", ...]
+
+    Le eccezioni delle view vengono inviate con il contesto della richiesta
+    (Django poi risponde con la sua pagina di errore); con l'app
+    ``panties.django`` in ``INSTALLED_APPS`` anche quelle fuori dalle view
+    (middleware, URLconf). Tag, extra e contesti impostati dalle view
+    valgono solo per la richiesta. Con ``traces_sample_rate`` > 0 ogni richiesta
+    campionata è una transazione ``http.server``; con
+    ``auto_session_tracking`` ogni richiesta è una sessione (``crashed`` se
+    la view solleva un'eccezione).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[Any], Any]) -> None:
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: Any) -> Any:
+        if self.is_async:
+            return self.__acall__(request)
+        info = DjangoRequest(request)
+        start_request_session(info)
+        token = _request.set(info)
+        try:
+            with push_scope():
+                txn = start_request_transaction(info)
+                if txn is None:
+                    return self.get_response(request)
+                with txn:
+                    response = self.get_response(request)
+                    set_request_result(txn, info, response.status_code)
+                    return response
+        finally:
+            _request.reset(token)
+            end_request_session(info)
+
+    async def __acall__(self, request: Any) -> Any:
+        info = DjangoRequest(request)
+        start_request_session(info)
+        token = _request.set(info)
+        try:
+            with push_scope():
+                txn = start_request_transaction(info)
+                if txn is None:
+                    return await self.get_response(request)
+                with txn:
+                    response = await self.get_response(request)
+                    set_request_result(txn, info, response.status_code)
+                    return response
+        finally:
+            _request.reset(token)
+            end_request_session(info)
+
+    def process_exception(self, request: Any, exception: Exception) -> None:
+        # Con le view async Django lo chiama in un altro thread: l'eccezione
+        # viene passata esplicitamente, non letta da sys.exc_info()
+        if isinstance(exception, _CLIENT_ERRORS):
+            return None
+        info = get_request()
+        if info is None or getattr(info, "http_request", None) is not request:
+            info = DjangoRequest(request)
+        capture_request_exception(info, exception)
+        return None
+
+
+def _on_request_exception(sender: Any, request: Any = None, **kwargs: Any) -> None:
+    """
+    Ricevitore di ``got_request_exception``: eccezioni che Django trasforma
+    in una risposta 500 fuori dalle view (non passate da ``process_exception``).
+    """
+    exc = sys.exc_info()[1]
+    if exc is None or already_captured(exc):
+        return
+    info = get_request()
+    if info is None and request is not None:
+        info = DjangoRequest(request)
+    if info is not None:
+        capture_request_exception(info, exc)
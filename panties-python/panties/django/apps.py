@@ -0,0 +1,33 @@
+# panties/django/apps.py
+from __future__ import annotations
+
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import got_request_exception
+
+from ..state import get_client
+
+
+class PantiesConfig(AppConfig):
+    """
+    App Django di panties (``"panties.django"`` in ``INSTALLED_APPS``).
+
+    All'avvio inizializza il client con le opzioni di ``settings.PANTIES``
+    (le stesse di ``panties.init``), se presenti e se il client non è già
+    stato inizializzato, e registra la cattura delle eccezioni che Django
+    trasforma in risposte 500.
+    """
+
+    name = "panties.django"
+    label = "panties"
+    verbose_name = "Panties"
+
+    def ready(self) -> None:
+        from . import _on_request_exception
+
+        options = getattr(settings, "PANTIES", None)
+        if options and get_client() is None:
+            import panties
+
+            panties.init(**options)
+        got_request_exception.connect(_on_request_exception, dispatch_uid="panties")
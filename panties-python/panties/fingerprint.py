@@ -0,0 +1,152 @@
+# panties/fingerprint.py
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+__all__ = ["exception_key", "fingerprint_hex", "DuplicateAggregator"]
+
+FingerprintKey = Tuple[Any, ...]
+
+
+def exception_key(exc_type, tb) -> FingerprintKey:
+    """
+    Chiave di raggruppamento di un'eccezione: tipo + frame normalizzati
+    (modulo, funzione, riga). Non dipende dal messaggio né dai path assoluti,
+    quindi è stabile tra host e processi diversi.
+    """
+    frames = []
+    while tb is not None:
+        frame = tb.tb_frame
+        frames.append((
+            frame.f_globals.get("__name__", ""),
+            frame.f_code.co_name,
+            tb.tb_lineno,
+        ))
+        tb = tb.tb_next
+    type_name = f"{exc_type.__module__}.{exc_type.__qualname__}" if exc_type else ""
+    return (type_name, tuple(frames))
+
+
+def fingerprint_hex(key: FingerprintKey) -> str:
+    """Fingerprint stabile (sha1 esadecimale) di una chiave ``exception_key``."""
+    import hashlib
+
+    type_name, frames = key
+    parts = [type_name]
+    parts.extend(f"{module}:{function}:{lineno}" for module, function, lineno in frames)
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class _Window:
+    __slots__ = ("started", "first_seen", "last_seen", "count", "event")
+
+    def __init__(self, now: float) -> None:
+        self.started = now
+        self.first_seen = 0.0
+        self.last_seen = 0.0
+        self.count = 0
+        self.event: Any = None  # EventSnapshot dell'occorrenza inviata
+
+
+class DuplicateAggregator:
+    """
+    Aggrega le eccezioni duplicate all'interno di una finestra temporale.
+
+    La prima occorrenza di un fingerprint viene inviata subito; le successive
+    nella stessa finestra vengono solo contate e, alla chiusura della
+    finestra, diventano un unico evento riassuntivo con il numero di
+    occorrenze e i timestamp della prima e dell'ultima.
+
+    La memoria è limitata a ``max_fingerprints`` finestre aperte: oltre il
+    limite la finestra più vecchia viene chiusa in anticipo.
+    """
+
+    def __init__(self, window: float = 60.0, max_fingerprints: int = 1000) -> None:
+        self.window = window
+        self.max_fingerprints = max(1, max_fingerprints)
+        self._windows: "OrderedDict[FingerprintKey, _Window]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, key: FingerprintKey, now: float) -> Tuple[bool, List[_Window]]:
+        """
+        Registra un'occorrenza di ``key``.
+
+        Ritorna ``(is_new, closed)``: ``is_new`` indica se l'evento va
+        costruito e inviato; ``closed`` sono le finestre chiuse (scadute o
+        evitte) per cui emettere un evento riassuntivo.
+        """
+        with self._lock:
+            closed = self._pop_expired(now)
+            current = self._windows.get(key)
+            if current is not None:
+                if current.count == 0:
+                    current.first_seen = now
+                current.count += 1
+                current.last_seen = now
+                return False, closed
+
+            self._windows[key] = _Window(now)
+            while len(self._windows) > self.max_fingerprints:
+                _, oldest = self._windows.popitem(last=False)
+                if oldest.count:
+                    closed.append(oldest)
+            return True, closed
+
+    def remember(self, key: FingerprintKey, event: Any) -> None:
+        """
+        Associa alla finestra l'evento inviato (uno ``EventSnapshot``), usato
+        come modello del riassunto.
+        """
+        with self._lock:
+            current = self._windows.get(key)
+            if current is not None:
+                current.event = event
+
+    def absorb(self, key: FingerprintKey, count: int, first_seen: float, last_seen: float) -> bool:
+        """
+        Somma alla finestra aperta di ``key`` le occorrenze di un riassunto
+        già calcolato altrove (es. da un altro processo, in ``panties.relay``).
+        Ritorna ``False`` se non c'è una finestra aperta per ``key``.
+        """
+        with self._lock:
+            current = self._windows.get(key)
+            if current is None or count <= 0:
+                return False
+            if current.count == 0 or first_seen < current.first_seen:
+                current.first_seen = first_seen
+            current.count += count
+            current.last_seen = max(current.last_seen, last_seen)
+            return True
+
+    def expired(self, now: float) -> List[_Window]:
+        """Chiude le finestre scadute, anche senza nuove occorrenze."""
+        with self._lock:
+            return self._pop_expired(now)
+
+    def next_expiry(self) -> Optional[float]:
+        """Istante di scadenza della finestra aperta più vecchia, se ce ne sono."""
+        with self._lock:
+            for oldest in self._windows.values():
+                return oldest.started + self.window
+            return None
+
+    def _pop_expired(self, now: float) -> List[_Window]:
+        closed = []
+        # Le finestre sono ordinate per apertura: basta guardare le prime
+        while self._windows:
+            key, oldest = next(iter(self._windows.items()))
+            if now - oldest.started < self.window:
+                break
+            del self._windows[key]
+            if oldest.count:
+                closed.append(oldest)
+        return closed
+
+    def drain(self) -> List[_Window]:
+        """Chiude tutte le finestre aperte (es. prima di un flush)."""
+        with self._lock:
+            closed = [w for w in self._windows.values() if w.count]
+            self._windows.clear()
+            return closed
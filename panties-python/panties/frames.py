@@ -0,0 +1,172 @@
+# panties/frames.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = ["extract_frames", "frame_locals", "clear_cache"]
+
+# Righe di contesto prima/dopo la riga dell'errore
+CONTEXT_LINES = 3
+# Intervallo minimo tra due stat() dello stesso file
+MTIME_CHECK_INTERVAL = 1.0
+
+_FRAME_CACHE_SIZE = 2048
+_FILE_CACHE_SIZE = 128
+
+_lock = threading.Lock()
+# (code, lineno) -> (mtime, dati statici del frame)
+_frame_cache: "OrderedDict[Tuple[Any, int], Tuple[Optional[float], Dict[str, Any]]]" = OrderedDict()
+# filename -> (mtime, righe)
+_file_cache: "OrderedDict[str, Tuple[Optional[float], List[str]]]" = OrderedDict()
+# filename -> (mtime, istante dell'ultimo controllo)
+_mtimes: Dict[str, Tuple[Optional[float], float]] = {}
+
+
+# Calcolati al primo frame estratto (sysconfig non viene importato prima)
+_LIBRARY_PREFIXES: Optional[Tuple[str, ...]] = None
+
+
+def _library_prefixes() -> Tuple[str, ...]:
+    global _LIBRARY_PREFIXES
+    if _LIBRARY_PREFIXES is None:
+        import sysconfig
+
+        paths = set()
+        for name in ("stdlib", "platstdlib", "purelib", "platlib"):
+            path = sysconfig.get_paths().get(name)
+            if path:
+                paths.add(os.path.abspath(path) + os.sep)
+        _LIBRARY_PREFIXES = tuple(paths)
+    return _LIBRARY_PREFIXES
+
+
+def _is_in_app(filename: str, module: str) -> bool:
+    if module == "panties" or module.startswith("panties."):
+        return False
+    if filename.startswith("<"):
+        return False
+    if "site-packages" in filename or "dist-packages" in filename:
+        return False
+    return not os.path.abspath(filename).startswith(_library_prefixes())
+
+
+def _mtime(filename: str, now: float) -> Optional[float]:
+    """mtime del file, con stat() al massimo una volta per MTIME_CHECK_INTERVAL."""
+    cached = _mtimes.get(filename)
+    if cached is not None and now - cached[1] < MTIME_CHECK_INTERVAL:
+        return cached[0]
+    try:
+        mtime: Optional[float] = os.stat(filename).st_mtime
+    except OSError:
+        mtime = None
+    _mtimes[filename] = (mtime, now)
+    return mtime
+
+
+def _file_lines(filename: str, mtime: Optional[float]) -> List[str]:
+    cached = _file_cache.get(filename)
+    if cached is not None and cached[0] == mtime:
+        _file_cache.move_to_end(filename)
+        return cached[1]
+    try:
+        with open(filename, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        lines = []
+    _file_cache[filename] = (mtime, lines)
+    if len(_file_cache) > _FILE_CACHE_SIZE:
+        _file_cache.popitem(last=False)
+    return lines
+
+
+def _build_frame(code, module: str, lineno: int, mtime: Optional[float]) -> Dict[str, Any]:
+    filename = code.co_filename
+    frame: Dict[str, Any] = {
+        "filename": filename,
+        "function": getattr(code, "co_qualname", code.co_name),
+        "module": module,
+        "lineno": lineno,
+        "in_app": _is_in_app(filename, module),
+    }
+    lines = _file_lines(filename, mtime) if mtime is not None else []
+    if 0 < lineno <= len(lines):
+        index = lineno - 1
+        frame["context_line"] = lines[index]
+        frame["pre_context"] = lines[max(0, index - CONTEXT_LINES):index]
+        frame["post_context"] = lines[index + 1:index + 1 + CONTEXT_LINES]
+    return frame
+
+
+def _frame_entries(tb) -> List[Tuple[Tuple[Any, int], Dict[str, Any]]]:
+    """
+    Coppie ``(chiave, dati)`` dei frame di un traceback, dal più esterno al
+    più interno. La chiave ``(code object, riga)`` identifica il frame ed è
+    usata anche per deduplicare i frame condivisi tra traceback concatenati.
+    """
+    entries = []
+    now = time.monotonic()
+    with _lock:
+        while tb is not None:
+            frame = tb.tb_frame
+            code = frame.f_code
+            lineno = tb.tb_lineno
+            mtime = _mtime(code.co_filename, now)
+            key = (code, lineno)
+            cached = _frame_cache.get(key)
+            if cached is not None and cached[0] == mtime:
+                _frame_cache.move_to_end(key)
+                data = cached[1]
+            else:
+                module = frame.f_globals.get("__name__", "")
+                data = _build_frame(code, module, lineno, mtime)
+                _frame_cache[key] = (mtime, data)
+                if len(_frame_cache) > _FRAME_CACHE_SIZE:
+                    _frame_cache.popitem(last=False)
+            entries.append((key, data))
+            tb = tb.tb_next
+    return entries
+
+
+def extract_frames(tb) -> List[Dict[str, Any]]:
+    """
+    Converte un traceback in una lista di frame strutturati (dal più esterno
+    al più interno): filename, function, module, lineno, in_app e qualche
+    riga di contesto.
+
+    I dati di ogni frame sono in una cache LRU indicizzata per
+    ``(code object, riga)`` e invalidata quando cambia l'mtime del file,
+    quindi i sorgenti vengono letti solo la prima volta.
+    """
+    # Copia: i dati in cache non devono essere modificati dal chiamante
+    return [dict(data) for _, data in _frame_entries(tb)]
+
+
+def frame_locals(tb) -> List[Dict[str, Any]]:
+    """
+    Copia superficiale delle variabili locali di ogni frame del traceback
+    (stesso ordine di ``extract_frames``): i nomi restano legati ai valori
+    del momento della cattura anche se il frame continua a eseguire.
+    """
+    variables = []
+    while tb is not None:
+        frame = tb.tb_frame
+        try:
+            f_locals = frame.f_locals
+            # A livello di modulo le "locali" sono i globals: non si copiano
+            variables.append({} if f_locals is frame.f_globals else dict(f_locals))
+        except Exception:
+            variables.append({})
+        tb = tb.tb_next
+    return variables
+
+
+def clear_cache() -> None:
+    """Svuota le cache di frame e sorgenti."""
+    with _lock:
+        _frame_cache.clear()
+        _file_cache.clear()
+        _mtimes.clear()
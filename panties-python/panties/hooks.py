@@ -1,11 +1,18 @@
 # panties/hooks.py
+from __future__ import annotations
+
 import sys
 import threading
 from types import TracebackType
-from typing import Optional, Type
+from typing import TYPE_CHECKING, Any, Dict, Optional, Type
 
+from .log import ERROR, INFO
+from .sessions import crash_session
 from .state import get_client
 
+if TYPE_CHECKING:
+    import asyncio
+
 _original_sys_excepthook = None
 _original_threading_excepthook = None
 
@@ -13,7 +20,8 @@ _original_threading_excepthook = None
 def install_global_excepthook() -> None:
     """
     Sostituisce sys.excepthook con una versione che invia l'eccezione a panties
-    e poi richiama l'hook originale.
+    (chiudendo come ``crashed`` la sessione in corso) e poi richiama l'hook
+    originale.
     """
     global _original_sys_excepthook
 
@@ -31,9 +39,10 @@ def install_global_excepthook() -> None:
         client = get_client()
         if client is not None:
             client.capture_exception(exc_type, exc_value, tb)
+            crash_session()
             # Flush the queue to ensure the event is sent before exit
             try:
-                client.transport.flush(timeout=2.0)
+                client.flush(timeout=2.0)
             except Exception:
                 pass
 
@@ -46,6 +55,7 @@ def install_global_excepthook() -> None:
 def install_threading_excepthook() -> None:
     """
     Installa un hook per eccezioni sollevate nei thread (Python 3.8+).
+    La sessione del thread, se avviata, viene chiusa come ``crashed``.
     Se threading.excepthook non è disponibile, non fa nulla.
     """
     if not hasattr(threading, "excepthook"):
@@ -66,8 +76,109 @@ def install_threading_excepthook() -> None:
                 exc_value=args.exc_value,
                 tb=args.exc_traceback,
             )
+            crash_session()
 
         if _original_threading_excepthook is not None:
             _original_threading_excepthook(args)
 
     threading.excepthook = panties_thread_excepthook
+
+
+def install_asyncio_exception_handler(
+    loop: "Optional[asyncio.AbstractEventLoop]" = None,
+) -> None:
+    """
+    Installa un exception handler sul loop asyncio (di default quello in
+    esecuzione) che invia a panties le eccezioni non gestite dei task e
+    delle callback, e poi richiama l'handler precedente.
+
+    Non crea thread: l'handler gira sul loop stesso.
+    """
+    if loop is None:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+
+    previous = loop.get_exception_handler()
+    if getattr(previous, "_panties_handler", False):
+        # Già installato su questo loop
+        return
+
+    def panties_loop_exception_handler(
+        loop: "asyncio.AbstractEventLoop",
+        context: Dict[str, Any],
+    ) -> None:
+        client = get_client()
+        if client is not None:
+            exc = context.get("exception")
+            extra = {"asyncio_message": context.get("message")}
+            task = context.get("task") or context.get("future")
+            if task is not None:
+                extra["asyncio_task"] = repr(task)
+            if exc is not None:
+                client.capture_exception(type(exc), exc, exc.__traceback__, extra=extra)
+            else:
+                client.capture_message(
+                    context.get("message", "Unhandled asyncio error"),
+                    level="error",
+                    extra=extra,
+                )
+
+        if previous is not None:
+            previous(loop, context)
+        else:
+            loop.default_exception_handler(context)
+
+    panties_loop_exception_handler._panties_handler = True  # type: ignore[attr-defined]
+    loop.set_exception_handler(panties_loop_exception_handler)
+
+
+_breadcrumb_handler: Any = None
+_event_handler: Any = None
+
+
+def install_logging_breadcrumbs(level: int = INFO, logger: Optional[str] = None) -> None:
+    """
+    Aggiunge un ``BreadcrumbHandler`` al logger ``logger`` (di default il
+    root logger): i record di livello ``level`` o superiore (default INFO)
+    diventano breadcrumb, allegati agli eventi inviati. Come per ogni
+    handler, i record devono superare anche il livello del logger.
+
+    Importa ``logging``: va chiamato esplicitamente (o con
+    ``init(install_logging_hook=True)``).
+    """
+    global _breadcrumb_handler
+
+    if _breadcrumb_handler is not None:
+        # Già installato
+        return
+
+    import logging
+
+    from .logging import BreadcrumbHandler
+
+    _breadcrumb_handler = BreadcrumbHandler(level)
+    logging.getLogger(logger).addHandler(_breadcrumb_handler)
+
+
+def install_logging_handler(level: int = ERROR, logger: Optional[str] = None) -> None:
+    """
+    Aggiunge un ``PantiesHandler`` al logger ``logger`` (di default il root
+    logger): i record di livello ``level`` o superiore (default ERROR)
+    vengono inviati come eventi, con il client globale.
+
+    Importa ``logging``: va chiamato esplicitamente (o con
+    ``init(install_logging_hook=True)``).
+    """
+    global _event_handler
+
+    if _event_handler is not None:
+        # Già installato
+        return
+
+    import logging
+
+    from .logging import PantiesHandler
+
+    _event_handler = PantiesHandler(level)
+    logging.getLogger(logger).addHandler(_event_handler)
@@ -0,0 +1,93 @@
+# panties/log.py
+from __future__ import annotations
+
+import sys
+import threading
+from typing import Any, Optional
+
+__all__ = ["get_logger"]
+
+# Livelli di logging (stessi valori del modulo logging, senza importarlo)
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+_lock = threading.Lock()
+_configured = False
+
+
+class LazyLogger:
+    """
+    Logger dell'SDK che non importa ``logging`` (e ``traceback``, ``re``,
+    ...) all'import di panties.
+
+    Finché l'applicazione non ha importato ``logging`` nessun handler può
+    essere configurato, quindi i messaggi non andrebbero comunque da
+    nessuna parte e le chiamate non fanno nulla. Al primo messaggio con
+    ``logging`` caricato si usa ``logging.getLogger(name)``, con un
+    ``NullHandler`` sul logger ``panties``: i log restano spenti finché
+    l'applicazione non li configura.
+    """
+
+    __slots__ = ("name", "_logger")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._logger: Any = None
+
+    def _resolve(self) -> Optional[Any]:
+        logger = self._logger
+        if logger is None:
+            logging = sys.modules.get("logging")
+            if logging is None:
+                return None
+            _configure(logging)
+            logger = self._logger = logging.getLogger(self.name)
+        return logger
+
+    def isEnabledFor(self, level: int) -> bool:
+        logger = self._resolve()
+        return logger is not None and logger.isEnabledFor(level)
+
+    def debug(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        self._log(DEBUG, msg, args, kwargs)
+
+    def info(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        self._log(INFO, msg, args, kwargs)
+
+    def warning(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        self._log(WARNING, msg, args, kwargs)
+
+    def error(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        self._log(ERROR, msg, args, kwargs)
+
+    def exception(self, msg: str, *args: Any, **kwargs: Any) -> None:
+        kwargs.setdefault("exc_info", True)
+        self._log(ERROR, msg, args, kwargs)
+
+    def log(self, level: int, msg: str, *args: Any, **kwargs: Any) -> None:
+        self._log(level, msg, args, kwargs)
+
+    def _log(self, level: int, msg: str, args: Any, kwargs: Any) -> None:
+        logger = self._resolve()
+        if logger is not None:
+            # stacklevel: il record punta al chiamante, non a questo modulo
+            kwargs["stacklevel"] = kwargs.get("stacklevel", 1) + 2
+            logger.log(level, msg, *args, **kwargs)
+
+
+def _configure(logging: Any) -> None:
+    global _configured
+    if _configured:
+        return
+    with _lock:
+        if not _configured:
+            # Log dell'SDK spenti di default: vanno configurati dall'applicazione
+            # (es. logging.getLogger("panties").setLevel(logging.DEBUG))
+            logging.getLogger("panties").addHandler(logging.NullHandler())
+            _configured = True
+
+
+def get_logger(name: str) -> LazyLogger:
+    return LazyLogger(name)
@@ -0,0 +1,158 @@
+# panties/logging.py
+from __future__ import annotations
+
+# Import assoluti: "logging" qui è il modulo della libreria standard
+import logging
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from .breadcrumbs import _format_message, record as _record_breadcrumb
+from .fingerprint import FingerprintKey
+from .state import get_client
+
+if TYPE_CHECKING:
+    from .client import PantiesClient
+
+__all__ = ["BreadcrumbHandler", "PantiesHandler", "log_key"]
+
+# True mentre il thread / task corrente sta inviando un record a panties:
+# i record emessi nel frattempo (es. da un transport che logga) si scartano
+_emitting: ContextVar[bool] = ContextVar("panties_log_emitting", default=False)
+
+
+def _is_sdk_logger(name: str) -> bool:
+    return name == "panties" or name.startswith("panties.")
+
+
+def _filtered(handler: logging.Handler, record: logging.LogRecord) -> Any:
+    """Esito dei filtri dell'handler: False, True o il record sostituito."""
+    if not handler.filters:
+        return True
+    return handler.filter(record)
+
+
+def log_key(record: logging.LogRecord) -> FingerprintKey:
+    """
+    Chiave di aggregazione di un record senza eccezione: logger, livello,
+    template del messaggio e punto di chiamata, non gli argomenti. Ha la
+    forma di ``exception_key``, quindi vale anche come fingerprint.
+    """
+    msg = record.msg if isinstance(record.msg, str) else type(record.msg).__qualname__
+    return (
+        f"log:{record.name}:{record.levelname}:{msg}",
+        ((record.module, record.funcName, record.lineno),),
+    )
+
+
+def _event_level(levelno: int) -> str:
+    if levelno >= logging.ERROR:
+        return "error"
+    if levelno >= logging.WARNING:
+        return "warning"
+    if levelno >= logging.INFO:
+        return "info"
+    return "debug"
+
+
+class BreadcrumbHandler(logging.Handler):
+    """
+    Handler di logging che registra ogni record come breadcrumb nel buffer
+    del thread / task corrente, allegato solo agli eventi inviati.
+
+    Il costo per chiamata di log è quello di una tupla scritta nel ring
+    buffer: il messaggio non viene formattato (solo quando un evento
+    catturato dallo stesso thread / task copia i breadcrumb) e non viene
+    preso il lock dell'handler, perché ogni
+    buffer ha un solo scrittore. I log dell'SDK (logger ``panties``) non
+    vengono registrati.
+    """
+
+    def __init__(self, level: int = logging.INFO) -> None:
+        super().__init__(level)
+
+    def handle(self, record: logging.LogRecord) -> Any:
+        rv = _filtered(self, record)
+        if not rv:
+            return rv
+        if isinstance(rv, logging.LogRecord):
+            # Filtro che sostituisce il record (Python 3.12+)
+            record = rv
+        # Come emit(), senza la chiamata in più
+        name = record.name
+        if name != "panties" and not name.startswith("panties."):
+            _record_breadcrumb(record.created, name, record.levelname, record.msg, record.args)
+        return rv
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if not _is_sdk_logger(record.name):
+            _record_breadcrumb(record.created, record.name, record.levelname, record.msg, record.args)
+
+
+class PantiesHandler(logging.Handler):
+    """
+    Handler di logging che invia i record (di default ERROR o superiori)
+    come eventi panties tramite ``PantiesClient``: i record con
+    ``exc_info`` (es. ``logger.exception``) come eccezioni, gli altri come
+    messaggi.
+
+    - non blocca la chiamata di log: il client cattura solo uno snapshot e
+      il transport lo mette in coda senza attendere; l'handler non prende
+      il proprio lock, perché il client è già thread-safe
+    - le raffiche di record identici (stesso logger, livello, template e
+      punto di chiamata, vedi ``log_key``) vengono aggregate dal client
+      come le eccezioni duplicate, entro ``dedupe_window``
+    - niente ricorsione: i record dei logger ``panties`` vengono ignorati,
+      così come quelli emessi dallo stesso thread / task mentre un record
+      viene inviato
+
+    Senza ``client`` usa il client globale (``panties.init``).
+    """
+
+    def __init__(self, level: int = logging.ERROR, client: "Optional[PantiesClient]" = None) -> None:
+        super().__init__(level)
+        self.client = client
+
+    def handle(self, record: logging.LogRecord) -> Any:
+        rv = _filtered(self, record)
+        if not rv:
+            return rv
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        self.emit(record)
+        return rv
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if _is_sdk_logger(record.name) or _emitting.get():
+            return
+        client = self.client or get_client()
+        if client is None:
+            return
+        token = _emitting.set(True)
+        try:
+            self._capture(client, record)
+        except Exception:
+            self.handleError(record)
+        finally:
+            _emitting.reset(token)
+
+    def _capture(self, client: "PantiesClient", record: logging.LogRecord) -> None:
+        message = _format_message(record.msg, record.args)
+        tags = {"logger": record.name}
+        extra: Dict[str, Any] = {
+            "function": record.funcName,
+            "lineno": record.lineno,
+            "thread": record.threadName,
+        }
+        exc_info = record.exc_info
+        if exc_info and exc_info[0] is not None:
+            exc_type, exc_value, tb = exc_info
+            extra["log_message"] = message
+            client.capture_exception(
+                exc_type, exc_value, tb or getattr(exc_value, "__traceback__", None),
+                extra=extra, tags=tags,
+            )
+        else:
+            client.capture_message(
+                message, level=_event_level(record.levelno),
+                extra=extra, tags=tags, dedupe_key=log_key(record),
+            )
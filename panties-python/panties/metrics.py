@@ -0,0 +1,90 @@
+# panties/metrics.py
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any, Dict, List
+
+__all__ = ["LatencyHistogram", "TransportMetrics"]
+
+
+class LatencyHistogram:
+    """
+    Istogramma delle latenze a bucket fissi (limiti superiori in ms), come
+    quelli di Prometheus: costo costante per osservazione e memoria fissa.
+    """
+
+    BOUNDS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self) -> None:
+        self._counts: List[int] = [0] * (len(self.BOUNDS_MS) + 1)
+        self._count = 0
+        self._sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        index = bisect.bisect_left(self.BOUNDS_MS, ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum_ms += ms
+
+    def _percentile(self, counts: List[int], total: int, q: float) -> float:
+        """Stima del percentile: limite superiore del bucket che lo contiene."""
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.BOUNDS_MS, counts):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+            sum_ms = self._sum_ms
+        buckets = {str(bound): count for bound, count in zip(self.BOUNDS_MS, counts)}
+        buckets["+Inf"] = counts[-1]
+        return {
+            "count": total,
+            "sum_ms": round(sum_ms, 3),
+            "p50_ms": self._percentile(counts, total, 0.50) if total else 0.0,
+            "p99_ms": self._percentile(counts, total, 0.99) if total else 0.0,
+            "buckets_ms": buckets,
+        }
+
+
+class TransportMetrics:
+    """
+    Contatori di un transport, thread-safe:
+
+    - ``enqueued``: eventi accettati in coda
+    - ``sent``: eventi consegnati al collector
+    - ``failed``: eventi il cui invio è fallito (poi trattenuti o nello spool)
+    - ``dropped``: eventi persi (coda piena, transport chiuso, rifiutati)
+    - ``bytes_sent``: byte inviati (dopo la compressione)
+
+    più l'istogramma delle latenze delle richieste HTTP.
+    """
+
+    FIELDS = ("enqueued", "sent", "failed", "dropped", "bytes_sent")
+
+    def __init__(self) -> None:
+        self._counts: Dict[str, int] = dict.fromkeys(self.FIELDS, 0)
+        self._lock = threading.Lock()
+        self.latency = LatencyHistogram()
+
+    def add(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += value
+
+    def __getitem__(self, name: str) -> int:
+        return self._counts[name]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot: Dict[str, Any] = dict(self._counts)
+        snapshot["send_latency"] = self.latency.snapshot()
+        return snapshot
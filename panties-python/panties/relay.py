@@ -0,0 +1,291 @@
+# panties/relay.py
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .client import _event_id
+from .fingerprint import DuplicateAggregator
+from .log import get_logger
+from .relay_transport import DEFAULT_RELAY_ADDRESS, GZIP_MAGIC, parse_address
+from .transport import HttpTransport
+
+__all__ = ["Relay", "main"]
+
+logger = get_logger(__name__)
+
+# Buffer di ricezione: un datagramma più grande arriva troncato (e scartato)
+_RECV_SIZE = 256 * 1024
+
+# Ogni quanto chiudere le finestre dei duplicati scadute, in secondi
+_SWEEP_INTERVAL = 1.0
+
+
+def _decompress(datagram: bytes, max_size: int) -> Optional[bytes]:
+    """
+    Decomprime un datagramma gzip fino a ``max_size`` byte (come il
+    ``CompressedJSONParser`` del server); ``None`` se non valido o più grande.
+    """
+    import zlib
+
+    decompressor = zlib.decompressobj(wbits=31)
+    try:
+        result = decompressor.decompress(datagram, max_size + 1)
+    except zlib.error:
+        return None
+    if len(result) > max_size or decompressor.unconsumed_tail or not decompressor.eof:
+        return None
+    return result
+
+
+def _dedupe_key(event: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    """Chiave dei duplicati tra processi: fingerprint, servizio e ambiente."""
+    fingerprint = event.get("fingerprint")
+    if not isinstance(fingerprint, str) or event.get("type") == "transaction":
+        return None
+    return (event.get("service_name"), event.get("environment"), fingerprint)
+
+
+class Relay:
+    """
+    Relay locale (``python -m panties.relay``): riceve gli eventi dei
+    processi dell'host, inviati da ``RelayTransport`` come datagrammi su un
+    socket Unix o UDP, e li inoltra al collector con un solo
+    ``HttpTransport`` (per default un worker, quindi una connessione
+    keep-alive), che li raggruppa in batch e li comprime. Retry, circuit
+    breaker e spool su disco sono quelli di ``HttpTransport``; le opzioni
+    in più vengono passate a lui.
+
+    Gli eventi vengono inoltrati così come arrivano, senza essere
+    serializzati di nuovo, ma solo se sono oggetti JSON validi: un
+    datagramma non valido finirebbe nel batch e lo farebbe rifiutare tutto.
+    Quelli compressi vengono decompressi al massimo fino a
+    ``max_event_bytes`` del serializer del transport. Quelli con fingerprint (eccezioni, messaggi con
+    ``dedupe_key``) vengono aggregati tra processi diversi: nella finestra
+    di ``dedupe_window`` secondi la prima occorrenza viene inoltrata e le
+    altre, compresi i riassunti dei duplicati calcolati dai singoli SDK,
+    diventano un solo evento riassuntivo alla chiusura della finestra.
+    """
+
+    def __init__(
+        self,
+        listen: str,
+        endpoint: str,
+        api_token: str,
+        dedupe_window: float = 60.0,
+        dedupe_max_fingerprints: int = 10000,
+        receive_buffer: int = 4 * 1024 * 1024,
+        **transport_options: Any,
+    ) -> None:
+        self.listen = listen
+        self.family, self.sockaddr = parse_address(listen)
+        self.receive_buffer = receive_buffer
+        transport_options.setdefault("workers", 1)
+        self.transport = HttpTransport(endpoint=endpoint, api_token=api_token, **transport_options)
+        self._aggregator: Optional[DuplicateAggregator] = None
+        if dedupe_window > 0:
+            self._aggregator = DuplicateAggregator(
+                window=dedupe_window,
+                max_fingerprints=dedupe_max_fingerprints,
+            )
+        self._sock: Optional[socket.socket] = None
+        self._stop = threading.Event()
+        self._next_sweep = 0.0
+        self.received = 0
+        self.invalid = 0
+        self.deduplicated = 0
+
+    def bind(self) -> None:
+        """Apre il socket di ascolto (un socket Unix rimasto da un'esecuzione precedente viene sostituito)."""
+        sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        if self.family == socket.AF_UNIX:
+            try:
+                os.unlink(self.sockaddr)
+            except FileNotFoundError:
+                pass
+        try:
+            # Assorbe i picchi mentre il thread di ricezione è occupato
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer)
+        except OSError:
+            pass
+        sock.bind(self.sockaddr)
+        sock.settimeout(_SWEEP_INTERVAL)
+        self._sock = sock
+
+    def serve_forever(self) -> None:
+        """Riceve e inoltra eventi finché non viene chiamato ``shutdown()``."""
+        if self._sock is None:
+            self.bind()
+        sock = self._sock
+        assert sock is not None
+        while not self._stop.is_set():
+            try:
+                datagram = sock.recv(_RECV_SIZE)
+            except socket.timeout:
+                datagram = None
+            except OSError:
+                if self._stop.is_set():
+                    break
+                raise
+            if datagram:
+                self.handle(datagram)
+            if self._aggregator is not None:
+                now = time.monotonic()
+                if now >= self._next_sweep:
+                    self._next_sweep = now + _SWEEP_INTERVAL
+                    self._send_aggregates(self._aggregator.expired(time.time()))
+
+    def handle(self, datagram: bytes) -> None:
+        """Inoltra (o aggrega) un evento ricevuto da un processo."""
+        self.received += 1
+        if datagram[:2] == GZIP_MAGIC:
+            decompressed = _decompress(datagram, self.transport.serializer.max_event_bytes)
+            if decompressed is None:
+                self.invalid += 1
+                return
+            datagram = decompressed
+        try:
+            event = json.loads(datagram)
+        except ValueError:
+            event = None
+        if not isinstance(event, dict):
+            self.invalid += 1
+            return
+        key = _dedupe_key(event) if self._aggregator is not None else None
+        if key is None:
+            self.transport.send_encoded(datagram)
+            return
+        assert self._aggregator is not None
+        aggregation = event.get("aggregation")
+        if aggregation is not None:
+            # Riassunto dei duplicati di un processo: sommato alla finestra aperta
+            try:
+                count = int(aggregation["count"])
+                absorbed = self._aggregator.absorb(
+                    key, count, float(aggregation["first_seen"]), float(aggregation["last_seen"])
+                )
+            except (KeyError, TypeError, ValueError):
+                absorbed = False
+            if absorbed:
+                self.deduplicated += count
+            else:
+                self.transport.send_encoded(datagram)
+            return
+        is_new, closed = self._aggregator.record(key, time.time())
+        self._send_aggregates(closed)
+        if is_new:
+            self._aggregator.remember(key, event)
+            self.transport.send_encoded(datagram)
+        else:
+            self.deduplicated += 1
+
+    def _send_aggregates(self, windows: List[Any]) -> None:
+        for window in windows:
+            if window.event is None:
+                continue
+            self.transport.send({
+                **window.event,
+                "event_id": _event_id(),
+                "timestamp": int(window.last_seen),
+                "aggregation": {
+                    "count": window.count,
+                    "first_seen": window.first_seen,
+                    "last_seen": window.last_seen,
+                },
+            })
+
+    def stats(self) -> Dict[str, Any]:
+        """Datagrammi ``received``, ``invalid`` e ``deduplicated``, più le statistiche del transport."""
+        stats = self.transport.stats()
+        stats["received"] = self.received
+        stats["invalid"] = self.invalid
+        stats["deduplicated"] = self.deduplicated
+        return stats
+
+    def shutdown(self) -> None:
+        """Ferma ``serve_forever`` (entro ``_SWEEP_INTERVAL`` secondi); sicuro da un signal handler."""
+        self._stop.set()
+
+    def close(self, timeout: float = 5.0) -> int:
+        """
+        Chiude il socket, invia i riassunti ancora aperti e gli eventi in
+        coda entro ``timeout`` secondi. Ritorna il numero di eventi non inviati.
+        """
+        self._stop.set()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+            if self.family == socket.AF_UNIX:
+                try:
+                    os.unlink(self.sockaddr)
+                except FileNotFoundError:
+                    pass
+        if self._aggregator is not None:
+            self._send_aggregates(self._aggregator.drain())
+        return self.transport.close(timeout)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point di ``python -m panties.relay``."""
+    import argparse
+    import logging
+    import signal
+
+    parser = argparse.ArgumentParser(
+        prog="panties-relay",
+        description="Forward events from local panties clients (RelayTransport) to the collector.",
+    )
+    parser.add_argument(
+        "--listen",
+        default=os.environ.get("PANTIES_RELAY_ADDRESS", DEFAULT_RELAY_ADDRESS),
+        help="unix:/path or udp://host:port (default: %(default)s)",
+    )
+    parser.add_argument("--endpoint", default=os.environ.get("PANTIES_ENDPOINT"), help="collector event endpoint")
+    parser.add_argument("--api-token", default=os.environ.get("PANTIES_API_TOKEN"))
+    parser.add_argument("--dedupe-window", type=float, default=60.0, help="seconds, 0 disables (default: 60)")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--batch-linger", type=float, default=0.2, help="seconds (default: 0.2)")
+    parser.add_argument("--compression", default="gzip", help="gzip, zstd or none (default: gzip)")
+    parser.add_argument("--spool-path", help="SQLite spool for events the collector could not take")
+    parser.add_argument("--shutdown-timeout", type=float, default=5.0)
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+    if not args.endpoint or not args.api_token:
+        parser.error("--endpoint and --api-token (or PANTIES_ENDPOINT and PANTIES_API_TOKEN) are required")
+
+    logging.basicConfig(
+        level=args.log_level.upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+    relay = Relay(
+        args.listen,
+        args.endpoint,
+        args.api_token,
+        dedupe_window=args.dedupe_window,
+        batch_size=args.batch_size,
+        batch_linger=args.batch_linger,
+        compression=None if args.compression == "none" else args.compression,
+        spool_path=args.spool_path,
+        shutdown_timeout=args.shutdown_timeout,
+    )
+    relay.bind()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: relay.shutdown())
+    logger.info("Listening on %s, forwarding to %s", args.listen, args.endpoint)
+    relay.serve_forever()
+    unsent = relay.close(args.shutdown_timeout)
+    stats = relay.stats()
+    logger.info(
+        "Stopped: %d received, %d deduplicated, %d sent, %d unsent",
+        stats["received"], stats["deduplicated"], stats["sent"], unsent,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
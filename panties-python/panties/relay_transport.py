@@ -0,0 +1,322 @@
+# panties/relay_transport.py
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import select
+import socket
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple, Union
+
+from .compression import _compressors, compress_body
+from .log import get_logger
+from .metrics import TransportMetrics
+from .serializer import EventSerializer
+from .snapshot import EventSnapshot
+
+__all__ = ["DEFAULT_RELAY_ADDRESS", "RelayTransport", "parse_address"]
+
+logger = get_logger(__name__)
+
+# Indirizzo di default di panties-relay (vedi panties.relay)
+DEFAULT_RELAY_ADDRESS = "unix:/tmp/panties-relay.sock"
+
+# Byte al massimo per datagramma: sta nel payload UDP (65507) e nel buffer
+# di invio di default dei socket Unix
+MAX_DATAGRAM = 65000
+
+# Primi byte di un datagramma compresso (gzip)
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Elemento in coda: snapshot da costruire o evento già serializzato
+_Item = Union[bytes, EventSnapshot]
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """
+    Famiglia e indirizzo di socket per ``"unix:/percorso"`` o
+    ``"udp://host:porta"`` (IPv6 tra parentesi quadre).
+    """
+    if address.startswith("unix:"):
+        path = address[5:]
+        if path:
+            return socket.AF_UNIX, path
+    elif address.startswith("udp://"):
+        host, sep, port = address[6:].rpartition(":")
+        if sep and host and port.isdigit():
+            if host.startswith("["):
+                return socket.AF_INET6, (host.strip("[]"), int(port))
+            return socket.AF_INET, (host, int(port))
+    raise ValueError(f"Invalid relay address {address!r}: expected unix:/path or udp://host:port")
+
+
+def _before_fork(ref: "weakref.ReferenceType[RelayTransport]") -> None:
+    transport = ref()
+    if transport is not None:
+        transport._prepare_fork()
+
+
+def _after_fork_in_parent(ref: "weakref.ReferenceType[RelayTransport]") -> None:
+    transport = ref()
+    if transport is not None:
+        transport._start_lock.release()
+
+
+def _after_fork_in_child(ref: "weakref.ReferenceType[RelayTransport]") -> None:
+    transport = ref()
+    if transport is not None:
+        transport._reset_after_fork()
+
+
+def _close_at_exit(ref: "weakref.ReferenceType[RelayTransport]") -> None:
+    transport = ref()
+    if transport is not None:
+        transport.close(transport.shutdown_timeout)
+
+
+class RelayTransport:
+    """
+    Transport verso un relay locale (``python -m panties.relay``) che
+    raccoglie gli eventi di tutti i processi dell'host:
+
+        panties.init(api_token="-", endpoint="-", transport=RelayTransport("unix:/tmp/panties-relay.sock"))
+
+    - ogni evento è un datagramma su un socket Unix o UDP, scritto senza
+      mai bloccare; connessione HTTP, batch, compressione, retry e spool
+      sono del relay, condivisi da tutti i processi
+    - gli ``EventSnapshot`` del client vengono costruiti e serializzati da
+      un thread worker (sul thread dell'applicazione resta l'accodamento);
+      i dict vengono serializzati e scritti subito
+    - eventi oltre ``max_datagram`` byte compressi con gzip, scartati se
+      non bastasse
+    - coda del relay piena: il thread dell'applicazione passa l'evento al
+      worker, che attende al massimo ``send_timeout`` secondi prima di
+      scartarlo. Sui socket Unix la coda è di ``net.unix.max_dgram_qlen``
+      datagrammi (spesso 10-512): con molti processi conviene alzarla o
+      usare UDP, limitato invece dal buffer di ricezione del relay
+    - relay non in ascolto: l'evento viene scartato e contato in
+      ``dropped``; il socket viene ricreato al prossimo evento, così un
+      relay riavviato riceve di nuovo
+    - fork-safe come ``HttpTransport``: nel figlio coda e worker ripartono
+      da zero
+    """
+
+    # Il client può passare snapshot invece di eventi già costruiti
+    accepts_snapshots = True
+
+    def __init__(
+        self,
+        address: str = DEFAULT_RELAY_ADDRESS,
+        max_queue_size: int = 1000,
+        max_datagram: int = MAX_DATAGRAM,
+        serializer: Optional[EventSerializer] = None,
+        send_timeout: float = 1.0,
+        shutdown_timeout: float = 2.0,
+    ) -> None:
+        self.address = address
+        self.family, self.sockaddr = parse_address(address)
+        self.max_queue_size = max_queue_size
+        self.max_datagram = max_datagram
+        self.send_timeout = send_timeout
+        self.serializer = serializer or EventSerializer()
+        self.shutdown_timeout = shutdown_timeout
+        self._metrics = TransportMetrics()
+        self._start_lock = threading.Lock()
+        self._setup()
+
+        ref = weakref.ref(self)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(
+                before=lambda: _before_fork(ref),
+                after_in_parent=lambda: _after_fork_in_parent(ref),
+                after_in_child=lambda: _after_fork_in_child(ref),
+            )
+        atexit.register(_close_at_exit, ref)
+
+    def _setup(self) -> None:
+        # None nella coda è il segnale di shutdown
+        self._queue: "queue.Queue[Optional[_Item]]" = queue.Queue(maxsize=self.max_queue_size)
+        self._sock: Optional[socket.socket] = None
+        self._sock_lock = threading.Lock()
+        # Relay irraggiungibile: segnalato nel log una volta, non a ogni evento
+        self._unreachable = False
+        self._thread: Optional[threading.Thread] = None
+        self._started = False
+        self._closed = False
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if not self._started:
+                self._thread = threading.Thread(target=self._worker_loop, daemon=True)
+                self._thread.start()
+                self._started = True
+
+    def _prepare_fork(self) -> None:
+        # Come HttpTransport: niente avvii o import a metà nel figlio
+        self._start_lock.acquire()
+        if self._started:
+            __import__("json")
+            _compressors()
+
+    def _reset_after_fork(self) -> None:
+        # Il socket del padre resta al padre: il figlio ne apre uno suo
+        self._start_lock = threading.Lock()
+        self._setup()
+
+    def _worker_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if type(item) is bytes:
+                    body = item
+                else:
+                    try:
+                        body = self.serializer.encode(item.to_event())
+                    except Exception:
+                        logger.warning("Failed to build event", exc_info=True)
+                        self._metrics.add("dropped")
+                        continue
+                self._write(body, self.send_timeout)
+            finally:
+                self._queue.task_done()
+
+    def _socket(self) -> socket.socket:
+        sock = self._sock
+        if sock is None:
+            with self._sock_lock:
+                sock = self._sock
+                if sock is None:
+                    sock = socket.socket(self.family, socket.SOCK_DGRAM)
+                    sock.setblocking(False)
+                    try:
+                        sock.connect(self.sockaddr)
+                    except OSError:
+                        sock.close()
+                        raise
+                    self._sock = sock
+        return sock
+
+    def _drop_socket(self) -> None:
+        with self._sock_lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+    def _write(self, body: bytes, wait: float = 0.0) -> bool:
+        """
+        Scrive un evento serializzato in un datagramma. Se il relay ha la
+        coda piena attende al massimo ``wait`` secondi (solo dal worker);
+        con ``wait=0`` ritorna ``False`` senza scrivere né scartare.
+        """
+        if len(body) > self.max_datagram:
+            body, _ = compress_body(body, "gzip", self.max_datagram)
+            if len(body) > self.max_datagram:
+                logger.warning("Event of %d bytes does not fit in a datagram, dropped", len(body))
+                self._metrics.add("dropped")
+                return True
+        deadline = time.monotonic() + wait
+        try:
+            sock = self._socket()
+            while True:
+                try:
+                    sock.send(body)
+                    break
+                except BlockingIOError:
+                    remaining = deadline - time.monotonic()
+                    if wait <= 0:
+                        return False
+                    if remaining <= 0:
+                        # Relay che non tiene il passo: l'evento si perde
+                        self._metrics.add("dropped")
+                        return True
+                    select.select((), (sock,), (), remaining)
+        except OSError as e:
+            # Relay non in ascolto (o riavviato: il socket va ricreato)
+            self._drop_socket()
+            self._metrics.add("dropped")
+            if not self._unreachable:
+                self._unreachable = True
+                logger.warning("Relay %s unreachable, dropping events: %s", self.address, e)
+            return True
+        if self._unreachable:
+            self._unreachable = False
+            logger.info("Relay %s reachable again", self.address)
+        self._metrics.add("sent")
+        self._metrics.add("bytes_sent", len(body))
+        return True
+
+    def send(self, event: Union[Dict[str, Any], EventSnapshot]) -> None:
+        """
+        Invia un evento al relay. I dict vengono serializzati e scritti
+        subito; gli ``EventSnapshot`` (e i dict trovati con la coda del
+        relay piena) vengono accodati per il worker, scartati a coda piena.
+        """
+        if self._closed:
+            self._metrics.add("dropped")
+            return
+        self._metrics.add("enqueued")
+        if type(event) is not EventSnapshot:
+            body = self.serializer.encode(event)
+            # Con il worker già in attesa del relay si accoda dietro di lui
+            if not self._queue.unfinished_tasks and self._write(body):
+                return
+            item: _Item = body
+        else:
+            item = event
+        if not self._started:
+            self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._metrics.add("dropped")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Statistiche del transport: ``queue_depth`` e i contatori di
+        ``TransportMetrics`` (``sent`` sono i datagrammi scritti sul socket).
+        """
+        totals: Dict[str, Any] = self._metrics.snapshot()
+        totals["queue_depth"] = self._queue.qsize()
+        totals["truncated"] = self.serializer.truncated
+        return totals
+
+    def flush(self, timeout: float = 2.0) -> int:
+        """
+        Attende che il worker scriva gli eventi in coda, al massimo
+        ``timeout`` secondi. Ritorna il numero di eventi non ancora scritti.
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._queue.all_tasks_done.wait(remaining)
+        return self._queue.unfinished_tasks
+
+    def close(self, timeout: float = 2.0) -> int:
+        """
+        Scrive gli eventi in coda entro ``timeout`` secondi, ferma il worker
+        e chiude il socket. Gli eventi inviati dopo ``close`` vengono scartati.
+        """
+        if self._closed:
+            return self._queue.unfinished_tasks
+        deadline = time.monotonic() + max(0.0, timeout)
+        unsent = self.flush(timeout)
+        with self._start_lock:
+            self._closed = True
+            started, self._started = self._started, False
+        if started and self._thread is not None:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self._thread.join(max(0.0, deadline - time.monotonic()))
+        if self._thread is None or not self._thread.is_alive():
+            self._drop_socket()
+        return unsent
@@ -0,0 +1,368 @@
+# panties/request.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+from .sessions import Session
+from .state import get_client
+from .tracing import start_transaction
+
+if TYPE_CHECKING:
+    from .tracing import Transaction
+
+__all__ = [
+    "DEFAULT_REDACTED_HEADERS",
+    "ASGIRequest",
+    "RequestInfo",
+    "WSGIRequest",
+    "capture_request_exception",
+    "copy_environ",
+    "get_request",
+]
+
+# Header mai inviati in chiaro (confronto case-insensitive)
+DEFAULT_REDACTED_HEADERS: FrozenSet[str] = frozenset({
+    "authorization",
+    "cookie",
+    "proxy-authorization",
+    "set-cookie",
+    "x-api-key",
+    "x-csrftoken",
+})
+
+_FILTERED = "[Filtered]"
+
+# Attributo che marca le eccezioni già inviate da un middleware, per non
+# inviarle di nuovo da un altro hook (es. il segnale di Django)
+_CAPTURED = "_panties_captured"
+
+# Richiesta HTTP in corso nel thread / task corrente (impostata dai middleware)
+_request: ContextVar[Optional["RequestInfo"]] = ContextVar("panties_request", default=None)
+
+
+def get_request() -> Optional["RequestInfo"]:
+    """Richiesta in corso, se il codice gira dentro un middleware di panties."""
+    return _request.get()
+
+
+def normalize_headers(names: Optional[Iterable[str]]) -> FrozenSet[str]:
+    """Nomi di header da oscurare, in minuscolo (``None``: quelli di default)."""
+    if names is None:
+        return DEFAULT_REDACTED_HEADERS
+    return frozenset(name.lower() for name in names)
+
+
+# Chiavi dell'environ lette dal contesto ``request``, oltre agli header ``HTTP_*``
+_ENVIRON_KEYS = frozenset({
+    "CONTENT_LENGTH",
+    "CONTENT_TYPE",
+    "PATH_INFO",
+    "QUERY_STRING",
+    "REQUEST_METHOD",
+    "SCRIPT_NAME",
+    "SERVER_NAME",
+    "SERVER_PORT",
+    "wsgi.url_scheme",
+})
+
+# Chiavi dello scope ASGI lette dal contesto ``request``
+_SCOPE_KEYS = ("type", "method", "scheme", "server", "root_path", "path", "query_string")
+
+
+def copy_environ(environ: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copia delle sole chiavi di un environ WSGI (o del ``META`` di Django)
+    usate da ``environ_request``: il dict originale appartiene al server,
+    che può modificarlo o riusarlo finita la richiesta.
+    """
+    return {
+        key: value for key, value in environ.items()
+        if key in _ENVIRON_KEYS or key.startswith("HTTP_")
+    }
+
+
+def _redact(headers: Iterable[Tuple[str, str]], redacted: FrozenSet[str]) -> Dict[str, str]:
+    return {
+        name: _FILTERED if name.lower() in redacted else value
+        for name, value in headers
+    }
+
+
+def _environ_headers(environ: Dict[str, Any]) -> Iterable[Tuple[str, str]]:
+    for key, value in environ.items():
+        if key.startswith("HTTP_"):
+            yield key[5:].replace("_", "-").title(), str(value)
+        elif key in ("CONTENT_TYPE", "CONTENT_LENGTH") and value:
+            yield key.replace("_", "-").title(), str(value)
+
+
+def _environ_url(environ: Dict[str, Any]) -> str:
+    scheme = environ.get("wsgi.url_scheme", "http")
+    host = environ.get("HTTP_HOST")
+    if not host:
+        host = environ.get("SERVER_NAME", "")
+        port = str(environ.get("SERVER_PORT", ""))
+        if port and port != ("443" if scheme == "https" else "80"):
+            host = f"{host}:{port}"
+    return f"{scheme}://{host}{environ.get('SCRIPT_NAME', '')}{environ.get('PATH_INFO', '')}"
+
+
+def environ_request(environ: Dict[str, Any], redacted: FrozenSet[str]) -> Dict[str, Any]:
+    """Contesto ``request`` da un environ WSGI (o dal ``META`` di Django)."""
+    return {
+        "method": environ.get("REQUEST_METHOD"),
+        "url": _environ_url(environ),
+        "query_string": environ.get("QUERY_STRING", ""),
+        "headers": _redact(_environ_headers(environ), redacted),
+    }
+
+
+class RequestInfo(ABC):
+    """
+    Riferimento alla richiesta in corso, creato dal middleware a ogni
+    richiesta. Sul percorso senza errori non fa altro: il contesto
+    ``request`` dell'evento viene costruito (e i suoi header oscurati) nel
+    worker del transport, solo per gli eventi effettivamente inviati.
+
+    ``freeze()`` viene chiamato alla cattura di un evento, sul thread
+    dell'applicazione: legge ciò che cambia durante la richiesta (route,
+    utente) finché è ancora valido e ritorna una copia dei pochi dati
+    usati dal contesto. Il worker costruisce l'evento dalla copia, senza
+    toccare la richiesta, che nel frattempo può essere finita.
+
+    ``session`` è la sessione della richiesta, con ``auto_session_tracking``.
+
+    Ogni integrazione ne definisce una sottoclasse con ``freeze()``,
+    ``method()``, ``path()`` e ``request()``.
+    """
+
+    __slots__ = ("route", "session", "_user")
+
+    def __init__(self) -> None:
+        self.route: Optional[str] = None
+        self.session: Optional[Session] = None
+        self._user: Optional[Dict[str, Any]] = None
+
+    def resolve(self) -> None:
+        """Legge route e utente, se già noti (sul thread dell'applicazione)."""
+
+    @abstractmethod
+    def freeze(self) -> "RequestInfo":
+        """Copia della richiesta per il contesto dell'evento (vedi sopra)."""
+
+    def _frozen(self, frozen: "RequestInfo") -> "RequestInfo":
+        """``frozen`` con route e utente di questa richiesta."""
+        self.resolve()
+        frozen.route = self.route
+        frozen._user = self._user
+        return frozen
+
+    @abstractmethod
+    def method(self) -> str:
+        """Metodo HTTP della richiesta."""
+
+    @abstractmethod
+    def path(self) -> str:
+        """Path della richiesta (con l'eventuale prefisso dell'applicazione)."""
+
+    @abstractmethod
+    def request(self, redacted: FrozenSet[str]) -> Dict[str, Any]:
+        """Contesto ``request`` dell'evento, con gli header ``redacted`` oscurati."""
+
+    def user(self) -> Optional[Dict[str, Any]]:
+        return self._user
+
+    def traceparent(self) -> Optional[str]:
+        """Header ``traceparent`` del chiamante, se presente."""
+        return None
+
+    def contexts(self, redacted: FrozenSet[str]) -> Dict[str, Any]:
+        """Contesti dell'evento (``request`` ed eventualmente ``user``)."""
+        request = self.request(redacted)
+        if self.route is not None:
+            request["route"] = self.route
+        contexts = {"request": request}
+        user = self.user()
+        if user:
+            contexts["user"] = user
+        return contexts
+
+    def transaction_name(self) -> str:
+        """Nome della transazione: metodo e route se nota, altrimenti il path."""
+        return f"{self.method()} {self.route or self.path()}"
+
+
+class WSGIRequest(RequestInfo):
+    """Richiesta WSGI; con Flask / Werkzeug la route viene dalla ``url_rule``."""
+
+    __slots__ = ("environ",)
+
+    def __init__(self, environ: Dict[str, Any]) -> None:
+        self.environ = environ
+        self.route = None
+        self.session = None
+        self._user = None
+
+    def resolve(self) -> None:
+        if self.route is None:
+            # Werkzeug salva la sua Request nell'environ
+            rule = getattr(self.environ.get("werkzeug.request"), "url_rule", None)
+            if rule is not None:
+                self.route = str(rule.rule)
+
+    def freeze(self) -> RequestInfo:
+        return self._frozen(WSGIRequest(copy_environ(self.environ)))
+
+    def method(self) -> str:
+        return self.environ.get("REQUEST_METHOD", "")
+
+    def path(self) -> str:
+        return self.environ.get("SCRIPT_NAME", "") + self.environ.get("PATH_INFO", "")
+
+    def request(self, redacted: FrozenSet[str]) -> Dict[str, Any]:
+        return environ_request(self.environ, redacted)
+
+    def traceparent(self) -> Optional[str]:
+        return self.environ.get("HTTP_TRACEPARENT")
+
+
+class ASGIRequest(RequestInfo):
+    """Richiesta ASGI; con Starlette / FastAPI la route viene da ``scope["route"]``."""
+
+    __slots__ = ("scope",)
+
+    def __init__(self, scope: Dict[str, Any]) -> None:
+        self.scope = scope
+        self.route = None
+        self.session = None
+        self._user = None
+
+    def resolve(self) -> None:
+        if self.route is None:
+            route = self.scope.get("route")
+            path = getattr(route, "path", None)
+            if path is not None:
+                self.route = str(path)
+
+    def freeze(self) -> RequestInfo:
+        scope = self.scope
+        frozen = {key: scope[key] for key in _SCOPE_KEYS if key in scope}
+        frozen["headers"] = list(scope.get("headers", ()))
+        return self._frozen(ASGIRequest(frozen))
+
+    def method(self) -> str:
+        return self.scope.get("method", "WEBSOCKET")
+
+    def path(self) -> str:
+        return self.scope.get("root_path", "") + self.scope.get("path", "")
+
+    def request(self, redacted: FrozenSet[str]) -> Dict[str, Any]:
+        scope = self.scope
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1"))
+            for name, value in scope.get("headers", ())
+        ]
+        host = next((value for name, value in headers if name.lower() == "host"), None)
+        if host is None and scope.get("server"):
+            server_host, port = scope["server"]
+            host = f"{server_host}:{port}" if port else server_host
+        query = scope.get("query_string", b"")
+        return {
+            "method": self.method(),
+            "url": f"{scope.get('scheme', 'http')}://{host or ''}{self.path()}",
+            "query_string": query.decode("latin-1") if isinstance(query, bytes) else str(query),
+            "headers": _redact(headers, redacted),
+        }
+
+    def traceparent(self) -> Optional[str]:
+        for name, value in self.scope.get("headers", ()):
+            if name == b"traceparent":
+                return value.decode("latin-1")
+        return None
+
+
+def capture_request_exception(info: RequestInfo, exc: Optional[BaseException] = None) -> None:
+    """
+    Invia ``exc`` (di default l'eccezione corrente) con il contesto della
+    richiesta ``info``, una volta sola per eccezione. La sessione della
+    richiesta risulta ``crashed``.
+    """
+    client = get_client()
+    if client is None:
+        return
+    if info.session is not None:
+        info.session.mark_crashed()
+    if exc is not None:
+        if getattr(exc, _CAPTURED, False):
+            return
+        try:
+            setattr(exc, _CAPTURED, True)
+        except AttributeError:
+            pass
+    token = _request.set(info)
+    try:
+        if exc is None:
+            client.capture_exception()
+        else:
+            client.capture_exception(type(exc), exc, exc.__traceback__)
+    finally:
+        _request.reset(token)
+
+
+def already_captured(exc: Optional[BaseException]) -> bool:
+    """``exc`` è già stata inviata da ``capture_request_exception``?"""
+    return exc is not None and getattr(exc, _CAPTURED, False)
+
+
+def http_status(code: int) -> str:
+    """Stato di una transazione per un codice di risposta HTTP."""
+    if code < 400:
+        return "ok"
+    if code in (401, 403):
+        return "permission_denied"
+    if code == 404:
+        return "not_found"
+    if code == 429:
+        return "resource_exhausted"
+    if code < 500:
+        return "invalid_argument"
+    return "internal_error"
+
+
+def start_request_transaction(info: RequestInfo) -> "Optional[Transaction]":
+    """
+    Transazione per la richiesta, se il tracing è attivo e la richiesta
+    viene campionata; altrimenti ``None`` (nessun costo oltre al controllo).
+    """
+    client = get_client()
+    if client is None or client.traces_sample_rate <= 0.0:
+        return None
+    txn = start_transaction(info.transaction_name(), "http.server", traceparent=info.traceparent())
+    return txn if txn.sampled else None
+
+
+def start_request_session(info: RequestInfo) -> None:
+    """Avvia la sessione della richiesta, se ``auto_session_tracking`` è attivo."""
+    client = get_client()
+    if client is not None and client.auto_session_tracking:
+        info.session = Session()
+
+
+def end_request_session(info: RequestInfo) -> None:
+    """Chiude la sessione della richiesta, se avviata."""
+    session = info.session
+    if session is not None:
+        info.session = None
+        session.end()
+
+
+def set_request_result(txn: "Transaction", info: RequestInfo, status_code: Optional[int]) -> None:
+    """Nome definitivo (con la route risolta) ed esito della transazione."""
+    info.resolve()
+    txn.name = info.transaction_name()
+    if status_code is not None:
+        txn.set_tag("http.status_code", status_code)
+        if txn.status is None:
+            txn.set_status(http_status(status_code))
@@ -0,0 +1,180 @@
+# panties/retry.py
+from __future__ import annotations
+
+import threading
+import time
+from typing import List, Optional, Tuple
+
+__all__ = ["Backoff", "CircuitBreaker", "is_server_error", "parse_retry_after", "split_rejected"]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Secondi di attesa indicati da un header ``Retry-After``, sia in forma
+    ``delta-seconds`` (``"30"``) sia come data HTTP. ``None`` se assente o
+    non valido.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    # Data HTTP: rara, email.utils viene importato solo qui
+    from datetime import timezone
+    from email.utils import parsedate_to_datetime
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, when.timestamp() - time.time())
+
+
+def is_server_error(status: int) -> bool:
+    """
+    Risposta 5xx di un collector raggiungibile che non riesce a salvare il
+    batch (es. un evento con un campo che il database rifiuta): riprovare lo
+    stesso batch darà lo stesso errore. 502, 503 e 504 vengono invece da
+    proxy o dal back-pressure del collector, e passano da soli.
+    """
+    return status >= 500 and status not in (502, 503, 504)
+
+
+def split_rejected(
+    batch: List[bytes], failures: int, max_failures: int
+) -> List[Tuple[List[bytes], int]]:
+    """
+    Batch da conservare dopo ``failures`` risposte 5xx consecutive (vedi
+    ``is_server_error``), ognuno con il proprio conteggio: lo stesso batch
+    finché non arriva a ``max_failures``, poi le sue due metà. Un evento
+    singolo rifiutato ``max_failures`` volte non viene conservato: l'evento
+    che fa fallire un batch finisce da solo e viene scartato, gli altri
+    vengono consegnati.
+    """
+    if failures < max_failures:
+        return [(batch, failures)]
+    if len(batch) == 1:
+        return []
+    half = len(batch) // 2
+    return [(batch[:half], 0), (batch[half:], 0)]
+
+
+class Backoff:
+    """
+    Backoff esponenziale con "full jitter": l'attesa prima del tentativo
+    ``attempt`` (da 0) è casuale tra 0 e ``min(cap, base * 2**attempt)``,
+    così più client non riprovano tutti nello stesso istante.
+    """
+
+    def __init__(self, base: float = 0.1, cap: float = 2.0) -> None:
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt: int) -> float:
+        import random
+
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker per il collector.
+
+    - ``closed``: gli invii procedono normalmente
+    - dopo ``failure_threshold`` fallimenti consecutivi (o subito, se il
+      server risponde con ``Retry-After``) passa a ``open``: nessun invio
+      finché non scade l'attesa
+    - scaduta l'attesa passa a ``half_open`` e lascia passare un solo invio
+      di prova: se riesce torna ``closed``, altrimenti si riapre con
+      un'attesa doppia (con jitter) fino a ``max_reset_timeout``
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 5.0,
+        max_reset_timeout: float = 300.0,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max(reset_timeout, max_reset_timeout)
+        self.state = self.CLOSED
+        self.opened = 0  # volte in cui il circuito si è aperto (totale)
+        self._failures = 0
+        self._trips = 0  # aperture consecutive, per il raddoppio dell'attesa
+        self._open_until = 0.0
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        """Se è possibile tentare un invio adesso."""
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and now < self._open_until:
+                return False
+            if self.state == self.HALF_OPEN and now - self._probe_started < self.reset_timeout:
+                # C'è già un invio di prova in corso
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_started = now
+            return True
+
+    def remaining(self, now: Optional[float] = None) -> float:
+        """Secondi prima che sia permesso un nuovo tentativo (0 se subito)."""
+        if self.state == self.CLOSED:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.state == self.OPEN:
+                return max(0.0, self._open_until - now)
+            if self.state == self.HALF_OPEN:
+                return max(0.0, self._probe_started + self.reset_timeout - now)
+            return 0.0
+
+    def record_success(self) -> None:
+        if self.state == self.CLOSED and not self._failures:
+            return
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trips = 0
+
+    def record_failure(self, retry_after: Optional[float] = None, now: Optional[float] = None) -> None:
+        """
+        Registra un invio fallito. ``retry_after`` (dall'header del server)
+        apre subito il circuito per il tempo richiesto.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._failures += 1
+            if (
+                retry_after is None
+                and self.state != self.HALF_OPEN
+                and self._failures < self.failure_threshold
+            ):
+                return
+            if retry_after is not None:
+                wait = min(retry_after, self.max_reset_timeout)
+            else:
+                import random
+
+                wait = min(self.max_reset_timeout, self.reset_timeout * (2 ** self._trips))
+                wait *= random.uniform(0.5, 1.0)
+            self._trips += 1
+            self.opened += 1
+            self.state = self.OPEN
+            self._open_until = now + wait
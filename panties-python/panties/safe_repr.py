@@ -0,0 +1,249 @@
+# panties/safe_repr.py
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import deque
+from types import FunctionType
+from typing import Any, Dict, Optional, Set
+
+__all__ = ["SafeRepr"]
+
+_ELLIPSIS = "..."
+_CYCLE = "<cycle>"
+_SKIPPED = "<skipped>"
+
+# Tipi il cui repr() esegue query o carica dati (confrontati su tutta la MRO)
+_LAZY_TYPES = frozenset({
+    "django.db.models.query.QuerySet",
+    "django.db.models.query.RawQuerySet",
+    "sqlalchemy.orm.query.Query",
+    "sqlalchemy.engine.result.Result",
+})
+
+# Tipi "lenti" ricordati al massimo
+_MAX_SLOW_TYPES = 256
+
+_SEQUENCES = {
+    list: ("[", "]"),
+    tuple: ("(", ")"),
+    set: ("{", "}"),
+    frozenset: ("frozenset({", "})"),
+    deque: ("deque([", "])"),
+}
+
+# Contenitori le cui sottoclassi (defaultdict, OrderedDict, Counter,
+# namedtuple, ...) vengono visitate come il tipo base, con parentesi proprie
+_CONTAINERS = (dict, list, tuple, set, frozenset, deque)
+_BRACKETS = {
+    dict: ("{", "}"),
+    list: ("[", "]"),
+    tuple: ("(", ")"),
+    set: ("{", "}"),
+    frozenset: ("{", "}"),
+    deque: ("[", "]"),
+}
+
+
+class _Budget:
+    __slots__ = ("deadline", "memo")
+
+    def __init__(self, deadline: float) -> None:
+        self.deadline = deadline
+        # id(oggetto) -> repr già calcolato (None mentre è in corso: ciclo)
+        self.memo: Dict[int, Optional[str]] = {}
+
+
+class SafeRepr:
+    """
+    ``repr()`` a costo limitato per le variabili locali dei frame:
+
+    - percorsi veloci per i tipi built-in: stringhe e bytes tagliati prima
+      del ``repr``, contenitori visitati solo per i primi ``max_items``
+      elementi e fino a ``max_depth`` livelli
+    - le sottoclassi dei contenitori built-in (``defaultdict``,
+      ``OrderedDict``, ``Counter``, namedtuple, ...) vengono visitate allo
+      stesso modo, con il nome del tipo davanti: il loro ``__repr__``
+      visiterebbe tutti gli elementi
+    - gli oggetti già visti nello stesso evento (es. ``self`` in più frame)
+      vengono rappresentati una volta sola, i riferimenti circolari
+      diventano ``"<cycle>"``
+    - QuerySet e simili (``repr`` che esegue query) non vengono valutati
+    - un tipo il cui ``__repr__`` ha superato ``value_time_budget`` viene
+      ricordato e da lì in poi rappresentato come ``<tipo object at ...>``
+    - ogni chiamata a ``repr_locals`` ha un budget totale di
+      ``time_budget`` secondi, oltre il quale le variabili restanti
+      diventano ``"<skipped>"``
+
+    Un singolo ``__repr__`` lento non può essere interrotto: il budget ne
+    limita il costo alla prima occorrenza per tipo.
+    """
+
+    def __init__(
+        self,
+        max_length: int = 200,
+        max_items: int = 10,
+        max_depth: int = 3,
+        max_vars: int = 50,
+        value_time_budget: float = 0.001,
+        time_budget: float = 0.01,
+    ) -> None:
+        self.max_length = max_length
+        self.max_items = max_items
+        self.max_depth = max_depth
+        self.max_vars = max_vars
+        self.value_time_budget = value_time_budget
+        self.time_budget = time_budget
+        self._slow_types: Set[type] = set()
+        self._lazy_cache: Dict[type, bool] = {}
+        self._lock = threading.Lock()
+
+    def budget(self) -> _Budget:
+        """Budget condiviso dalle variabili di tutti i frame di un evento."""
+        return _Budget(time.perf_counter() + self.time_budget)
+
+    def repr_locals(self, variables: Dict[str, Any], budget: Optional[_Budget] = None) -> Dict[str, str]:
+        """Rappresentazione limitata di un dizionario di variabili locali."""
+        if budget is None:
+            budget = self.budget()
+        result = {}
+        for name, value in itertools.islice(variables.items(), self.max_vars):
+            if time.perf_counter() > budget.deadline:
+                result[str(name)] = _SKIPPED
+            else:
+                result[str(name)] = self._repr(value, budget, self.max_depth)
+        return result
+
+    def repr(self, value: Any) -> str:
+        return self._repr(value, self.budget(), self.max_depth)
+
+    # ------- Implementazione -------
+
+    def _truncate(self, text: str) -> str:
+        if len(text) > self.max_length:
+            return text[:self.max_length] + _ELLIPSIS
+        return text
+
+    def _repr(self, value: Any, budget: _Budget, depth: int) -> str:
+        t = type(value)
+        if value is None or t is bool or t is float or t is complex:
+            return repr(value)
+        if t is int:
+            # I repr di interi enormi costano (e oltre 4300 cifre falliscono)
+            if value.bit_length() > 256:
+                return f"<int with {value.bit_length()} bits>"
+            return int.__repr__(value)
+        if t is str or t is bytes:
+            if len(value) > self.max_length:
+                return repr(value[:self.max_length]) + _ELLIPSIS
+            return repr(value)
+        if t is dict or t in _SEQUENCES:
+            return self._repr_container(value, t, budget, depth)
+        if isinstance(value, _CONTAINERS):
+            base = next(base for base in _CONTAINERS if isinstance(value, base))
+            return self._repr_container(value, base, budget, depth, t.__qualname__)
+        return self._repr_object(value, t, budget)
+
+    def _repr_container(
+        self, value: Any, t: type, budget: _Budget, depth: int, name: Optional[str] = None
+    ) -> str:
+        """
+        Visita limitata di un contenitore di tipo base ``t``. Per una
+        sottoclasse (``name``) gli elementi vengono letti con i metodi di
+        ``t`` se la sottoclasse li ridefinisce in Python: il suo codice non
+        viene eseguito. Le namedtuple mostrano i nomi dei campi
+        (``Point(x=1, y=2)``).
+        """
+        key = id(value)
+        if key in budget.memo:
+            cached = budget.memo[key]
+            return _CYCLE if cached is None else cached
+        length = t.__len__(value)
+        if name is None:
+            if not length:
+                return repr(value)
+            opening, closing = ("{", "}") if t is dict else _SEQUENCES[t]
+        else:
+            opening, closing = _BRACKETS[t]
+            if not length:
+                return f"{name}()"
+            opening, closing = f"{name}({opening}", f"{closing})"
+        fields = None
+        if name is not None and t is tuple:
+            fields = getattr(type(value), "_fields", None)
+            if type(fields) is tuple and len(fields) == length:
+                opening, closing = f"{name}(", ")"
+            else:
+                fields = None
+        if depth <= 0:
+            return f"{opening}{_ELLIPSIS}{closing}"
+
+        iterate = dict.items if t is dict else t.__iter__
+        if name is not None:
+            own = type(value).items if t is dict else type(value).__iter__
+            if not isinstance(own, FunctionType):
+                # Implementazione in C (es. OrderedDict): ordine del tipo
+                iterate = own
+
+        budget.memo[key] = None
+        parts = []
+        size = 0
+        try:
+            for index, item in enumerate(itertools.islice(iterate(value), self.max_items)):
+                if t is dict:
+                    piece = self._repr(item[0], budget, depth - 1) + ": " + self._repr(item[1], budget, depth - 1)
+                elif fields is not None:
+                    piece = f"{fields[index]}={self._repr(item, budget, depth - 1)}"
+                else:
+                    piece = self._repr(item, budget, depth - 1)
+                parts.append(piece)
+                size += len(piece) + 2
+                if size > self.max_length or time.perf_counter() > budget.deadline:
+                    break
+        except RuntimeError:
+            # Contenitore modificato da un altro thread durante la visita
+            parts.append("<changed>")
+        if len(parts) < length:
+            parts.append(f"...(+{length - len(parts)})")
+        text = self._truncate(opening + ", ".join(parts) + closing)
+        budget.memo[key] = text
+        return text
+
+    def _repr_object(self, value: Any, t: type, budget: _Budget) -> str:
+        default = f"<{t.__module__}.{t.__qualname__} object at {id(value):#x}>"
+        if t in self._slow_types or self._is_lazy(t):
+            return default
+        if t.__repr__ is object.__repr__:
+            return default
+
+        key = id(value)
+        if key in budget.memo:
+            cached = budget.memo[key]
+            return _CYCLE if cached is None else cached
+        budget.memo[key] = None
+
+        start = time.perf_counter()
+        try:
+            text = self._truncate(repr(value))
+        except Exception:
+            text = f"<unrepresentable {t.__qualname__} object>"
+        if time.perf_counter() - start > self.value_time_budget:
+            with self._lock:
+                if len(self._slow_types) < _MAX_SLOW_TYPES:
+                    self._slow_types.add(t)
+        budget.memo[key] = text
+        return text
+
+    def _is_lazy(self, t: type) -> bool:
+        lazy = self._lazy_cache.get(t)
+        if lazy is None:
+            try:
+                names = {f"{base.__module__}.{base.__qualname__}" for base in t.__mro__}
+            except Exception:
+                names = set()
+            lazy = not _LAZY_TYPES.isdisjoint(names)
+            with self._lock:
+                if len(self._lazy_cache) < 4096:
+                    self._lazy_cache[t] = lazy
+        return lazy
@@ -0,0 +1,128 @@
+# panties/sampling.py
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+__all__ = ["Sampler", "TokenBucketLimiter", "DiscardCounter"]
+
+
+class Sampler:
+    """
+    Campionamento degli eventi prima che vengano costruiti.
+
+    - ``sample_rate``: probabilità globale di inviare un evento
+    - ``level_rates``: override per livello dei messaggi (es. ``{"info": 0.1}``)
+    - ``exception_rates``: override per tipo di eccezione, per nome semplice
+      o qualificato (``"ValueError"``, ``"myapp.errors.Timeout"``); vale anche
+      per le sottoclassi
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        level_rates: Optional[Dict[str, float]] = None,
+        exception_rates: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.level_rates = dict(level_rates or {})
+        self.exception_rates = dict(exception_rates or {})
+        # Nessun campionamento configurato: percorso veloce
+        self.enabled = (
+            sample_rate < 1.0
+            or any(rate < 1.0 for rate in self.level_rates.values())
+            or any(rate < 1.0 for rate in self.exception_rates.values())
+        )
+        self._type_rates: Dict[type, float] = {}
+
+    def exception_rate(self, exc_type: type) -> float:
+        rate = self._type_rates.get(exc_type)
+        if rate is None:
+            rate = self.sample_rate
+            for klass in getattr(exc_type, "__mro__", (exc_type,)):
+                qualified = f"{klass.__module__}.{klass.__qualname__}"
+                if qualified in self.exception_rates:
+                    rate = self.exception_rates[qualified]
+                    break
+                if klass.__name__ in self.exception_rates:
+                    rate = self.exception_rates[klass.__name__]
+                    break
+            self._type_rates[exc_type] = rate
+        return rate
+
+    def level_rate(self, level: str) -> float:
+        return self.level_rates.get(level, self.sample_rate)
+
+    @staticmethod
+    def keep(rate: float) -> bool:
+        if rate >= 1.0:
+            return True
+        import random
+
+        return random.random() < rate
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket per chiave (fingerprint): ``rate`` eventi al secondo con
+    raffiche fino a ``burst``. Le chiavi sono in una LRU di ``max_keys``
+    elementi per mantenere la memoria limitata.
+    """
+
+    def __init__(self, rate: float, burst: int = 10, max_keys: int = 1000) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_keys = max(1, max_keys)
+        self._buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key: Hashable, now: float) -> bool:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                # [token disponibili, istante dell'ultimo aggiornamento]
+                bucket = [float(self.burst), now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1.0:
+                bucket[0] -= 1.0
+                return True
+            return False
+
+
+class DiscardCounter:
+    """Conteggio degli eventi scartati lato client, per motivo e categoria."""
+
+    def __init__(self) -> None:
+        self._counts: Dict[Tuple[str, str], int] = {}
+        # Totali dall'avvio, per stats(): non vengono azzerati da drain()
+        self._totals: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, reason: str, category: str, quantity: int = 1) -> None:
+        with self._lock:
+            key = (reason, category)
+            self._counts[key] = self._counts.get(key, 0) + quantity
+            self._totals[reason] = self._totals.get(reason, 0) + quantity
+
+    def totals(self) -> Dict[str, int]:
+        """Eventi scartati dall'avvio, per motivo."""
+        with self._lock:
+            return dict(self._totals)
+
+    def __bool__(self) -> bool:
+        return bool(self._counts)
+
+    def drain(self) -> List[Dict[str, object]]:
+        with self._lock:
+            counts, self._counts = self._counts, {}
+        return [
+            {"reason": reason, "category": category, "quantity": quantity}
+            for (reason, category), quantity in counts.items()
+        ]
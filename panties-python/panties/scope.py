@@ -0,0 +1,164 @@
+# panties/scope.py
+from __future__ import annotations
+
+import threading
+from contextvars import ContextVar, Token
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+__all__ = [
+    "Scope",
+    "get_scope",
+    "push_scope",
+    "set_context",
+    "set_extra",
+    "set_tag",
+    "set_tags",
+]
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+
+class Scope:
+    """
+    Tag, extra e contesti applicati agli eventi catturati, uniti a quelli
+    passati alle singole ``capture_*`` (che hanno la precedenza).
+
+    Ci sono due livelli:
+
+    - dentro ``push_scope`` lo scope è del thread / task corrente (una
+      ContextVar): le modifiche non si vedono dagli altri thread e task.
+      I middleware di ``panties.wsgi``, ``panties.asgi`` e
+      ``panties.django`` aprono uno scope per ogni richiesta
+    - fuori da ogni ``push_scope`` ``set_tag``, ``set_extra`` e
+      ``set_context`` modificano lo scope di processo, condiviso da tutti i
+      thread e task: va usato per i dati validi ovunque (es. regione, host)
+      impostati all'avvio, non per quelli di una richiesta o di un job
+
+    Uno ``Scope`` è immutabile: ogni modifica ne crea uno nuovo copiando
+    solo il dizionario modificato e lo pubblica nella ContextVar. Per
+    questo lo stesso scope può essere condiviso senza copie da task figli
+    e snapshot degli eventi, e ``push_scope`` costa O(1) indipendentemente
+    dal numero di tag.
+    """
+
+    __slots__ = ("tags", "extra", "contexts")
+
+    def __init__(
+        self,
+        tags: Mapping[str, Any] = _EMPTY,
+        extra: Mapping[str, Any] = _EMPTY,
+        contexts: Mapping[str, Any] = _EMPTY,
+    ) -> None:
+        self.tags = tags
+        self.extra = extra
+        self.contexts = contexts
+
+    def __bool__(self) -> bool:
+        return bool(self.tags or self.extra or self.contexts)
+
+    def with_tags(self, tags: Mapping[str, Any]) -> "Scope":
+        return Scope(MappingProxyType({**self.tags, **tags}), self.extra, self.contexts)
+
+    def with_extra(self, key: str, value: Any) -> "Scope":
+        return Scope(self.tags, MappingProxyType({**self.extra, key: value}), self.contexts)
+
+    def with_context(self, name: str, value: Optional[Mapping[str, Any]]) -> "Scope":
+        contexts = dict(self.contexts)
+        if value is None:
+            contexts.pop(name, None)
+        else:
+            # Copia: il chiamante può continuare a modificare il suo dict
+            contexts[name] = dict(value)
+        return Scope(self.tags, self.extra, MappingProxyType(contexts))
+
+
+# Scope di processo: usato fuori da push_scope, visibile da tutti i thread
+_global_scope = Scope()
+_global_lock = threading.Lock()
+
+# Scope del contesto corrente (None fuori da push_scope)
+_scope: ContextVar[Optional[Scope]] = ContextVar("panties_scope", default=None)
+
+
+def get_scope() -> Scope:
+    """Scope applicato agli eventi catturati da qui."""
+    scope = _scope.get()
+    return _global_scope if scope is None else scope
+
+
+def _update(change: Any, *args: Any) -> None:
+    global _global_scope
+    scope = _scope.get()
+    if scope is not None:
+        _scope.set(change(scope, *args))
+        return
+    with _global_lock:
+        _global_scope = change(_global_scope, *args)
+
+
+class push_scope:
+    """
+    Context manager che apre uno scope annidato: tag, extra e contesti
+    impostati al suo interno valgono fino all'uscita, solo per il thread /
+    task corrente (e per i task che crea). Fuori da ``push_scope`` le
+    modifiche valgono per tutto il processo, in tutti i thread e task:
+    il codice di una richiesta o di un job va eseguito dentro uno scope.
+
+        with panties.push_scope():
+            panties.set_tag("order_id", order.id)
+            process(order)
+
+    Entrare e uscire costa O(1): lo scope corrente viene condiviso, non
+    copiato, e la prima modifica ne crea uno nuovo.
+    """
+
+    __slots__ = ("_token",)
+
+    def __init__(self) -> None:
+        self._token: Optional[Token] = None
+
+    def __enter__(self) -> Scope:
+        scope = get_scope()
+        self._token = _scope.set(scope)
+        return scope
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._token is not None:
+            _scope.reset(self._token)
+            self._token = None
+
+
+def set_tag(key: str, value: Any) -> None:
+    """
+    Imposta un tag (indicizzato dal server) sullo scope corrente: quello
+    di ``push_scope`` se aperto, altrimenti quello di processo.
+    """
+    _update(Scope.with_tags, {key: value})
+
+
+def set_tags(tags: Mapping[str, Any]) -> None:
+    """Imposta più tag sullo scope corrente (vedi ``set_tag``)."""
+    _update(Scope.with_tags, dict(tags))
+
+
+def set_extra(key: str, value: Any) -> None:
+    """Imposta un dato extra (non indicizzato) sullo scope corrente (vedi ``set_tag``)."""
+    _update(Scope.with_extra, key, value)
+
+
+def set_context(name: str, value: Optional[Mapping[str, Any]]) -> None:
+    """
+    Imposta un contesto strutturato (es. ``"user"``, ``"request"``) sullo
+    scope corrente (vedi ``set_tag``); ``None`` lo rimuove.
+    """
+    _update(Scope.with_context, name, value)
+
+
+def merged(base: Mapping[str, Any], override: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Dati dello scope uniti a quelli della singola cattura (già copiati)."""
+    if not base:
+        return override if override is not None else {}
+    if not override:
+        return dict(base)
+    return {**base, **override}
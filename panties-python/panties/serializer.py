@@ -0,0 +1,404 @@
+# panties/serializer.py
+from __future__ import annotations
+
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+__all__ = ["EventSerializer"]
+
+# Encoder C di json per le stringhe (escape ASCII, quindi len() == byte) e
+# per i sottoalberi già validati (frame costruiti dall'SDK); json viene
+# importato al primo evento serializzato
+_encode_str: Callable[[str], str]
+_encode_trusted: Optional[Callable[[Any], str]] = None
+
+
+def _load_json() -> None:
+    global _encode_str, _encode_trusted
+    import json
+
+    _encode_str = json.encoder.encode_basestring_ascii
+    _encode_trusted = json.JSONEncoder(
+        check_circular=False, allow_nan=False, separators=(",", ":")
+    ).encode
+
+_CYCLE = '"<cycle>"'
+_TOO_DEEP = '"<max depth>"'
+_UNREPRESENTABLE = '"<unrepresentable>"'
+_ELLIPSIS = "..."
+
+
+class _Encoded(str):
+    """Frammento JSON già codificato, da copiare così com'è."""
+
+
+class _State:
+    __slots__ = ("parts", "size", "limit", "seen", "truncated")
+
+    def __init__(self, limit: int) -> None:
+        self.parts: List[str] = []
+        self.size = 0
+        self.limit = limit
+        self.seen: set = set()
+        self.truncated = False
+
+
+class EventSerializer:
+    """
+    Serializza gli eventi in JSON applicando i limiti durante la codifica,
+    senza costruire prima il JSON completo:
+
+    - stringhe tagliate a ``max_string_length`` caratteri (messaggi
+      dell'eccezione e dei ``message`` a ``max_message_length``)
+    - al massimo ``max_frames`` frame, tenendo i più esterni e i più interni
+    - dict/liste con al massimo ``max_items`` elementi e ``max_depth``
+      livelli (``extra`` a ``max_extra_depth`` livelli e ``max_extra_bytes``
+      byte)
+    - evento intero entro ``max_event_bytes`` byte (circa)
+
+    I riferimenti circolari diventano ``"<cycle>"`` e gli oggetti non JSON
+    il loro ``repr``, quindi la serializzazione non fallisce mai per colpa
+    dei dati dell'utente.
+    """
+
+    def __init__(
+        self,
+        max_string_length: int = 1024,
+        max_message_length: int = 8192,
+        max_frames: int = 100,
+        max_items: int = 100,
+        max_depth: int = 10,
+        max_extra_depth: int = 5,
+        max_extra_bytes: int = 64 * 1024,
+        max_event_bytes: int = 1024 * 1024,
+    ) -> None:
+        self.max_string_length = max_string_length
+        self.max_message_length = max_message_length
+        self.max_frames = max(2, max_frames)
+        self.max_items = max(1, max_items)
+        self.max_depth = max(1, max_depth)
+        self.max_extra_depth = max(1, max_extra_depth)
+        self.max_extra_bytes = max_extra_bytes
+        self.max_event_bytes = max_event_bytes
+        # Eventi troncati (letti da stats() del transport)
+        self.truncated = 0
+        self._lock = threading.Lock()
+
+    def encode(self, event: Dict[str, Any]) -> bytes:
+        if _encode_trusted is None:
+            _load_json()
+        st = _State(self.max_event_bytes)
+        self._write_event(event, st)
+        if st.truncated:
+            with self._lock:
+                self.truncated += 1
+        return "".join(st.parts).encode("ascii")
+
+    # ------- Campi noti dell'evento -------
+
+    def _write_event(self, event: Dict[str, Any], st: _State) -> None:
+        st.seen.add(id(event))
+        parts = st.parts
+        parts.append("{")
+        st.size += 1
+        first = True
+        for key, value in event.items():
+            if not first:
+                parts.append(",")
+                st.size += 1
+            first = False
+            self._write_key(key, st)
+            if key == "exception" and type(value) is dict:
+                self._write_exception(value, st)
+            elif key == "message" and type(value) is dict:
+                self._write_dict(value, st, self.max_depth, {"text": self.max_message_length})
+            elif key == "transaction" and type(value) is dict:
+                self._write_transaction(value, st)
+            elif key == "extra":
+                limit = st.limit
+                st.limit = min(limit, st.size + self.max_extra_bytes)
+                self._write(value, st, self.max_extra_depth, self.max_string_length)
+                st.limit = limit
+            else:
+                self._write(value, st, self.max_depth, self.max_string_length)
+        parts.append("}")
+        st.size += 1
+
+    def _write_exception(self, exc: Dict[str, Any], st: _State) -> None:
+        frames = exc.get("frames")
+        if type(exc.get("exceptions")) is list and type(frames) is list:
+            # Catena di eccezioni: "frames" è la tabella condivisa
+            exc = self._limit_chain(exc, frames, st)
+        elif type(frames) is list and len(frames) > self.max_frames:
+            # Tiene i frame più esterni e i più interni (dove c'è l'errore)
+            head = self.max_frames // 2
+            tail = self.max_frames - head
+            exc = dict(exc)
+            exc["frames"] = frames[:head] + frames[-tail:]
+            exc["frames_omitted"] = len(frames) - self.max_frames
+            st.truncated = True
+        frames = exc.get("frames")
+        if type(frames) is list and all(self._frame_ok(frame) for frame in frames):
+            # Percorso veloce: frame dell'SDK già entro i limiti, codificati
+            # in un colpo solo dall'encoder C di json
+            exc = dict(exc)
+            exc["frames"] = _Encoded(_encode_trusted(frames))
+        self._write_dict(exc, st, self.max_depth, {"message": self.max_message_length})
+
+    def _write_transaction(self, txn: Dict[str, Any], st: _State) -> None:
+        """
+        Transazione: gli span sono già limitati dall'SDK (``MAX_SPANS``),
+        quindi ``max_items`` vale per i campi di ogni span e non per la lista.
+        """
+        spans = txn.get("spans")
+        if type(spans) is list and all(self._span_ok(span) for span in spans):
+            # Percorso veloce: span senza dati dell'utente da limitare
+            txn = dict(txn)
+            txn["spans"] = _Encoded(_encode_trusted(spans))
+        elif type(spans) is list:
+            sub = _State(st.limit - st.size)
+            sub.parts.append("[")
+            for position, span in enumerate(spans):
+                if sub.size >= sub.limit:
+                    sub.truncated = True
+                    break
+                if position:
+                    sub.parts.append(",")
+                    sub.size += 1
+                self._write(span, sub, self.max_depth, self.max_string_length)
+            sub.parts.append("]")
+            if sub.truncated:
+                st.truncated = True
+            txn = dict(txn)
+            txn["spans"] = _Encoded("".join(sub.parts))
+        self._write_dict(txn, st, self.max_depth)
+
+    def _span_ok(self, span: Any) -> bool:
+        """Span con soli valori semplici entro i limiti e ``data`` vuoto."""
+        if type(span) is not dict:
+            return False
+        max_str = self.max_string_length
+        for key, value in span.items():
+            t = type(value)
+            if t is str:
+                if len(value) > max_str:
+                    return False
+            elif t is float:
+                if not math.isfinite(value):
+                    return False
+            elif t is dict:
+                if value:
+                    return False
+            elif not (t is int or value is None) or type(key) is not str:
+                return False
+        return True
+
+    def _limit_chain(self, exc: Dict[str, Any], frames: List[Any], st: _State) -> Dict[str, Any]:
+        """
+        Limiti per una catena di eccezioni: al massimo ``max_items`` nodi e
+        ``max_frames`` frame per nodo (i più esterni e i più interni); la
+        tabella dei frame viene ridotta a quelli ancora referenziati.
+        """
+        nodes = exc["exceptions"]
+        truncated = len(nodes) > self.max_items
+        limited = []
+        for node in nodes[:self.max_items]:
+            refs = node.get("frames") if type(node) is dict else None
+            if type(refs) is list and len(refs) > self.max_frames:
+                head = self.max_frames // 2
+                tail = self.max_frames - head
+                node = dict(node)
+                node["frames"] = refs[:head] + refs[-tail:]
+                node["frames_omitted"] = len(refs) - self.max_frames
+                truncated = True
+            limited.append(node)
+        if not truncated:
+            return exc
+
+        st.truncated = True
+        used = sorted({
+            ref
+            for node in limited if type(node) is dict and type(node.get("frames")) is list
+            for ref in node["frames"] if type(ref) is int and 0 <= ref < len(frames)
+        })
+        remap = {old: new for new, old in enumerate(used)}
+        for position, node in enumerate(limited):
+            if type(node) is dict and type(node.get("frames")) is list:
+                node = dict(node)
+                node["frames"] = [remap[ref] for ref in node["frames"] if ref in remap]
+                limited[position] = node
+        exc = dict(exc)
+        exc["frames"] = [frames[ref] for ref in used]
+        exc["exceptions"] = limited
+        return exc
+
+    def _frame_ok(self, frame: Any) -> bool:
+        """Se un frame contiene solo scalari/liste di stringhe entro i limiti."""
+        if type(frame) is not dict or len(frame) > self.max_items:
+            return False
+        max_str = self.max_string_length
+        for key, value in frame.items():
+            t = type(value)
+            if t is str:
+                if len(value) > max_str:
+                    return False
+            elif t is list:
+                if len(value) > self.max_items:
+                    return False
+                for line in value:
+                    if type(line) is not str or len(line) > max_str:
+                        return False
+            elif t is dict:
+                # Variabili locali ("vars"): nomi e repr già limitati
+                if len(value) > self.max_items:
+                    return False
+                for name, text in value.items():
+                    if type(name) is not str or type(text) is not str or len(text) > max_str:
+                        return False
+            elif not (t is int or t is bool or value is None) or type(key) is not str:
+                return False
+        return True
+
+    # ------- Scrittura generica -------
+
+    def _write_key(self, key: Any, st: _State) -> None:
+        if type(key) is not str:
+            key = str(key)
+        if len(key) > self.max_string_length:
+            key = key[:self.max_string_length] + _ELLIPSIS
+            st.truncated = True
+        piece = _encode_str(key)
+        st.parts.append(piece)
+        st.parts.append(":")
+        st.size += len(piece) + 1
+
+    def _write_dict(
+        self,
+        obj: Any,
+        st: _State,
+        depth: int,
+        overrides: Optional[Dict[str, int]] = None,
+    ) -> None:
+        if id(obj) in st.seen:
+            st.parts.append(_CYCLE)
+            st.size += len(_CYCLE)
+            st.truncated = True
+            return
+        st.seen.add(id(obj))
+        parts = st.parts
+        parts.append("{")
+        st.size += 1
+        count = 0
+        for key, value in obj.items():
+            if count >= self.max_items or st.size >= st.limit:
+                st.truncated = True
+                break
+            if count:
+                parts.append(",")
+                st.size += 1
+            count += 1
+            self._write_key(key, st)
+            max_str = self.max_string_length
+            if overrides is not None and key in overrides:
+                max_str = overrides[key]
+            self._write(value, st, depth - 1, max_str)
+        parts.append("}")
+        st.size += 1
+        st.seen.discard(id(obj))
+
+    def _write_list(self, obj: Any, st: _State, depth: int) -> None:
+        if id(obj) in st.seen:
+            st.parts.append(_CYCLE)
+            st.size += len(_CYCLE)
+            st.truncated = True
+            return
+        st.seen.add(id(obj))
+        parts = st.parts
+        parts.append("[")
+        st.size += 1
+        count = 0
+        for value in obj:
+            if count >= self.max_items or st.size >= st.limit:
+                st.truncated = True
+                break
+            if count:
+                parts.append(",")
+                st.size += 1
+            count += 1
+            self._write(value, st, depth - 1, self.max_string_length)
+        parts.append("]")
+        st.size += 1
+        st.seen.discard(id(obj))
+
+    def _write(self, obj: Any, st: _State, depth: int, max_str: int) -> None:
+        t = type(obj)
+        if t is str:
+            if len(obj) > max_str:
+                obj = obj[:max_str] + _ELLIPSIS
+                st.truncated = True
+            piece = _encode_str(obj)
+        elif obj is None:
+            piece = "null"
+        elif obj is True:
+            piece = "true"
+        elif obj is False:
+            piece = "false"
+        elif t is int:
+            piece = int.__repr__(obj)
+        elif t is float:
+            piece = float.__repr__(obj) if math.isfinite(obj) else "null"
+        elif t is _Encoded:
+            piece = obj
+        elif t is dict or t is list or t is tuple:
+            if depth <= 0:
+                st.parts.append(_TOO_DEEP)
+                st.size += len(_TOO_DEEP)
+                st.truncated = True
+            elif t is dict:
+                self._write_dict(obj, st, depth)
+            else:
+                self._write_list(obj, st, depth)
+            return
+        else:
+            piece = self._write_other(obj, st, depth, max_str)
+            if piece is None:
+                return
+        st.parts.append(piece)
+        st.size += len(piece)
+
+    def _write_other(self, obj: Any, st: _State, depth: int, max_str: int) -> Optional[str]:
+        """Sottoclassi dei tipi JSON, altri contenitori e oggetti qualsiasi."""
+        try:
+            if isinstance(obj, str):
+                return self._string_piece(str.__str__(obj), st, max_str)
+            if isinstance(obj, bool):
+                return "true" if obj else "false"
+            if isinstance(obj, int):
+                return int.__repr__(obj)
+            if isinstance(obj, float):
+                return float.__repr__(obj) if math.isfinite(obj) else "null"
+            if isinstance(obj, (dict, list, tuple, set, frozenset)):
+                if id(obj) in st.seen:
+                    st.truncated = True
+                    return _CYCLE
+                # La copia ha un altro id: si marca l'originale
+                st.seen.add(id(obj))
+                try:
+                    copy = dict(obj) if isinstance(obj, dict) else list(obj)
+                    self._write(copy, st, depth, max_str)
+                finally:
+                    st.seen.discard(id(obj))
+                return None
+            return self._string_piece(repr(obj), st, max_str)
+        except Exception:
+            # repr() o conversione che fallisce: si usa un segnaposto
+            st.truncated = True
+            return _UNREPRESENTABLE
+
+    @staticmethod
+    def _string_piece(value: str, st: _State, max_str: int) -> str:
+        if len(value) > max_str:
+            value = value[:max_str] + _ELLIPSIS
+            st.truncated = True
+        return _encode_str(value)
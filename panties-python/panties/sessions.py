@@ -0,0 +1,131 @@
+# panties/sessions.py
+from __future__ import annotations
+
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from .state import get_client
+
+__all__ = ["Session", "end_session", "get_session", "start_session"]
+
+# Stati finali di una sessione, nell'ordine dei contatori inviati
+STATUSES = ("exited", "errored", "crashed")
+
+# Posizione del contatore per ogni stato (una sessione "ok" è "exited")
+_COUNTER = {"ok": 0, "exited": 0, "errored": 1, "crashed": 2}
+
+# Ampiezza dei bucket di aggregazione (per inizio della sessione), in secondi
+BUCKET_SECONDS = 60
+
+# Sessione in corso nel thread / task corrente (avviata con start_session)
+_session: ContextVar[Optional["Session"]] = ContextVar("panties_session", default=None)
+
+
+class Session:
+    """
+    Sessione in corso: un'esecuzione dell'applicazione (una richiesta, un
+    job, un processo) di cui interessa solo l'esito. Non viene inviata da
+    sola: alla fine diventa un incremento dei contatori del client.
+
+    ``status`` è ``"ok"``, ``"errored"`` (un'eccezione inviata durante la
+    sessione) o ``"crashed"`` (un'eccezione non gestita l'ha interrotta).
+    """
+
+    __slots__ = ("started", "status", "_ended")
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.status = "ok"
+        self._ended = False
+
+    def mark_errored(self) -> None:
+        if self.status == "ok":
+            self.status = "errored"
+
+    def mark_crashed(self) -> None:
+        self.status = "crashed"
+
+    def end(self, status: Optional[str] = None) -> None:
+        """Chiude la sessione (una volta sola) e la conta nel client globale."""
+        if self._ended:
+            return
+        self._ended = True
+        if status is not None:
+            self.status = status
+        client = get_client()
+        if client is not None:
+            client.record_session(self)
+
+
+def get_session() -> Optional[Session]:
+    """Sessione in corso nel thread / task corrente, se avviata."""
+    return _session.get()
+
+
+def start_session() -> Optional[Session]:
+    """
+    Avvia una sessione nel contesto corrente (thread o task asyncio),
+    chiudendo quella eventualmente in corso. Senza client non fa nulla.
+
+    Le richieste HTTP sono sessioni automatiche con
+    ``auto_session_tracking=True`` e i middleware di panties; per job,
+    comandi e processi va chiamata esplicitamente, con ``end_session()``.
+    """
+    if get_client() is None:
+        return None
+    end_session()
+    session = Session()
+    _session.set(session)
+    return session
+
+
+def end_session(status: Optional[str] = None) -> None:
+    """
+    Chiude la sessione in corso: ``"exited"`` se non ci sono stati errori,
+    altrimenti l'esito registrato (o ``status``, se passato).
+    """
+    session = _session.get()
+    if session is not None:
+        _session.set(None)
+        session.end(status)
+
+
+def crash_session() -> None:
+    """Chiude la sessione in corso come ``"crashed"`` (eccezione non gestita)."""
+    end_session("crashed")
+
+
+class SessionAggregator:
+    """
+    Contatori delle sessioni finite per minuto di inizio e stato: milioni
+    di sessioni diventano poche righe, inviate in un solo evento
+    ``sessions`` per release e ambiente (vedi
+    ``PantiesClient.session_flush_interval``).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: Dict[int, List[int]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._buckets)
+
+    def add(self, started: float, status: str) -> None:
+        bucket = int(started) // BUCKET_SECONDS * BUCKET_SECONDS
+        index = _COUNTER.get(status, 0)
+        with self._lock:
+            counts = self._buckets.get(bucket)
+            if counts is None:
+                counts = self._buckets[bucket] = [0, 0, 0]
+            counts[index] += 1
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Contatori accumulati (``started`` in secondi Unix), azzerati."""
+        with self._lock:
+            buckets, self._buckets = self._buckets, {}
+        return [
+            {"started": bucket, **dict(zip(STATUSES, counts))}
+            for bucket, counts in sorted(buckets.items())
+        ]
@@ -0,0 +1,159 @@
+# panties/snapshot.py
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+__all__ = ["EventSnapshot"]
+
+# Byte stimati dell'evento serializzato, per parte dello snapshot
+_BASE_SIZE = 512
+# filename, funzione, riga di codice e righe di contesto di un frame della
+# tabella condivisa; ogni occorrenza nei traceback ne è solo l'indice
+_FRAME_SIZE = 512
+_FRAME_REF_SIZE = 8
+# nome e repr (troncato da safe_repr) di una variabile locale
+_VARIABLE_SIZE = 96
+# timestamp, categoria, livello e dati; il messaggio si conta a parte
+_BREADCRUMB_SIZE = 96
+_SPAN_SIZE = 192
+_TAG_SIZE = 64
+# Eccezioni concatenate (__cause__ / __context__) contate nella stima
+_MAX_CHAIN = 8
+
+
+class EventSnapshot:
+    """
+    Dati minimi di un evento catturati sul thread dell'applicazione:
+    riferimenti all'eccezione e al traceback, timestamp, copia di tags ed
+    extra. La costruzione dell'evento (frame, uuid, messaggi) e la
+    serializzazione avvengono dopo, nel worker del transport, chiamando
+    ``to_event()``.
+
+    Dopo la prima costruzione l'evento resta in cache e i riferimenti al
+    traceback e alle variabili locali vengono rilasciati, così i frame non
+    restano in memoria.
+    """
+
+    __slots__ = (
+        "kind",
+        "timestamp",
+        "exc_type",
+        "exc_value",
+        "tb",
+        "locals",
+        "breadcrumbs",
+        "scope",
+        "key",
+        "message",
+        "level",
+        "tags",
+        "extra",
+        "sample_rate",
+        "source",
+        "aggregation",
+        "transaction",
+        "request",
+        "_builder",
+        "_event",
+        "_size",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        builder: Callable[["EventSnapshot"], Dict[str, Any]],
+        kind: str,
+        timestamp: float,
+        tags: Optional[Dict[str, Any]] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        sample_rate: float = 1.0,
+    ) -> None:
+        self._builder = builder
+        self.kind = kind
+        self.timestamp = timestamp
+        # Copie superficiali: il chiamante può modificare i suoi dict dopo
+        self.tags = dict(tags) if tags else None
+        self.extra = dict(extra) if extra else None
+        self.sample_rate = sample_rate
+        self.exc_type: Any = None
+        self.exc_value: Any = None
+        self.tb: Any = None
+        # Variabili locali dei frame (solo con capture_locals)
+        self.locals: Optional[List[Dict[str, Any]]] = None
+        # Record dei breadcrumb del thread / task che ha catturato l'evento
+        self.breadcrumbs: Optional[List[Any]] = None
+        # Scope attivo alla cattura (immutabile: condiviso, non copiato)
+        self.scope: Any = None
+        self.key: Any = None
+        self.message: Optional[str] = None
+        self.level: Optional[str] = None
+        # Riassunto dei duplicati: snapshot originale e conteggi
+        self.source: Optional["EventSnapshot"] = None
+        self.aggregation: Optional[Dict[str, Any]] = None
+        # Transazione finita (panties.tracing) con i suoi span
+        self.transaction: Any = None
+        # Richiesta HTTP in corso alla cattura (panties.request), già "congelata"
+        self.request: Any = None
+        self._event: Optional[Dict[str, Any]] = None
+        self._size: Optional[int] = None
+        # Più worker possono costruire lo stesso snapshot (es. l'originale di
+        # un riassunto dei duplicati): la costruzione avviene una volta sola
+        self._lock = threading.Lock()
+
+    def estimated_size(self) -> int:
+        """
+        Stima dei byte dell'evento serializzato, calcolata (una volta sola)
+        da frame, variabili locali, breadcrumb e span ancora referenziati.
+        Il transport la addebita al budget della coda finché lo snapshot
+        non viene costruito.
+        """
+        size = self._size
+        if size is not None:
+            return size
+        if self._event is not None:
+            # Già costruito: i riferimenti sono stati rilasciati
+            size = _BASE_SIZE
+        else:
+            size = _BASE_SIZE + len(self.message or "")
+            size += _TAG_SIZE * (len(self.tags or ()) + len(self.extra or ()))
+            frames = set()
+            occurrences = 0
+            tb = self.tb
+            exc = self.exc_value
+            for _ in range(_MAX_CHAIN):
+                while tb is not None:
+                    frames.add((tb.tb_frame.f_code, tb.tb_lineno))
+                    occurrences += 1
+                    tb = tb.tb_next
+                exc = getattr(exc, "__cause__", None) or getattr(exc, "__context__", None)
+                if exc is None:
+                    break
+                tb = exc.__traceback__
+            size += _FRAME_SIZE * len(frames) + _FRAME_REF_SIZE * occurrences
+            if self.locals:
+                size += _VARIABLE_SIZE * sum(len(variables) for variables in self.locals)
+            if self.breadcrumbs:
+                size += sum(_BREADCRUMB_SIZE + len(record[3]) for record in self.breadcrumbs)
+            if self.transaction is not None:
+                size += _SPAN_SIZE * (1 + len(self.transaction.spans))
+            if self.source is not None:
+                size += self.source.estimated_size()
+        self._size = size
+        return size
+
+    def to_event(self) -> Dict[str, Any]:
+        """Costruisce (una volta sola) l'evento completo."""
+        event = self._event
+        if event is None:
+            with self._lock:
+                event = self._event
+                if event is None:
+                    event = self._event = self._builder(self)
+                    self.tb = None
+                    self.exc_value = None
+                    self.locals = None
+                    self.breadcrumbs = None
+                    self.transaction = None
+                    self.request = None
+        return event
@@ -0,0 +1,111 @@
+# panties/spool.py
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from typing import List, Tuple
+
+__all__ = ["SqliteSpool"]
+
+
+class SqliteSpool:
+    """
+    Spool persistente su disco (SQLite in modalità WAL) per gli eventi che
+    non è stato possibile consegnare.
+
+    - gli eventi sono salvati già serializzati (bytes JSON)
+    - budget massimo in byte: oltre il limite vengono eliminati i più vecchi
+    - sopravvive ai riavvii: gli eventi vengono reinviati al prossimo avvio
+    """
+
+    def __init__(self, path: str, max_bytes: int = 50 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "body BLOB NOT NULL, "
+            "size INTEGER NOT NULL)"
+        )
+        row = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM events").fetchone()
+        self._count, self._size = row
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def append(self, bodies: List[bytes]) -> None:
+        """Aggiunge eventi serializzati in coda allo spool."""
+        if not bodies:
+            return
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT INTO events (body, size) VALUES (?, ?)",
+                [(body, len(body)) for body in bodies],
+            )
+            self._db.execute("COMMIT")
+            self._count += len(bodies)
+            self._size += sum(len(body) for body in bodies)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Elimina gli eventi più vecchi finché non si rientra nel budget
+        excess = self._size - self.max_bytes
+        cutoff = None
+        freed = removed = 0
+        for row_id, size in self._db.execute("SELECT id, size FROM events ORDER BY id"):
+            cutoff = row_id
+            freed += size
+            removed += 1
+            if freed >= excess:
+                break
+        if cutoff is not None:
+            self._db.execute("DELETE FROM events WHERE id <= ?", (cutoff,))
+            self._count -= removed
+            self._size -= freed
+            self.evicted += removed
+
+    def peek(self, limit: int) -> List[Tuple[int, bytes]]:
+        """Ritorna fino a ``limit`` eventi, dal più vecchio, senza rimuoverli."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, body FROM events ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+
+    def remove(self, ids: List[int]) -> None:
+        """Rimuove gli eventi consegnati."""
+        if not ids:
+            return
+        with self._lock:
+            self._db.execute("BEGIN")
+            removed = freed = 0
+            for chunk_start in range(0, len(ids), 500):
+                chunk = ids[chunk_start:chunk_start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                row = self._db.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM events WHERE id IN ({placeholders})",
+                    chunk,
+                ).fetchone()
+                removed += row[0]
+                freed += row[1]
+                self._db.execute(f"DELETE FROM events WHERE id IN ({placeholders})", chunk)
+            self._db.execute("COMMIT")
+            self._count -= removed
+            self._size -= freed
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,4 +1,6 @@
 # panties/state.py
+from __future__ import annotations
+
 from typing import Optional, TYPE_CHECKING
 
 if TYPE_CHECKING:
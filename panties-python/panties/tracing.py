@@ -0,0 +1,323 @@
+# panties/tracing.py
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar, Token
+from types import TracebackType
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from .state import get_client
+
+__all__ = [
+    "Span",
+    "Transaction",
+    "get_current_span",
+    "parse_traceparent",
+    "span",
+    "start_transaction",
+]
+
+# Span per transazione oltre i quali i successivi vengono solo contati
+MAX_SPANS = 1000
+
+# Span (o transazione) attivo nel thread / task corrente
+_current: ContextVar[Optional["Span"]] = ContextVar("panties_span", default=None)
+
+_clock = time.perf_counter
+
+
+_getrandbits: Optional[Callable[[int], int]] = None
+
+
+def _new_id(bits: int) -> str:
+    # random importato al primo id: di solito nel worker, a evento costruito
+    global _getrandbits
+    if _getrandbits is None:
+        import random
+
+        _getrandbits = random.getrandbits
+    return "%0*x" % (bits // 4, _getrandbits(bits) or 1)
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Legge un header W3C ``traceparent`` (``00-<trace_id>-<span_id>-<flag>``)
+    e ritorna ``(trace_id, parent_span_id, sampled)``, o ``None`` se non è
+    valido.
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        if not int(parts[1], 16) or not int(parts[2], 16):
+            return None
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    return parts[1].lower(), parts[2].lower(), bool(flags & 1)
+
+
+class Span:
+    """
+    Operazione temporizzata dentro una transazione (query, chiamata HTTP,
+    ...). I tempi usano un clock monotono (``time.perf_counter``); il
+    timestamp assoluto è solo quello di inizio della transazione.
+
+    Si usa come context manager (``with panties.span("db.query"):``) oppure
+    chiamando ``finish()``. Uno span finito viene aggiunto alla sua
+    transazione, che lo invia insieme a sé quando finisce.
+    """
+
+    __slots__ = (
+        "transaction",
+        "parent",
+        "op",
+        "description",
+        "status",
+        "data",
+        "start",
+        "end",
+        "_span_id",
+        "_token",
+    )
+
+    def __init__(
+        self,
+        transaction: "Transaction",
+        parent: Optional["Span"],
+        op: str,
+        description: Optional[str] = None,
+    ) -> None:
+        self.transaction = transaction
+        self.parent = parent
+        self.op = op
+        self.description = description
+        self.status: Optional[str] = None
+        self.data: Optional[Dict[str, Any]] = None
+        self.start = _clock()
+        self.end: Optional[float] = None
+        self._span_id: Optional[str] = None
+        self._token: Optional[Token] = None
+
+    @property
+    def span_id(self) -> str:
+        # Generato al primo uso, di solito nel worker che costruisce l'evento
+        if self._span_id is None:
+            self._span_id = _new_id(64)
+        return self._span_id
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        return None if self.parent is None else self.parent.span_id
+
+    @property
+    def sampled(self) -> bool:
+        return self.transaction.sampled
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Durata in secondi, ``None`` finché lo span è aperto."""
+        return None if self.end is None else self.end - self.start
+
+    def set_data(self, key: str, value: Any) -> None:
+        if self.data is None:
+            self.data = {}
+        self.data[key] = value
+
+    def set_status(self, status: str) -> None:
+        """Esito dell'operazione (``"ok"``, ``"internal_error"``, ``"not_found"``, ...)."""
+        self.status = status
+
+    def start_child(self, op: str, description: Optional[str] = None) -> "Span":
+        """Nuovo span figlio di questo (da chiudere con ``finish()`` o ``with``)."""
+        if not self.transaction.sampled:
+            return _NOOP_SPAN
+        return Span(self.transaction, self, op, description)
+
+    def traceparent(self) -> str:
+        """Header W3C ``traceparent`` per propagare la trace ai servizi chiamati."""
+        return f"00-{self.transaction.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def finish(self) -> None:
+        if self.end is None:
+            self.end = _clock()
+            self.transaction._add_span(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if exc_type is not None and self.status is None:
+            self.status = "internal_error"
+        # finish() in linea: è il percorso di ogni span
+        if self.end is None:
+            self.end = _clock()
+            self.transaction._add_span(self)
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+
+
+class _NoOpSpan:
+    """
+    Span di una transazione non campionata (o senza transazione): non
+    registra nulla, così il costo di ``panties.span`` resta minimo.
+    """
+
+    __slots__ = ()
+
+    sampled = False
+    duration = None
+
+    def set_data(self, key: str, value: Any) -> None:
+        pass
+
+    def set_status(self, status: str) -> None:
+        pass
+
+    def start_child(self, op: str, description: Optional[str] = None) -> "_NoOpSpan":
+        return self
+
+    def finish(self) -> None:
+        pass
+
+    def __enter__(self) -> "_NoOpSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+_NOOP_SPAN: Any = _NoOpSpan()
+
+
+class Transaction(Span):
+    """
+    Span radice di una trace locale, es. una richiesta HTTP o un job.
+
+    Il campionamento è deciso all'inizio (head-based): se la transazione
+    non è campionata i suoi span non registrano nulla e alla fine non viene
+    inviato niente. Con un ``traceparent`` in ingresso la decisione del
+    servizio chiamante viene rispettata.
+
+    Quando finisce, la transazione con i suoi span (al massimo
+    ``MAX_SPANS``) viene passata al client, che la costruisce e la invia
+    dal worker del transport insieme agli altri eventi in coda.
+    """
+
+    __slots__ = (
+        "name",
+        "sampled",
+        "sample_rate",
+        "timestamp",
+        "tags",
+        "spans",
+        "dropped_spans",
+        "client",
+        "_trace_id",
+        "_parent_span_id",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        op: str = "function",
+        trace_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        sampled: bool = True,
+        sample_rate: float = 1.0,
+        client: Any = None,
+    ) -> None:
+        self.name = name
+        self._trace_id = trace_id
+        # Span del servizio chiamante (da traceparent), fuori da questo processo
+        self._parent_span_id = parent_id
+        self.sampled = sampled
+        self.sample_rate = sample_rate
+        self.client = client
+        self.tags: Optional[Dict[str, Any]] = None
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self.timestamp = time.time()
+        super().__init__(self, None, op)
+
+    @property
+    def trace_id(self) -> str:
+        if self._trace_id is None:
+            self._trace_id = _new_id(128)
+        return self._trace_id
+
+    @property
+    def parent_id(self) -> Optional[str]:
+        return self._parent_span_id
+
+    def set_tag(self, key: str, value: Any) -> None:
+        if self.tags is None:
+            self.tags = {}
+        self.tags[key] = value
+
+    def _add_span(self, span: Span) -> None:
+        if span is self:
+            if self.sampled and self.client is not None:
+                self.client.capture_transaction(self)
+        elif len(self.spans) < MAX_SPANS:
+            self.spans.append(span)
+        else:
+            self.dropped_spans += 1
+
+
+def get_current_span() -> Optional[Span]:
+    """Span (o transazione) attivo nel thread / task corrente."""
+    return _current.get()
+
+
+def start_transaction(
+    name: str,
+    op: str = "function",
+    sampled: Optional[bool] = None,
+    traceparent: Optional[str] = None,
+) -> Transaction:
+    """
+    Inizia una transazione, da usare come context manager:
+
+        with panties.start_transaction("GET /orders", op="http.server"):
+            with panties.span("db.query", "SELECT ... FROM orders"):
+                ...
+
+    Il campionamento segue, in ordine: ``sampled`` se passato, il flag del
+    ``traceparent`` del chiamante, ``traces_sample_rate`` del client.
+    """
+    client = get_client()
+    trace_id = parent_id = None
+    sample_rate = 1.0
+    if traceparent is not None:
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, parent_sampled = parent
+            if sampled is None:
+                sampled = parent_sampled
+    if sampled is None:
+        if client is None:
+            sampled = False
+        else:
+            sampled, sample_rate = client.sample_transaction()
+    return Transaction(name, op, trace_id, parent_id, sampled, sample_rate, client)
+
+
+def span(op: str, description: Optional[str] = None) -> Any:
+    """
+    Span figlio dello span corrente, da usare come context manager. Fuori
+    da una transazione campionata non registra nulla.
+    """
+    parent = _current.get()
+    if parent is None or not parent.transaction.sampled:
+        return _NOOP_SPAN
+    return Span(parent.transaction, parent, op, description)
@@ -1,96 +1,815 @@
 # panties/transport.py
-import json
+from __future__ import annotations
+
+import atexit
+import collections
+import os
 import queue
 import threading
-import urllib.request
-import urllib.error
-from typing import Dict, Any, Optional
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from typing import TYPE_CHECKING
+
+from .compression import _compressors, compress_body
+from .log import DEBUG, get_logger
+from .metrics import TransportMetrics
+from .retry import Backoff, CircuitBreaker, is_server_error, parse_retry_after, split_rejected
+from .serializer import EventSerializer
+from .snapshot import EventSnapshot
+
+if TYPE_CHECKING:
+    from .connection import ConnectionPool
+    from .spool import SqliteSpool
 
 __all__ = ["HttpTransport"]
 
+logger = get_logger(__name__)
+
+
+def _default_batch_endpoint(endpoint: str) -> str:
+    """
+    Deriva l'endpoint batch da quello singolo:
+    ``.../api/events/`` -> ``.../api/events/batch/``.
+    """
+    return endpoint.rstrip("/") + "/batch/"
+
+
+def _split_url(url: str) -> Tuple[str, str]:
+    """Ritorna ``(origin, path)`` di un URL, con la query inclusa nel path."""
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return f"{parts.scheme}://{parts.netloc}", path
+
+
+def _before_fork(ref: "weakref.ReferenceType[HttpTransport]") -> None:
+    transport = ref()
+    if transport is not None:
+        transport._prepare_fork()
+
+
+def _after_fork_in_parent(ref: "weakref.ReferenceType[HttpTransport]") -> None:
+    transport = ref()
+    if transport is not None:
+        transport._resume_after_fork()
+
+
+def _after_fork_in_child(ref: "weakref.ReferenceType[HttpTransport]") -> None:
+    transport = ref()
+    if transport is not None:
+        transport._reset_after_fork()
+
+
+def _close_at_exit(ref: "weakref.ReferenceType[HttpTransport]") -> None:
+    transport = ref()
+    if transport is not None:
+        transport.close(transport.shutdown_timeout)
+
+
+# Moduli importati al primo uso sul percorso di invio (oltre a quelli
+# importati da _ensure_started), completati prima di un fork()
+_SEND_PATH_MODULES = ("json", "uuid", "random")
+
+# Sender temporanei al massimo (worker compresi) per svuotare la coda in flush()
+_MAX_DRAINERS = 4
+
+# Elemento in coda: evento serializzato o snapshot da costruire nel worker
+_Item = Union[bytes, EventSnapshot]
+
 
 class HttpTransport:
     """
     Transport HTTP asincrono:
-    - queue in memoria
+    - queue in memoria, limitata sia per numero di eventi
+      (``max_queue_size``) sia per byte (``max_queue_bytes``)
+    - gli ``EventSnapshot`` del client vengono costruiti e serializzati nel
+      worker; i dict all'ingresso. ``EventSerializer`` applica i limiti di
+      dimensione per campo troncando durante la codifica
     - worker thread in background
+    - gli eventi in coda vengono raggruppati in un'unica busta (batch)
+      limitata per numero di eventi, byte e tempo di attesa (linger)
+    - connessioni HTTP persistenti (keep-alive), una per ogni worker
+    - body compressi (gzip/zstd) sopra ``compress_threshold`` byte
+    - spool opzionale su disco (``spool_path``): gli eventi che non entrano
+      in coda o che non è stato possibile consegnare vengono salvati e
+      reinviati in background quando il collector torna raggiungibile
+    - fork-safe: i thread partono al primo evento e, dopo un ``fork()``,
+      il processo figlio riparte con una coda vuota e worker propri
+    - errori temporanei riprovati con backoff esponenziale e jitter, fino a
+      ``max_retries`` volte; ``Retry-After`` (429/503) viene rispettato
+    - circuit breaker: se il collector non risponde gli invii vengono
+      sospesi e gli eventi tenuti in memoria (o nello spool) finché non
+      torna raggiungibile
+    - un batch che il collector rifiuta con un 5xx (vedi
+      ``retry.is_server_error``) per ``max_server_errors`` volte di fila
+      viene diviso a metà, fino a scartare il solo evento che lo fa fallire:
+      non blocca i batch successivi
+    - ``flush(timeout)``/``close(timeout)`` rispettano la scadenza e
+      ritornano il numero di eventi non inviati; ``close`` viene chiamato
+      anche all'uscita del processo (``atexit``, con ``shutdown_timeout``)
+    - metriche in ``stats()``; con ``stats_callback`` vengono passate ogni
+      ``stats_interval`` secondi (dal thread worker) a una funzione esterna,
+      es. per inviarle al proprio sistema di metriche
     """
 
+    # Il client può passare snapshot invece di eventi già costruiti
+    accepts_snapshots = True
+
     def __init__(
         self,
         endpoint: str,
         api_token: str,
         timeout: float = 2.0,
         max_queue_size: int = 1000,
+        batch_size: int = 100,
+        batch_max_bytes: int = 512 * 1024,
+        batch_linger: float = 0.05,
+        batch_endpoint: Optional[str] = None,
+        workers: int = 1,
+        compression: Optional[str] = "gzip",
+        compress_threshold: int = 1024,
+        spool_path: Optional[str] = None,
+        spool_max_bytes: int = 50 * 1024 * 1024,
+        spool_retry_interval: float = 5.0,
+        max_retries: int = 2,
+        retry_backoff: float = 0.1,
+        retry_backoff_max: float = 2.0,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 5.0,
+        breaker_max_reset_timeout: float = 300.0,
+        max_queue_bytes: int = 8 * 1024 * 1024,
+        serializer: Optional[EventSerializer] = None,
+        shutdown_timeout: float = 2.0,
+        max_server_errors: int = 3,
+        stats_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        stats_interval: float = 60.0,
     ) -> None:
         self.endpoint = endpoint
         self.api_token = api_token
         self.timeout = timeout
-        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(
-            maxsize=max_queue_size
+        self.batch_size = max(1, batch_size)
+        self.batch_max_bytes = batch_max_bytes
+        self.batch_linger = batch_linger
+        self.batch_endpoint = batch_endpoint or _default_batch_endpoint(endpoint)
+        self.workers = max(1, workers)
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.spool_retry_interval = spool_retry_interval
+        self.max_queue_size = max_queue_size
+        self.max_queue_bytes = max_queue_bytes
+        self.serializer = serializer or EventSerializer()
+        self.shutdown_timeout = shutdown_timeout
+        self.stats_callback = stats_callback
+        self.stats_interval = stats_interval
+        self.spool_path = spool_path
+        self.spool_max_bytes = spool_max_bytes
+        self.max_retries = max(0, max_retries)
+        self.max_server_errors = max(1, max_server_errors)
+        self.retry_backoff_max = retry_backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.breaker_max_reset_timeout = breaker_max_reset_timeout
+        self._backoff = Backoff(retry_backoff, retry_backoff_max)
+        self._start_lock = threading.Lock()
+        self._setup()
+        if self._spool is not None and len(self._spool):
+            # Eventi rimasti da un'esecuzione precedente: reinviali subito
+            self._ensure_started()
+
+        # weakref: le callback non devono tenere in vita il transport
+        ref = weakref.ref(self)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(
+                before=lambda: _before_fork(ref),
+                after_in_parent=lambda: _after_fork_in_parent(ref),
+                after_in_child=lambda: _after_fork_in_child(ref),
+            )
+        atexit.register(_close_at_exit, ref)
+
+    def _setup(self) -> None:
+        """
+        Crea lo stato interno (coda, spool); pool di connessioni e thread
+        vengono creati al primo evento.
+        """
+        self._spool: "Optional[SqliteSpool]" = None
+        if self.spool_path:
+            from .spool import SqliteSpool
+
+            self._spool = SqliteSpool(self.spool_path, max_bytes=self.spool_max_bytes)
+        self._pools: "Dict[str, ConnectionPool]" = {}
+        # La coda contiene eventi serializzati o snapshot; None è il segnale di shutdown
+        self._queue: "queue.Queue[Optional[_Item]]" = queue.Queue(maxsize=self.max_queue_size)
+        # Byte in coda (e in overflow), per il limite max_queue_bytes
+        self._queued_bytes = 0
+        self._overflow_bytes = 0
+        self._bytes_lock = threading.Lock()
+        self._metrics = TransportMetrics()
+        self._next_stats = time.monotonic() + self.stats_interval
+        self._stats_lock = threading.Lock()
+        if self._spool is not None:
+            # Eventi in overflow: il thread dello spool li scrive su disco,
+            # così il thread applicativo non fa mai I/O
+            self._overflow: "collections.deque[_Item]" = collections.deque()
+            self._spool_wakeup = threading.Event()
+        self._breaker = CircuitBreaker(
+            self.breaker_threshold, self.breaker_reset_timeout, self.breaker_max_reset_timeout
         )
-        self._worker = threading.Thread(target=self._worker_loop, daemon=True)
-        self._worker.start()
+        # Batch non consegnati, tenuti in memoria (senza spool) finché il
+        # collector non torna raggiungibile; limitati come la coda. Ogni
+        # batch ha il numero di 5xx consecutivi ricevuti
+        self._held: "collections.deque[Tuple[List[bytes], int]]" = collections.deque()
+        self._held_events = 0
+        self._held_bytes = 0
+        self._held_lock = threading.Lock()
+        # Replay dello spool: righe per invio e 5xx consecutivi ricevuti
+        self._replay_size = self.batch_size
+        self._replay_failures = 0
+        self._threads: List[threading.Thread] = []
+        self._started = False
+        self._closed = False
+
+    def _ensure_started(self) -> None:
+        """Avvia i thread di invio al primo utilizzo."""
+        with self._start_lock:
+            if self._started:
+                return
+            self._endpoint_pool, self._endpoint_path = self._route(self.endpoint)
+            self._batch_pool, self._batch_path = self._route(self.batch_endpoint)
+            self._threads = [
+                threading.Thread(target=self._worker_loop, daemon=True)
+                for _ in range(self.workers)
+            ]
+            if self._spool is not None:
+                self._threads.append(threading.Thread(target=self._spool_loop, daemon=True))
+            for worker in self._threads:
+                worker.start()
+            self._started = True
+
+    def _prepare_fork(self) -> None:
+        """
+        Prima di ``fork()``: attende un eventuale avvio in corso in un altro
+        thread e completa gli import differiti del percorso di invio. Un
+        import a metà in un altro thread lascerebbe al figlio un modulo
+        incompleto (o il suo lock, tenuto da un thread che non esiste più).
+        """
+        self._start_lock.acquire()
+        if self._started:
+            for name in _SEND_PATH_MODULES:
+                __import__(name)
+            _compressors()
+
+    def _resume_after_fork(self) -> None:
+        self._start_lock.release()
+
+    def _reset_after_fork(self) -> None:
+        """
+        Nel processo figlio i thread del padre non esistono e coda, lock e
+        connessioni sono copie condivise: si riparte da uno stato pulito.
+        Gli eventi già in coda restano al padre, che li invierà.
+        """
+        self._start_lock = threading.Lock()
+        self._setup()
+
+    def _senders(self) -> int:
+        """
+        Numero massimo di thread che inviano in parallelo: worker (o sender
+        temporanei di flush) più il replay dello spool.
+        """
+        return max(self.workers, _MAX_DRAINERS) + (1 if self._spool is not None else 0)
+
+    def _route(self, url: str) -> "Tuple[ConnectionPool, str]":
+        """Ritorna il pool (condiviso per origin) e il path per ``url``."""
+        from .connection import ConnectionPool
+
+        origin, path = _split_url(url)
+        pool = self._pools.get(origin)
+        if pool is None:
+            pool = ConnectionPool(url, timeout=self.timeout, maxsize=self._senders())
+            self._pools[origin] = pool
+        return pool, path
 
     def _worker_loop(self) -> None:
         while True:
-            event = self._queue.get()
-            if event is None:
-                # Segnale di shutdown (non usato al momento)
+            if self.stats_callback is not None:
+                self._maybe_report_stats()
+            try:
+                item = self._queue.get(timeout=self._get_timeout())
+            except queue.Empty:
+                # Coda vuota ma ci sono batch in attesa: riprova a inviarli
+                self._retry_held()
+                continue
+            if item is None:
+                # Segnale di shutdown (da close)
+                self._queue.task_done()
                 break
+            if self._process(item):
+                break
+
+    def _drain_loop(self) -> None:
+        """Sender temporaneo di flush(): svuota la coda e termina."""
+        while True:
             try:
-                self._send_sync(event)
-            except Exception:
-                # Qui potresti loggare su stderr, metriche, ecc.
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                stop = True
+                self._queue.task_done()
+            else:
+                stop = self._process(item)
+            if stop:
+                # Il segnale di shutdown spetta ai worker: lo rimette in coda
+                self._queue.put(None)
+                return
+
+    def _process(self, first: _Item) -> bool:
+        """
+        Invia un batch che parte da ``first``; i batch non consegnati vengono
+        conservati. Ritorna ``True`` se è arrivato il segnale di shutdown.
+        """
+        batch, taken, stop = self._collect_batch(first)
+        try:
+            if not batch:
+                pass
+            elif not self._deliver(batch):
                 pass
-            finally:
+            elif self._spool is not None and len(self._spool):
+                # Il collector è di nuovo raggiungibile: svuota lo spool
+                self._spool_wakeup.set()
+            elif self._held:
+                self._retry_held()
+        except Exception:
+            # Qui potresti loggare su stderr, metriche, ecc.
+            pass
+        finally:
+            for _ in range(taken + stop):
                 self._queue.task_done()
+        return stop
 
-    def _send_sync(self, event: Dict[str, Any]) -> None:
-        body = json.dumps(event).encode("utf-8")
-        req = urllib.request.Request(
-            self.endpoint,
-            data=body,
-            method="POST",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_token}",
-            },
-        )
+    def _get_timeout(self) -> Optional[float]:
+        """
+        Attesa massima sulla coda: fino al prossimo tentativo sui batch in
+        sospeso o al prossimo report delle metriche, altrimenti illimitata.
+        """
+        timeout = None
+        if self._held:
+            timeout = max(self._breaker.remaining(), self.retry_backoff_max)
+        if self.stats_callback is not None:
+            until_stats = max(0.0, self._next_stats - time.monotonic())
+            timeout = until_stats if timeout is None else min(timeout, until_stats)
+        return timeout
+
+    def _maybe_report_stats(self, force: bool = False) -> None:
+        """Passa le metriche a ``stats_callback`` al massimo ogni ``stats_interval``."""
+        now = time.monotonic()
+        if not force and now < self._next_stats:
+            return
+        # Un solo worker per volta
+        if not self._stats_lock.acquire(blocking=False):
+            return
         try:
-            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
-                # Possibile gestione del body di risposta se serve
-                response_body = resp.read()
-                print(f"[Panties] Event sent successfully: {resp.status}")
-                print(f"[Panties] Response: {response_body.decode('utf-8')}")
-        except urllib.error.HTTPError as e:
-            # In produzione: log o metriche per codice HTTP
-            # e.code, e.read()
-            error_body = e.read().decode('utf-8') if e.fp else 'No error body'
-            print(f"[Panties] HTTP Error {e.code}: {error_body}")
-        except urllib.error.URLError as e:
-            # Problemi di rete
-            print(f"[Panties] URL Error: {e.reason}")
+            self._next_stats = now + self.stats_interval
+            self.stats_callback(self.stats())
+        except Exception:
+            logger.debug("stats_callback failed", exc_info=True)
+        finally:
+            self._stats_lock.release()
+
+    def _deliver(self, batch: List[bytes]) -> bool:
+        """Invia un batch preso dalla coda; se non viene consegnato lo conserva."""
+        delivered, server_errors = self._send_batch(batch)
+        if not delivered:
+            if self._spool is not None:
+                self._spool.append(batch)
+            else:
+                self._hold(self._rejected(batch, server_errors))
+        return delivered
 
-    def send(self, event: Dict[str, Any]) -> None:
+    def _rejected(self, batch: List[bytes], failures: int) -> List[Tuple[List[bytes], int]]:
+        """``split_rejected`` con ``max_server_errors``, contando gli eventi scartati."""
+        parts = split_rejected(batch, failures, self.max_server_errors)
+        if not parts:
+            logger.warning("Dropping event rejected %d times in a row by the collector", failures)
+            self._metrics.add("dropped")
+        return parts
+
+    def _hold(self, parts: List[Tuple[List[bytes], int]], front: bool = False) -> None:
+        """
+        Conserva in memoria batch non consegnati, in coda o (``front``) in
+        testa, dove vanno quelli appena riprovati.
+        """
+        with self._held_lock:
+            for part in reversed(parts) if front else parts:
+                batch = part[0]
+                if front:
+                    self._held.appendleft(part)
+                else:
+                    self._held.append(part)
+                self._held_events += len(batch)
+                self._held_bytes += sum(len(body) for body in batch)
+            # Oltre il limite si scartano i batch più vecchi
+            while len(self._held) > 1 and (
+                self._held_events > self.max_queue_size
+                or self._held_bytes > self.max_queue_bytes
+            ):
+                dropped, _ = self._held.popleft()
+                self._held_events -= len(dropped)
+                self._held_bytes -= sum(len(body) for body in dropped)
+                self._metrics.add("dropped", len(dropped))
+
+    def _retry_held(self) -> None:
+        """
+        Reinvia i batch in memoria, dal più vecchio, finché il collector
+        risponde. Un batch rifiutato troppe volte viene diviso e le sue metà
+        riprovate subito.
+        """
+        while True:
+            with self._held_lock:
+                if not self._held:
+                    return
+                batch, failures = self._held.popleft()
+                self._held_events -= len(batch)
+                self._held_bytes -= sum(len(body) for body in batch)
+            delivered, server_errors = self._send_batch(batch)
+            if delivered:
+                continue
+            parts = self._rejected(batch, failures + server_errors)
+            self._hold(parts, front=True)
+            if len(parts) == 1:
+                return
+
+    def _collect_batch(self, first: _Item):
         """
-        Inserisce l'evento in coda per l'invio asincrono.
+        Raccoglie, a partire da ``first``, gli eventi già in coda finché non
+        si raggiunge uno dei limiti (numero, byte o linger), serializzando
+        gli snapshot.
 
-        Se la coda è piena, al momento scarta l'evento.
-        In produzione potresti voler fare:
-        - bloccare
-        - o implementare una policy di drop con log/metriche.
+        Ritorna la lista di eventi serializzati, il numero di elementi presi
+        dalla coda e un flag di shutdown.
+        """
+        batch: List[bytes] = []
+        taken = 0
+        size = 0
+        cost = 0
+        item: Optional[_Item] = first
+        deadline = time.monotonic() + self.batch_linger
+
+        while item is not None:
+            taken += 1
+            cost += self._cost(item)
+            body = self._encode_item(item)
+            if body is not None:
+                batch.append(body)
+                size += len(body)
+            if len(batch) >= self.batch_size or size >= self.batch_max_bytes:
+                break
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+        self._release(cost)
+        return batch, taken, item is None
+
+    @staticmethod
+    def _cost(item: _Item) -> int:
+        """
+        Byte addebitati al budget della coda per un elemento: per uno
+        snapshot non ancora serializzato, la sua stima.
         """
+        return len(item) if type(item) is bytes else item.estimated_size()
+
+    def _encode_item(self, item: _Item) -> Optional[bytes]:
+        if type(item) is bytes:
+            return item
         try:
-            self._queue.put_nowait(event)
-        except queue.Full:
-            # Droppa l'evento silenziosamente per ora
-            # (Puoi aggiungere logging/metriche)
-            pass
+            return self.serializer.encode(item.to_event())
+        except Exception:
+            # Costruzione dell'evento fallita (es. bug in un __str__)
+            logger.warning("Failed to build event", exc_info=True)
+            self._metrics.add("dropped")
+            return None
+
+    def _release(self, size: int) -> None:
+        """Libera il budget di byte degli eventi tolti dalla coda."""
+        with self._bytes_lock:
+            self._queued_bytes -= size
+
+    def _spool_loop(self) -> None:
+        assert self._spool is not None
+        # Al primo giro reinvia subito quanto rimasto da un'esecuzione precedente
+        self._spool_wakeup.set()
+        while not self._closed:
+            self._spool_wakeup.wait(self.spool_retry_interval)
+            self._spool_wakeup.clear()
+            try:
+                self._persist_overflow()
+                self._replay_spool()
+            except Exception:
+                pass
+
+    def _persist_overflow(self) -> None:
+        assert self._spool is not None
+        bodies = []
+        cost = 0
+        while self._overflow:
+            item = self._overflow.popleft()
+            cost += self._cost(item)
+            body = self._encode_item(item)
+            if body is not None:
+                bodies.append(body)
+        with self._bytes_lock:
+            self._overflow_bytes -= cost
+        self._spool.append(bodies)
 
-    def flush(self, timeout: float = 2.0) -> None:
+    def _replay_spool(self) -> None:
         """
-        Wait for all queued events to be sent.
-        This should be called before program exit to ensure events are sent.
+        Reinvia gli eventi dello spool, dal più vecchio, finché il collector
+        risponde. Come per i batch in memoria, un gruppo rifiutato
+        ``max_server_errors`` volte viene riprovato a metà, fino a scartare
+        la riga che lo fa fallire.
+        """
+        assert self._spool is not None
+        while len(self._spool):
+            rows = self._spool.peek(self._replay_size)
+            if not rows:
+                return
+            delivered, server_errors = self._send_batch([body for _, body in rows])
+            if delivered:
+                self._spool.remove([row_id for row_id, _ in rows])
+                self._replay_failures = 0
+                continue
+            if not server_errors:
+                return
+            self._replay_failures += server_errors
+            if self._replay_failures < self.max_server_errors:
+                return
+            self._replay_failures = 0
+            if len(rows) > 1:
+                self._replay_size = max(1, len(rows) // 2)
+            else:
+                logger.warning("Dropping spooled event rejected repeatedly by the collector")
+                self._metrics.add("dropped")
+                self._spool.remove([rows[0][0]])
+                self._replay_size = self.batch_size
+
+    def _send_batch(self, batch: List[bytes]) -> Tuple[bool, int]:
+        """``_send_sync`` di un batch: un evento singolo va all'endpoint classico."""
+        if len(batch) == 1:
+            result = self._send_sync(batch[0], self._endpoint_pool, self._endpoint_path, 1)
+        else:
+            envelope = b'{"events":[' + b",".join(batch) + b"]}"
+            result = self._send_sync(envelope, self._batch_pool, self._batch_path, len(batch))
+        if not result[0]:
+            self._metrics.add("failed", len(batch))
+        return result
+
+    def _send_sync(self, body: bytes, pool: "ConnectionPool", path: str, events: int = 1) -> Tuple[bool, int]:
+        """
+        Invia un body al collector, riprovando gli errori temporanei (rete,
+        5xx, 408, 429) con backoff esponenziale e jitter.
+
+        Ritorna ``(delivered, server_errors)``: ``delivered`` è ``False`` se
+        l'invio non è riuscito e conviene riprovare più tardi (tentativi
+        esauriti, circuito aperto o ``Retry-After`` del server);
+        ``server_errors`` il numero di risposte ``is_server_error``
+        consecutive con cui si è concluso.
+        """
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_token}",
+        }
+        body, content_encoding = compress_body(body, self.compression, self.compress_threshold)
+        if content_encoding is not None:
+            headers["Content-Encoding"] = content_encoding
+
+        server_errors = 0
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self._backoff.delay(attempt - 1))
+            if not self._breaker.allow():
+                # Collector giù: nessun tentativo finché il circuito è aperto
+                return False, server_errors
+            retry, retry_after, status = self._request(pool, path, body, headers, events)
+            if not retry:
+                self._breaker.record_success()
+                return True, 0
+            server_errors = server_errors + 1 if is_server_error(status) else 0
+            self._breaker.record_failure(retry_after)
+            if retry_after is not None:
+                # Il server ha chiesto di attendere: il circuito resta aperto
+                return False, server_errors
+        return False, server_errors
+
+    def _request(
+        self,
+        pool: "ConnectionPool",
+        path: str,
+        body: bytes,
+        headers: Dict[str, str],
+        events: int,
+    ) -> Tuple[bool, Optional[float], int]:
+        """
+        Un singolo tentativo di invio. Ritorna ``(retry, retry_after,
+        status)``: ``retry`` indica un errore temporaneo, ``retry_after`` i
+        secondi richiesti dal server (429/503), ``status`` il codice HTTP
+        (0 per un errore di rete).
+        """
+        start = time.perf_counter()
+        try:
+            status, response_body, response_headers = pool.request(
+                "POST", path, body=body, headers=headers
+            )
+        except pool.errors as e:
+            # Problemi di rete
+            logger.warning("Connection error sending %d event(s): %s", events, e)
+            return True, None, 0
+        self._metrics.latency.observe(time.perf_counter() - start)
+        if status >= 400:
+            if status < 500 and status not in (408, 429):
+                # Errore definitivo (es. evento non valido): inutile riprovare
+                logger.warning(
+                    "Collector rejected %d event(s) with HTTP %d: %s",
+                    events, status, response_body[:200].decode("utf-8", "replace"),
+                )
+                self._metrics.add("dropped", events)
+                return False, None, status
+            logger.warning("Collector returned HTTP %d for %d event(s)", status, events)
+            retry_after = None
+            if status in (429, 503):
+                retry_after = parse_retry_after(response_headers.get("Retry-After"))
+            return True, retry_after, status
+        self._metrics.add("sent", events)
+        self._metrics.add("bytes_sent", len(body))
+        if logger.isEnabledFor(DEBUG):
+            logger.debug("Sent %d event(s), %d bytes: HTTP %d", events, len(body), status)
+        return False, None, status
+
+    def send(self, event: Union[Dict[str, Any], EventSnapshot]) -> None:
+        """
+        Inserisce l'evento in coda per l'invio asincrono. I dict vengono
+        serializzati subito; gli ``EventSnapshot`` restano tali e vengono
+        costruiti e serializzati dal worker.
+
+        Se la coda è piena (per numero o per byte) l'evento finisce nello
+        spool su disco (se configurato), altrimenti viene scartato.
+        """
+        if type(event) is EventSnapshot:
+            self._enqueue(event)
+        else:
+            self._enqueue(self.serializer.encode(event))
+
+    def send_encoded(self, body: bytes) -> None:
+        """
+        Come ``send`` per un evento già serializzato (JSON), es. ricevuto da
+        ``panties.relay``: viene accodato senza essere decodificato.
+        """
+        self._enqueue(body)
+
+    def _enqueue(self, body: _Item) -> None:
+        if not self._started:
+            if self._closed:
+                self._metrics.add("dropped")
+                return
+            self._ensure_started()
+        size = self._cost(body)
+        with self._bytes_lock:
+            fits = self._queued_bytes + size <= self.max_queue_bytes
+            if fits:
+                self._queued_bytes += size
+        if fits:
+            try:
+                self._queue.put_nowait(body)
+                self._metrics.add("enqueued")
+                return
+            except queue.Full:
+                self._release(size)
+
+        if self._spool is not None:
+            with self._bytes_lock:
+                fits = self._overflow_bytes + size <= self.max_queue_bytes
+                if fits:
+                    self._overflow_bytes += size
+            if fits:
+                self._overflow.append(body)
+                self._spool_wakeup.set()
+                return
+        # Senza spool (o con l'overflow pieno) l'evento viene scartato
+        self._metrics.add("dropped")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Statistiche del transport:
+
+        - coda: ``queue_depth``, ``queued_bytes``
+        - eventi: ``enqueued``, ``sent``, ``failed``, ``dropped``,
+          ``truncated`` e ``bytes_sent``
+        - ``send_latency``: istogramma delle latenze HTTP (bucket in ms,
+          p50/p99 stimati)
+        - connessioni (``connections_opened``, ``connections_reused``,
+          ``requests``), spool o eventi trattenuti in memoria (``held``) e
+          stato del circuit breaker (``circuit_open``, ``circuit_opened``)
+        """
+        totals: Dict[str, Any] = self._metrics.snapshot()
+        totals["queue_depth"] = self._queue.qsize()
+        totals["queued_bytes"] = self._queued_bytes
+        totals["truncated"] = self.serializer.truncated
+        for pool in self._pools.values():
+            for key, value in pool.stats().items():
+                totals[key] = totals.get(key, 0) + value
+        if self._spool is not None:
+            totals["spooled"] = len(self._spool)
+            totals["spool_bytes"] = self._spool.size_bytes
+            totals["spool_evicted"] = self._spool.evicted
+        else:
+            totals["held"] = self._held_events
+        totals["circuit_open"] = int(self._breaker.state != CircuitBreaker.CLOSED)
+        totals["circuit_opened"] = self._breaker.opened
+        return totals
+
+    def _unsent(self) -> int:
+        """Eventi non ancora consegnati né salvati nello spool."""
+        unsent = self._queue.unfinished_tasks + self._held_events
+        if self._spool is not None:
+            unsent += len(self._overflow)
+        return unsent
+
+    def _start_drainers(self) -> None:
+        """Avvia sender temporanei se la coda contiene più di un batch per worker."""
+        if self._breaker.state != CircuitBreaker.CLOSED:
+            return
+        extra = min(_MAX_DRAINERS - self.workers, self._queue.qsize() // self.batch_size - self.workers)
+        for _ in range(max(0, extra)):
+            threading.Thread(target=self._drain_loop, daemon=True).start()
+
+    def _wait_queue(self, deadline: float) -> None:
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._queue.all_tasks_done.wait(remaining)
+
+    def flush(self, timeout: float = 2.0) -> int:
+        """
+        Attende l'invio degli eventi in coda, al massimo ``timeout`` secondi;
+        se la coda è lunga la svuota in parallelo con sender temporanei.
+
+        Ritorna il numero di eventi non ancora inviati alla scadenza. Con lo
+        spool, gli eventi in overflow vengono salvati su disco prima di
+        tornare e non contano come non inviati.
+        """
+        deadline = time.monotonic() + max(0.0, timeout)
+        if self._started:
+            self._start_drainers()
+            self._wait_queue(deadline)
+        if self._spool is not None and self._overflow:
+            self._persist_overflow()
+        return self._unsent()
+
+    def close(self, timeout: float = 2.0) -> int:
+        """
+        Invia gli eventi in coda entro ``timeout`` secondi, ferma i worker e
+        rilascia connessioni e spool. Gli eventi inviati dopo ``close``
+        vengono scartati.
+
+        Ritorna il numero di eventi rimasti non inviati.
         """
-        self._queue.join()  # Wait for all items to be processed
+        if self._closed:
+            return self._unsent()
+        deadline = time.monotonic() + max(0.0, timeout)
+        unsent = self.flush(timeout)
+        with self._start_lock:
+            self._closed = True
+            started, self._started = self._started, False
+        if started:
+            for _ in range(self.workers):
+                try:
+                    self._queue.put_nowait(None)
+                except queue.Full:
+                    # Worker ancora occupati alla scadenza: sono daemon
+                    break
+            if self._spool is not None:
+                self._spool_wakeup.set()
+            for thread in self._threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+        if self.stats_callback is not None:
+            self._maybe_report_stats(force=True)
+        if any(thread.is_alive() for thread in self._threads):
+            # Scadenza raggiunta con invii in corso: le risorse restano ai thread
+            return unsent
+        for pool in self._pools.values():
+            pool.close()
+        if self._spool is not None:
+            self._persist_overflow()
+            self._spool.close()
+        return unsent
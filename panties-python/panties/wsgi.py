@@ -0,0 +1,128 @@
+# panties/wsgi.py
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from .request import (
+    WSGIRequest,
+    _request,
+    capture_request_exception,
+    end_request_session,
+    set_request_result,
+    start_request_session,
+    start_request_transaction,
+)
+from .scope import push_scope
+from .tracing import Transaction, _current
+
+__all__ = ["PantiesWSGIMiddleware"]
+
+
+class PantiesWSGIMiddleware:
+    """
+    Middleware WSGI (Flask, Werkzeug, qualsiasi app PEP 3333):
+
+        app.wsgi_app = PantiesWSGIMiddleware(app.wsgi_app)
+
+    Le eccezioni non gestite (anche durante l'iterazione della risposta)
+    vengono inviate con il contesto della richiesta e poi rilanciate. Gli
+    eventi catturati durante la richiesta hanno lo stesso contesto; tag,
+    extra e contesti impostati dall'app valgono solo per la richiesta.
+
+    Con ``traces_sample_rate`` > 0 ogni richiesta campionata è una
+    transazione ``http.server`` (che segue l'header ``traceparent``) e dura
+    fino alla chiusura della risposta. Con ``auto_session_tracking`` ogni
+    richiesta è anche una sessione, chiusa insieme alla risposta.
+    """
+
+    __slots__ = ("app",)
+
+    def __init__(self, app: Callable[..., Iterable[bytes]]) -> None:
+        self.app = app
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable[..., Any]) -> Iterable[bytes]:
+        info = WSGIRequest(environ)
+        start_request_session(info)
+        txn = start_request_transaction(info)
+        if txn is not None:
+            start_response = _recording(start_response, txn)
+            span_token = _current.set(txn)
+        token = _request.set(info)
+        with push_scope():
+            try:
+                iterable = self.app(environ, start_response)
+            except Exception:
+                capture_request_exception(info)
+                if txn is not None:
+                    txn.set_status("internal_error")
+                    _finish(txn, info)
+                end_request_session(info)
+                raise
+            finally:
+                _request.reset(token)
+                if txn is not None:
+                    _current.reset(span_token)
+        if txn is None and type(iterable) is list:
+            # Risposta già in memoria: l'iterazione non può fallire
+            end_request_session(info)
+            return iterable
+        return _Response(iterable, info, txn)
+
+
+class _Response:
+    """
+    Risposta dell'app avvolta: cattura gli errori durante l'iterazione e
+    chiude transazione e sessione in ``close()``, chiamato dal server a fine
+    invio.
+    """
+
+    __slots__ = ("_iterable", "_info", "_transaction")
+
+    def __init__(self, iterable: Iterable[bytes], info: WSGIRequest, txn: Optional[Transaction]) -> None:
+        self._iterable = iterable
+        self._info = info
+        self._transaction = txn
+
+    def __iter__(self) -> Iterator[bytes]:
+        # Il contesto della richiesta non viene reimpostato qui: un generatore
+        # abbandonato può essere chiuso più tardi, in un'altra richiesta
+        try:
+            yield from self._iterable
+        except Exception:
+            capture_request_exception(self._info)
+            if self._transaction is not None:
+                self._transaction.set_status("internal_error")
+            raise
+
+    def close(self) -> None:
+        try:
+            close = getattr(self._iterable, "close", None)
+            if close is not None:
+                close()
+        except Exception:
+            capture_request_exception(self._info)
+            if self._transaction is not None:
+                self._transaction.set_status("internal_error")
+            raise
+        finally:
+            if self._transaction is not None:
+                _finish(self._transaction, self._info)
+                self._transaction = None
+            end_request_session(self._info)
+
+
+def _recording(start_response: Callable[..., Any], txn: Transaction) -> Callable[..., Any]:
+    def start_response_recording(status: str, headers: Any, exc_info: Any = None) -> Any:
+        try:
+            txn.set_tag("http.status_code", int(status[:3]))
+        except ValueError:
+            pass
+        return start_response(status, headers, exc_info)
+
+    return start_response_recording
+
+
+def _finish(txn: Transaction, info: WSGIRequest) -> None:
+    code = txn.tags.get("http.status_code") if txn.tags else None
+    set_request_result(txn, info, code)
+    txn.finish()
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+# Collector HTTP finto condiviso con i benchmark
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from _collector import Collector  # noqa: E402
+from panties.client import PantiesClient  # noqa: E402
+from panties.state import set_client  # noqa: E402
+
+
+class ListTransport:
+    """Transport che tiene in memoria gli eventi, costruiti dal client."""
+
+    def __init__(self):
+        self.events = []
+
+    def send(self, event):
+        self.events.append(event)
+
+    def flush(self, timeout=2.0):
+        return 0
+
+    def close(self, timeout=2.0):
+        return 0
+
+
+class SnapshotTransport(ListTransport):
+    """Come ``ListTransport``, ma riceve gli snapshot non ancora costruiti."""
+
+    accepts_snapshots = True
+
+
+@pytest.fixture
+def collector():
+    with Collector() as server:
+        yield server
+
+
+@pytest.fixture
+def transport():
+    return ListTransport()
+
+
+@pytest.fixture
+def client(transport):
+    """Client globale (``set_client``) con ``transport`` e senza dedupe."""
+    client = PantiesClient("test", "http://collector.invalid/api/events/", transport=transport, dedupe_window=0)
+    set_client(client)
+    yield client
+    set_client(None)
+    client.close(0)
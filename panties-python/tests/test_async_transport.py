@@ -0,0 +1,47 @@
+"""
+``AsyncHttpTransport`` contro il collector HTTP finto dei benchmark.
+"""
+import asyncio
+import threading
+
+from panties.async_transport import AsyncHttpTransport
+from panties.snapshot import EventSnapshot
+
+
+def _event(origin, i):
+    return {"event_id": f"{origin}-{i}", "type": "message", "message": {"text": "test", "level": "info"}}
+
+
+def test_async_flush_and_close(collector):
+    async def run():
+        transport = AsyncHttpTransport(collector.endpoint, "test", batch_size=20)
+        for i in range(50):
+            transport.send(_event("async", i))
+        assert await transport.aflush(5.0) == 0
+        assert collector.stats["events"] == 50
+        assert await transport.aclose() == 0
+        transport.send(_event("async", 50))
+        assert transport.stats()["dropped"] == 1
+
+    asyncio.run(run())
+
+
+def test_snapshots_built_off_the_event_loop(collector):
+    threads = []
+
+    def builder(snapshot):
+        threads.append(threading.current_thread())
+        return _event("snapshot", len(threads))
+
+    async def run():
+        transport = AsyncHttpTransport(collector.endpoint, "test")
+        for _ in range(10):
+            transport.send(EventSnapshot(builder, "message", 0.0))
+        transport.send(_event("dict", 0))
+        assert await transport.aflush(5.0) == 0
+        await transport.aclose()
+
+    asyncio.run(run())
+    assert collector.stats["events"] == 11
+    assert len(threads) == 10
+    assert threading.main_thread() not in threads
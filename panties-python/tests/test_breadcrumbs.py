@@ -0,0 +1,92 @@
+"""Breadcrumb per thread / task e integrazione con ``logging``."""
+import asyncio
+import logging
+import threading
+
+import pytest
+
+from panties.breadcrumbs import MAX_BREADCRUMBS, add_breadcrumb, clear_breadcrumbs
+from panties.logging import BreadcrumbHandler
+
+
+@pytest.fixture(autouse=True)
+def _clean():
+    clear_breadcrumbs()
+    yield
+    clear_breadcrumbs()
+
+
+@pytest.fixture
+def logger():
+    logger = logging.getLogger("tests.breadcrumbs")
+    logger.setLevel(logging.DEBUG)
+    handler = BreadcrumbHandler(logging.INFO)
+    logger.addHandler(handler)
+    yield logger
+    logger.removeHandler(handler)
+
+
+def _messages(event):
+    return [crumb["message"] for crumb in event.get("breadcrumbs", ())]
+
+
+def test_ring_buffer_keeps_the_latest(client, transport):
+    for i in range(MAX_BREADCRUMBS + 50):
+        add_breadcrumb(f"step {i}", data={"i": i})
+    client.capture_message("done")
+    (event,) = transport.events
+    assert _messages(event) == [f"step {i}" for i in range(50, MAX_BREADCRUMBS + 50)]
+    assert event["breadcrumbs"][-1]["data"] == {"i": MAX_BREADCRUMBS + 49}
+
+
+def test_log_records_become_breadcrumbs(client, transport, logger):
+    logger.debug("ignored")
+    logger.info("order %s paid", 42)
+    logging.getLogger("panties.transport").warning("sdk")
+    client.capture_message("done")
+    (crumb,) = transport.events[0]["breadcrumbs"]
+    assert (crumb["category"], crumb["level"], crumb["message"]) == ("tests.breadcrumbs", "info", "order 42 paid")
+
+
+def test_arguments_are_formatted_when_captured(client, transport, logger):
+    class Order:
+        state = "new"
+
+        def __str__(self):
+            return self.state
+
+    order = Order()
+    logger.info("order %s", order)
+    order.state = "paid"
+    client.capture_message("done")
+    order.state = "refunded"
+    # Formattato alla cattura, sul thread dell'applicazione
+    assert _messages(transport.events[0]) == ["order paid"]
+
+
+def test_buffers_are_per_thread(client, transport):
+    add_breadcrumb("main")
+
+    def worker():
+        add_breadcrumb("worker")
+        client.capture_message("from worker")
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    client.capture_message("from main")
+    assert [_messages(event) for event in transport.events] == [["worker"], ["main"]]
+
+
+def test_tasks_inherit_but_do_not_share(client, transport):
+    async def task(name):
+        add_breadcrumb(name)
+        await asyncio.sleep(0)
+        client.capture_message(name)
+
+    async def main():
+        add_breadcrumb("before")
+        await asyncio.gather(task("a"), task("b"))
+
+    asyncio.run(main())
+    assert [_messages(event) for event in transport.events] == [["before", "a"], ["before", "b"]]
@@ -0,0 +1,93 @@
+"""Catene di eccezioni (``__cause__``/``__context__``) ed ``ExceptionGroup``."""
+import sys
+
+import pytest
+
+from panties.chain import extract_exception_chain
+
+
+def _fail(error):
+    raise error
+
+
+def _capture(client, transport, work):
+    try:
+        work()
+    except BaseException:
+        client.capture_exception()
+    return transport.events[0]["exception"]
+
+
+def _relations(exception):
+    return [(node["type"], node["parent"], node["relation"]) for node in exception["exceptions"]]
+
+
+def test_cause_and_context_are_linked(client, transport):
+    def work():
+        try:
+            _fail(KeyError("k"))
+        except KeyError as error:
+            raise ValueError("v") from error
+
+    exception = _capture(client, transport, work)
+    assert _relations(exception) == [("ValueError", None, None), ("KeyError", 0, "cause")]
+    inner = exception["exceptions"][1]
+    assert [exception["frames"][i]["function"] for i in inner["frames"]][-1] == "_fail"
+
+
+def test_suppressed_context_is_not_reported(client, transport):
+    def work():
+        try:
+            _fail(KeyError("k"))
+        except KeyError:
+            raise ValueError("v") from None
+
+    exception = _capture(client, transport, work)
+    assert "exceptions" not in exception
+    assert exception["type"] == "ValueError"
+
+
+def test_implicit_context_and_cycles():
+    try:
+        try:
+            _fail(KeyError("k"))
+        except KeyError:
+            raise RuntimeError("r")
+    except RuntimeError as error:
+        # Ciclo creato a mano: ogni eccezione compare una volta sola
+        error.__context__.__context__ = error
+        _, exceptions = extract_exception_chain(error)
+    assert [(node["type"], node["relation"]) for node in exceptions] == [("RuntimeError", None), ("KeyError", "context")]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 11), reason="ExceptionGroup richiede Python 3.11")
+def test_exception_group_tree_shares_frames(client, transport):
+    def work():
+        errors = []
+        for error in (ValueError("a"), TypeError("b")):
+            try:
+                _fail(error)
+            except Exception as caught:
+                errors.append(caught)
+        raise ExceptionGroup("batch", errors)  # noqa: F821
+
+    exception = _capture(client, transport, work)
+    assert _relations(exception) == [
+        ("ExceptionGroup", None, None), ("ValueError", 0, "group"), ("TypeError", 0, "group"),
+    ]
+    assert exception["exceptions"][0]["is_group"]
+    first, second = exception["exceptions"][1]["frames"], exception["exceptions"][2]["frames"]
+    # Stessa riga di ``_fail`` in entrambi i traceback: un solo frame in tabella
+    assert first[-1] == second[-1]
+    assert len(exception["frames"]) == len({i for node in exception["exceptions"] for i in node["frames"]})
+
+
+def test_tree_size_is_bounded():
+    error = ValueError(0)
+    for i in range(1, 10):
+        try:
+            raise ValueError(i) from error
+        except ValueError as raised:
+            error = raised
+    _, exceptions = extract_exception_chain(error, max_exceptions=4)
+    assert [node["message"] for node in exceptions] == ["9", "8", "7", "6"]
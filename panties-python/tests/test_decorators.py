@@ -0,0 +1,108 @@
+"""``capture_exceptions`` su funzioni, coroutine e generatori."""
+import asyncio
+import functools
+import inspect
+
+import pytest
+
+from panties.decorators import capture_exceptions, capture_exceptions_ctx
+
+
+def _types(transport):
+    return [event["exception"]["type"] for event in transport.events]
+
+
+def test_function_is_wrapped_and_reraises(client, transport):
+    @capture_exceptions
+    def charge(amount):
+        """Addebita."""
+        if amount < 0:
+            raise ValueError(amount)
+        return amount
+
+    assert (charge.__name__, charge.__doc__, charge(3)) == ("charge", "Addebita.", 3)
+    with pytest.raises(ValueError):
+        charge(-1)
+    assert _types(transport) == ["ValueError"]
+
+
+def test_coroutine_is_awaited(client, transport):
+    @capture_exceptions
+    async def charge():
+        await asyncio.sleep(0)
+        raise ValueError("async")
+
+    assert inspect.iscoroutinefunction(charge)
+    with pytest.raises(ValueError):
+        asyncio.run(charge())
+    assert _types(transport) == ["ValueError"]
+
+
+def test_generator_errors_during_iteration(client, transport):
+    @capture_exceptions
+    def rows():
+        received = yield 1
+        yield received
+        raise KeyError("row")
+
+    gen = rows()
+    assert (next(gen), gen.send("sent")) == (1, "sent")
+    with pytest.raises(KeyError):
+        next(gen)
+    assert _types(transport) == ["KeyError"]
+
+
+def test_async_generator_forwards_send_throw_and_close(client, transport):
+    closed = []
+
+    @capture_exceptions
+    async def rows():
+        try:
+            received = yield 1
+            try:
+                yield received
+            except TypeError:
+                yield "handled"
+            yield 3
+            raise KeyError("row")
+        finally:
+            closed.append(True)
+
+    async def main():
+        agen = rows()
+        assert await agen.__anext__() == 1
+        assert await agen.asend("sent") == "sent"
+        assert await agen.athrow(TypeError()) == "handled"
+        assert [item async for item in agen] == [3]
+
+    with pytest.raises(KeyError):
+        asyncio.run(main())
+    assert _types(transport) == ["KeyError"]
+    assert closed == [True]
+
+
+def test_partial_of_coroutine_is_recognized(client, transport):
+    async def charge(amount):
+        raise ValueError(amount)
+
+    wrapped = capture_exceptions(functools.partial(charge, 1))
+    with pytest.raises(ValueError):
+        asyncio.run(wrapped())
+    assert _types(transport) == ["ValueError"]
+
+
+def test_context_manager_sync_and_async(client, transport):
+    with pytest.raises(ValueError):
+        with capture_exceptions_ctx():
+            raise ValueError("sync")
+
+    async def main():
+        async with capture_exceptions_ctx():
+            raise TypeError("async")
+
+    with pytest.raises(TypeError):
+        asyncio.run(main())
+    with pytest.raises(KeyboardInterrupt):
+        with capture_exceptions_ctx():
+            raise KeyboardInterrupt
+    assert _types(transport) == ["ValueError", "TypeError"]
@@ -0,0 +1,64 @@
+"""
+Fingerprint delle eccezioni e aggregazione dei duplicati nel client.
+"""
+import pytest
+
+from panties.client import PantiesClient
+from panties.fingerprint import DuplicateAggregator, exception_key, fingerprint_hex
+from panties.state import set_client
+
+
+@pytest.fixture
+def client(transport):
+    client = PantiesClient("test", "http://collector.invalid/api/events/", transport=transport, dedupe_window=60)
+    set_client(client)
+    yield client
+    set_client(None)
+    client.close(0)
+
+
+def _fail(message):
+    raise ValueError(message)
+
+
+def _capture(client, message="boom"):
+    try:
+        _fail(message)
+    except ValueError:
+        client.capture_exception()
+
+
+def test_fingerprint_ignores_the_message():
+    keys = []
+    for message in ("user 1 not found", "user 2 not found"):
+        try:
+            _fail(message)
+        except ValueError as exc:
+            keys.append(exception_key(type(exc), exc.__traceback__))
+    assert keys[0] == keys[1]
+    assert fingerprint_hex(keys[0]) == fingerprint_hex(keys[1])
+    assert len(fingerprint_hex(keys[0])) == 40
+
+
+def test_duplicates_become_one_summary(client, transport):
+    for i in range(5):
+        _capture(client, f"boom {i}")
+    assert len(transport.events) == 1
+    first = transport.events[0]
+    client.flush()
+    assert len(transport.events) == 2
+    summary = transport.events[1]
+    assert summary["fingerprint"] == first["fingerprint"]
+    assert summary["aggregation"]["count"] == 4
+    assert summary["event_id"] != first["event_id"]
+
+
+def test_aggregator_windows():
+    aggregator = DuplicateAggregator(window=10.0, max_fingerprints=2)
+    assert aggregator.record("a", 0.0) == (True, [])
+    assert aggregator.record("a", 1.0) == (False, [])
+    # Oltre max_fingerprints la finestra più vecchia viene chiusa subito
+    aggregator.record("b", 2.0)
+    _, closed = aggregator.record("c", 3.0)
+    assert [window.count for window in closed] == [1]
+    assert aggregator.record("b", 20.0)[0]
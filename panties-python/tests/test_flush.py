@@ -0,0 +1,51 @@
+"""
+Semantica di flush/close di ``HttpTransport``, contro il collector HTTP
+finto dei benchmark.
+"""
+import time
+
+from panties.transport import HttpTransport
+
+
+def _event(origin, i):
+    return {"event_id": f"{origin}-{i}", "type": "message", "message": {"text": "test", "level": "info"}}
+
+
+def test_flush_sends_queued_events(collector):
+    transport = HttpTransport(collector.endpoint, "test", batch_size=50)
+    for i in range(120):
+        transport.send(_event("flush", i))
+    assert transport.flush(5.0) == 0
+    assert collector.stats["events"] == 120
+    stats = transport.stats()
+    assert (stats["sent"], stats["queue_depth"]) == (120, 0)
+    assert transport.close() == 0
+
+
+def test_flush_returns_unsent_at_deadline(collector):
+    collector.delay(1.0)
+    transport = HttpTransport(collector.endpoint, "test", timeout=5.0, batch_linger=0.0)
+    transport.send(_event("slow", 0))
+    start = time.monotonic()
+    assert transport.flush(0.1) == 1
+    assert time.monotonic() - start < 0.5
+    assert transport.flush(5.0) == 0
+    assert collector.stats["events"] == 1
+    transport.close()
+
+
+def test_flush_without_events_does_not_start_workers(collector):
+    transport = HttpTransport(collector.endpoint, "test")
+    assert transport.flush(0.1) == 0
+    assert not transport._started
+    transport.close()
+
+
+def test_events_after_close_are_dropped(collector):
+    transport = HttpTransport(collector.endpoint, "test")
+    transport.send(_event("close", 0))
+    assert transport.close(5.0) == 0
+    transport.send(_event("close", 1))
+    assert transport.flush(0.1) == 0
+    assert transport.stats()["dropped"] == 1
+    assert collector.stats["events"] == 1
@@ -0,0 +1,82 @@
+"""
+Fork-safety di ``HttpTransport`` (server preforking, multiprocessing),
+contro il collector HTTP finto dei benchmark.
+"""
+import os
+import threading
+import time
+
+import pytest
+
+from panties.transport import HttpTransport
+
+
+def _event(origin, i):
+    return {"event_id": f"{origin}-{i}", "type": "message", "message": {"text": "test", "level": "info"}}
+
+
+fork_only = pytest.mark.skipif(not hasattr(os, "fork"), reason="os.fork non disponibile")
+
+
+def _fork(work):
+    """Esegue ``work()`` in un processo figlio; ritorna il pid."""
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = 0 if work() else 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def _exit_code(pid):
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+@fork_only
+def test_child_sends_with_own_worker(collector):
+    transport = HttpTransport(collector.endpoint, "test")
+    transport.send(_event("parent", 0))
+    assert transport.flush(5.0) == 0
+
+    def child():
+        # Coda vuota e nessun thread ereditato: il worker parte al primo evento
+        if transport._started or transport.stats()["queue_depth"]:
+            return False
+        for i in range(50):
+            transport.send(_event("child", i))
+        return transport.flush(5.0) == 0 and transport.stats()["sent"] == 50
+
+    assert _exit_code(_fork(child)) == 0
+    assert collector.stats["events"] == 51
+    transport.close()
+
+
+@fork_only
+def test_fork_under_load_loses_no_events(collector):
+    parent_events, children, per_child = 1000, 4, 200
+    transport = HttpTransport(collector.endpoint, "test", max_queue_size=parent_events + 1)
+
+    def load():
+        for i in range(parent_events):
+            transport.send(_event("parent", i))
+            if i % 100 == 0:
+                time.sleep(0.001)
+
+    def child(c):
+        for i in range(per_child):
+            transport.send(_event(f"child{c}", i))
+        return transport.flush(5.0) == 0
+
+    loader = threading.Thread(target=load)
+    loader.start()
+    pids = [_fork(lambda c=c: child(c)) for c in range(children)]
+    assert [_exit_code(pid) for pid in pids] == [0] * children
+    loader.join()
+    assert transport.flush(10.0) == 0
+    # Eventi in coda nel padre al momento del fork: inviati una volta sola
+    assert collector.stats["events"] == parent_events + children * per_child
+    transport.close()
+
@@ -0,0 +1,72 @@
+"""
+Frame strutturati con righe di contesto, dalla cache di frame e sorgenti.
+"""
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+from panties import frames
+from panties.frames import extract_frames
+
+SOURCE = '''\
+def fail():
+    a = 1
+    b = 2
+    raise ValueError("{marker}")
+'''
+
+
+@pytest.fixture
+def module(tmp_path, monkeypatch):
+    monkeypatch.setattr(frames, "MTIME_CHECK_INTERVAL", 0.0)
+    path = tmp_path / "app_module.py"
+    path.write_text(SOURCE.format(marker="first"))
+    spec = importlib.util.spec_from_file_location("app_module", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    yield module, path
+    sys.modules.pop("app_module", None)
+    frames.clear_cache()
+
+
+def _frames(function):
+    try:
+        function()
+    except Exception as exc:
+        return extract_frames(exc.__traceback__)
+
+
+def test_frame_fields_and_context(module):
+    module, path = module
+    frame = _frames(module.fail)[-1]
+    assert frame["filename"] == str(path)
+    assert (frame["function"], frame["module"], frame["lineno"]) == ("fail", "app_module", 4)
+    assert frame["in_app"] is True
+    assert frame["context_line"] == '    raise ValueError("first")'
+    assert frame["pre_context"] == ["def fail():", "    a = 1", "    b = 2"]
+    assert frame["post_context"] == []
+
+
+def test_library_frames_are_not_in_app():
+    frame = _frames(lambda: json.loads("{"))[-1]
+    assert frame["module"].startswith("json")
+    assert frame["in_app"] is False
+
+
+def test_source_reloaded_when_file_changes(module):
+    module, path = module
+    assert _frames(module.fail)[-1]["context_line"].endswith('"first")')
+    # Le righe in cache sono quelle del file: cambiato l'mtime vengono rilette
+    path.write_text(SOURCE.format(marker="second"))
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert _frames(module.fail)[-1]["context_line"].endswith('"second")')
+
+
+def test_cached_frames_are_copies(module):
+    module, _ = module
+    _frames(module.fail)[-1]["vars"] = {"a": "1"}
+    assert "vars" not in _frames(module.fail)[-1]
@@ -0,0 +1,26 @@
+"""
+``import panties`` + ``init()`` non importano i moduli pesanti e non
+avviano thread: tutto è differito al primo evento.
+"""
+from bench_import import DEFERRED, _run
+
+
+def test_init_defers_heavy_imports_and_threads():
+    result, _ = _run()
+    assert [name for name in DEFERRED if name in result["modules"]] == []
+    assert result["threads"] == 1
+
+
+def test_first_event_starts_the_send_path():
+    result, _ = _run(
+        "import panties\n"
+        "panties.init(api_token='test', endpoint='http://127.0.0.1:9/api/events/', timeout=0.1)\n"
+        "panties.capture_message('hello')\n"
+        "panties.close(0)\n"
+    )
+    assert "http.client" in result["modules"]
+
+
+def test_async_transport_is_loaded_on_access():
+    result, _ = _run("import panties\npanties.AsyncHttpTransport")
+    assert "asyncio" in result["modules"]
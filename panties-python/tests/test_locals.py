@@ -0,0 +1,56 @@
+"""Variabili locali (``capture_locals``) allegate ai frame in-app."""
+import pytest
+
+from panties.client import PantiesClient
+from panties.state import set_client
+
+
+@pytest.fixture
+def client(transport):
+    client = PantiesClient(
+        "test", "http://collector.invalid/api/events/", transport=transport,
+        dedupe_window=0, capture_locals=True,
+    )
+    set_client(client)
+    yield client
+    set_client(None)
+    client.close(0)
+
+
+def _recurse(depth, error):
+    if depth == 0:
+        raise error
+    _recurse(depth - 1, error)
+
+
+def _depths(table, indices):
+    return [table[i]["vars"]["depth"] for i in indices if table[i]["function"] == "_recurse"]
+
+
+def test_recursive_frames_keep_their_own_locals(client, transport):
+    try:
+        _recurse(3, ValueError("plain"))
+    except ValueError:
+        client.capture_exception()
+    frames = transport.events[0]["exception"]["frames"]
+    assert _depths(frames, range(len(frames))) == ["3", "2", "1", "0"]
+
+
+def test_shared_frame_table_keeps_locals_per_occurrence(client, transport):
+    try:
+        _recurse(1, ValueError("cause"))
+    except ValueError as exc:
+        cause = exc
+    error = KeyError("outer")
+    error.__cause__ = cause
+    try:
+        _recurse(3, error)
+    except KeyError:
+        client.capture_exception()
+    exception = transport.events[0]["exception"]
+    table = exception["frames"]
+    primary, chained = exception["exceptions"]
+    assert chained["relation"] == "cause"
+    # Stessi code object/righe in più occorrenze e nella causa: ognuna le sue vars
+    assert _depths(table, primary["frames"]) == ["3", "2", "1", "0"]
+    assert not any("vars" in table[i] for i in chained["frames"])
@@ -0,0 +1,74 @@
+"""``PantiesHandler``: record di logging inviati come eventi."""
+import logging
+
+import pytest
+
+from panties.client import PantiesClient
+from panties.logging import PantiesHandler
+
+
+@pytest.fixture
+def logger(client):
+    logger = logging.getLogger("tests.handler")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    handler = PantiesHandler()
+    logger.addHandler(handler)
+    yield logger
+    logger.removeHandler(handler)
+    logger.propagate = True
+
+
+def test_errors_are_sent_as_messages(logger, transport):
+    logger.warning("not sent")
+    logger.error("payment %s failed", 42)
+    (event,) = transport.events
+    assert (event["type"], event["message"]["text"], event["message"]["level"]) == ("message", "payment 42 failed", "error")
+    assert event["tags"]["logger"] == "tests.handler"
+    assert event["extra"]["function"] == "test_errors_are_sent_as_messages"
+
+
+def test_exc_info_is_sent_as_exception(logger, transport):
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("while paying %s", 42)
+    (event,) = transport.events
+    assert (event["exception"]["type"], event["exception"]["message"]) == ("ValueError", "boom")
+    assert event["extra"]["log_message"] == "while paying 42"
+
+
+def test_identical_records_are_aggregated(transport):
+    client = PantiesClient("test", "http://collector.invalid/api/events/", transport=transport, dedupe_window=60)
+    logger = logging.getLogger("tests.handler.dedupe")
+    handler = PantiesHandler(client=client)
+    logger.addHandler(handler)
+    try:
+        for i in range(5):
+            logger.error("payment %s failed", i)
+        logger.error("other")
+        client.flush()
+    finally:
+        logger.removeHandler(handler)
+        client.close(0)
+    texts = [event["message"]["text"] for event in transport.events]
+    assert texts == ["payment 0 failed", "other", "payment 0 failed"]
+    assert transport.events[2]["aggregation"]["count"] == 4
+
+
+def test_sdk_and_reentrant_records_are_ignored(client, transport, logger):
+    handler = logger.handlers[0]
+    logging.getLogger("panties.transport").addHandler(handler)
+    try:
+        logging.getLogger("panties.transport").error("sdk")
+    finally:
+        logging.getLogger("panties.transport").removeHandler(handler)
+
+    def send(event):
+        transport.events.append(event)
+        # Un transport che logga mentre invia non genera altri eventi
+        logger.error("from transport")
+
+    client.transport.send = send
+    logger.error("app")
+    assert [event["message"]["text"] for event in transport.events] == ["app"]
@@ -0,0 +1,117 @@
+"""Contesto della richiesta nei middleware WSGI, ASGI e Django."""
+import asyncio
+
+import pytest
+
+import panties
+from conftest import SnapshotTransport
+from panties.asgi import PantiesASGIMiddleware
+from panties.client import PantiesClient
+from panties.scope import get_scope
+from panties.state import set_client
+from panties.wsgi import PantiesWSGIMiddleware
+
+
+def _environ(**extra):
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": "/orders/42",
+        "QUERY_STRING": "page=2",
+        "SERVER_NAME": "shop.local",
+        "SERVER_PORT": "80",
+        "wsgi.url_scheme": "http",
+        "HTTP_AUTHORIZATION": "Bearer secret",
+        "HTTP_USER_AGENT": "test",
+        "wsgi.input": object(),
+    }
+    environ.update(extra)
+    return environ
+
+
+def _failing_app(environ, start_response):
+    panties.set_tag("order", environ["PATH_INFO"])
+    raise RuntimeError("boom")
+
+
+def test_wsgi_captures_request_context(client, transport):
+    app = PantiesWSGIMiddleware(_failing_app)
+    with pytest.raises(RuntimeError):
+        app(_environ(), None)
+    (event,) = transport.events
+    request = event["contexts"]["request"]
+    assert (request["method"], request["url"], request["query_string"]) == (
+        "POST", "http://shop.local/orders/42", "page=2",
+    )
+    assert request["headers"] == {"Authorization": "[Filtered]", "User-Agent": "test"}
+    assert event["tags"]["order"] == "/orders/42"
+
+
+def test_wsgi_scope_is_per_request(client, transport):
+    app = PantiesWSGIMiddleware(_failing_app)
+    for path in ("/a", "/b"):
+        with pytest.raises(RuntimeError):
+            app(_environ(PATH_INFO=path), None)
+    assert [event["tags"]["order"] for event in transport.events] == ["/a", "/b"]
+    assert not get_scope()
+
+
+def test_event_built_after_request_reads_a_copy():
+    transport = SnapshotTransport()
+    client = PantiesClient("test", "http://collector.invalid/api/events/", transport=transport, dedupe_window=0)
+    set_client(client)
+    environ = _environ()
+    try:
+        with pytest.raises(RuntimeError):
+            PantiesWSGIMiddleware(_failing_app)(environ, None)
+        # Il server riusa l'environ per la richiesta successiva
+        environ.clear()
+        environ.update(_environ(PATH_INFO="/next", HTTP_USER_AGENT="other"))
+        (snapshot,) = transport.events
+        request = snapshot.to_event()["contexts"]["request"]
+    finally:
+        set_client(None)
+        client.close(0)
+    assert request["url"] == "http://shop.local/orders/42"
+    assert request["headers"]["User-Agent"] == "test"
+
+
+def test_asgi_captures_route_and_headers(client, transport):
+    class Route:
+        path = "/orders/{order_id}"
+
+    async def app(scope, receive, send):
+        scope["route"] = Route()
+        raise ValueError("boom")
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "scheme": "https",
+        "path": "/orders/42",
+        "query_string": b"",
+        "headers": [(b"host", b"shop.local"), (b"cookie", b"session=1")],
+    }
+    with pytest.raises(ValueError):
+        asyncio.run(PantiesASGIMiddleware(app)(scope, None, None))
+    request = transport.events[0]["contexts"]["request"]
+    assert request["url"] == "https://shop.local/orders/42"
+    assert request["route"] == "/orders/{order_id}"
+    assert request["headers"]["cookie"] == "[Filtered]"
+
+
+def test_django_request_freeze_copies_meta():
+    pytest.importorskip("django")
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure(ALLOWED_HOSTS=["*"], LOGGING_CONFIG=None)
+    from django.test import RequestFactory
+
+    from panties.django import DjangoRequest
+
+    http_request = RequestFactory().get("/orders/42", HTTP_X_ORDER="42")
+    frozen = DjangoRequest(http_request).freeze()
+    http_request.META.clear()
+    request = frozen.request(frozenset())
+    assert (request["method"], request["headers"]["X-Order"]) == ("GET", "42")
+    assert frozen.transaction_name() == "GET /orders/42"
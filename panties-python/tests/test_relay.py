@@ -0,0 +1,79 @@
+"""
+Relay locale: validazione dei datagrammi ricevuti dai processi,
+aggregazione dei duplicati e inoltro al collector tramite ``RelayTransport``.
+"""
+import gzip
+import json
+import threading
+import time
+
+import pytest
+
+from panties.relay import Relay
+from panties.relay_transport import RelayTransport
+
+
+def _datagram(i, **fields):
+    return json.dumps({"event_id": f"relay-{i}", "type": "message", "message": {"text": "test"}, **fields}).encode()
+
+
+@pytest.mark.parametrize("dedupe_window", [0, 60])
+def test_invalid_datagrams_are_not_forwarded(collector, dedupe_window):
+    relay = Relay("udp://127.0.0.1:0", collector.endpoint, "test", dedupe_window=dedupe_window)
+    for datagram in (b"{not json", b"[1, 2]", b"\x1f\x8bcorrupted", gzip.compress(b"{truncated")[:-8]):
+        relay.handle(datagram)
+    relay.handle(_datagram(0))
+    relay.handle(gzip.compress(_datagram(1)))
+    assert relay.close(5.0) == 0
+    assert (relay.received, relay.invalid) == (6, 4)
+    # Un solo batch con i due eventi validi: quelli non validi non lo fanno rifiutare
+    assert (collector.stats["events"], collector.stats["rejected"]) == (2, 0)
+
+
+def test_decompression_is_capped(collector):
+    relay = Relay("udp://127.0.0.1:0", collector.endpoint, "test", dedupe_window=0)
+    limit = relay.transport.serializer.max_event_bytes
+    bomb = gzip.compress(_datagram(0, extra={"padding": " " * limit}))
+    assert len(bomb) < 16 * 1024
+    relay.handle(bomb)
+    relay.handle(gzip.compress(_datagram(1, extra={"padding": " " * (limit // 2)})))
+    assert relay.close(5.0) == 0
+    assert relay.invalid == 1
+    assert collector.stats["events"] == 1
+
+
+def test_duplicates_from_many_processes_become_one_summary(collector):
+    relay = Relay("udp://127.0.0.1:0", collector.endpoint, "test", dedupe_window=60)
+    for i in range(3):
+        relay.handle(_datagram(i, fingerprint="f" * 40))
+    # Riassunto calcolato da un altro processo: sommato alla stessa finestra
+    relay.handle(_datagram(3, fingerprint="f" * 40, aggregation={"count": 4, "first_seen": 1.0, "last_seen": 2.0}))
+    relay.handle(_datagram(4, fingerprint="e" * 40))
+    assert relay.close(5.0) == 0
+    assert relay.deduplicated == 6
+    # Prima occorrenza di ogni fingerprint più un riassunto
+    assert collector.stats["events"] == 3
+
+
+def test_relay_transport_delivers_through_the_relay(collector):
+    relay = Relay("udp://127.0.0.1:0", collector.endpoint, "test", dedupe_window=0)
+    relay.bind()
+    host, port = relay._sock.getsockname()
+    server = threading.Thread(target=relay.serve_forever)
+    server.start()
+    transport = RelayTransport(f"udp://{host}:{port}")
+    try:
+        for i in range(20):
+            transport.send({"event_id": f"relay-{i}", "type": "message", "message": {"text": "test"}})
+        transport.send({"event_id": "big", "type": "message", "extra": {"padding": " " * 100_000}})
+        assert transport.flush(5.0) == 0
+        deadline = time.monotonic() + 5.0
+        while relay.received < 21 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        transport.close(0)
+        relay.shutdown()
+        server.join()
+        relay.close(5.0)
+    assert relay.invalid == 0
+    assert collector.stats["events"] == 21
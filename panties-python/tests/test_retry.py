@@ -0,0 +1,102 @@
+"""
+Batch non consegnati di ``HttpTransport`` e ``AsyncHttpTransport``: tenuti
+in memoria finché il collector torna raggiungibile, divisi e infine
+scartati se il collector continua a rifiutarli con un 5xx.
+"""
+import asyncio
+import time
+
+from panties.async_transport import AsyncHttpTransport
+from panties.retry import is_server_error, split_rejected
+from panties.transport import HttpTransport
+
+
+def _event(origin, i):
+    return {"event_id": f"{origin}-{i}", "type": "message", "message": {"text": "test", "level": "info"}}
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+async def _await_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+    return predicate()
+
+
+def _options():
+    return dict(max_retries=0, retry_backoff_max=0.05, breaker_threshold=100, batch_linger=0.0)
+
+
+def test_split_rejected():
+    batch = [b"a", b"b", b"c"]
+    assert split_rejected(batch, 2, 3) == [(batch, 2)]
+    assert split_rejected(batch, 3, 3) == [([b"a"], 0), ([b"b", b"c"], 0)]
+    assert split_rejected([b"a"], 3, 3) == []
+    # 502/503/504: collector o proxy temporaneamente giù, non un evento rifiutato
+    assert [is_server_error(s) for s in (500, 502, 503, 504, 507, 429)] == [True, False, False, False, True, False]
+
+
+def test_failed_batches_held_until_collector_recovers(collector):
+    collector.fail_with(503)
+    transport = HttpTransport(collector.endpoint, "test", **_options())
+    for i in range(10):
+        transport.send(_event("held", i))
+    assert _wait_for(lambda: transport.stats()["held"] == 10)
+    assert transport.flush(0.1) == 10
+    collector.fail_with(None)
+    assert _wait_for(lambda: collector.stats["events"] == 10)
+    assert transport.close(5.0) == 0
+
+
+def test_poison_event_is_dropped(collector):
+    collector.reject(b'"poison-3"')
+    transport = HttpTransport(collector.endpoint, "test", max_server_errors=2, **_options())
+    for i in range(8):
+        transport.send(_event("poison", i))
+    # Il batch viene diviso fino a isolare l'evento rifiutato; gli altri passano
+    assert _wait_for(lambda: collector.stats["events"] == 7)
+    assert _wait_for(lambda: transport.stats()["held"] == 0)
+    assert transport.stats()["dropped"] == 1
+    # I batch successivi non restano bloccati dietro quello rifiutato
+    transport.send(_event("after", 0))
+    assert transport.flush(5.0) == 0
+    assert collector.stats["events"] == 8
+    transport.close()
+
+
+def test_async_failed_batches_held_until_collector_recovers(collector):
+    async def run():
+        collector.fail_with(503)
+        transport = AsyncHttpTransport(collector.endpoint, "test", **_options())
+        for i in range(10):
+            transport.send(_event("held", i))
+        assert await _await_for(lambda: transport.stats()["held"] == 10)
+        assert await transport.aflush(0.1) == 10
+        collector.fail_with(None)
+        assert await _await_for(lambda: collector.stats["events"] == 10)
+        assert await transport.aclose() == 0
+
+    asyncio.run(run())
+
+
+def test_async_poison_event_is_dropped(collector):
+    async def run():
+        collector.reject(b'"poison-3"')
+        transport = AsyncHttpTransport(collector.endpoint, "test", max_server_errors=2, **_options())
+        for i in range(8):
+            transport.send(_event("poison", i))
+        assert await _await_for(lambda: collector.stats["events"] == 7)
+        assert await _await_for(lambda: transport.stats()["held"] == 0)
+        assert transport.stats()["dropped"] == 1
+        transport.send(_event("after", 0))
+        assert await transport.aflush(5.0) == 0
+        assert collector.stats["events"] == 8
+        await transport.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,40 @@
+"""Sottoclassi dei contenitori built-in in ``SafeRepr``."""
+from collections import Counter, OrderedDict, defaultdict, deque, namedtuple
+
+from panties.safe_repr import SafeRepr
+
+Point = namedtuple("Point", "x y")
+
+
+class Strict(dict):
+    """Mapping che non va mai letto con i propri metodi."""
+
+    def items(self):
+        raise AssertionError("items() chiamato")
+
+    def __repr__(self):
+        raise AssertionError("__repr__ chiamato")
+
+
+def test_subclasses_are_bounded():
+    safe = SafeRepr(max_items=3)
+    groups = defaultdict(list, {i: [i] for i in range(100_000)})
+    assert safe.repr(groups) == "defaultdict({0: [0], 1: [1], 2: [2], ...(+99997)})"
+    assert safe.repr(deque(range(10))) == "deque([0, 1, 2, ...(+7)])"
+    assert safe.repr(Counter("aab")) == "Counter({'a': 2, 'b': 1})"
+    assert safe.repr(Point(1, [2])) == "Point(x=1, y=[2])"
+    assert safe.repr(Point(1, list(range(5)))) == "Point(x=1, y=[0, 1, 2, ...(+2)])"
+
+
+def test_subclass_methods_defined_in_python_are_not_called():
+    assert SafeRepr().repr(Strict(a=1)) == "Strict({'a': 1})"
+
+
+def test_native_iteration_order_and_cycles():
+    ordered = OrderedDict(a=1, b=2)
+    ordered.move_to_end("a")
+    assert SafeRepr().repr(ordered) == "OrderedDict({'b': 2, 'a': 1})"
+    graph = defaultdict(list)
+    graph["self"].append(graph)
+    assert SafeRepr().repr(graph) == "defaultdict({'self': [<cycle>]})"
+    assert SafeRepr().repr(defaultdict(int)) == "defaultdict()"
@@ -0,0 +1,76 @@
+"""
+Campionamento, rate limit per fingerprint e client report degli scarti.
+"""
+import pytest
+
+from panties.client import PantiesClient
+from panties.sampling import Sampler, TokenBucketLimiter
+from panties.state import set_client
+
+
+class TimeoutError_(Exception):
+    pass
+
+
+class ReadTimeout(TimeoutError_):
+    pass
+
+
+def _client(transport, **options):
+    client = PantiesClient("test", "http://collector.invalid/api/events/", transport=transport, dedupe_window=0, **options)
+    set_client(client)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def _reset_client():
+    yield
+    set_client(None)
+
+
+def _capture(client, exc_type=ValueError):
+    try:
+        raise exc_type("boom")
+    except exc_type:
+        client.capture_exception()
+
+
+def test_exception_rates_apply_to_subclasses():
+    sampler = Sampler(1.0, exception_rates={"TimeoutError_": 0.0, "builtins.KeyError": 0.5})
+    assert sampler.enabled
+    assert sampler.exception_rate(ReadTimeout) == 0.0
+    assert sampler.exception_rate(KeyError) == 0.5
+    assert sampler.exception_rate(ValueError) == 1.0
+    assert Sampler(1.0, level_rates={"info": 1.0}).enabled is False
+
+
+def test_token_bucket():
+    limiter = TokenBucketLimiter(rate=1.0, burst=2)
+    assert [limiter.allow("a", 0.0) for _ in range(3)] == [True, True, False]
+    assert limiter.allow("b", 0.0)
+    assert limiter.allow("a", 1.0)
+    assert not limiter.allow("a", 1.0)
+
+
+def test_sampled_out_events_are_reported(transport):
+    client = _client(transport, exception_sample_rates={"ValueError": 0.0}, level_sample_rates={"info": 0.0})
+    for _ in range(3):
+        _capture(client)
+    client.capture_message("hello", level="info")
+    _capture(client, KeyError)
+    assert [event["type"] for event in transport.events] == ["exception"]
+    assert client.stats()["discarded"] == {"sample_rate": 4}
+    client.close(0)
+    report = transport.events[-1]
+    assert report["type"] == "client_report"
+    assert sorted((d["category"], d["quantity"]) for d in report["discarded"]) == [("exception", 3), ("message", 1)]
+
+
+def test_rate_limit_per_fingerprint(transport):
+    client = _client(transport, rate_limit=0.001, rate_limit_burst=2)
+    for _ in range(5):
+        _capture(client)
+    _capture(client, KeyError)
+    assert len(transport.events) == 3
+    assert client.stats()["discarded"] == {"rate_limit": 3}
+    client.close(0)
@@ -0,0 +1,87 @@
+"""Scope per richiesta (``push_scope``) e scope di processo."""
+import asyncio
+import threading
+
+import pytest
+
+import panties.scope
+from panties.scope import Scope, get_scope, push_scope, set_context, set_extra, set_tag, set_tags
+
+
+@pytest.fixture(autouse=True)
+def _global_scope(monkeypatch):
+    monkeypatch.setattr(panties.scope, "_global_scope", Scope())
+
+
+def test_scope_is_applied_and_capture_fields_win(client, transport):
+    with push_scope():
+        set_tags({"order": "42", "region": "eu"})
+        set_extra("attempt", 2)
+        set_context("user", {"id": 7})
+        client.capture_message("hello", tags={"order": "43"})
+    (event,) = transport.events
+    assert event["tags"] == {"order": "43", "region": "eu"}
+    assert event["extra"]["attempt"] == 2
+    assert event["contexts"]["user"] == {"id": 7}
+
+
+def test_push_scope_is_undone_on_exit():
+    set_tag("region", "eu")
+    with push_scope():
+        set_tag("order", "42")
+        with push_scope():
+            set_context("user", {"id": 7})
+            assert dict(get_scope().contexts) == {"user": {"id": 7}}
+        assert not get_scope().contexts
+    assert dict(get_scope().tags) == {"region": "eu"}
+
+
+def test_changes_are_copied_not_shared():
+    user = {"id": 7}
+    with push_scope() as outer:
+        set_context("user", user)
+        user["id"] = 8
+        assert get_scope().contexts["user"] == {"id": 7}
+        assert outer is not get_scope() and not outer.contexts
+
+
+def test_request_scopes_are_isolated_between_threads():
+    seen = {}
+    barrier = threading.Barrier(2, timeout=5)
+
+    def request(name):
+        with push_scope():
+            set_tag("request", name)
+            barrier.wait()
+            seen[name] = dict(get_scope().tags)
+
+    threads = [threading.Thread(target=request, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == {"a": {"request": "a"}, "b": {"request": "b"}}
+    assert not get_scope()
+
+
+def test_tasks_inherit_the_scope_without_sharing_changes():
+    async def child():
+        set_tag("child", "1")
+        return dict(get_scope().tags)
+
+    async def main():
+        with push_scope():
+            set_tag("request", "r")
+            inner = await asyncio.create_task(child())
+            return inner, dict(get_scope().tags)
+
+    inner, outer = asyncio.run(main())
+    assert inner == {"request": "r", "child": "1"}
+    assert outer == {"request": "r"}
+
+
+def test_unscoped_changes_are_process_wide():
+    thread = threading.Thread(target=set_tag, args=("region", "eu"))
+    thread.start()
+    thread.join()
+    assert dict(get_scope().tags) == {"region": "eu"}
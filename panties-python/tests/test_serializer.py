@@ -0,0 +1,61 @@
+"""
+``EventSerializer``: limiti per campo applicati durante la codifica.
+"""
+import json
+
+from panties.serializer import EventSerializer
+from panties.transport import HttpTransport
+
+
+def _frames(n):
+    return [{"filename": "app.py", "function": f"f{i}", "lineno": i, "in_app": True} for i in range(n)]
+
+
+def _event(**fields):
+    return {"event_id": "e1", "type": "exception", **fields}
+
+
+def test_strings_and_messages_are_truncated():
+    serializer = EventSerializer(max_string_length=20, max_message_length=30)
+    event = _event(exception={"type": "E", "message": "m" * 50, "frames": []}, tags={"a": "b" * 50})
+    out = json.loads(serializer.encode(event))
+    assert out["exception"]["message"] == "m" * 30 + "..."
+    assert out["tags"]["a"] == "b" * 20 + "..."
+    assert serializer.truncated == 1
+
+
+def test_keeps_outermost_and_innermost_frames():
+    out = json.loads(EventSerializer(max_frames=4).encode(_event(exception={"type": "E", "frames": _frames(10)})))
+    assert [frame["function"] for frame in out["exception"]["frames"]] == ["f0", "f1", "f8", "f9"]
+    assert out["exception"]["frames_omitted"] == 6
+
+
+def test_extra_is_bounded_and_never_fails():
+    cycle = {}
+    cycle["self"] = cycle
+    extra = {"list": list(range(50)), "deep": {"a": {"b": {"c": 1}}}, "obj": object(), "cycle": cycle}
+    out = json.loads(EventSerializer(max_items=10, max_extra_depth=2).encode(_event(extra=extra)))
+    assert out["extra"]["list"] == list(range(10))
+    assert out["extra"]["deep"] == {"a": "<max depth>"}
+    assert out["extra"]["obj"].startswith("<object object at")
+    assert out["extra"]["cycle"] == {"self": "<max depth>"}
+    out = json.loads(EventSerializer(max_extra_depth=10).encode(_event(extra={"cycle": cycle})))
+    assert out["extra"]["cycle"] == {"self": "<cycle>"}
+
+
+def test_event_size_is_capped():
+    extra = {str(i): "v" * 100 for i in range(1000)}
+    body = EventSerializer(max_event_bytes=4096, max_extra_bytes=1024 * 1024).encode(_event(extra=extra))
+    assert len(body) < 4096 + 200
+    assert json.loads(body)["event_id"] == "e1"
+
+
+def test_queue_byte_budget_drops_events():
+    # Linger lungo: il worker non svuota la coda durante il test
+    http = HttpTransport("http://collector.invalid/api/events/", "test", max_queue_bytes=1000, batch_linger=5.0)
+    body = b'{"event_id": "e1", "message": "' + b"x" * 500 + b'"}'
+    for _ in range(3):
+        http.send_encoded(body)
+    stats = http.stats()
+    assert (stats["enqueued"], stats["dropped"], stats["queued_bytes"]) == (1, 2, len(body))
+    http.close(0)
@@ -0,0 +1,56 @@
+"""
+Sessioni: esiti contati in memoria e inviati come un solo evento
+``sessions``, anche senza altre sessioni finite.
+"""
+import time
+
+import pytest
+
+from panties.client import PantiesClient
+from panties.sessions import crash_session, end_session, start_session
+from panties.state import set_client
+
+
+@pytest.fixture
+def client(transport):
+    client = PantiesClient(
+        "test", "http://collector.invalid/api/events/", transport=transport,
+        release="app@1.0", session_flush_interval=0.1,
+    )
+    set_client(client)
+    yield client
+    set_client(None)
+    client.close(0)
+
+
+def _totals(events):
+    totals = {"exited": 0, "errored": 0, "crashed": 0}
+    for event in events:
+        assert (event["type"], event["release"]) == ("sessions", "app@1.0")
+        for bucket in event["aggregates"]:
+            for status in totals:
+                totals[status] += bucket.get(status, 0)
+    return totals
+
+
+def test_sessions_are_aggregated(client, transport):
+    for _ in range(3):
+        start_session()
+        end_session()
+    start_session().mark_errored()
+    end_session()
+    start_session()
+    crash_session()
+    client.flush()
+    assert _totals(transport.events) == {"exited": 3, "errored": 1, "crashed": 1}
+
+
+def test_pending_sessions_sent_by_timer(client, transport):
+    start_session()
+    end_session()
+    # Nessun'altra sessione finisce e nessun flush: le invia il timer
+    deadline = time.monotonic() + 5.0
+    while not transport.events and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _totals(transport.events) == {"exited": 1, "errored": 0, "crashed": 0}
+    assert client._sessions_timer is None or not client._sessions_timer.is_alive()
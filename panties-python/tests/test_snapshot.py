@@ -0,0 +1,88 @@
+"""
+``EventSnapshot``: costruzione unica dell'evento e stima dei byte usata dal
+transport per il budget della coda.
+"""
+import threading
+
+import pytest
+
+from conftest import SnapshotTransport
+from panties.breadcrumbs import add_breadcrumb, clear_breadcrumbs
+from panties.serializer import EventSerializer
+from panties.snapshot import EventSnapshot
+from panties.transport import HttpTransport
+
+
+@pytest.fixture
+def transport():
+    return SnapshotTransport()
+
+
+def _capture(client, transport, depth=3):
+    def fail(n):
+        if n == 0:
+            raise ValueError("boom")
+        fail(n - 1)
+
+    try:
+        fail(depth)
+    except ValueError:
+        client.capture_exception()
+    return transport.events.pop()
+
+
+def test_estimated_size_follows_the_snapshot(client, transport):
+    clear_breadcrumbs()
+    small = _capture(client, transport)
+    for i in range(50):
+        add_breadcrumb(f"request {i} handled", "log")
+    large = _capture(client, transport)
+    assert large.estimated_size() > small.estimated_size() + 50 * len("request 0 handled")
+
+    serializer = EventSerializer()
+    for snapshot in (small, large):
+        estimate = snapshot.estimated_size()
+        size = len(serializer.encode(snapshot.to_event()))
+        assert size <= estimate < 2 * size
+        # Stima invariata dopo la costruzione: il transport rilascia quanto addebitato
+        assert snapshot.estimated_size() == estimate
+
+
+def test_queue_budget_charges_the_estimate(client, transport):
+    snapshot = _capture(client, transport)
+    # Linger lungo: il worker non toglie lo snapshot dalla coda durante il test
+    http = HttpTransport(
+        "http://collector.invalid/api/events/", "test",
+        max_queue_bytes=snapshot.estimated_size(), batch_linger=5.0,
+    )
+    http.send(snapshot)
+    http.send(_capture(client, transport))
+    stats = http.stats()
+    assert (stats["enqueued"], stats["dropped"], stats["queued_bytes"]) == (1, 1, snapshot.estimated_size())
+    http.close(0)
+
+
+def test_builds_once_per_snapshot_without_a_global_lock():
+    calls = []
+    started = threading.Barrier(2, timeout=5)
+
+    def builder(snapshot):
+        calls.append(snapshot)
+        if snapshot.kind == "slow":
+            # Lo snapshot "fast" si costruisce mentre questo è in corso
+            started.wait()
+            started.wait()
+        return {"kind": snapshot.kind}
+
+    slow = EventSnapshot(builder, "slow", 0.0)
+    fast = EventSnapshot(builder, "fast", 0.0)
+    workers = [threading.Thread(target=slow.to_event) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    started.wait()
+    assert fast.to_event() == {"kind": "fast"}
+    started.wait()
+    for worker in workers:
+        worker.join()
+    assert calls == [slow, fast]
+    assert slow.to_event() == {"kind": "slow"}
@@ -0,0 +1,71 @@
+"""Transazioni e span: campionamento, propagazione e limiti."""
+import pytest
+
+import panties.tracing
+from panties.tracing import get_current_span, parse_traceparent, span, start_transaction
+
+TRACEPARENT = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+
+
+def test_spans_are_nested_and_timed(client, transport):
+    with start_transaction("GET /orders", op="http.server", sampled=True) as txn:
+        with span("db.query", "SELECT 1") as query:
+            with span("db.fetch") as fetch:
+                assert get_current_span() is fetch
+        with pytest.raises(ValueError):
+            with span("render"):
+                raise ValueError("boom")
+    assert get_current_span() is None
+    (event,) = transport.events
+    data = event["transaction"]
+    assert (data["name"], data["op"], data["status"]) == ("GET /orders", "http.server", "ok")
+    spans = {item["op"]: item for item in data["spans"]}
+    assert spans["db.fetch"]["parent_span_id"] == query.span_id
+    assert spans["db.query"]["parent_span_id"] == txn.span_id
+    assert spans["render"]["status"] == "internal_error"
+    assert 0 <= spans["db.query"]["start"] <= spans["db.fetch"]["start"] <= data["duration"]
+
+
+def test_unsampled_transactions_record_nothing(client, transport):
+    # traces_sample_rate di default: 0
+    with start_transaction("job") as txn:
+        assert not txn.sampled
+        with span("db.query") as child:
+            child.set_data("rows", 1)
+    assert transport.events == []
+
+
+def test_sample_rate_is_reported(client, transport):
+    client.traces_sample_rate = 0.5
+    for _ in range(50):
+        with start_transaction("job"):
+            pass
+    assert 0 < len(transport.events) < 50
+    assert {event["sample_rate"] for event in transport.events} == {0.5}
+
+
+def test_incoming_traceparent_is_continued(client, transport):
+    with start_transaction("GET /orders", traceparent=TRACEPARENT) as txn:
+        outgoing = txn.traceparent()
+    (event,) = transport.events
+    assert (event["transaction"]["trace_id"], event["transaction"]["parent_span_id"]) == ("a" * 32, "b" * 16)
+    assert outgoing == f"00-{'a' * 32}-{txn.span_id}-01"
+    unsampled = TRACEPARENT[:-2] + "00"
+    with start_transaction("GET /orders", traceparent=unsampled):
+        pass
+    assert len(transport.events) == 1
+
+
+def test_invalid_traceparent_is_ignored():
+    for header in (None, "", "00-abc-def-01", "00-" + "0" * 32 + "-" + "b" * 16 + "-01", "00-" + "g" * 32 + "-" + "b" * 16 + "-01"):
+        assert parse_traceparent(header) is None
+
+
+def test_spans_beyond_the_limit_are_counted(client, transport, monkeypatch):
+    monkeypatch.setattr(panties.tracing, "MAX_SPANS", 3)
+    with start_transaction("batch", sampled=True):
+        for _ in range(5):
+            with span("item"):
+                pass
+    data = transport.events[0]["transaction"]
+    assert (len(data["spans"]), data["dropped_spans"]) == (3, 2)
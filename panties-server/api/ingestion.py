@@ -0,0 +1,601 @@
+"""
+Shared helpers for Panties event ingestion.
+
+These functions turn a raw client payload into an unsaved ``ErrorEvent`` so
+that the single-event and batch endpoints apply exactly the same rules.
+"""
+import logging
+import math
+from datetime import datetime, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.timezone import make_aware
+from rest_framework.response import Response
+from rest_framework import status
+
+from core.models import Project, ErrorEvent, StackFrame, DiscardedEventCount, SessionCount, Transaction, Span
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the nodes of a chained exception / ExceptionGroup tree
+MAX_EXCEPTION_NODES = 1000
+
+# Upper bound on the breadcrumbs kept per event (the most recent ones)
+MAX_BREADCRUMBS = 200
+
+# Upper bound on the spans stored per transaction
+MAX_SPANS = 1000
+
+# Upper bound on the buckets of a session aggregates payload
+MAX_SESSION_AGGREGATES = 1000
+
+SESSION_STATUSES = ('exited', 'errored', 'crashed')
+
+EXCEPTION_RELATIONS = ('cause', 'context', 'group')
+
+_CHAIN_SEPARATORS = {
+    'cause': '\nThe above exception was the direct cause of the following exception:\n\n',
+    'context': '\nDuring handling of the above exception, another exception occurred:\n\n',
+}
+
+
+class EventValidationError(ValueError):
+    """Raised when a single event in a payload cannot be accepted."""
+
+
+def authenticate_project(request):
+    """
+    Resolve the project from the ``Authorization: Bearer <api_key>`` header.
+
+    Returns a ``(project, None)`` tuple on success, ``(None, Response)`` with
+    the error response otherwise.
+    """
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None, Response(
+            {'error': 'Missing or invalid Authorization header. Expected: Bearer <api_key>'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+    api_key = auth_header.replace('Bearer ', '').strip()
+
+    try:
+        return Project.objects.get(api_key=api_key), None
+    except Project.DoesNotExist:
+        return None, Response(
+            {'error': 'Invalid API key'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+
+
+def _optional_text(value, max_length):
+    """Coerce an optional free-text field to ``str`` and truncate it to the column size."""
+    return str(value)[:max_length] if value else None
+
+
+def _event_id(data):
+    """
+    Return the payload's ``event_id``. Ids are not truncated: two events
+    sharing a prefix would collide, so an oversized id is rejected instead.
+    """
+    event_id = data.get('event_id')
+    if not event_id:
+        raise EventValidationError('Missing required field: event_id')
+    if not isinstance(event_id, str) or len(event_id) > 64:
+        raise EventValidationError('Invalid event_id: expected a string of at most 64 characters')
+    return event_id
+
+
+def parse_timestamp(timestamp_value):
+    """Parse a unix or ISO 8601 timestamp, falling back to now."""
+    if not timestamp_value:
+        return make_aware(datetime.now())
+    try:
+        if isinstance(timestamp_value, (int, float)):
+            # Unix timestamp
+            return make_aware(datetime.fromtimestamp(timestamp_value))
+        # ISO format string
+        return make_aware(datetime.fromisoformat(timestamp_value.replace('Z', '+00:00')))
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Failed to parse timestamp: {e}")
+        return make_aware(datetime.now())
+
+
+def _frame_payloads(data):
+    """Return the list of structured frame dicts in a payload, if any."""
+    exc_data = data.get('exception') if isinstance(data, dict) else None
+    frames = exc_data.get('frames') if isinstance(exc_data, dict) else None
+    if not isinstance(frames, list):
+        return []
+    return [frame for frame in frames if isinstance(frame, dict)]
+
+
+def format_frames(frames):
+    """Render structured frames as traceback-style text."""
+    lines = []
+    for frame in frames:
+        if not isinstance(frame, dict):
+            continue
+        lines.append(
+            f'  File "{frame.get("filename")}", line {frame.get("lineno")}, '
+            f'in {frame.get("function")}\n'
+        )
+        if frame.get('context_line'):
+            lines.append(f"    {str(frame['context_line']).strip()}\n")
+    return ''.join(lines)
+
+
+def exception_chain(data):
+    """
+    Return the validated exception tree of a payload (``exception.exceptions``),
+    or an empty list when the event carries a single exception.
+
+    Each node keeps ``type``, ``message``, ``frames`` (indices into the frame
+    table), ``parent`` (index of an earlier node) and ``relation``. Invalid
+    references are dropped rather than rejecting the event.
+    """
+    exc_data = data.get('exception') if isinstance(data, dict) else None
+    nodes = exc_data.get('exceptions') if isinstance(exc_data, dict) else None
+    if not isinstance(nodes, list):
+        return []
+    frame_count = len(_frame_payloads(data))
+
+    chain = []
+    for node in nodes[:MAX_EXCEPTION_NODES]:
+        if not isinstance(node, dict):
+            continue
+        # Parents always precede their children; anything else becomes a root
+        parent = node.get('parent')
+        if not isinstance(parent, int) or not 0 <= parent < len(chain):
+            parent = None
+        relation = node.get('relation')
+        frames = node.get('frames')
+        chain.append({
+            'type': str(node.get('type') or '')[:128],
+            'message': str(node.get('message') or ''),
+            'frames': [
+                i for i in frames if isinstance(i, int) and 0 <= i < frame_count
+            ] if isinstance(frames, list) else [],
+            'parent': parent,
+            'relation': relation if parent is not None and relation in EXCEPTION_RELATIONS else None,
+            'is_group': bool(node.get('is_group')),
+        })
+    return chain
+
+
+def format_exception_chain(frames, chain):
+    """
+    Render an exception tree as Python-style traceback text: causes and
+    contexts first, ExceptionGroup members indented below their group.
+    """
+    frames = [frame for frame in frames if isinstance(frame, dict)]
+    children = [[] for _ in chain]
+    for position, node in enumerate(chain):
+        if node['parent'] is not None:
+            children[node['parent']].append(position)
+
+    def render(position):
+        node = chain[position]
+        parts = []
+        for child in children[position]:
+            relation = chain[child]['relation']
+            if relation in _CHAIN_SEPARATORS:
+                parts.append(render(child))
+                parts.append(_CHAIN_SEPARATORS[relation])
+        if node['is_group']:
+            parts.append('Exception Group Traceback (most recent call last):\n')
+        else:
+            parts.append('Traceback (most recent call last):\n')
+        parts.append(format_frames([frames[i] for i in node['frames'] if i < len(frames)]))
+        parts.append(f"{node['type']}: {node['message']}\n")
+        members = [child for child in children[position] if chain[child]['relation'] == 'group']
+        for number, child in enumerate(members, 1):
+            parts.append(f'+---------------- {number} ----------------\n')
+            parts.extend(f'    | {line}' for line in render(child).splitlines(True))
+        return ''.join(parts)
+
+    return ''.join(render(position) for position, node in enumerate(chain) if node['parent'] is None)
+
+
+def breadcrumbs(data):
+    """
+    Return the validated breadcrumbs of a payload, oldest first, keeping
+    the last ``MAX_BREADCRUMBS``. Malformed entries are dropped rather than
+    rejecting the event.
+    """
+    items = data.get('breadcrumbs') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return []
+
+    result = []
+    for item in items[-MAX_BREADCRUMBS:]:
+        if not isinstance(item, dict):
+            continue
+        timestamp = item.get('timestamp')
+        crumb = {
+            'timestamp': timestamp if isinstance(timestamp, (int, float)) else None,
+            'category': str(item.get('category') or 'default')[:128],
+            'level': str(item.get('level') or 'info')[:16].lower(),
+            'message': str(item.get('message') or ''),
+        }
+        if isinstance(item.get('data'), dict):
+            crumb['data'] = item['data']
+        result.append(crumb)
+    return result
+
+
+def contexts(data):
+    """
+    Return the structured contexts of a payload: a mapping of context name
+    to a JSON object. Entries that are not objects are dropped.
+    """
+    value = data.get('contexts') if isinstance(data, dict) else None
+    if not isinstance(value, dict):
+        return {}
+    return {
+        str(name)[:128]: context for name, context in value.items() if isinstance(context, dict)
+    }
+
+
+def _string_list(value):
+    if not isinstance(value, list):
+        return []
+    return [str(line) for line in value]
+
+
+def _string_dict(value):
+    if not isinstance(value, dict):
+        return {}
+    return {str(name)[:256]: str(text) for name, text in value.items()}
+
+
+def build_stack_frames(error_event, data):
+    """
+    Build unsaved ``StackFrame`` rows for a saved ``error_event`` from the
+    structured frames in its payload.
+    """
+    stack_frames = []
+    for index, frame in enumerate(_frame_payloads(data)):
+        lineno = frame.get('lineno')
+        stack_frames.append(StackFrame(
+            event=error_event,
+            index=index,
+            filename=str(frame.get('filename') or '')[:512],
+            function=str(frame.get('function') or '')[:256],
+            module=str(frame.get('module') or '')[:256],
+            lineno=lineno if isinstance(lineno, int) and lineno >= 0 else None,
+            in_app=bool(frame.get('in_app')),
+            context_line=frame.get('context_line'),
+            pre_context=_string_list(frame.get('pre_context')),
+            post_context=_string_list(frame.get('post_context')),
+            vars=_string_dict(frame.get('vars')),
+        ))
+    return stack_frames
+
+
+def build_error_event(project, data):
+    """
+    Build an unsaved ``ErrorEvent`` for ``project`` from a client payload.
+
+    Raises ``EventValidationError`` if the payload is not acceptable.
+    """
+    if not isinstance(data, dict):
+        raise EventValidationError('Invalid request body. Expected JSON object.')
+
+    # Extract required fields
+    event_id = _event_id(data)
+    # Support both 'type' (from Python client) and 'event_type'
+    event_type = data.get('type') or data.get('event_type', 'exception')
+
+    # Grouping key: truncating it would merge unrelated groups
+    fingerprint = data.get('fingerprint')
+    if fingerprint is not None and (not isinstance(fingerprint, str) or len(fingerprint) > 64):
+        raise EventValidationError('Invalid fingerprint: expected a string of at most 64 characters')
+
+    timestamp = parse_timestamp(data.get('timestamp'))
+
+    # Extract exception data (support nested format from Python client)
+    exception_type = None
+    message = None
+    stacktrace = None
+    chain = []
+    level = data.get('level', 'error')
+
+    if event_type == 'exception' and 'exception' in data:
+        # Nested format from Python client
+        exc_data = data['exception']
+        exception_type = exc_data.get('type')
+        message = exc_data.get('message')
+
+        # Stacktrace can be a list of frames or a string
+        stacktrace_data = exc_data.get('stacktrace')
+        if isinstance(stacktrace_data, list):
+            # Join list of frames into a single string
+            stacktrace = ''.join(stacktrace_data)
+        else:
+            stacktrace = stacktrace_data
+
+        # Chained exceptions / ExceptionGroup tree over a shared frame table
+        chain = exception_chain(data)
+
+        # Structured frames (Python client): keep a text rendering as well
+        if not stacktrace and isinstance(exc_data.get('frames'), list):
+            if chain:
+                stacktrace = format_exception_chain(exc_data['frames'], chain)
+            else:
+                stacktrace = format_frames(exc_data['frames'])
+    elif event_type == 'message' and 'message' in data:
+        # Message event from Python client
+        msg_data = data['message']
+        message = msg_data.get('text')
+        level = msg_data.get('level', 'info')
+    else:
+        # Flat format (legacy or other clients)
+        exception_type = data.get('exception_type')
+        message = data.get('message')
+        stacktrace = data.get('stacktrace')
+
+    # Client-side aggregation of duplicate exceptions
+    occurrences = 1
+    first_seen = last_seen = None
+    aggregation = data.get('aggregation')
+    if isinstance(aggregation, dict):
+        try:
+            occurrences = max(1, int(aggregation.get('count', 1)))
+        except (TypeError, ValueError):
+            raise EventValidationError('Invalid aggregation count')
+        first_seen = parse_timestamp(aggregation.get('first_seen'))
+        last_seen = parse_timestamp(aggregation.get('last_seen'))
+
+    sample_rate = data.get('sample_rate', 1.0)
+    if not isinstance(sample_rate, (int, float)) or not 0 < sample_rate <= 1:
+        sample_rate = 1.0
+
+    return ErrorEvent(
+        project=project,
+        event_id=event_id,
+        timestamp=timestamp,
+        event_type=str(event_type)[:32],
+        exception_type=_optional_text(exception_type, 128),
+        message=message,
+        stacktrace=stacktrace,
+        level=_optional_text(level, 16),
+        environment=_optional_text(data.get('environment'), 64),
+        service_name=_optional_text(data.get('service_name'), 128),
+        tags=data.get('tags', {}),
+        extra=data.get('extra', {}),
+        fingerprint=fingerprint or None,
+        occurrences=occurrences,
+        first_seen=first_seen,
+        last_seen=last_seen,
+        sample_rate=sample_rate,
+        exception_chain=chain,
+        breadcrumbs=breadcrumbs(data),
+        contexts=contexts(data),
+    )
+
+
+def is_client_report(data):
+    """Whether a payload is a client report rather than an error event."""
+    return isinstance(data, dict) and data.get('type') == 'client_report'
+
+
+def parse_client_report(data):
+    """
+    Validate a client report and return its discarded-event counters,
+    keyed by ``(reason, category)``, without writing anything.
+
+    Raises ``EventValidationError`` if the report is malformed.
+    """
+    discarded = data.get('discarded')
+    if not isinstance(discarded, list):
+        raise EventValidationError('Invalid client report: expected a "discarded" list')
+
+    counts = {}
+    for item in discarded:
+        if not isinstance(item, dict):
+            raise EventValidationError('Invalid client report entry')
+        quantity = item.get('quantity')
+        if not isinstance(quantity, int) or quantity < 0:
+            raise EventValidationError('Invalid client report quantity')
+        key = (str(item.get('reason', 'unknown'))[:32], str(item.get('category', 'unknown'))[:32])
+        counts[key] = counts.get(key, 0) + quantity
+    return counts
+
+
+def save_client_report(project, counts):
+    """
+    Add counters from ``parse_client_report`` to the daily
+    ``DiscardedEventCount`` rollup of ``project``. Call it inside the
+    transaction that stores the rest of the request.
+    """
+    today = timezone.now().date()
+    for (reason, category), quantity in counts.items():
+        if not quantity:
+            continue
+        row, created = DiscardedEventCount.objects.get_or_create(
+            project=project, date=today, reason=reason, category=category,
+            defaults={'quantity': quantity},
+        )
+        if not created:
+            DiscardedEventCount.objects.filter(pk=row.pk).update(
+                quantity=F('quantity') + quantity
+            )
+
+
+def record_client_report(project, data):
+    """
+    Add the discarded-event counters of a client report to the daily
+    ``DiscardedEventCount`` rollup of ``project``.
+
+    Raises ``EventValidationError`` if the report is malformed.
+    """
+    counts = parse_client_report(data)
+    with transaction.atomic():
+        save_client_report(project, counts)
+
+
+def is_session_aggregates(data):
+    """Whether a payload carries pre-aggregated session counters."""
+    return isinstance(data, dict) and data.get('type') == 'sessions'
+
+
+def parse_session_aggregates(data):
+    """
+    Validate a ``sessions`` payload and return ``(release, environment,
+    counts)``, with ``counts`` the ``[exited, errored, crashed]`` totals
+    keyed by hour, without writing anything. Each aggregate is a bucket of
+    sessions started in the same minute (``started``, unix seconds);
+    release and environment apply to the whole payload.
+
+    Raises ``EventValidationError`` if the payload is malformed.
+    """
+    aggregates = data.get('aggregates')
+    if not isinstance(aggregates, list):
+        raise EventValidationError('Invalid sessions payload: expected an "aggregates" list')
+    if len(aggregates) > MAX_SESSION_AGGREGATES:
+        raise EventValidationError(f'Too many session aggregates (max {MAX_SESSION_AGGREGATES})')
+
+    release = str(data.get('release') or '')[:200]
+    environment = str(data.get('environment') or '')[:64]
+    counts = {}
+    for item in aggregates:
+        if not isinstance(item, dict):
+            raise EventValidationError('Invalid session aggregate')
+        started = item.get('started')
+        if isinstance(started, bool) or not isinstance(started, (int, float)) or not math.isfinite(started):
+            raise EventValidationError('Invalid session aggregate start')
+        try:
+            hour = datetime.fromtimestamp(started, tz=dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+        except (OverflowError, OSError, ValueError):
+            raise EventValidationError('Invalid session aggregate start')
+        totals = counts.setdefault(hour, [0, 0, 0])
+        for index, name in enumerate(SESSION_STATUSES):
+            quantity = item.get(name, 0)
+            if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 0:
+                raise EventValidationError(f'Invalid session count "{name}"')
+            totals[index] += quantity
+    return release, environment, counts
+
+
+def save_session_aggregates(project, aggregates):
+    """
+    Add the result of ``parse_session_aggregates`` to the hourly
+    ``SessionCount`` rollup of ``project``. Call it inside the transaction
+    that stores the rest of the request.
+    """
+    release, environment, counts = aggregates
+    for hour, (exited, errored, crashed) in counts.items():
+        if not (exited or errored or crashed):
+            continue
+        row, created = SessionCount.objects.get_or_create(
+            project=project, release=release, environment=environment, hour=hour,
+            defaults={'exited': exited, 'errored': errored, 'crashed': crashed},
+        )
+        if not created:
+            SessionCount.objects.filter(pk=row.pk).update(
+                exited=F('exited') + exited,
+                errored=F('errored') + errored,
+                crashed=F('crashed') + crashed,
+            )
+
+
+def record_session_aggregates(project, data):
+    """
+    Add the session counters of a ``sessions`` payload to the hourly
+    ``SessionCount`` rollup of ``project``.
+
+    Raises ``EventValidationError`` if the payload is malformed.
+    """
+    aggregates = parse_session_aggregates(data)
+    with transaction.atomic():
+        save_session_aggregates(project, aggregates)
+
+
+def is_transaction(data):
+    """Whether a payload is a performance transaction rather than an error event."""
+    return isinstance(data, dict) and data.get('type') == 'transaction'
+
+
+def _milliseconds(value):
+    """A non-negative finite duration / offset in milliseconds, or ``None``."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if not math.isfinite(value) or value < 0:
+        return None
+    return float(value)
+
+
+def build_transaction(project, data):
+    """
+    Build an unsaved ``Transaction`` for ``project`` from a client payload
+    (``{"type": "transaction", "transaction": {...}}``).
+
+    Raises ``EventValidationError`` if the payload is not acceptable.
+    """
+    event_id = _event_id(data)
+    txn = data.get('transaction')
+    if not isinstance(txn, dict):
+        raise EventValidationError('Invalid transaction: expected a "transaction" object')
+    name = txn.get('name')
+    if not isinstance(name, str) or not name:
+        raise EventValidationError('Invalid transaction: missing name')
+    duration = _milliseconds(txn.get('duration'))
+    if duration is None:
+        raise EventValidationError('Invalid transaction duration')
+
+    sample_rate = data.get('sample_rate', 1.0)
+    if not isinstance(sample_rate, (int, float)) or not 0 < sample_rate <= 1:
+        sample_rate = 1.0
+    dropped_spans = txn.get('dropped_spans')
+    tags = data.get('tags')
+
+    return Transaction(
+        project=project,
+        event_id=event_id,
+        trace_id=str(txn.get('trace_id') or '')[:32],
+        span_id=str(txn.get('span_id') or '')[:16],
+        parent_span_id=str(txn['parent_span_id'])[:16] if txn.get('parent_span_id') else None,
+        name=name[:256],
+        op=str(txn.get('op') or '')[:64],
+        status=str(txn.get('status') or 'ok')[:32],
+        start_timestamp=parse_timestamp(txn.get('start_timestamp') or data.get('timestamp')),
+        duration=duration,
+        environment=_optional_text(data.get('environment'), 64),
+        service_name=_optional_text(data.get('service_name'), 128),
+        tags=tags if isinstance(tags, dict) else {},
+        sample_rate=sample_rate,
+        dropped_spans=dropped_spans if isinstance(dropped_spans, int) and dropped_spans > 0 else 0,
+    )
+
+
+def build_spans(transaction, data):
+    """
+    Build unsaved ``Span`` rows for a saved ``transaction`` from its payload.
+    Spans without a valid start offset or duration are dropped.
+    """
+    items = data['transaction'].get('spans')
+    if not isinstance(items, list):
+        return []
+
+    spans = []
+    for item in items[:MAX_SPANS]:
+        if not isinstance(item, dict):
+            continue
+        start = _milliseconds(item.get('start'))
+        duration = _milliseconds(item.get('duration'))
+        if start is None or duration is None:
+            continue
+        spans.append(Span(
+            transaction=transaction,
+            span_id=str(item.get('span_id') or '')[:16],
+            parent_span_id=str(item['parent_span_id'])[:16] if item.get('parent_span_id') else None,
+            op=str(item.get('op') or '')[:64],
+            description=str(item.get('description') or ''),
+            status=str(item.get('status') or 'ok')[:32],
+            start_offset=start,
+            duration=duration,
+            data=item['data'] if isinstance(item.get('data'), dict) else {},
+        ))
+    return spans
@@ -0,0 +1,105 @@
+"""
+Request parsers for Panties event ingestion.
+"""
+import io
+import zlib
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError, UnsupportedMediaType
+from rest_framework.parsers import JSONParser
+
+# zstd is optional: stdlib on Python 3.14+, otherwise the `zstandard` package
+zstd = zstandard = None
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard
+    except ImportError:
+        pass
+
+# Default cap on the decompressed size of a request body
+DEFAULT_MAX_DECOMPRESSED_SIZE = 10 * 1024 * 1024
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Decompressed request body is too large.'
+    default_code = 'payload_too_large'
+
+
+def _decompress_gzip(data, max_size):
+    # wbits=47 accepts both gzip and zlib framed data
+    decompressor = zlib.decompressobj(wbits=47)
+    try:
+        result = decompressor.decompress(data, max_size + 1)
+    except zlib.error as e:
+        raise ValueError(f'Invalid gzip body: {e}')
+    if len(result) > max_size or decompressor.unconsumed_tail:
+        raise PayloadTooLarge()
+    return result
+
+
+def _decompress_zstd(data, max_size):
+    try:
+        if zstd is not None:
+            decompressor = zstd.ZstdDecompressor()
+            result = decompressor.decompress(data, max_length=max_size + 1)
+        else:
+            reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data))
+            result = reader.read(max_size + 1)
+    except PayloadTooLarge:
+        raise
+    except Exception as e:
+        raise ValueError(f'Invalid zstd body: {e}')
+    if len(result) > max_size:
+        raise PayloadTooLarge()
+    return result
+
+
+def supported_encodings():
+    """Content-Encoding values accepted by the ingestion endpoints."""
+    encodings = ['gzip', 'deflate']
+    if zstd is not None or zstandard is not None:
+        encodings.append('zstd')
+    return encodings
+
+
+class CompressedJSONParser(JSONParser):
+    """
+    JSON parser that transparently decodes ``Content-Encoding: gzip`` (and
+    ``zstd`` when available) request bodies before parsing.
+
+    The decompressed size is capped by ``PANTIES_MAX_DECOMPRESSED_SIZE`` to
+    guard against decompression bombs.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context.get('request')
+        encoding = ''
+        if request is not None:
+            encoding = request.headers.get('Content-Encoding', '').strip().lower()
+
+        if encoding in ('', 'identity'):
+            return super().parse(stream, media_type, parser_context)
+
+        max_size = getattr(
+            settings, 'PANTIES_MAX_DECOMPRESSED_SIZE', DEFAULT_MAX_DECOMPRESSED_SIZE
+        )
+        data = stream.read() if stream is not None else b''
+        try:
+            if encoding in ('gzip', 'x-gzip', 'deflate'):
+                data = _decompress_gzip(data, max_size)
+            elif encoding == 'zstd' and 'zstd' in supported_encodings():
+                data = _decompress_zstd(data, max_size)
+            else:
+                raise UnsupportedMediaType(
+                    media_type,
+                    detail=f'Unsupported Content-Encoding "{encoding}". '
+                           f'Supported: {", ".join(supported_encodings())}.'
+                )
+        except ValueError as e:
+            raise ParseError(str(e))
+
+        return super().parse(io.BytesIO(data), media_type, parser_context)
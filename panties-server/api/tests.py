@@ -1,3 +1,328 @@
-from django.test import TestCase
+"""
+Tests for the ingestion endpoints.
+"""
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError
+from django.test import TestCase, override_settings
+
+from core.models import DiscardedEventCount, ErrorEvent, Project, SessionCount, Span, StackFrame, Transaction
+
+# 2024-01-01 10:00:00 UTC
+HOUR = 1704103200
+
+
+def error_event(event_id):
+    return {
+        'event_id': event_id,
+        'type': 'exception',
+        'exception': {
+            'type': 'ValueError',
+            'message': 'bad',
+            'stacktrace': ['line 1\n', 'line 2\n'],
+            'frames': [{'filename': 'app.py', 'function': 'main', 'lineno': 3, 'in_app': True}],
+        },
+    }
+
+
+def transaction_event(event_id):
+    return {
+        'event_id': event_id,
+        'type': 'transaction',
+        'transaction': {
+            'name': 'GET /orders',
+            'duration': 12.5,
+            'trace_id': 'a' * 32,
+            'span_id': 'b' * 16,
+            'spans': [{'span_id': 'c' * 16, 'op': 'db', 'start': 1.0, 'duration': 4.0}],
+        },
+    }
+
+
+def client_report(event_id, quantity):
+    return {
+        'event_id': event_id,
+        'type': 'client_report',
+        'discarded': [{'reason': 'queue_overflow', 'category': 'error', 'quantity': quantity}],
+    }
+
+
+def sessions(event_id, exited=0, errored=0, crashed=0, started=HOUR):
+    return {
+        'event_id': event_id,
+        'type': 'sessions',
+        'release': 'app@1.0',
+        'environment': 'production',
+        'aggregates': [{'started': started, 'exited': exited, 'errored': errored, 'crashed': crashed}],
+    }
+
+
+class IngestionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = get_user_model().objects.create_user(username='owner', password='secret')
+        self.project = Project.objects.create(name='Shop', owner=owner)
+
+    def post(self, url, data, api_key=None):
+        return self.client.post(
+            url, data, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {api_key or self.project.api_key}',
+        )
+
+
+class EventIngestionTests(IngestionTestCase):
+    def test_stores_error_event(self):
+        response = self.post('/api/events/', error_event('e1'))
+        self.assertEqual(response.status_code, 201)
+        event = ErrorEvent.objects.get(event_id='e1')
+        self.assertEqual(event.project, self.project)
+        self.assertEqual(event.exception_type, 'ValueError')
+
+    def test_rejects_unknown_api_key(self):
+        response = self.post('/api/events/', error_event('e1'), api_key='nope')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(ErrorEvent.objects.exists())
+
+    def test_rejects_event_without_id(self):
+        response = self.post('/api/events/', {'type': 'message', 'message': {'text': 'hi'}})
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicate_event_id_is_acknowledged(self):
+        self.assertEqual(self.post('/api/events/', error_event('e1')).status_code, 201)
+        response = self.post('/api/events/', error_event('e1'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'success')
+        # Same id in another project: a different event
+        other = Project.objects.create(name='Other', owner=self.project.owner)
+        self.assertEqual(self.post('/api/events/', error_event('e1'), api_key=other.api_key).status_code, 201)
+        self.assertEqual(ErrorEvent.objects.filter(project=self.project).count(), 1)
+        self.assertEqual(StackFrame.objects.count(), 2)
+
+    def test_concurrent_duplicate_is_acknowledged(self):
+        with mock.patch.object(ErrorEvent, 'save', side_effect=IntegrityError('UNIQUE constraint failed')):
+            response = self.post('/api/events/', error_event('e1'))
+        self.assertEqual(response.status_code, 200)
+
+
+class ClientReportIngestionTests(IngestionTestCase):
+    def test_counts_are_summed(self):
+        self.assertEqual(self.post('/api/events/', client_report('r1', 3)).status_code, 201)
+        self.assertEqual(self.post('/api/events/', client_report('r2', 2)).status_code, 201)
+        row = DiscardedEventCount.objects.get(project=self.project)
+        self.assertEqual((row.reason, row.category, row.quantity), ('queue_overflow', 'error', 5))
+
+    def test_invalid_report(self):
+        response = self.post('/api/events/', {'type': 'client_report', 'discarded': [{'quantity': -1}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DiscardedEventCount.objects.exists())
+
+    def test_sample_rate_is_stored(self):
+        self.assertEqual(self.post('/api/events/', {**error_event('e1'), 'sample_rate': 0.25}).status_code, 201)
+        self.assertEqual(self.post('/api/events/', {**error_event('e2'), 'sample_rate': 5}).status_code, 201)
+        rates = dict(ErrorEvent.objects.values_list('event_id', 'sample_rate'))
+        self.assertEqual(rates, {'e1': 0.25, 'e2': 1.0})
+
+
+class StackFrameIngestionTests(IngestionTestCase):
+    def test_stores_structured_frames(self):
+        data = error_event('e1')
+        data['exception']['frames'].append({
+            'filename': 'lib.py', 'function': 'helper', 'module': 'lib', 'lineno': 10, 'in_app': False,
+            'context_line': '    raise ValueError("bad")', 'pre_context': ['def helper():'], 'post_context': [],
+        })
+        self.assertEqual(self.post('/api/events/', data).status_code, 201)
+        event = ErrorEvent.objects.get(event_id='e1')
+        frames = list(StackFrame.objects.filter(event=event).order_by('index'))
+        self.assertEqual([(f.function, f.lineno, f.in_app) for f in frames], [('main', 3, True), ('helper', 10, False)])
+        self.assertEqual(frames[1].context_line, '    raise ValueError("bad")')
+        self.assertEqual(frames[1].pre_context, ['def helper():'])
+
+    def test_text_stacktrace_rendered_from_frames(self):
+        data = error_event('e1')
+        del data['exception']['stacktrace']
+        self.assertEqual(self.post('/api/events/', data).status_code, 201)
+        self.assertIn('File "app.py", line 3, in main', ErrorEvent.objects.get().stacktrace)
+
+    def test_malformed_frames_are_skipped(self):
+        data = error_event('e1')
+        data['exception']['frames'] = ['not a frame', {'function': 'f', 'lineno': -1}]
+        self.assertEqual(self.post('/api/events/', data).status_code, 201)
+        frame = StackFrame.objects.get()
+        self.assertEqual((frame.filename, frame.lineno), ('', None))
+
+
+class SessionIngestionTests(IngestionTestCase):
+    def test_aggregates_by_hour(self):
+        response = self.post('/api/sessions/', {
+            **sessions('s1'),
+            'aggregates': [
+                {'started': HOUR, 'exited': 10, 'crashed': 1},
+                {'started': HOUR + 600, 'exited': 5, 'errored': 2},
+            ],
+        })
+        self.assertEqual(response.status_code, 201)
+        self.post('/api/sessions/', sessions('s2', exited=1))
+        row = SessionCount.objects.get(project=self.project)
+        self.assertEqual((row.release, row.environment), ('app@1.0', 'production'))
+        self.assertEqual((row.exited, row.errored, row.crashed), (16, 2, 1))
+
+    def test_rows_per_release_environment_and_hour(self):
+        batch = {'events': [
+            sessions('s1', exited=1),
+            sessions('s2', exited=2, started=HOUR + 3600),
+            {**sessions('s3', crashed=1), 'release': 'app@2.0'},
+            sessions('s4', errored=3),
+        ]}
+        self.assertEqual(self.post('/api/events/batch/', batch).status_code, 201)
+        rows = SessionCount.objects.order_by('release', 'hour')
+        self.assertEqual(
+            [(row.release, row.exited, row.errored, row.crashed) for row in rows],
+            [('app@1.0', 1, 3, 0), ('app@1.0', 2, 0, 0), ('app@2.0', 0, 0, 1)],
+        )
+
+    def test_event_endpoint_accepts_sessions(self):
+        self.assertEqual(self.post('/api/events/', sessions('s1', crashed=4)).status_code, 201)
+        self.assertEqual(SessionCount.objects.get(project=self.project).crashed, 4)
+
+    def test_invalid_payload(self):
+        response = self.post('/api/sessions/', sessions('s1', exited=-1))
+        self.assertEqual(response.status_code, 400)
+        response = self.post('/api/sessions/', {'type': 'transaction'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SessionCount.objects.exists())
+
+    def test_database_unavailable_returns_503(self):
+        with mock.patch.object(SessionCount.objects, 'get_or_create', side_effect=OperationalError('database is locked')):
+            response = self.post('/api/sessions/', sessions('s1', exited=1))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+
+class BatchIngestionTests(IngestionTestCase):
+    def test_partial_success(self):
+        response = self.post('/api/events/batch/', {'events': [
+            error_event('e1'),
+            {'type': 'message', 'message': {'text': 'no id'}},
+            transaction_event('t1'),
+            'not an event',
+            client_report('r1', 3),
+            sessions('s1', exited=2),
+        ]})
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body['status'], 'partial')
+        self.assertEqual((body['accepted'], body['rejected']), (4, 2))
+        self.assertEqual(
+            [result['status'] for result in body['results']],
+            ['success', 'error', 'success', 'error', 'success', 'success'],
+        )
+        self.assertEqual(ErrorEvent.objects.get().event_id, 'e1')
+        self.assertEqual(StackFrame.objects.count(), 1)
+        self.assertEqual(Transaction.objects.get().name, 'GET /orders')
+        self.assertEqual(Span.objects.count(), 1)
+        self.assertEqual(DiscardedEventCount.objects.get().quantity, 3)
+        self.assertEqual(SessionCount.objects.get().exited, 2)
+
+    def test_all_rejected(self):
+        response = self.post('/api/events/batch/', {'events': [{'type': 'message'}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'partial')
+
+    def test_invalid_envelope(self):
+        self.assertEqual(self.post('/api/events/batch/', {'event': []}).status_code, 400)
+
+    @mock.patch('api.views.MAX_BATCH_EVENTS', 2)
+    def test_too_many_events(self):
+        response = self.post('/api/events/batch/', {'events': [error_event(f'e{i}') for i in range(3)]})
+        self.assertEqual(response.status_code, 413)
+
+    def test_events_stored_once_per_id(self):
+        batch = {'events': [error_event('e1'), error_event('e2'), error_event('e1')]}
+        self.assertEqual(self.post('/api/events/batch/', batch).status_code, 201)
+        # Retry after a lost response: acknowledged, not stored again
+        response = self.post('/api/events/batch/', batch)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(sorted(ErrorEvent.objects.values_list('event_id', flat=True)), ['e1', 'e2'])
+        self.assertEqual(StackFrame.objects.count(), 2)
+
+    def test_concurrent_duplicate_is_retried(self):
+        with mock.patch.object(ErrorEvent.objects, 'bulk_create', side_effect=IntegrityError('UNIQUE constraint failed')):
+            response = self.post('/api/events/batch/', {'events': [error_event('e1'), client_report('r1', 3)]})
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(DiscardedEventCount.objects.exists())
+
+    def test_database_unavailable_stores_nothing(self):
+        batch = {'events': [error_event('e1'), client_report('r1', 3), sessions('s1', exited=2)]}
+        with mock.patch.object(ErrorEvent.objects, 'bulk_create', side_effect=OperationalError('database is locked')):
+            response = self.post('/api/events/batch/', batch)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '30')
+        self.assertFalse(ErrorEvent.objects.exists())
+        self.assertFalse(DiscardedEventCount.objects.exists())
+        self.assertFalse(SessionCount.objects.exists())
+
+    def test_counters_written_in_batch_transaction(self):
+        # The counters come after the events: a failure on the last write
+        # must roll back everything written before it
+        batch = {'events': [error_event('e1'), client_report('r1', 3), sessions('s1', exited=2)]}
+        with mock.patch('api.views.save_session_aggregates', side_effect=OperationalError('database is locked')):
+            self.assertEqual(self.post('/api/events/batch/', batch).status_code, 503)
+        self.assertFalse(ErrorEvent.objects.exists())
+        self.assertFalse(DiscardedEventCount.objects.exists())
+
+        # The client retries the same batch: counted once
+        self.assertEqual(self.post('/api/events/batch/', batch).status_code, 201)
+        self.assertEqual(ErrorEvent.objects.count(), 1)
+        self.assertEqual(DiscardedEventCount.objects.get().quantity, 3)
+        self.assertEqual(SessionCount.objects.get().exited, 2)
+
+
+class RetryableResponseTests(IngestionTestCase):
+    # Responses the SDK retries later instead of dropping the events
+    def test_database_unavailable_returns_503(self):
+        with mock.patch.object(ErrorEvent, 'save', side_effect=OperationalError('database is locked')):
+            response = self.post('/api/events/', error_event('e1'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '30')
+        self.assertFalse(ErrorEvent.objects.exists())
+
+    @override_settings(PANTIES_INGEST_RATE='2/min')
+    def test_throttled_requests_get_429(self):
+        codes = [self.post('/api/events/', error_event(f'e{i}')).status_code for i in range(3)]
+        self.assertEqual(codes, [201, 201, 429])
+
+    @override_settings(PANTIES_INGEST_RATE='1/min')
+    def test_throttle_sends_retry_after(self):
+        self.post('/api/events/', error_event('e1'))
+        response = self.post('/api/events/batch/', {'events': [error_event('e2')]})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response.headers['Retry-After']), 0)
+
+
+class FieldLimitTests(IngestionTestCase):
+    # A value longer than its column must never reach the database: the
+    # DataError would turn the whole batch into a 500 the client retries
+    def test_free_text_fields_are_truncated(self):
+        data = error_event('e1')
+        data['exception']['type'] = 'E' * 300
+        data.update(level='x' * 50, environment='p' * 100, service_name='s' * 200)
+        self.assertEqual(self.post('/api/events/', data).status_code, 201)
+        event = ErrorEvent.objects.get()
+        self.assertEqual(len(event.exception_type), 128)
+        self.assertEqual((len(event.level), len(event.environment), len(event.service_name)), (16, 64, 128))
+
+    def test_oversized_fingerprint_is_rejected(self):
+        data = {**error_event('e1'), 'fingerprint': 'f' * 65}
+        self.assertEqual(self.post('/api/events/', data).status_code, 400)
+        response = self.post('/api/events/batch/', {'events': [data, error_event('e2')]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r['status'] for r in response.json()['results']], ['error', 'success'])
+
+    def test_oversized_event_id_is_rejected(self):
+        self.assertEqual(self.post('/api/events/', error_event('e' * 65)).status_code, 400)
+        self.assertEqual(self.post('/api/events/', transaction_event(['t1'])).status_code, 400)
+        self.assertFalse(ErrorEvent.objects.exists())
+        self.assertFalse(Transaction.objects.exists())
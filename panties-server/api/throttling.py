@@ -0,0 +1,46 @@
+"""
+Back-pressure for Panties event ingestion.
+
+Clients are told to slow down with ``429 Too Many Requests`` (per-project
+rate limit) or ``503 Service Unavailable`` (storage temporarily down), both
+carrying a ``Retry-After`` header that the SDKs honour.
+"""
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import SimpleRateThrottle
+
+# Default Retry-After (seconds) sent with 503 responses
+DEFAULT_RETRY_AFTER = 30
+
+
+class ProjectIngestionThrottle(SimpleRateThrottle):
+    """
+    Rate limit on ingestion requests per project API key.
+
+    The rate comes from ``PANTIES_INGEST_RATE`` (e.g. ``"100/s"``,
+    ``"5000/min"``); when it is unset the throttle is disabled. Throttled
+    requests get a ``429`` with ``Retry-After``.
+    """
+    scope = 'ingest'
+
+    def get_rate(self):
+        return getattr(settings, 'PANTIES_INGEST_RATE', None) or None
+
+    def get_cache_key(self, request, view):
+        auth_header = request.headers.get('Authorization', '')
+        if not auth_header.startswith('Bearer '):
+            # Unauthenticated requests are rejected by the view anyway
+            return None
+        api_key = auth_header.replace('Bearer ', '').strip()
+        return self.cache_format % {'scope': self.scope, 'ident': api_key}
+
+
+def service_unavailable(message):
+    """Build a ``503`` response asking the client to retry later."""
+    retry_after = getattr(settings, 'PANTIES_RETRY_AFTER', DEFAULT_RETRY_AFTER)
+    return Response(
+        {'error': message},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(retry_after)},
+    )
@@ -9,4 +9,7 @@ app_name = 'api'
 urlpatterns = [
     # Event ingestion endpoint
     path('events/', views.EventIngestionView.as_view(), name='ingest_event'),
+    path('events/batch/', views.EventBatchIngestionView.as_view(), name='ingest_event_batch'),
+    # Release health: pre-aggregated session counters
+    path('sessions/', views.SessionIngestionView.as_view(), name='ingest_sessions'),
 ]
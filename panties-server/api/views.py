@@ -2,17 +2,50 @@
 API views for Panties event ingestion.
 """
 import logging
-from datetime import datetime
+from django.db import IntegrityError, OperationalError, transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from django.utils.timezone import make_aware
 
-from core.models import Project, ErrorEvent
+from core.models import ErrorEvent, StackFrame, Transaction, Span
+from .ingestion import (
+    authenticate_project, build_error_event, build_stack_frames, EventValidationError,
+    is_client_report, record_client_report, parse_client_report, save_client_report, is_transaction, build_transaction, build_spans,
+    is_session_aggregates, record_session_aggregates, parse_session_aggregates, save_session_aggregates,
+)
+from .parsers import CompressedJSONParser
+from .throttling import ProjectIngestionThrottle, service_unavailable
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on the number of events accepted in a single batch envelope
+MAX_BATCH_EVENTS = 1000
+
+
+def _already_stored(project, event_id):
+    """Response for an error event the project already has (a client retry)."""
+    logger.info(f"Duplicate event {event_id} for project {project.name} ignored")
+    return Response(
+        {'status': 'success', 'event_id': event_id, 'message': 'Event already stored'},
+        status=status.HTTP_200_OK
+    )
+
+
+def _record_sessions(project, data):
+    """Store a sessions payload and build the response for it."""
+    try:
+        record_session_aggregates(project, data)
+    except EventValidationError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except OperationalError as e:
+        logger.error(f"Database unavailable, session aggregates deferred: {e}")
+        return service_unavailable('Storage temporarily unavailable')
+    return Response(
+        {'status': 'success', 'event_id': data.get('event_id'), 'message': 'Session aggregates recorded'},
+        status=status.HTTP_201_CREATED
+    )
+
 
 class EventIngestionView(APIView):
     """
@@ -20,127 +53,260 @@ class EventIngestionView(APIView):
     Authentication via API key in Authorization header.
     """
     permission_classes = [AllowAny]  # We handle auth manually via API key
+    parser_classes = [CompressedJSONParser]
+    throttle_classes = [ProjectIngestionThrottle]
 
     def post(self, request):
         """Handle incoming error events."""
-        # Extract API key from Authorization header
-        auth_header = request.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
-            return Response(
-                {'error': 'Missing or invalid Authorization header. Expected: Bearer <api_key>'},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
+        project, error_response = authenticate_project(request)
+        if error_response is not None:
+            return error_response
 
-        api_key = auth_header.replace('Bearer ', '').strip()
+        # Parse event data
+        data = request.data
 
-        # Find project by API key
-        try:
-            project = Project.objects.get(api_key=api_key)
-        except Project.DoesNotExist:
+        # Client reports only update the discarded-events rollup
+        if is_client_report(data):
+            try:
+                record_client_report(project, data)
+            except EventValidationError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except OperationalError as e:
+                logger.error(f"Database unavailable, client report deferred: {e}")
+                return service_unavailable('Storage temporarily unavailable')
             return Response(
-                {'error': 'Invalid API key'},
-                status=status.HTTP_401_UNAUTHORIZED
+                {'status': 'success', 'event_id': data.get('event_id'), 'message': 'Client report recorded'},
+                status=status.HTTP_201_CREATED
             )
 
-        # Parse event data
-        data = request.data
-        if not isinstance(data, dict):
+        # Session counters only update the release health rollup
+        if is_session_aggregates(data):
+            return _record_sessions(project, data)
+
+        # Performance transactions are stored apart from error events
+        if is_transaction(data):
+            try:
+                txn = build_transaction(project, data)
+            except EventValidationError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                with transaction.atomic():
+                    txn.save()
+                    Span.objects.bulk_create(build_spans(txn, data))
+            except OperationalError as e:
+                logger.error(f"Database unavailable, transaction deferred: {e}")
+                return service_unavailable('Storage temporarily unavailable')
             return Response(
-                {'error': 'Invalid request body. Expected JSON object.'},
-                status=status.HTTP_400_BAD_REQUEST
+                {'status': 'success', 'event_id': txn.event_id, 'message': 'Transaction received and stored'},
+                status=status.HTTP_201_CREATED
             )
 
-        # Extract required fields
-        event_id = data.get('event_id')
-        # Support both 'type' (from Python client) and 'event_type'
-        event_type = data.get('type') or data.get('event_type', 'exception')
-
-        if not event_id:
+        try:
+            error_event = build_error_event(project, data)
+        except EventValidationError as e:
             return Response(
-                {'error': 'Missing required field: event_id'},
+                {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Parse timestamp
-        timestamp_value = data.get('timestamp')
-        if timestamp_value:
-            try:
-                if isinstance(timestamp_value, (int, float)):
-                    # Unix timestamp
-                    timestamp = make_aware(datetime.fromtimestamp(timestamp_value))
-                else:
-                    # ISO format string
-                    timestamp = make_aware(datetime.fromisoformat(timestamp_value.replace('Z', '+00:00')))
-            except (ValueError, TypeError) as e:
-                logger.warning(f"Failed to parse timestamp: {e}")
-                timestamp = make_aware(datetime.now())
-        else:
-            timestamp = make_aware(datetime.now())
-
-        # Extract exception data (support nested format from Python client)
-        exception_type = None
-        message = None
-        stacktrace = None
-        level = data.get('level', 'error')
-
-        if event_type == 'exception' and 'exception' in data:
-            # Nested format from Python client
-            exc_data = data['exception']
-            exception_type = exc_data.get('type')
-            message = exc_data.get('message')
-
-            # Stacktrace can be a list of frames or a string
-            stacktrace_data = exc_data.get('stacktrace')
-            if isinstance(stacktrace_data, list):
-                # Join list of frames into a single string
-                stacktrace = ''.join(stacktrace_data)
-            else:
-                stacktrace = stacktrace_data
-        elif event_type == 'message' and 'message' in data:
-            # Message event from Python client
-            msg_data = data['message']
-            message = msg_data.get('text')
-            level = msg_data.get('level', 'info')
-        else:
-            # Flat format (legacy or other clients)
-            exception_type = data.get('exception_type')
-            message = data.get('message')
-            stacktrace = data.get('stacktrace')
-
         # Create error event
         try:
-            error_event = ErrorEvent.objects.create(
-                project=project,
-                event_id=event_id,
-                timestamp=timestamp,
-                event_type=event_type,
-                exception_type=exception_type,
-                message=message,
-                stacktrace=stacktrace,
-                level=level,
-                environment=data.get('environment'),
-                service_name=data.get('service_name'),
-                tags=data.get('tags', {}),
-                extra=data.get('extra', {})
-            )
+            if ErrorEvent.objects.filter(project=project, event_id=error_event.event_id).exists():
+                return _already_stored(project, error_event.event_id)
+            with transaction.atomic():
+                error_event.save()
+                StackFrame.objects.bulk_create(build_stack_frames(error_event, data))
 
             logger.info(
-                f"Event ingested: {event_id} for project {project.name} "
-                f"(type: {event_type}, exception: {error_event.exception_type})"
+                f"Event ingested: {error_event.event_id} for project {project.name} "
+                f"(type: {error_event.event_type}, exception: {error_event.exception_type})"
             )
 
             return Response(
                 {
                     'status': 'success',
-                    'event_id': event_id,
+                    'event_id': error_event.event_id,
                     'message': 'Event received and stored'
                 },
                 status=status.HTTP_201_CREATED
             )
 
+        except IntegrityError:
+            # Stored by a concurrent request between the check and the insert
+            return _already_stored(project, error_event.event_id)
+        except OperationalError as e:
+            # Database down or overloaded: ask the client to retry later
+            logger.error(f"Database unavailable, event deferred: {e}")
+            return service_unavailable('Storage temporarily unavailable')
         except Exception as e:
             logger.error(f"Failed to create error event: {e}", exc_info=True)
             return Response(
                 {'error': 'Failed to store event', 'details': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class EventBatchIngestionView(APIView):
+    """
+    API endpoint for ingesting a batch envelope of events in one request.
+
+    Expects ``{"events": [...]}``. The project is resolved once, every event is
+    validated independently and the valid ones are written with a single
+    ``bulk_create``. The response carries a status entry for each event, in
+    the same order as the envelope.
+    """
+    permission_classes = [AllowAny]  # We handle auth manually via API key
+    parser_classes = [CompressedJSONParser]
+    throttle_classes = [ProjectIngestionThrottle]
+
+    def post(self, request):
+        """Handle an incoming batch envelope."""
+        project, error_response = authenticate_project(request)
+        if error_response is not None:
+            return error_response
+
+        data = request.data
+        events = data.get('events') if isinstance(data, dict) else None
+        if not isinstance(events, list):
+            return Response(
+                {'error': 'Invalid request body. Expected JSON object with an "events" list.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(events) > MAX_BATCH_EVENTS:
+            return Response(
+                {'error': f'Too many events in batch (max {MAX_BATCH_EVENTS}).'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        results = []
+        to_create = []
+        payloads = []
+        transactions = []
+        transaction_payloads = []
+        # Counter payloads are validated here but written with the events:
+        # a batch retried after a 503 must not count them twice
+        client_reports = []
+        session_aggregates = []
+        for event_data in events:
+            event_id = event_data.get('event_id') if isinstance(event_data, dict) else None
+            try:
+                if is_client_report(event_data):
+                    client_reports.append(parse_client_report(event_data))
+                    results.append({'event_id': event_id, 'status': 'success'})
+                    continue
+                if is_session_aggregates(event_data):
+                    session_aggregates.append(parse_session_aggregates(event_data))
+                    results.append({'event_id': event_id, 'status': 'success'})
+                    continue
+                if is_transaction(event_data):
+                    transactions.append(build_transaction(project, event_data))
+                    transaction_payloads.append(event_data)
+                else:
+                    to_create.append(build_error_event(project, event_data))
+                    payloads.append(event_data)
+            except EventValidationError as e:
+                results.append({'event_id': event_id, 'status': 'error', 'error': str(e)})
+                continue
+            except OperationalError as e:
+                logger.error(f"Database unavailable, batch deferred: {e}")
+                return service_unavailable('Storage temporarily unavailable')
+            except Exception as e:
+                logger.warning(f"Rejected malformed event {event_id}: {e}")
+                results.append({'event_id': event_id, 'status': 'error', 'error': 'Malformed event'})
+                continue
+            results.append({'event_id': event_id, 'status': 'success'})
+
+        # Error events already stored (a batch retried after a lost response)
+        # or repeated in the batch are acknowledged without a second copy.
+        # Their frames need the new rows' primary keys, so conflicts are
+        # filtered here rather than with bulk_create(ignore_conflicts=True).
+        try:
+            seen = set(ErrorEvent.objects.filter(
+                project=project, event_id__in=[error_event.event_id for error_event in to_create]
+            ).values_list('event_id', flat=True))
+        except OperationalError as e:
+            logger.error(f"Database unavailable, batch deferred: {e}")
+            return service_unavailable('Storage temporarily unavailable')
+        new_events = []
+        for error_event, event_data in zip(to_create, payloads):
+            if error_event.event_id not in seen:
+                seen.add(error_event.event_id)
+                new_events.append((error_event, event_data))
+        to_create = [error_event for error_event, _ in new_events]
+        payloads = [event_data for _, event_data in new_events]
+
+        try:
+            with transaction.atomic():
+                ErrorEvent.objects.bulk_create(to_create)
+                frames = []
+                for error_event, event_data in zip(to_create, payloads):
+                    frames.extend(build_stack_frames(error_event, event_data))
+                StackFrame.objects.bulk_create(frames)
+                Transaction.objects.bulk_create(transactions)
+                spans = []
+                for txn, event_data in zip(transactions, transaction_payloads):
+                    spans.extend(build_spans(txn, event_data))
+                Span.objects.bulk_create(spans)
+                for counts in client_reports:
+                    save_client_report(project, counts)
+                for aggregates in session_aggregates:
+                    save_session_aggregates(project, aggregates)
+        except IntegrityError as e:
+            # An event of the batch was stored concurrently: nothing was
+            # written, and the retry skips it
+            logger.warning(f"Concurrent duplicate in batch, deferred: {e}")
+            return service_unavailable('Duplicate event stored concurrently')
+        except OperationalError as e:
+            logger.error(f"Database unavailable, batch deferred: {e}")
+            return service_unavailable('Storage temporarily unavailable')
+        except Exception as e:
+            logger.error(f"Failed to store event batch: {e}", exc_info=True)
+            return Response(
+                {'error': 'Failed to store events', 'details': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        accepted = sum(1 for result in results if result['status'] == 'success')
+        logger.info(
+            f"Batch ingested for project {project.name}: "
+            f"{accepted} accepted, {len(results) - accepted} rejected"
+        )
+
+        return Response(
+            {
+                'status': 'success' if accepted == len(results) else 'partial',
+                'accepted': accepted,
+                'rejected': len(results) - accepted,
+                'results': results,
+            },
+            status=status.HTTP_201_CREATED if accepted or not results else status.HTTP_400_BAD_REQUEST
+        )
+
+
+class SessionIngestionView(APIView):
+    """
+    Aggregate-only endpoint for release health.
+
+    Expects one ``sessions`` payload (``release``, ``environment`` and an
+    ``aggregates`` list of per-minute ``exited``/``errored``/``crashed``
+    counters) and adds it to the hourly ``SessionCount`` rollup. The same
+    payload is also accepted by the event and batch endpoints.
+    """
+    permission_classes = [AllowAny]  # We handle auth manually via API key
+    parser_classes = [CompressedJSONParser]
+    throttle_classes = [ProjectIngestionThrottle]
+
+    def post(self, request):
+        """Handle an incoming sessions payload."""
+        project, error_response = authenticate_project(request)
+        if error_response is not None:
+            return error_response
+
+        data = request.data
+        if not isinstance(data, dict) or data.get('type', 'sessions') != 'sessions':
+            return Response(
+                {'error': 'Invalid request body. Expected a "sessions" payload.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return _record_sessions(project, data)
@@ -163,6 +163,15 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 50,
 }
 
+# Event ingestion
+# Maximum size of a request body after Content-Encoding (gzip/zstd) decoding
+PANTIES_MAX_DECOMPRESSED_SIZE = config('PANTIES_MAX_DECOMPRESSED_SIZE', default=10 * 1024 * 1024, cast=int)
+# Per-project ingestion rate limit, e.g. "100/s" or "5000/min" (unset: no limit).
+# Throttled requests get a 429 with Retry-After.
+PANTIES_INGEST_RATE = config('PANTIES_INGEST_RATE', default=None)
+# Retry-After (seconds) sent with 503 responses when storage is unavailable
+PANTIES_RETRY_AFTER = config('PANTIES_RETRY_AFTER', default=30, cast=int)
+
 # Logging
 LOGGING = {
     'version': 1,
@@ -4,7 +4,7 @@ Admin configuration for Panties core models.
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Project, ProjectMember, ErrorEvent
+from .models import Project, ProjectMember, ErrorEvent, StackFrame, DiscardedEventCount, SessionCount, Transaction, Span
 
 
 class ProjectMemberInline(admin.TabularInline):
@@ -69,9 +69,19 @@ class ProjectMemberAdmin(admin.ModelAdmin):
     )
 
 
+class StackFrameInline(admin.TabularInline):
+    """Inline admin for structured stack frames."""
+    model = StackFrame
+    extra = 0
+    fields = ('index', 'filename', 'lineno', 'function', 'module', 'in_app', 'context_line')
+    readonly_fields = fields
+    can_delete = False
+
+
 @admin.register(ErrorEvent)
 class ErrorEventAdmin(admin.ModelAdmin):
     """Admin interface for ErrorEvent model."""
+    inlines = [StackFrameInline]
     list_display = ('event_id_short', 'project', 'event_type', 'exception_type', 'timestamp', 'has_stacktrace')
     list_filter = ('event_type', 'timestamp', 'project')
     search_fields = ('event_id', 'exception_type', 'message', 'project__name')
@@ -85,6 +95,10 @@ class ErrorEventAdmin(admin.ModelAdmin):
         ('Error Details', {
             'fields': ('exception_type', 'message', 'level')
         }),
+        ('Grouping', {
+            'fields': ('fingerprint', 'occurrences', 'first_seen', 'last_seen'),
+            'classes': ('collapse',)
+        }),
         ('Stack Trace', {
             'fields': ('stacktrace',),
             'classes': ('collapse',)
@@ -107,3 +121,40 @@ class ErrorEventAdmin(admin.ModelAdmin):
         return format_html('<span style="color: red;">✗</span>')
     has_stacktrace.short_description = 'Stack Trace'
     has_stacktrace.admin_order_field = 'stacktrace'
+
+
+@admin.register(DiscardedEventCount)
+class DiscardedEventCountAdmin(admin.ModelAdmin):
+    """Admin interface for DiscardedEventCount model."""
+    list_display = ('project', 'date', 'reason', 'category', 'quantity')
+    list_filter = ('reason', 'category', 'date', 'project')
+    readonly_fields = ('project', 'date', 'reason', 'category', 'quantity')
+
+
+@admin.register(SessionCount)
+class SessionCountAdmin(admin.ModelAdmin):
+    """Admin interface for SessionCount model."""
+    list_display = ('project', 'release', 'environment', 'hour', 'exited', 'errored', 'crashed')
+    list_filter = ('environment', 'hour', 'project')
+    search_fields = ('release',)
+    readonly_fields = ('project', 'release', 'environment', 'hour', 'exited', 'errored', 'crashed')
+
+
+class SpanInline(admin.TabularInline):
+    """Inline admin for the spans of a transaction."""
+    model = Span
+    extra = 0
+    fields = ('op', 'description', 'status', 'start_offset', 'duration')
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(Transaction)
+class TransactionAdmin(admin.ModelAdmin):
+    """Admin interface for Transaction model."""
+    inlines = [SpanInline]
+    list_display = ('name', 'project', 'duration', 'status', 'start_timestamp')
+    list_filter = ('status', 'start_timestamp', 'project')
+    search_fields = ('name', 'trace_id', 'event_id', 'project__name')
+    readonly_fields = ('event_id', 'trace_id', 'span_id', 'parent_span_id', 'start_timestamp')
+    date_hierarchy = 'start_timestamp'
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_errorevent_aggregation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StackFrame',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('filename', models.CharField(max_length=512)),
+                ('function', models.CharField(blank=True, db_index=True, max_length=256)),
+                ('module', models.CharField(blank=True, db_index=True, max_length=256)),
+                ('lineno', models.PositiveIntegerField(blank=True, null=True)),
+                ('in_app', models.BooleanField(default=False)),
+                ('context_line', models.TextField(blank=True, null=True)),
+                ('pre_context', models.JSONField(blank=True, default=list)),
+                ('post_context', models.JSONField(blank=True, default=list)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='frames', to='core.errorevent')),
+            ],
+            options={
+                'ordering': ['event', 'index'],
+                'indexes': [models.Index(fields=['filename', 'lineno'], name='core_stackf_filenam_e48e9c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_stackframe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='errorevent',
+            name='sample_rate',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.CreateModel(
+            name='DiscardedEventCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True)),
+                ('reason', models.CharField(max_length=32)),
+                ('category', models.CharField(max_length=32)),
+                ('quantity', models.PositiveBigIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='discarded_counts', to='core.project')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('project', 'date', 'reason', 'category')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_sampling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='errorevent',
+            name='exception_chain',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_exception_chain'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stackframe',
+            name='vars',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_errorevent_breadcrumbs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='errorevent',
+            name='contexts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
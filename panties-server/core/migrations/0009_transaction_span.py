@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_errorevent_contexts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(db_index=True, max_length=64)),
+                ('trace_id', models.CharField(db_index=True, max_length=32)),
+                ('span_id', models.CharField(max_length=16)),
+                ('parent_span_id', models.CharField(blank=True, max_length=16, null=True)),
+                ('name', models.CharField(max_length=256)),
+                ('op', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(default='ok', max_length=32)),
+                ('start_timestamp', models.DateTimeField(db_index=True)),
+                ('duration', models.FloatField()),
+                ('environment', models.CharField(blank=True, db_index=True, max_length=64, null=True)),
+                ('service_name', models.CharField(blank=True, db_index=True, max_length=128, null=True)),
+                ('tags', models.JSONField(blank=True, default=dict)),
+                ('sample_rate', models.FloatField(default=1.0)),
+                ('dropped_spans', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='core.project')),
+            ],
+            options={
+                'ordering': ['-start_timestamp'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Span',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('span_id', models.CharField(max_length=16)),
+                ('parent_span_id', models.CharField(blank=True, max_length=16, null=True)),
+                ('op', models.CharField(db_index=True, max_length=64)),
+                ('description', models.TextField(blank=True)),
+                ('status', models.CharField(default='ok', max_length=32)),
+                ('start_offset', models.FloatField()),
+                ('duration', models.FloatField()),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spans', to='core.transaction')),
+            ],
+            options={
+                'ordering': ['transaction', 'start_offset'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['project', 'start_timestamp'], name='core_transa_project_82ec75_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['project', 'name', 'duration'], name='core_transa_project_f51b61_idx'),
+        ),
+    ]
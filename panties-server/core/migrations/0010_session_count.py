@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_transaction_span'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('release', models.CharField(blank=True, db_index=True, max_length=200)),
+                ('environment', models.CharField(blank=True, max_length=64)),
+                ('hour', models.DateTimeField(db_index=True)),
+                ('exited', models.PositiveBigIntegerField(default=0)),
+                ('errored', models.PositiveBigIntegerField(default=0)),
+                ('crashed', models.PositiveBigIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_counts', to='core.project')),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'unique_together': {('project', 'release', 'environment', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:27
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def delete_duplicate_events(apps, schema_editor):
+    """Keep the first stored copy of each (project, event_id) before adding the constraint."""
+    ErrorEvent = apps.get_model('core', 'ErrorEvent')
+    duplicates = (
+        ErrorEvent.objects.order_by()
+        .values('project', 'event_id')
+        .annotate(copies=Count('id'), first=Min('id'))
+        .filter(copies__gt=1)
+    )
+    for row in list(duplicates):
+        ErrorEvent.objects.filter(project=row['project'], event_id=row['event_id']).exclude(pk=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_session_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_events, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='errorevent',
+            unique_together={('project', 'event_id')},
+        ),
+    ]
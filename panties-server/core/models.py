@@ -1,3 +1,5 @@
+from datetime import datetime, timezone as dt_timezone
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -137,6 +139,27 @@ class ErrorEvent(models.Model):
     extra = models.JSONField(default=dict, blank=True)
     raw_json = models.JSONField(null=True, blank=True)
 
+    # Grouping / client-side aggregation of duplicates
+    fingerprint = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    occurrences = models.PositiveIntegerField(default=1)
+    first_seen = models.DateTimeField(null=True, blank=True)
+    last_seen = models.DateTimeField(null=True, blank=True)
+
+    # Client-side sampling rate the event was kept with (1.0 = not sampled)
+    sample_rate = models.FloatField(default=1.0)
+
+    # Chained exceptions / ExceptionGroup tree, in pre-order with the primary
+    # exception first. Each node references its frames by index into
+    # ``frames`` (the event's shared frame table).
+    exception_chain = models.JSONField(default=list, blank=True)
+
+    # Last log records / HTTP calls before the event (oldest first), each
+    # with ``timestamp``, ``category``, ``level``, ``message`` and ``data``
+    breadcrumbs = models.JSONField(default=list, blank=True)
+
+    # Structured contexts set on the client scope (e.g. ``user``, ``request``)
+    contexts = models.JSONField(default=dict, blank=True)
+
     # Environment info
     environment = models.CharField(max_length=64, null=True, blank=True, db_index=True)
     service_name = models.CharField(max_length=128, null=True, blank=True, db_index=True)
@@ -146,6 +169,8 @@ class ErrorEvent(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # A client retrying a batch it could not confirm resends the same ids
+        unique_together = ['project', 'event_id']
         indexes = [
             models.Index(fields=['-created_at', 'project']),
             models.Index(fields=['event_type', 'project']),
@@ -154,3 +179,232 @@ class ErrorEvent(models.Model):
 
     def __str__(self):
         return f"{self.event_type} - {self.exception_type or self.message[:50]}"
+
+    def exception_tree(self, frames=None):
+        """
+        Nodes of ``exception_chain`` in pre-order, each with its ``depth`` in
+        the tree and its resolved ``StackFrame`` rows, for rendering.
+        """
+        if frames is None:
+            frames = self.frames.all()
+        by_index = {frame.index: frame for frame in frames}
+        depths = []
+        tree = []
+        for node in self.exception_chain:
+            parent = node.get('parent')
+            depth = depths[parent] + 1 if parent is not None else 0
+            depths.append(depth)
+            tree.append({
+                **node,
+                'depth': depth,
+                'frames': [by_index[i] for i in node.get('frames', []) if i in by_index],
+            })
+        return tree
+
+    def breadcrumb_entries(self):
+        """``breadcrumbs`` with their unix ``timestamp`` as ``time``, for rendering."""
+        entries = []
+        for crumb in self.breadcrumbs:
+            timestamp = crumb.get('timestamp')
+            entries.append({
+                **crumb,
+                'time': datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+                if isinstance(timestamp, (int, float)) else None,
+            })
+        return entries
+
+
+class DiscardedEventCount(models.Model):
+    """Daily rollup of events dropped client-side (sampling, rate limiting)"""
+
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='discarded_counts'
+    )
+    date = models.DateField(db_index=True)
+    reason = models.CharField(max_length=32)
+    category = models.CharField(max_length=32)
+    quantity = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['project', 'date', 'reason', 'category']
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.project.name} {self.date}: {self.quantity} {self.category} ({self.reason})"
+
+
+class SessionCount(models.Model):
+    """
+    Hourly rollup of session outcomes per release and environment.
+
+    SDKs count sessions in memory and send pre-aggregated counters, so any
+    number of sessions costs one row per project, release, environment
+    and hour.
+    """
+
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='session_counts'
+    )
+    release = models.CharField(max_length=200, blank=True, db_index=True)
+    environment = models.CharField(max_length=64, blank=True)
+    hour = models.DateTimeField(db_index=True)
+    exited = models.PositiveBigIntegerField(default=0)
+    errored = models.PositiveBigIntegerField(default=0)
+    crashed = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['project', 'release', 'environment', 'hour']
+        ordering = ['-hour']
+
+    def __str__(self):
+        return f"{self.project.name} {self.release or '(no release)'} {self.hour:%Y-%m-%d %H:00}: {self.total} sessions"
+
+    @property
+    def total(self):
+        return self.exited + self.errored + self.crashed
+
+
+class StackFrame(models.Model):
+    """
+    Structured stack frame of an exception event, outermost first.
+
+    For chained exceptions the rows are the event's shared frame table:
+    frames common to several tracebacks are stored once and referenced by
+    ``index`` from ``ErrorEvent.exception_chain``.
+    """
+
+    event = models.ForeignKey(
+        ErrorEvent,
+        on_delete=models.CASCADE,
+        related_name='frames'
+    )
+    index = models.PositiveIntegerField()
+
+    filename = models.CharField(max_length=512)
+    function = models.CharField(max_length=256, blank=True, db_index=True)
+    module = models.CharField(max_length=256, blank=True, db_index=True)
+    lineno = models.PositiveIntegerField(null=True, blank=True)
+    in_app = models.BooleanField(default=False)
+
+    # Source context around the failing line
+    context_line = models.TextField(null=True, blank=True)
+    pre_context = models.JSONField(default=list, blank=True)
+    post_context = models.JSONField(default=list, blank=True)
+
+    # Local variables (name -> bounded repr), when the client captures them
+    vars = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['event', 'index']
+        indexes = [
+            models.Index(fields=['filename', 'lineno']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename}:{self.lineno} in {self.function}"
+
+    @property
+    def formatted(self):
+        """Traceback-style text for this frame."""
+        text = f'  File "{self.filename}", line {self.lineno}, in {self.function}\n'
+        if self.context_line:
+            text += f'    {self.context_line.strip()}\n'
+        return text
+
+
+class Transaction(models.Model):
+    """
+    Finished performance transaction (e.g. an HTTP request) sent by a
+    client with tracing enabled. Clients sample transactions at the start
+    (head-based), so ``sample_rate`` tells how many requests each row stands for.
+    """
+
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='transactions'
+    )
+    event_id = models.CharField(max_length=64, db_index=True)
+    trace_id = models.CharField(max_length=32, db_index=True)
+    span_id = models.CharField(max_length=16)
+    parent_span_id = models.CharField(max_length=16, null=True, blank=True)
+
+    # Endpoint / job name the latency percentiles are grouped by
+    name = models.CharField(max_length=256)
+    op = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=32, default='ok')
+
+    start_timestamp = models.DateTimeField(db_index=True)
+    # Wall-clock duration in milliseconds
+    duration = models.FloatField()
+
+    environment = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    service_name = models.CharField(max_length=128, null=True, blank=True, db_index=True)
+    tags = models.JSONField(default=dict, blank=True)
+    sample_rate = models.FloatField(default=1.0)
+    # Spans the client did not send because the transaction had too many
+    dropped_spans = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-start_timestamp']
+        indexes = [
+            models.Index(fields=['project', 'start_timestamp']),
+            models.Index(fields=['project', 'name', 'duration']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.duration:.1f} ms)"
+
+    def span_rows(self, spans=None):
+        """
+        Spans in start order, each with its ``depth`` below the transaction
+        and its offset / width as a percentage of the transaction, for a
+        waterfall rendering.
+        """
+        if spans is None:
+            spans = self.spans.all()
+        depths = {self.span_id: 0}
+        total = self.duration or 1.0
+        rows = []
+        for span in spans:
+            depth = depths.get(span.parent_span_id, 0) + 1
+            depths[span.span_id] = depth
+            rows.append({
+                'span': span,
+                'depth': depth,
+                'offset': min(100.0, max(0.0, span.start_offset / total * 100)),
+                'width': min(100.0, max(0.5, span.duration / total * 100)),
+            })
+        return rows
+
+
+class Span(models.Model):
+    """Timed operation inside a transaction (database query, HTTP call, ...)"""
+
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        related_name='spans'
+    )
+    span_id = models.CharField(max_length=16)
+    parent_span_id = models.CharField(max_length=16, null=True, blank=True)
+    op = models.CharField(max_length=64, db_index=True)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=32, default='ok')
+
+    # Milliseconds since the start of the transaction, and duration
+    start_offset = models.FloatField()
+    duration = models.FloatField()
+    data = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        ordering = ['transaction', 'start_offset']
+
+    def __str__(self):
+        return f"{self.op} ({self.duration:.1f} ms)"
@@ -1,3 +1,61 @@
+"""
+Tests for the dashboard views.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from .models import Project, Transaction
+
+
+class PerformanceViewTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user(username='owner', password='secret')
+        self.project = Project.objects.create(name='Shop', owner=owner)
+        self.client.force_login(owner)
+        self.url = reverse('core:performance', kwargs={'project_pk': self.project.pk})
+
+    def add(self, name, durations, sample_rate=1.0):
+        Transaction.objects.bulk_create(
+            Transaction(
+                project=self.project, event_id=f'{name}-{sample_rate}-{i}', trace_id='a' * 32, span_id='b' * 16,
+                name=name, start_timestamp=timezone.now(), duration=duration, sample_rate=sample_rate,
+            )
+            for i, duration in enumerate(durations)
+        )
+
+    def endpoints(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return {endpoint['name']: endpoint for endpoint in response.context['endpoints']}
+
+    def test_nearest_rank_percentiles(self):
+        self.add('GET /orders', range(1, 101))
+        self.add('GET /cart', [5.0])
+        endpoints = self.endpoints()
+        orders = endpoints['GET /orders']
+        self.assertEqual((orders['p50'], orders['p95'], orders['p99']), (50, 95, 99))
+        cart = endpoints['GET /cart']
+        self.assertEqual((cart['p50'], cart['p95'], cart['p99']), (5, 5, 5))
+
+    def test_percentiles_weighted_by_sample_rate(self):
+        # 5 fast rows kept at 10% stand for 50 requests, against 10 slow
+        # ones: unweighted, the median row would be a slow one
+        self.add('GET /orders', [10.0] * 5, sample_rate=0.1)
+        self.add('GET /orders', [1000.0] * 10)
+        orders = self.endpoints()['GET /orders']
+        self.assertEqual(orders['count'], 15)
+        self.assertEqual((orders['p50'], orders['p95']), (10, 1000))
+
+    def test_query_count_does_not_grow_with_endpoints(self):
+        self.add('GET /a', [1.0, 2.0])
+        with CaptureQueriesContext(connection) as few:
+            self.endpoints()
+        for i in range(20):
+            self.add(f'GET /e{i}', [1.0, 2.0, 3.0])
+        with CaptureQueriesContext(connection) as many:
+            self.endpoints()
+        self.assertEqual(len(few), len(many))
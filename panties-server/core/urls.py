@@ -26,4 +26,8 @@ urlpatterns = [
     path('projects/<int:project_pk>/errors/', views.ErrorEventListView.as_view(), name='error_list'),
     path('projects/<int:project_pk>/errors/<int:pk>/', views.ErrorEventDetailView.as_view(), name='error_detail'),
     path('projects/<int:project_pk>/errors/<int:pk>/delete/', views.ErrorEventDeleteView.as_view(), name='error_delete'),
+
+    # Performance
+    path('projects/<int:project_pk>/performance/', views.PerformanceView.as_view(), name='performance'),
+    path('projects/<int:project_pk>/performance/<int:pk>/', views.TransactionDetailView.as_view(), name='transaction_detail'),
 ]
@@ -5,15 +5,16 @@ import json
 from datetime import timedelta
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Q, Count
+from django.db.models import Q, Avg, Count, F, FloatField, Max, Sum
+from django.db.models.functions import Cast
 from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse_lazy, reverse
 from django.utils import timezone
 from django.views.generic import (
-    ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
+    ListView, DetailView, CreateView, UpdateView, DeleteView, FormView, TemplateView
 )
 
-from .models import Project, ProjectMember, ErrorEvent
+from .models import Project, ProjectMember, ErrorEvent, Transaction
 from .forms import ProjectForm, ProjectMemberForm, ProjectMemberUpdateForm
 from .mixins import ProjectAccessMixin, ProjectEditMixin, ProjectDeleteMixin, ProjectOwnerMixin
 
@@ -59,6 +60,33 @@ class ProjectDetailView(ProjectAccessMixin, DetailView):
         week_ago = timezone.now() - timedelta(days=7)
         context['errors_week'] = self.object.errors.filter(timestamp__gte=week_ago).count()
 
+        # Events dropped client-side (sampling / rate limiting) in the last 7 days,
+        # and the estimated true volume extrapolated from the sample rates
+        context['discarded_week'] = self.object.discarded_counts.filter(
+            date__gte=week_ago.date()
+        ).aggregate(total=Sum('quantity'))['total'] or 0
+        if context['discarded_week']:
+            estimated = self.object.errors.filter(timestamp__gte=week_ago).aggregate(
+                total=Sum(Cast(F('occurrences'), FloatField()) / F('sample_rate'))
+            )['total'] or 0
+            context['estimated_week'] = round(estimated)
+
+        # Release health: crash-free sessions per release in the last 7 days,
+        # most recently active releases first
+        releases = self.object.session_counts.filter(hour__gte=week_ago).values('release').annotate(
+            exited=Sum('exited'), errored=Sum('errored'), crashed=Sum('crashed'), last_seen=Max('hour'),
+        ).order_by('-last_seen')[:10]
+        release_health = []
+        for row in releases:
+            total = row['exited'] + row['errored'] + row['crashed']
+            if not total:
+                continue
+            row['sessions'] = total
+            row['crash_free'] = 100.0 * (total - row['crashed']) / total
+            row['error_free'] = 100.0 * row['exited'] / total
+            release_health.append(row)
+        context['release_health'] = release_health
+
         # Errors per day for chart (last 7 days)
         errors_per_day = []
         labels = []
@@ -255,6 +283,9 @@ class ErrorEventDetailView(ProjectAccessMixin, DetailView):
         context = super().get_context_data(**kwargs)
         context['project'] = self.project
         context['can_edit'] = self.project.user_can_edit(self.request.user)
+        context['frames'] = list(self.object.frames.all())
+        if self.object.exception_chain:
+            context['exceptions'] = self.object.exception_tree(context['frames'])
         return context
 
 
@@ -277,3 +308,107 @@ class ErrorEventDeleteView(ProjectEditMixin, DeleteView):
         context = super().get_context_data(**kwargs)
         context['project'] = self.project
         return context
+
+
+# Performance Views
+
+# Time windows selectable on the performance page
+PERFORMANCE_PERIODS = {
+    '1h': timedelta(hours=1),
+    '24h': timedelta(days=1),
+    '7d': timedelta(days=7),
+}
+
+# Endpoints shown on the performance page, busiest first
+MAX_ENDPOINTS = 50
+
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def latency_percentiles(transactions, endpoints):
+    """
+    Add weighted nearest-rank percentiles of ``duration`` (``p50``,
+    ``p95``, ``p99``) to each endpoint dict, whose ``estimated`` is the sum
+    of the ``1 / sample_rate`` weights of its rows.
+
+    A row kept at ``sample_rate`` 0.1 stands for ten requests, so it counts
+    ten times: the percentiles describe the estimated traffic rather than
+    the stored rows. All endpoints come from a single query ordered by
+    name and duration, streamed so the durations are never all in memory.
+    """
+    by_name = {}
+    for endpoint in endpoints:
+        endpoint.update(dict.fromkeys(f'p{percentile}' for percentile in LATENCY_PERCENTILES))
+        by_name[endpoint['name']] = endpoint
+    rows = (
+        transactions.filter(name__in=by_name)
+        .order_by('name', 'duration')
+        .values_list('name', 'duration', 'sample_rate')
+    )
+    endpoint = targets = None
+    seen = 0.0
+    for name, duration, sample_rate in rows.iterator(chunk_size=2000):
+        if endpoint is None or name != endpoint['name']:
+            endpoint = by_name[name]
+            # Allow for rounding between the database sum and ours
+            targets = [
+                (f'p{percentile}', endpoint['estimated'] * percentile / 100 * (1 - 1e-9))
+                for percentile in LATENCY_PERCENTILES
+            ]
+            seen = 0.0
+        seen += 1.0 / sample_rate
+        while targets and seen >= targets[0][1]:
+            endpoint[targets.pop(0)[0]] = duration
+
+
+class PerformanceView(ProjectAccessMixin, TemplateView):
+    """Per-endpoint latency percentiles, with the slowest transactions of one endpoint."""
+    template_name = 'core/performance.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        period = self.request.GET.get('period')
+        if period not in PERFORMANCE_PERIODS:
+            period = '24h'
+        since = timezone.now() - PERFORMANCE_PERIODS[period]
+        transactions = Transaction.objects.filter(project=self.project, start_timestamp__gte=since)
+
+        endpoints = list(
+            transactions.values('name').annotate(
+                count=Count('id'),
+                failed=Count('id', filter=~Q(status='ok')),
+                avg=Avg('duration'),
+                # Requests each row stands for under client-side sampling
+                estimated=Sum(1.0 / Cast(F('sample_rate'), FloatField())),
+            ).order_by('-count')[:MAX_ENDPOINTS]
+        )
+        latency_percentiles(transactions, endpoints)
+        for endpoint in endpoints:
+            endpoint['error_rate'] = endpoint['failed'] / endpoint['count'] * 100
+
+        selected = self.request.GET.get('name')
+        if selected:
+            context['selected'] = selected
+            context['slowest'] = transactions.filter(name=selected).order_by('-duration')[:20]
+
+        context['project'] = self.project
+        context['period'] = period
+        context['periods'] = list(PERFORMANCE_PERIODS)
+        context['endpoints'] = endpoints
+        return context
+
+
+class TransactionDetailView(ProjectAccessMixin, DetailView):
+    """A single transaction with its spans as a waterfall."""
+    model = Transaction
+    template_name = 'core/transaction_detail.html'
+    context_object_name = 'txn'
+
+    def get_queryset(self):
+        return Transaction.objects.filter(project=self.project)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['project'] = self.project
+        context['span_rows'] = self.object.span_rows()
+        return context